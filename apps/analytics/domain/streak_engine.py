@@ -0,0 +1,123 @@
+import datetime
+import numpy as np
+
+
+EPOCH = datetime.date(1970, 1, 1)
+#1970-01-01 is a Thursday, shifting by three days makes every weekly bucket start on a Monday
+WEEK_ALIGNMENT_DAYS = 3
+
+
+
+class StreakSummary:
+	"""
+	The streaks of many habits, computed from their progress history.
+
+	Per habit arrays (sorted by habit id): habit_ids, current_streaks, longest_streaks.
+	Per run arrays (sorted by habit id, then time): run_habit_ids, run_first_days,
+	run_last_days and run_lengths. Days are counted from 1970-01-01, lengths in periods.
+	"""
+	def __init__(self, habit_ids, current_streaks, longest_streaks, run_habit_ids, run_first_days, run_last_days, run_lengths):
+		self.habit_ids = habit_ids
+		self.current_streaks = current_streaks
+		self.longest_streaks = longest_streaks
+		self.run_habit_ids = run_habit_ids
+		self.run_first_days = run_first_days
+		self.run_last_days = run_last_days
+		self.run_lengths = run_lengths
+
+
+	def to_dict(self):
+		"""
+		Converts the summary to plain Python values.
+
+		Returns:
+			dict: habit_id -> {'current_streak', 'longest_streak', 'runs'}, runs being
+				  (first tick date, last tick date, length in periods) tuples in time order.
+		"""
+		summary = {
+			int(habit_id): {'current_streak': int(current), 'longest_streak': int(longest), 'runs': []}
+			for habit_id, current, longest in zip(self.habit_ids, self.current_streaks, self.longest_streaks)
+		}
+		for habit_id, first_day, last_day, length in zip(self.run_habit_ids, self.run_first_days, self.run_last_days, self.run_lengths):
+			summary[int(habit_id)]['runs'].append((to_date(first_day), to_date(last_day), int(length)))
+		return summary
+
+
+
+def to_day_number(date):
+	"""Returns the amount of days between 1970-01-01 and a date or datetime."""
+	if isinstance(date, datetime.datetime):
+		date = date.date()
+	return (date - EPOCH).days
+
+
+
+def to_date(day_number):
+	"""Inverse of to_day_number."""
+	return EPOCH + datetime.timedelta(days=int(day_number))
+
+
+
+def compute_streaks(habit_ids, period_days, day_numbers, today):
+	"""
+	Computes the streaks of every habit in one vectorized pass over all progress rows.
+
+	Each tick is put in the period it falls in: a calendar day for daily habits, a Monday
+	to Sunday week for weekly ones. Several ticks in one period count once, and a run is a
+	sequence of consecutive periods with at least one tick. A habit's current streak is
+	its last run, as long as that run reaches the current or the previous period, otherwise
+	it expired and the current streak is 0.
+
+	Args:
+		habit_ids (array-like of int): The habit of every progress row.
+		period_days (array-like of int): The periodicity of the row's habit in days, 1 or 7.
+		day_numbers (array-like of int): The day of every progress row, see to_day_number.
+		today (int): The current day, see to_day_number.
+
+	Returns:
+		StreakSummary: Current and longest streak per habit and every run.
+	"""
+	habit_ids = np.asarray(habit_ids, dtype=np.int64)
+	period_days = np.asarray(period_days, dtype=np.int64)
+	day_numbers = np.asarray(day_numbers, dtype=np.int64)
+	if habit_ids.size == 0:
+		empty = np.empty(0, dtype=np.int64)
+		return StreakSummary(empty, empty, empty, empty, empty, empty, empty)
+
+	#a single packed int64 sort key is several times faster than an argsort over three arrays
+	first_day = day_numbers.min()
+	day_bits = int(day_numbers.max() - first_day).bit_length()
+	period_bits = int(period_days.max()).bit_length()
+	keys = np.sort((habit_ids << (period_bits + day_bits)) | (period_days << day_bits) | (day_numbers - first_day))
+	habit_ids = keys >> (period_bits + day_bits)
+	period_days = (keys >> day_bits) & ((1 << period_bits) - 1)
+	day_numbers = (keys & ((1 << day_bits) - 1)) + first_day
+	buckets = (day_numbers + WEEK_ALIGNMENT_DAYS) // period_days
+
+	starts_habit = np.ones(habit_ids.size, dtype=bool)
+	starts_habit[1:] = habit_ids[1:] != habit_ids[:-1]
+	starts_run = starts_habit.copy()
+	starts_run[1:] |= buckets[1:] > buckets[:-1] + 1
+
+	run_first_rows = np.flatnonzero(starts_run)
+	run_last_rows = np.append(run_first_rows[1:], habit_ids.size) - 1
+	run_lengths = buckets[run_last_rows] - buckets[run_first_rows] + 1
+
+	habit_first_runs = np.flatnonzero(starts_habit[run_first_rows])
+	habit_last_runs = np.append(habit_first_runs[1:], run_first_rows.size) - 1
+	longest_streaks = np.maximum.reduceat(run_lengths, habit_first_runs)
+
+	last_rows = run_last_rows[habit_last_runs]
+	current_buckets = (today + WEEK_ALIGNMENT_DAYS) // period_days[last_rows]
+	alive = buckets[last_rows] >= current_buckets - 1
+	current_streaks = np.where(alive, run_lengths[habit_last_runs], 0)
+
+	return StreakSummary(
+		habit_ids=habit_ids[run_first_rows[habit_first_runs]],
+		current_streaks=current_streaks,
+		longest_streaks=longest_streaks,
+		run_habit_ids=habit_ids[run_first_rows],
+		run_first_days=day_numbers[run_first_rows],
+		run_last_days=day_numbers[run_last_rows],
+		run_lengths=run_lengths,
+	)
@@ -22,9 +22,9 @@ class Analytics(models.Model):
 		]
 
 	def save(self, *args, **kwargs):
-		if self.times_completed < 0 or self.times_completed > 365:
+		if self.times_completed < 0:
 			raise ValueError("Habit is completed invalid amount of times.")
-		if self.streak_length < 0 or self.streak_length > 365:
+		if self.streak_length < 0:
 			raise ValueError("Streak is completed invalid amount of times.")
 
 		super().save(*args, **kwargs)
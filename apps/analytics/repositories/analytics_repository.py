@@ -1,6 +1,9 @@
 from apps.habits.repositories.habit_repository import HabitRepository
 from apps.database.database_manager import MariadbConnection
+from apps.database.instrumentation import instrument_repository_call
 from mysql.connector.errors import IntegrityError
+import numpy as np
+import datetime
 
 class AnalyticsRepositoryError(Exception):
 	"""BASE exception"""
@@ -16,16 +19,17 @@ class AnalyticsNotFoundError(AnalyticsRepositoryError):
 
 def handle_analytics_repository_errors(f):
 	"""Decorator, with an optional rollback in case of integrity error"""
+	f = instrument_repository_call(f)
 	def exception_wrapper(self, *args, **kwargs):
 		try:
 			return f(self, *args, **kwargs)
 		except IntegrityError as ierror:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise ierror
 		except AnalyticsRepositoryError as arerror:
 			raise arerror
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise error
 	return exception_wrapper
 
@@ -63,7 +67,7 @@ class AnalyticsRepository:
 		with self._db._connection.cursor() as cursor:	
 			query = "INSERT INTO analytics(times_completed, streak_length, last_completed_at, created_at, habit_id_id) VALUES (%s, %s, %s, NOW(), %s);"
 			cursor.execute(query, (times_completed, streak_length, last_completed_at, habit_id))
-			self._db._connection.commit()
+			self._db.commit()
 			return {
 				'analytics_id': cursor.lastrowid,
 				'times_completed': times_completed,
@@ -147,7 +151,7 @@ class AnalyticsRepository:
 		query = "UPDATE analytics SET " + set_commands + " WHERE analytics_id = %s;"
 		with self._db._connection.cursor() as cursor:
 			cursor.execute(query, updated_values)
-			self._db._connection.commit()
+			self._db.commit()
 
 			if cursor.rowcount == 0:
 				raise AnalyticsNotFoundError(f"Analytics for habit with analyticsid: {analytics_id} is not found.")
@@ -176,13 +180,90 @@ class AnalyticsRepository:
 		with self._db._connection.cursor() as cursor:
 			query = "DELETE FROM analytics WHERE analytics_id = %s"
 			cursor.execute(query, (analytics_id,))
-			self._db._connection.commit()
+			self._db.commit()
 			if cursor.rowcount == 0:
 				raise AnalyticsNotFoundError(f"Analytics for habit with id analyticsid: {analytics_id} is not found.")
 			return cursor.rowcount
 
 
 
+	@handle_analytics_repository_errors
+	def record_completions(self, completions):
+		"""
+		Folds a batch of habit completions into the analytics rows of their habits, creating missing rows.
+		Every completion counts once towards times_completed, streak_length keeps the longest streak
+		reached and last_completed_at the latest completion date.
+
+		Args:
+			completions (list of tuple): (habit_id, streak, completed_at) triples. completed_at may be None for now.
+
+		Returns:
+			int: The number of completions recorded.
+
+		Raises:
+			IntegrityError: If a habit does not exist.
+			AnalyticsRepositoryError: For repository-level errors related to analytics.
+			Exception: For any other unexpected errors.
+		"""
+		if not completions:
+			return 0
+
+		with self._db._connection.cursor() as cursor:
+			query = """
+				INSERT INTO analytics(habit_id_id, times_completed, streak_length, last_completed_at, created_at)
+				VALUES (%s, 1, %s, DATE(COALESCE(%s, NOW())), NOW())
+				ON DUPLICATE KEY UPDATE
+					times_completed = times_completed + 1,
+					streak_length = GREATEST(streak_length, VALUES(streak_length)),
+					last_completed_at = GREATEST(COALESCE(last_completed_at, VALUES(last_completed_at)), VALUES(last_completed_at));
+			"""
+			cursor.executemany(query, completions)
+			self._db.commit()
+			return len(completions)
+
+
+
+	@handle_analytics_repository_errors
+	def rebuild_analytics_chunk(self, after_habit_id, chunk_size):
+		"""
+		Rebuilds the analytics rows of the next chunk of habits, by habit_id, from their progress entries.
+		The chunk is replaced in its own unit of work, so a long backfill never holds more than one chunk's locks.
+
+		Args:
+			after_habit_id (int): The last habit_id of the previous chunk, 0 to start from the beginning.
+			chunk_size (int): The maximum number of habits to rebuild.
+
+		Returns:
+			tuple: (last habit_id of the chunk, number of habits in the chunk), or (None, 0) when no habits are left.
+
+		Raises:
+			IntegrityError: For database integrity-related errors.
+			AnalyticsRepositoryError: For repository-level errors related to analytics.
+			Exception: For any other unexpected errors.
+		"""
+		with self._db.unit_of_work():
+			with self._db._connection.cursor() as cursor:
+				cursor.execute("SELECT habit_id FROM habits WHERE habit_id > %s ORDER BY habit_id LIMIT %s;", (after_habit_id, chunk_size))
+				habit_ids = [row[0] for row in cursor.fetchall()]
+				if not habit_ids:
+					return None, 0
+
+				first_habit_id, last_habit_id = habit_ids[0], habit_ids[-1]
+				cursor.execute("DELETE FROM analytics WHERE habit_id_id BETWEEN %s AND %s;", (first_habit_id, last_habit_id))
+				query = """
+					INSERT INTO analytics(habit_id_id, times_completed, streak_length, last_completed_at, created_at)
+					SELECT g.habit_id_id, COUNT(p.progress_id), MAX(p.current_streak), DATE(MAX(p.occurence_date)), NOW()
+					FROM goals g
+					JOIN progresses p ON p.goal_id_id = g.goal_id
+					WHERE g.habit_id_id BETWEEN %s AND %s
+					GROUP BY g.habit_id_id;
+				"""
+				cursor.execute(query, (first_habit_id, last_habit_id))
+				self._db.commit()
+				return last_habit_id, len(habit_ids)
+
+
+
 	@handle_analytics_repository_errors
 	def calculate_longest_streak(self):
 		"""
@@ -269,22 +350,22 @@ class AnalyticsRepository:
 	@handle_analytics_repository_errors
 	def longest_streak_for_habit(self, habit_id):
 		"""
-		Retrieves the progress entry with the highest streak for the specified habit.
+		Retrieves the analytics row of the specified habit, which keeps the longest streak it ever reached.
 
 		Args:
 			habit_id (int): The unique identifier of the habit.
 
 		Returns:
-			list of tuples: Each tuple represents a progress record sorted by the highest streak first.
+			list of tuples: One (habit_id, streak_length, times_completed, last_completed_at) tuple.
 
 		Raises:
-			AnalyticsNotFoundError: If no progress entries are found for the given habit.
+			AnalyticsNotFoundError: If the habit has no analytics row, i.e. it was never completed.
 			IntegrityError: For database integrity-related errors.
 			AnalyticsRepositoryError: For other repository-level analytics errors.
 			Exception: For any other unexpected errors.
 		"""
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT p.* FROM progresses p JOIN goals g ON p.goal_id_id = g.goal_id WHERE g.habit_id_id = %s ORDER BY p.current_streak DESC LIMIT 1;"
+			query = "SELECT habit_id_id, streak_length, times_completed, last_completed_at FROM analytics WHERE habit_id_id = %s;"
 			cursor.execute(query, (habit_id, ))
 
 			result = cursor.fetchall()
@@ -296,27 +377,153 @@ class AnalyticsRepository:
 
 
 	@handle_analytics_repository_errors
-	def get_habit_streaks(self):
+	def get_streak_statistics(self, user_id=None, periodicity_type=None, active_only=False, percentiles=(0.5, 0.9, 0.99)):
+		"""
+		Aggregates the current habit streaks in the database, so only one row per statement is transferred
+		no matter how many habits match.
+
+		Args:
+			user_id (int, optional): Only include the habits of this user. Defaults to None.
+			periodicity_type (str, optional): Only include habits of this periodicity type. Defaults to None.
+			active_only (bool, optional): Only include habits with a streak above zero. Defaults to False.
+			percentiles (tuple of float, optional): Fractions between 0 and 1 to compute continuous percentiles for. Defaults to (0.5, 0.9, 0.99).
+
+		Returns:
+			dict: 'count', 'sum', 'mean', 'min', 'max' and 'percentiles', a dict keyed by the requested fractions.
+				  mean, min, max and the percentiles are None if no habit matches.
+
+		Raises:
+			IntegrityError: For database integrity-related errors.
+			AnalyticsRepositoryError: For other repository-level analytics errors.
+			Exception: For any other unexpected errors.
+		"""
+		conditions = []
+		filter_values = []
+		if user_id is not None:
+			conditions.append("habit_user_id = %s")
+			filter_values.append(user_id)
+		if periodicity_type is not None:
+			conditions.append("habit_periodicity_type = %s")
+			filter_values.append(periodicity_type)
+		if active_only:
+			conditions.append("habit_streak > 0")
+		where_clause = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+		with self._db._connection.cursor() as cursor:
+			query = "SELECT COUNT(*), COALESCE(SUM(habit_streak), 0), AVG(habit_streak), MIN(habit_streak), MAX(habit_streak) FROM habits" + where_clause + ";"
+			cursor.execute(query, filter_values)
+			count, total, mean, minimum, maximum = cursor.fetchone()
+
+			percentile_values = {percentile: None for percentile in percentiles}
+			if count and percentiles:
+				#MariaDB only offers PERCENTILE_CONT as a window function, every row carries the same values so one is enough
+				percentile_columns = ", ".join("PERCENTILE_CONT(%s) WITHIN GROUP (ORDER BY habit_streak) OVER ()" for _ in percentiles)
+				query = "SELECT " + percentile_columns + " FROM habits" + where_clause + " LIMIT 1;"
+				cursor.execute(query, list(percentiles) + filter_values)
+				percentile_values = dict(zip(percentiles, (float(value) for value in cursor.fetchone())))
+
+		return {
+			'count': count,
+			'sum': int(total),
+			'mean': float(mean) if mean is not None else None,
+			'min': minimum,
+			'max': maximum,
+			'percentiles': percentile_values,
+		}
+
+
+
+	@handle_analytics_repository_errors
+	def query_all_habit_streaks(self, today=None):
 		"""
-		Fetches all current streak values from the habits table.
+		Computes the longest-ever and the current streak of every habit from its progress log, in a single statement.
+
+		A "gaps and islands" query: ticks are bucketed per calendar day for daily habits and per Monday
+		to Sunday week for weekly ones, bucket minus ROW_NUMBER() is constant within a run of consecutive
+		buckets, so grouping by it yields every run. The current streak is the last run if it reaches the
+		current or the previous period. Agrees with streak_engine.compute_streaks, without pulling the history.
+
+		Args:
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
 
-		This method retrieves the `habit_streak` field for every habit.
-	
 		Returns:
-			list of tuples: Each tuple contains a single integer (habit_streak).
+			list of tuples: One (habit_id, longest_streak, current_streak) tuple per habit with progress, ordered by habit_id.
 
 		Raises:
-			AnalyticsNotFoundError: If there are no streak values present in the database.
-			IntegrityError: For database-level errors.
-			AnalyticsRepositoryError: For repository-level failures.
-			Exception: For any other unexpected exceptions.
+			IntegrityError: For database integrity-related errors.
+			AnalyticsRepositoryError: For other repository-level analytics errors.
+			Exception: For any other unexpected errors.
 		"""
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT habit_streak FROM habits;"
-			cursor.execute(query, )
+			query = """
+				WITH habit_periods AS (
+					SELECT habit_id, CASE WHEN habit_periodicity_type = 'weekly' THEN 7 ELSE 1 END AS period_days
+					FROM habits
+				),
+				ticks AS (
+					SELECT DISTINCT hp.habit_id, hp.period_days, FLOOR((DATEDIFF(p.occurence_date, '1970-01-01') + 3) / hp.period_days) AS bucket
+					FROM progresses p
+					JOIN goals g ON p.goal_id_id = g.goal_id
+					JOIN habit_periods hp ON g.habit_id_id = hp.habit_id
+				),
+				islands AS (
+					SELECT habit_id, period_days, bucket, bucket - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY bucket) AS island
+					FROM ticks
+				),
+				runs AS (
+					SELECT habit_id, period_days, MAX(bucket) AS last_bucket, COUNT(*) AS run_length
+					FROM islands
+					GROUP BY habit_id, period_days, island
+				)
+				SELECT habit_id,
+					MAX(run_length) AS longest_streak,
+					MAX(CASE WHEN last_bucket >= FLOOR((DATEDIFF(%s, '1970-01-01') + 3) / period_days) - 1 THEN run_length ELSE 0 END) AS current_streak
+				FROM runs
+				GROUP BY habit_id
+				ORDER BY habit_id;
+			"""
+			cursor.execute(query, ((today or datetime.date.today()).isoformat(),))
+			return [(habit_id, int(longest_streak), int(current_streak)) for habit_id, longest_streak, current_streak in cursor.fetchall()]
 
-			result = cursor.fetchall()
-			if result:
-				return result
-			else:
-				raise AnalyticsNotFoundError(f"There are no streaks to be found.")
\ No newline at end of file
+
+
+	@handle_analytics_repository_errors
+	def load_progress_history(self, habit_ids=None, chunk_size=100000):
+		"""
+		Loads the progress log as a NumPy array, for the vectorized streak engine.
+		Rows are fetched in chunks and packed as integers, so no Python object is kept per progress row.
+
+		Args:
+			habit_ids (list of int, optional): Only load the history of these habits. Defaults to every habit.
+			chunk_size (int, optional): Rows fetched per round trip. Defaults to 100000.
+
+		Returns:
+			numpy.ndarray: An (n, 3) int64 array of (habit_id, period in days, days since 1970-01-01) rows.
+
+		Raises:
+			IntegrityError: For database integrity-related errors.
+			AnalyticsRepositoryError: For other repository-level analytics errors.
+			Exception: For any other unexpected errors.
+		"""
+		where_clause = ""
+		if habit_ids is not None:
+			if not habit_ids:
+				return np.empty((0, 3), dtype=np.int64)
+			where_clause = " WHERE g.habit_id_id IN (" + ", ".join(["%s"] * len(habit_ids)) + ")"
+
+		query = (
+			"SELECT g.habit_id_id, IF(h.habit_periodicity_type = 'weekly', 7, 1), DATEDIFF(p.occurence_date, '1970-01-01') "
+			"FROM progresses p JOIN goals g ON p.goal_id_id = g.goal_id JOIN habits h ON g.habit_id_id = h.habit_id" + where_clause + ";"
+		)
+		chunks = []
+		with self._db._connection.cursor() as cursor:
+			cursor.execute(query, list(habit_ids or []))
+			while True:
+				rows = cursor.fetchmany(chunk_size)
+				if not rows:
+					break
+				chunks.append(np.array(rows, dtype=np.int64))
+
+		if not chunks:
+			return np.empty((0, 3), dtype=np.int64)
+		return np.concatenate(chunks)
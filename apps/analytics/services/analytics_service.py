@@ -1,11 +1,14 @@
 from apps.analytics.repositories.analytics_repository import AnalyticsRepository, AnalyticsNotFoundError
 from apps.habits.services.habit_service import HabitService
 from apps.progresses.services.progress_service import ProgressesService
+from apps.analytics.domain.streak_engine import compute_streaks, to_day_number
+from apps.utils.tracing import traced
 from mysql.connector.errors import IntegrityError
+import datetime
 import logging
 
 def handle_analytics_service_exceptions(f):
-
+	f = traced('service')(f)
 	def wrapper(*args, **kwargs):
 		try:
 			return f(*args, **kwargs) 
@@ -51,7 +54,7 @@ class AnalyticsService:
 			ValueError: 
 				- If the action provided is not one of the allowed values ("create", "update", "delete").
 				- If required fields (analytics_id, habit_id, times_completed, streak_length) are missing or invalid based on the action.
-				- If times_completed or streak_length values are outside the allowed range (0 to 365).
+				- If times_completed or streak_length values are negative.
 		"""
 		if action not in ["create", "update", "delete"]:
 			raise ValueError(f"Invalid action '{action}'. Allowed: create, update, delete.")
@@ -65,11 +68,11 @@ class AnalyticsService:
 		if action == "create" and not (times_completed and streak_length and habit_id):
 			raise ValueError("times_completed and streak_length and habit_id are required for creating an analytics.")
 
-		if streak_length and (streak_length < 0 or streak_length > 365):
-			raise ValueError("Streak_length must be between 0 and 365.")
+		if streak_length and streak_length < 0:
+			raise ValueError("Streak_length can not be negative.")
 		
-		if times_completed and (times_completed < 0 or times_completed > 365):
-			raise ValueError("times_completed must be between 0 and 365.")
+		if times_completed and times_completed < 0:
+			raise ValueError("times_completed can not be negative.")
 
 
 
@@ -176,6 +179,60 @@ class AnalyticsService:
 
 
 
+	@handle_analytics_service_exceptions
+	def record_completions(self, completions):
+		"""
+		Records habit completions in the analytics rows of their habits. Called from the tick path,
+		within the unit of work of the tick, so the analytics never drift from the progresses.
+
+		Args:
+			completions (list of tuple): (habit_id, streak, completed_at) triples, completed_at may be None for now.
+
+		Returns:
+			int: The number of completions recorded.
+
+		Logs and Raises:
+			ValueError: If a streak is negative.
+			IntegrityError: For database integrity-related issues, e.g. an unknown habit.
+			Exception: For any other unexpected errors in analytics service.
+		"""
+		if any(streak < 0 for _, streak, _ in completions):
+			raise ValueError("Streak can not be negative.")
+
+		return self._repository.record_completions(completions)
+
+
+
+	@handle_analytics_service_exceptions
+	def rebuild_analytics(self, chunk_size=500):
+		"""
+		Rebuilds every analytics row from the progresses table, chunk_size habits at a time.
+		Used to backfill the analytics of existing data and to repair drifted rows.
+
+		Args:
+			chunk_size (int, optional): Habits rebuilt per unit of work. Defaults to 500.
+
+		Returns:
+			int: The number of habits processed.
+
+		Logs and Raises:
+			ValueError: If chunk_size is not a positive integer.
+			IntegrityError: For database integrity-related issues.
+			Exception: For any other unexpected errors in analytics service.
+		"""
+		if not isinstance(chunk_size, int) or chunk_size < 1:
+			raise ValueError("chunk_size must be a positive integer.")
+
+		processed_habits = 0
+		last_habit_id = 0
+		while True:
+			last_habit_id, chunk_habits = self._repository.rebuild_analytics_chunk(after_habit_id=last_habit_id, chunk_size=chunk_size)
+			processed_habits += chunk_habits
+			if chunk_habits < chunk_size:
+				return processed_habits
+
+
+
 	@handle_analytics_service_exceptions
 	def calculate_longest_streak(self):
 		"""
@@ -237,16 +294,16 @@ class AnalyticsService:
 	@handle_analytics_service_exceptions
 	def longest_streak_for_habit(self, habit_id):
 		"""
-		Retrieves the single highest streak entry from 'progresses' for a given habit.
+		Retrieves the longest streak a given habit ever reached from its analytics row.
 
 		Args:
 			habit_id (int): The unique identifier of the habit.
 
 		Returns:
-			list of tuples: The fetched progress records ordered by largest streak first.
+			list of tuples: One (habit_id, streak_length, times_completed, last_completed_at) tuple.
 
 		Raises:
-			AnalyticsNotFoundError: If no progress data is found for the habit.
+			AnalyticsNotFoundError: If the habit was never completed.
 			IntegrityError: For database integrity-related issues.
 			Exception: For other unexpected errors in analytics service.
 		"""
@@ -254,28 +311,108 @@ class AnalyticsService:
 		return result
 
 
+	@handle_analytics_service_exceptions
+	def get_streak_statistics(self, user_id=None, periodicity_type=None, active_only=False, percentiles=(0.5, 0.9, 0.99)):
+		"""
+		Summarises the current habit streaks: count, sum, mean, min, max and percentiles.
+		Everything is aggregated in the database, so memory and transfer stay constant
+		however many habits there are.
+
+		Args:
+			user_id (int, optional): Only include the habits of this user. Defaults to None.
+			periodicity_type (str, optional): Only include 'daily' or 'weekly' habits. Defaults to None.
+			active_only (bool, optional): Only include habits with a streak above zero. Defaults to False.
+			percentiles (tuple of float, optional): Fractions between 0 and 1. Defaults to (0.5, 0.9, 0.99).
+
+		Returns:
+			dict: 'count', 'sum', 'mean', 'min', 'max' and 'percentiles' (keyed by fraction).
+
+		Raises:
+			ValueError: If the periodicity type or a percentile is invalid.
+			IntegrityError: For database integrity-related issues.
+			Exception: For any other unexpected errors in analytics service.
+		"""
+		if periodicity_type is not None and periodicity_type.upper() not in {"DAILY", "WEEKLY"}:
+			raise ValueError("Invalid habit periodicity type. Expected daily or weekly.")
+
+		if any(not 0.0 <= percentile <= 1.0 for percentile in percentiles):
+			raise ValueError("Percentiles must be between 0 and 1.")
+
+		return self._repository.get_streak_statistics(
+			user_id=user_id,
+			periodicity_type=periodicity_type.lower() if periodicity_type else None,
+			active_only=active_only,
+			percentiles=tuple(percentiles)
+		)
+
+
+
 	@handle_analytics_service_exceptions
 	def average_streaks(self):
 		"""
 		Calculates the average streak length across all tracked habits.
 
-		This method fetches all current streak values and returns the average
-		streak length across them. Useful for understanding user consistency
-		trends across the system.
+		The average is computed by the database, so only a single
+		row is read however many habits exist. Useful for understanding
+		user consistency trends across the system.
 
 		Returns:
 			float: The average streak length. Returns 0.0 if no streak data is available, in case you start with an empty database.
 
 		Raises:
-			AnalyticsNotFoundError: If no streak data can be retrieved.
 			IntegrityError: For database integrity-related issues.
 			Exception: For any other unexpected errors in analytics service.
 		"""
-		all_streaks = self._repository.get_habit_streaks()
-		amount_of_habits = len(all_streaks)
-		total = 0
+		statistics = self._repository.get_streak_statistics(percentiles=())
+		return statistics['mean'] if statistics['count'] else 0.0
+
 
-		for streak in all_streaks:
-			total += streak[0]
 
-		return (total/amount_of_habits) if amount_of_habits else 0.0
\ No newline at end of file
+	@handle_analytics_service_exceptions
+	def get_all_habit_streaks(self, today=None):
+		"""
+		Retrieves the longest-ever and the current streak of every habit, computed from the progress log by
+		a single window function statement in the database. Use this instead of compute_historical_streaks
+		when the history is too large to pull into Python.
+
+		Args:
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
+
+		Returns:
+			dict: habit_id -> {'longest_streak', 'current_streak'}. Habits without progress are left out.
+
+		Raises:
+			IntegrityError: For database integrity-related issues.
+			Exception: For any other unexpected errors in analytics service.
+		"""
+		rows = self._repository.query_all_habit_streaks(today=today)
+		return {habit_id: {'longest_streak': longest_streak, 'current_streak': current_streak} for habit_id, longest_streak, current_streak in rows}
+
+
+
+	@handle_analytics_service_exceptions
+	def compute_historical_streaks(self, habit_ids=None, today=None):
+		"""
+		Recomputes the streaks of habits from their progress log, instead of trusting the
+		denormalized progresses.current_streak and habits.habit_streak columns.
+
+		The history of all requested habits is loaded as one NumPy array and every streak
+		is computed in a single vectorized pass, see streak_engine.compute_streaks.
+
+		Args:
+			habit_ids (list of int, optional): The habits to compute. Defaults to every habit with progress.
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
+
+		Returns:
+			dict: habit_id -> {'current_streak', 'longest_streak', 'runs'}, runs being
+				  (first tick date, last tick date, length in periods) tuples. Habits without progress are left out.
+
+		Raises:
+			IntegrityError: For database integrity-related issues.
+			Exception: For any other unexpected errors in analytics service.
+		"""
+		history = self._repository.load_progress_history(habit_ids=habit_ids)
+		today = to_day_number(today or datetime.date.today())
+
+		summary = compute_streaks(habit_ids=history[:, 0], period_days=history[:, 1], day_numbers=history[:, 2], today=today)
+		return summary.to_dict()
@@ -0,0 +1,75 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from apps.analytics.repositories.analytics_repository import AnalyticsRepository
+
+
+@pytest.fixture
+def mock_cursor():
+	"""
+	Fixture returning a MagicMock cursor usable as a context manager.
+
+	Returns:
+		MagicMock: The mocked cursor.
+	"""
+	cursor = MagicMock()
+	cursor.__enter__.return_value = cursor
+	return cursor
+
+
+
+@pytest.fixture
+def analytics_repository(mock_cursor):
+	"""
+	Fixture instantiating AnalyticsRepository on a mocked database connection.
+
+	Returns:
+		AnalyticsRepository: Repository whose connection hands out mock_cursor.
+	"""
+	database = MagicMock()
+	database._connection.cursor.return_value = mock_cursor
+	return AnalyticsRepository(database=database, habit_repository=MagicMock())
+
+
+
+def test_get_streak_statistics_reads_single_rows(analytics_repository, mock_cursor):
+	"""
+	Test that the statistics are aggregated by the database and only single rows are transferred.
+
+	Given:
+		- The aggregate row and the percentile row MariaDB returns, with DECIMAL values.
+	When:
+		- get_streak_statistics is called with every filter.
+	Then:
+		- Two statements run, both filtered the same way, nothing is fetched with fetchall and the values are plain numbers.
+	"""
+	mock_cursor.fetchone.side_effect = [(4, Decimal(20), Decimal("5.0000"), 1, 10), (Decimal("4.5"), Decimal("9.1"))]
+
+	result = analytics_repository.get_streak_statistics(user_id=7, periodicity_type="daily", active_only=True, percentiles=(0.5, 0.9))
+
+	assert result == {'count': 4, 'sum': 20, 'mean': 5.0, 'min': 1, 'max': 10, 'percentiles': {0.5: 4.5, 0.9: 9.1}}
+	assert mock_cursor.execute.call_count == 2
+	mock_cursor.fetchall.assert_not_called()
+
+	aggregate_query, aggregate_values = mock_cursor.execute.call_args_list[0].args
+	percentile_query, percentile_values = mock_cursor.execute.call_args_list[1].args
+	for query in (aggregate_query, percentile_query):
+		assert "WHERE habit_user_id = %s AND habit_periodicity_type = %s AND habit_streak > 0" in query
+	assert aggregate_values == [7, "daily"]
+	assert percentile_values == [0.5, 0.9, 7, "daily"]
+	assert percentile_query.endswith("LIMIT 1;")
+
+
+
+def test_get_streak_statistics_without_habits_skips_percentiles(analytics_repository, mock_cursor):
+	"""
+	Test that an empty selection returns a zero count without asking for percentiles.
+	"""
+	mock_cursor.fetchone.return_value = (0, 0, None, None, None)
+
+	result = analytics_repository.get_streak_statistics()
+
+	assert result == {'count': 0, 'sum': 0, 'mean': None, 'min': None, 'max': None, 'percentiles': {0.5: None, 0.9: None, 0.99: None}}
+	assert mock_cursor.execute.call_count == 1
+	assert "WHERE" not in mock_cursor.execute.call_args.args[0]
@@ -1,3 +1,5 @@
+import datetime
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 from mysql.connector.errors import IntegrityError
@@ -174,39 +176,60 @@ def test_update_analytics_success(analytics_service, mock_analytics_repo):
 
 def test_average_streaks_empty(analytics_service, mock_analytics_repo):
 	"""
-	Test calculating average streaks from nonexisting analytics records.
+	Test calculating average streaks when there are no habits yet.
 
 	Given:
-		- repository.get_habit_streaks returns a list of tuples with streak values.
+		- repository.get_streak_statistics reports a count of zero.
 	When:
 		- average_streaks is called.
 	Then:
-		- The correct average is computed and returned.
+		- 0.0 is returned.
 	"""
-	mock_analytics_repo.get_habit_streaks.return_value = []
+	mock_analytics_repo.get_streak_statistics.return_value = {'count': 0, 'sum': 0, 'mean': None, 'min': None, 'max': None, 'percentiles': {}}
 
 	result = analytics_service.average_streaks()
 	assert result == 0.0
-	mock_analytics_repo.get_habit_streaks.assert_called_once()
+	mock_analytics_repo.get_streak_statistics.assert_called_once_with(percentiles=())
 
 
 
 def test_average_streaks_success(analytics_service, mock_analytics_repo):
 	"""
-	Test calculating average streaks from existing analytics records.
+	Test that the average comes from the database aggregate instead of summing rows in Python.
 
 	Given:
-		- repository.get_habit_streaks returns a list of tuples with streak values.
+		- repository.get_streak_statistics returns the aggregate of three habits.
 	When:
 		- average_streaks is called.
 	Then:
-		- The correct average is computed and returned.
+		- The mean of the aggregate is returned.
 	"""
-	mock_analytics_repo.get_habit_streaks.return_value = [(2,), (4,), (6,)]
+	mock_analytics_repo.get_streak_statistics.return_value = {'count': 3, 'sum': 12, 'mean': 4.0, 'min': 2, 'max': 6, 'percentiles': {}}
 
 	result = analytics_service.average_streaks()
 	assert result == 4.0
-	mock_analytics_repo.get_habit_streaks.assert_called_once()
+	mock_analytics_repo.get_streak_statistics.assert_called_once()
+
+
+
+def test_get_streak_statistics_forwards_filters(analytics_service, mock_analytics_repo):
+	"""
+	Test that the filters and percentiles reach the repository normalised.
+	"""
+	analytics_service.get_streak_statistics(user_id=3, periodicity_type="WEEKLY", active_only=True, percentiles=[0.5, 0.95])
+
+	mock_analytics_repo.get_streak_statistics.assert_called_once_with(user_id=3, periodicity_type="weekly", active_only=True, percentiles=(0.5, 0.95))
+
+
+
+@pytest.mark.parametrize("arguments", [{'periodicity_type': "yearly"}, {'percentiles': (0.5, 1.5)}])
+def test_get_streak_statistics_rejects_invalid_arguments(analytics_service, mock_analytics_repo, arguments):
+	"""
+	Test that unknown periodicity types and percentiles outside [0, 1] are rejected before querying.
+	"""
+	with pytest.raises(ValueError):
+		analytics_service.get_streak_statistics(**arguments)
+	mock_analytics_repo.get_streak_statistics.assert_not_called()
 
 
 
@@ -314,3 +337,90 @@ def test_misc_analytics_queries(analytics_service, mock_analytics_repo):
 	mock_analytics_repo.longest_streak_for_habit.return_value = [(1,7,'h', 'date',3)]
 	assert analytics_service.longest_streak_for_habit(habit_id=50) == [(1,7,'h', 'date',3)]
 	mock_analytics_repo.longest_streak_for_habit.assert_called_once_with(50)
+
+
+
+def test_record_completions_forwards_to_repository(analytics_service, mock_analytics_repo):
+	"""
+	Test that completions are folded into the analytics rows with one repository call.
+	"""
+	mock_analytics_repo.record_completions.return_value = 2
+	completions = [(1, 4, None), (2, 0, None)]
+
+	assert analytics_service.record_completions(completions) == 2
+	mock_analytics_repo.record_completions.assert_called_once_with(completions)
+
+
+
+def test_record_completions_rejects_negative_streaks(analytics_service, mock_analytics_repo):
+	"""
+	Test that a negative streak never reaches the analytics table.
+	"""
+	with pytest.raises(ValueError):
+		analytics_service.record_completions([(1, -1, None)])
+	mock_analytics_repo.record_completions.assert_not_called()
+
+
+
+def test_rebuild_analytics_walks_every_chunk(analytics_service, mock_analytics_repo):
+	"""
+	Test that the backfill rebuilds chunk after chunk until a chunk comes back short.
+
+	Given:
+		- Five habits and a chunk size of two.
+	When:
+		- rebuild_analytics is called.
+	Then:
+		- Three chunks are rebuilt, each starting after the last habit of the previous one.
+	"""
+	mock_analytics_repo.rebuild_analytics_chunk.side_effect = [(2, 2), (4, 2), (5, 1)]
+
+	assert analytics_service.rebuild_analytics(chunk_size=2) == 5
+	assert [call.kwargs['after_habit_id'] for call in mock_analytics_repo.rebuild_analytics_chunk.call_args_list] == [0, 2, 4]
+
+
+
+def test_validate_analytics_allows_long_lived_habits(analytics_service):
+	"""
+	Test that habits tracked for more than a year pass validation, only negative values are rejected.
+	"""
+	analytics_service.validate_analytics("update", habit_id=1, analytics_id=1, times_completed=1000, streak_length=400)
+
+	with pytest.raises(ValueError):
+		analytics_service.validate_analytics("update", habit_id=1, analytics_id=1, times_completed=-1, streak_length=400)
+
+
+
+def test_compute_historical_streaks_uses_the_progress_log(analytics_service, mock_analytics_repo):
+	"""
+	Test that historical streaks are computed from the loaded progress log.
+
+	Given:
+		- A daily habit ticked on the two days before 2025-03-19 and the day itself.
+	When:
+		- compute_historical_streaks is called for that day.
+	Then:
+		- The history of the requested habits is loaded once and a current streak of 3 is reported.
+	"""
+	today = datetime.date(2025, 3, 19)
+	days_since_epoch = (today - datetime.date(1970, 1, 1)).days
+	mock_analytics_repo.load_progress_history.return_value = np.array([(5, 1, days_since_epoch - day) for day in (2, 1, 0)], dtype=np.int64)
+
+	result = analytics_service.compute_historical_streaks(habit_ids=[5], today=today)
+
+	mock_analytics_repo.load_progress_history.assert_called_once_with(habit_ids=[5])
+	assert result[5]['current_streak'] == 3
+	assert result[5]['longest_streak'] == 3
+
+
+
+def test_get_all_habit_streaks_is_one_repository_call(analytics_service, mock_analytics_repo):
+	"""
+	Test that the streaks of every habit come from a single repository statement, keyed by habit.
+	"""
+	mock_analytics_repo.query_all_habit_streaks.return_value = [(1, 5, 2), (4, 3, 0)]
+
+	result = analytics_service.get_all_habit_streaks(today=datetime.date(2025, 3, 19))
+
+	assert result == {1: {'longest_streak': 5, 'current_streak': 2}, 4: {'longest_streak': 3, 'current_streak': 0}}
+	mock_analytics_repo.query_all_habit_streaks.assert_called_once_with(today=datetime.date(2025, 3, 19))
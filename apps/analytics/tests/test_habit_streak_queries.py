@@ -0,0 +1,91 @@
+import random
+import datetime
+import pytest
+from unittest.mock import MagicMock
+from django.db import connection
+
+from apps.habits.models import Habits
+from apps.goals.models import Goals
+from apps.analytics.repositories.analytics_repository import AnalyticsRepository
+from apps.analytics.domain.streak_engine import compute_streaks, to_day_number
+
+
+TODAY = datetime.date(2025, 3, 19)
+
+pytestmark = pytest.mark.django_db
+
+
+
+@pytest.fixture
+def analytics_repository():
+	"""
+	Fixture instantiating AnalyticsRepository on the test database. On SQLite, DATEDIFF is
+	registered so the MariaDB statement runs unchanged.
+
+	Returns:
+		AnalyticsRepository: Repository running its SQL on the test database.
+	"""
+	connection.ensure_connection()
+	if connection.vendor == "sqlite":
+		connection.connection.create_function("DATEDIFF", 2, lambda date, other_date: (datetime.date.fromisoformat(str(date)[:10]) - datetime.date.fromisoformat(str(other_date)[:10])).days)
+
+	database = MagicMock()
+	database._connection = connection
+	return AnalyticsRepository(database=database, habit_repository=MagicMock())
+
+
+
+@pytest.fixture
+def seeded_history(setup_user):
+	"""
+	Fixture seeding 40 daily and weekly habits with random ticks over the last 120 days,
+	some of them with several goals or several ticks a day.
+
+	Returns:
+		list of tuple: The (habit_id, period in days, day number) of every seeded tick.
+	"""
+	generator = random.Random(12)
+	history = []
+	progress_rows = []
+	for number in range(40):
+		periodicity_type = generator.choice(('daily', 'weekly'))
+		habit = Habits.objects.create(habit_name=f"seeded habit {number}", habit_user=setup_user, habit_action="seeded", habit_periodicity_type=periodicity_type)
+		goals = [Goals.objects.create(goal_name=f"seeded goal {number}.{goal}", habit_id=habit, target_kvi_value=1.0) for goal in range(generator.choice((1, 1, 2)))]
+		tick_chance = generator.random()
+		for days_ago in range(120):
+			for _ in range(generator.choice((1, 1, 1, 2))):
+				if generator.random() < tick_chance:
+					occurence_date = datetime.datetime.combine(TODAY, datetime.time(generator.randint(0, 23), generator.randint(0, 59))) - datetime.timedelta(days=days_ago)
+					progress_rows.append((generator.choice(goals).goal_id, occurence_date.strftime("%Y-%m-%d %H:%M:%S")))
+					history.append((habit.habit_id, 7 if periodicity_type == 'weekly' else 1, to_day_number(occurence_date)))
+
+	with connection.cursor() as cursor:
+		cursor.executemany(
+			"INSERT INTO progresses(goal_id_id, progress_description, current_kvi_value, distance_from_goal_kvi_value, current_streak, occurence_date, goal_name, habit_name) VALUES (%s, 'seeded', 1.0, 0.0, 0, %s, 'seeded', 'seeded');",
+			progress_rows
+		)
+	return history
+
+
+
+def test_query_all_habit_streaks_agrees_with_python(analytics_repository, seeded_history):
+	"""
+	Test the gaps and islands statement against the Python streak engine on seeded data.
+
+	Given:
+		- 40 seeded habits with random, unordered ticks, including several ticks per period.
+	When:
+		- query_all_habit_streaks is called.
+	Then:
+		- It returns one row per habit with progress, and the longest and current streak of every row
+		  equal those computed in Python from the same ticks.
+	"""
+	habit_ids, period_days, day_numbers = zip(*seeded_history)
+	expected = compute_streaks(habit_ids=habit_ids, period_days=period_days, day_numbers=day_numbers, today=to_day_number(TODAY)).to_dict()
+
+	rows = analytics_repository.query_all_habit_streaks(today=TODAY)
+
+	assert [habit_id for habit_id, _, _ in rows] == sorted(expected)
+	for habit_id, longest_streak, current_streak in rows:
+		assert (longest_streak, current_streak) == (expected[habit_id]['longest_streak'], expected[habit_id]['current_streak'])
+	assert any(current_streak for _, _, current_streak in rows)
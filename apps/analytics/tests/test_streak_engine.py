@@ -0,0 +1,142 @@
+import random
+import datetime
+import numpy as np
+import pytest
+
+from apps.analytics.domain.streak_engine import compute_streaks, to_day_number, to_date, WEEK_ALIGNMENT_DAYS
+
+
+TODAY = to_day_number(datetime.date(2025, 3, 19))
+
+
+
+def reference_streaks(history, today):
+	"""
+	Computes the streaks habit by habit with plain loops, the way one would by hand.
+
+	Args:
+		history (list of tuple): (habit_id, period in days, day number) rows.
+		today (int): The current day number.
+
+	Returns:
+		dict: habit_id -> (current streak, longest streak, run lengths).
+	"""
+	periods_by_habit = {}
+	for habit_id, period, day in history:
+		periods_by_habit.setdefault(habit_id, (period, set()))[1].add((day + WEEK_ALIGNMENT_DAYS) // period)
+
+	result = {}
+	for habit_id, (period, periods) in periods_by_habit.items():
+		runs = []
+		previous = None
+		for bucket in sorted(periods):
+			if previous is not None and bucket == previous + 1:
+				runs[-1] += 1
+			else:
+				runs.append(1)
+			previous = bucket
+		alive = previous >= (today + WEEK_ALIGNMENT_DAYS) // period - 1
+		result[habit_id] = (runs[-1] if alive else 0, max(runs), runs)
+	return result
+
+
+
+def summarise(history, today):
+	history = np.array(history, dtype=np.int64).reshape(-1, 3)
+	return compute_streaks(habit_ids=history[:, 0], period_days=history[:, 1], day_numbers=history[:, 2], today=today).to_dict()
+
+
+
+def test_daily_streak_runs():
+	"""
+	Test a daily habit with a gap, a double tick and a streak that is still alive.
+
+	Given:
+		- Ticks 3 days in a row, a missed day, then ticks yesterday and twice today.
+	When:
+		- compute_streaks is called.
+	Then:
+		- Two runs are found, the longest is 3 and the current one is 2.
+	"""
+	history = [(1, 1, TODAY - day) for day in (6, 5, 4, 1, 0, 0)]
+
+	result = summarise(history, TODAY)
+
+	assert result[1]['current_streak'] == 2
+	assert result[1]['longest_streak'] == 3
+	assert result[1]['runs'] == [
+		(to_date(TODAY - 6), to_date(TODAY - 4), 3),
+		(to_date(TODAY - 1), to_date(TODAY), 2),
+	]
+
+
+
+def test_expired_streak_is_not_current():
+	"""
+	Test that a run which stopped more than one period ago no longer counts as current.
+	"""
+	history = [(1, 1, TODAY - day) for day in (5, 4, 3)] + [(2, 7, TODAY - 21), (2, 7, TODAY - 14)]
+
+	result = summarise(history, TODAY)
+
+	assert (result[1]['current_streak'], result[1]['longest_streak']) == (0, 3)
+	assert (result[2]['current_streak'], result[2]['longest_streak']) == (0, 2)
+
+
+
+def test_weekly_ticks_are_bucketed_by_calendar_week():
+	"""
+	Test that weekly ticks count per Monday to Sunday week, however many days apart they are.
+
+	Given:
+		- 2025-03-19 is a Wednesday. Ticks last Sunday, this Monday and on the Sunday two weeks before.
+	When:
+		- compute_streaks is called.
+	Then:
+		- The Sunday and Monday ticks are consecutive weeks, the earlier Sunday is a run of its own.
+	"""
+	history = [(9, 7, TODAY - 17), (9, 7, TODAY - 3), (9, 7, TODAY - 2)]
+
+	result = summarise(history, TODAY)
+
+	assert [length for _, _, length in result[9]['runs']] == [1, 2]
+	assert result[9]['current_streak'] == 2
+
+
+
+def test_empty_history():
+	"""
+	Test that no progress rows give no habits instead of failing.
+	"""
+	assert summarise([], TODAY) == {}
+
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_agrees_with_reference(seed):
+	"""
+	Test the vectorized engine against the loop based reference on random histories.
+
+	Given:
+		- 300 habits, daily and weekly, with random ticks over the last 200 days in random order.
+	When:
+		- compute_streaks and reference_streaks are called.
+	Then:
+		- Current streak, longest streak and run lengths agree for every habit.
+	"""
+	generator = random.Random(seed)
+	history = []
+	for habit_id in range(1, 301):
+		period = generator.choice((1, 7))
+		tick_chance = generator.random()
+		history.extend((habit_id, period, TODAY - day) for day in range(200) if generator.random() < tick_chance)
+	generator.shuffle(history)
+
+	result = summarise(history, TODAY)
+	expected = reference_streaks(history, TODAY)
+
+	assert result.keys() == expected.keys()
+	for habit_id, (current, longest, runs) in expected.items():
+		assert result[habit_id]['current_streak'] == current
+		assert result[habit_id]['longest_streak'] == longest
+		assert [length for _, _, length in result[habit_id]['runs']] == runs
@@ -1,5 +1,8 @@
 from apps.core.facades.habit_tracker_facade_impl import HabitTrackerFacadeImpl
 from apps.core.orchestrators.habit_orchestrator import HabitOrchestrator
+from apps.progresses.domain.progress_records import ImportCheckpoint, read_progress_records
+from apps.database.pagination import DEFAULT_PAGE_SIZE
+from apps.utils.tracing import traced
 
 
 class HabitController:
@@ -51,6 +54,33 @@ class HabitController:
 
 
 
+	def iter_all_users(self):
+		"""
+		Streams all users stored in the system, for listings of any size.
+
+		Returns:
+			iterator: User records, read from the database as they are consumed.
+		"""
+		return self._facade.iter_all_user_data()
+
+
+
+	def get_users_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of users, for listings paged with next and previous.
+
+		Args:
+			page_size (int, optional): Users per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._facade.get_users_page(page_size=page_size, after=after, before=before)
+
+
+
 	def query_user_and_related_habits(self):
 		"""
 		Fetches users along with their associated habits.
@@ -62,6 +92,17 @@ class HabitController:
 
 
 
+	def iter_user_and_related_habits(self):
+		"""
+		Streams users along with their associated habits.
+
+		Returns:
+			iterator: User and habit records, read from the database as they are consumed.
+		"""
+		return self._facade.iter_user_and_related_habits()
+
+
+
 	def create_a_habit_with_validation(self, habit_name, habit_action, periodicity_type, user_id):
 		"""
 		Creates a new habit, ensuring the user is valid.
@@ -108,6 +149,33 @@ class HabitController:
 
 
 
+	def iter_all_habits(self):
+		"""
+		Streams all habits in the system, for listings of any size.
+
+		Returns:
+			iterator: Habit entries, read from the database as they are consumed.
+		"""
+		return self._facade.iter_all_habits()
+
+
+
+	def get_habits_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of habits, for listings paged with next and previous.
+
+		Args:
+			page_size (int, optional): Habits per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._facade.get_habits_page(page_size=page_size, after=after, before=before)
+
+
+
 	def delete_a_habit(self, habit_id):
 		"""
 		Deletes a habit by ID, preserving any associated progress entries.
@@ -133,6 +201,33 @@ class HabitController:
 
 
 
+	def iter_goals_and_related_habits(self):
+		"""
+		Streams goals along with their associated habit data.
+
+		Returns:
+			iterator: Goal and habit records, read from the database as they are consumed.
+		"""
+		return self._facade.iter_goals_and_related_habits()
+
+
+
+	def get_goals_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of goals with their habit, for listings paged with next and previous.
+
+		Args:
+			page_size (int, optional): Goals per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._facade.get_goals_page(page_size=page_size, after=after, before=before)
+
+
+
 	def delete_a_goal(self, goal_id):
 		"""
 		Deletes an existing goal by ID.
@@ -158,6 +253,7 @@ class HabitController:
 
 
 
+	@traced('controller')
 	def complete_a_habit(self, habit_id, goal_id):
 		"""
 		Marks a habit as completed for the day or week, incrementing streaks and progress.
@@ -173,6 +269,21 @@ class HabitController:
 
 
 
+	@traced('controller')
+	def complete_habits_batch(self, habit_goal_pairs):
+		"""
+		Marks many habits as completed at once, e.g. for a bulk import.
+
+		Args:
+			habit_goal_pairs (list of tuple): (habit_id, goal_id) pairs to complete.
+
+		Returns:
+			list of dict: One report per pair with its status: 'ticked', 'reset', 'too_early' or 'not_found'.
+		"""
+		return self._facade.complete_habits_batch(habit_goal_pairs=habit_goal_pairs)
+
+
+
 	def get_pending_goals(self):
 		"""
 		Retrieves a list of goals that are pending completion or reminders.
@@ -225,7 +336,7 @@ class HabitController:
 			habit_id (int): The habit ID to evaluate.
 
 		Returns:
-			list of tuples: The longest streak value for the specified habit from progresses table.
+			list of tuples: The (habit_id, streak_length, times_completed, last_completed_at) analytics row of the habit.
 		"""
 		return self._facade.longest_streak_for_habit(habit_id)
 
@@ -240,6 +351,94 @@ class HabitController:
 		"""
 		return self._facade.average_streaks()
 
+
+
+	def get_streak_statistics(self, user_id=None, periodicity_type=None, active_only=False, percentiles=(0.5, 0.9, 0.99)):
+		"""
+		Summarises the current streaks of the selected habits.
+
+		Args:
+			user_id (int, optional): Only include the habits of this user.
+			periodicity_type (str, optional): Only include 'daily' or 'weekly' habits.
+			active_only (bool, optional): Only include habits with a streak above zero.
+			percentiles (tuple of float, optional): Fractions between 0 and 1.
+
+		Returns:
+			dict: count, sum, mean, min, max and percentiles of the streaks.
+		"""
+		return self._facade.get_streak_statistics(user_id=user_id, periodicity_type=periodicity_type, active_only=active_only, percentiles=percentiles)
+
+
+
+	def get_all_habit_streaks(self, today=None):
+		"""
+		Retrieves the longest-ever and the current streak of every habit with one statement.
+
+		Args:
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
+
+		Returns:
+			dict: habit_id -> {'longest_streak', 'current_streak'}.
+		"""
+		return self._facade.get_all_habit_streaks(today=today)
+
+
+
+	def compute_historical_streaks(self, habit_ids=None, today=None):
+		"""
+		Recomputes current streak, longest streak and every streak run of habits from their progress log.
+
+		Args:
+			habit_ids (list of int, optional): The habits to compute. Defaults to every habit with progress.
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
+
+		Returns:
+			dict: habit_id -> {'current_streak', 'longest_streak', 'runs'}.
+		"""
+		return self._facade.compute_historical_streaks(habit_ids=habit_ids, today=today)
+
+
+
+	def rebuild_analytics(self, chunk_size=500):
+		"""
+		Rebuilds every analytics row from the progresses table, in chunks.
+
+		Args:
+			chunk_size (int, optional): Habits rebuilt per transaction. Defaults to 500.
+
+		Returns:
+			int: The number of habits processed.
+		"""
+		return self._facade.rebuild_analytics(chunk_size=chunk_size)
+
+
+
+	@traced('controller')
+	def import_progress_history(self, path, resume=False, chunk_size=1000, on_progress=None):
+		"""
+		Imports the progress records of a JSONL or CSV file, see read_progress_records for the format.
+		The committed offset is kept in a checkpoint file next to the import file, which is removed
+		once the import completes.
+
+		Args:
+			path (str): The import file.
+			resume (bool, optional): Continue after the last committed chunk of an interrupted import
+				instead of starting over. Defaults to False.
+			chunk_size (int, optional): Records per transaction. Defaults to 1000.
+			on_progress (callable, optional): Called with the running report after every chunk.
+
+		Returns:
+			dict: The import report, see HabitOrchestrator.import_progress_history.
+		"""
+		checkpoint = ImportCheckpoint(f"{path}.checkpoint")
+		if not resume:
+			checkpoint.clear()
+		saved = checkpoint.load()
+		records = read_progress_records(path, start_offset=saved['offset'] if saved else 0)
+		report = self._facade.import_progress_history(records, checkpoint=checkpoint, chunk_size=chunk_size, on_progress=on_progress)
+		checkpoint.clear()
+		return report
+
 	
 
 	def update_habit_streak(self, habit_id, updated_streak_value):
@@ -285,6 +484,23 @@ class HabitController:
 
 
 
+	def get_progress_history_page(self, goal_id=None, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of the progress history, newest entries first.
+
+		Args:
+			goal_id (int, optional): Only the history of this goal. Defaults to every goal.
+			page_size (int, optional): Entries per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next (older) page.
+			before (tuple, optional): previous_cursor of the current page, for the previous (newer) page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._facade.get_progress_history_page(goal_id=goal_id, page_size=page_size, after=after, before=before)
+
+
+
 	def query_goal_of_a_habit(self, habit_id):
 		"""
 		Retrieves a single goal for a habit, currently one is expected.
@@ -323,4 +539,29 @@ class HabitController:
 			habit_name=habit_name,
 			current_streak=current_streak,
 			progress_description=progress_description,
-			occurence_date=occurence_date)
\ No newline at end of file
+			occurence_date=occurence_date)
+
+
+
+	def get_repository_metrics(self):
+		"""
+		Retrieves the call statistics of every repository method and SQL statement since start up.
+
+		Returns:
+			dict: 'methods' and 'statements' statistics, see RepositoryMetrics.snapshot.
+		"""
+		return self._facade.get_repository_metrics()
+
+
+
+	def dump_repository_metrics(self, directory):
+		"""
+		Writes the repository statistics as JSON and in the Prometheus text format.
+
+		Args:
+			directory (str): The target directory.
+
+		Returns:
+			tuple: The paths of the JSON and the Prometheus file.
+		"""
+		return self._facade.dump_repository_metrics(directory)
@@ -1,6 +1,14 @@
 from abc import ABC, abstractmethod
+from apps.database.pagination import DEFAULT_PAGE_SIZE
 
 class HabitTrackerFacadeInterface(ABC):
+	"""TRANSACTION RELATED METHODS"""
+	@abstractmethod
+	def unit_of_work(self):
+		pass
+
+
+
 	"""USER RELATED METHODS"""
 	@abstractmethod
 	def validate_user_by_id(self, user_id: int) ->int:
@@ -26,6 +34,18 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def iter_all_user_data(self):
+		pass
+
+
+
+	@abstractmethod
+	def get_users_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		pass
+
+
+
 	"""HABIT RELATED METHODS"""
 	@abstractmethod
 	def query_user_and_related_habits(self) -> dict:
@@ -33,6 +53,12 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def iter_user_and_related_habits(self):
+		pass
+
+
+
 	@abstractmethod
 	def create_a_habit(self, habit_name, habit_action, habit_periodicity_type, habit_user_id, habit_streak=None, habit_periodicity_value=None):
 		pass
@@ -45,6 +71,18 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def iter_all_habits(self):
+		pass
+
+
+
+	@abstractmethod
+	def get_habits_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		pass
+
+
+
 	@abstractmethod
 	def delete_a_habit_by_id(self, habit_id):
 		pass
@@ -69,6 +107,24 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def complete_habits_batch(self, habit_goal_pairs):
+		pass
+
+
+
+	@abstractmethod
+	def import_progress_history(self, records, checkpoint=None, chunk_size=1000, on_progress=None):
+		pass
+
+
+
+	@abstractmethod
+	def update_habit_streaks(self, streak_updates):
+		pass
+
+
+
 	@abstractmethod
 	def update_habit_streak(habit_id, updated_streak_value):
 		pass
@@ -107,6 +163,18 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def iter_goals_and_related_habits(self):
+		pass
+
+
+
+	@abstractmethod
+	def get_goals_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		pass
+
+
+
 	@abstractmethod
 	def update_goal_current_kvi_value(self, goal_id, current_kvi_value):
 		pass
@@ -142,6 +210,30 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def query_tickable_goals(self):
+		pass
+
+
+
+	@abstractmethod
+	def get_goal_entities_by_ids(self, goal_ids):
+		pass
+
+
+
+	@abstractmethod
+	def get_goals_of_user_habits(self, user_habit_pairs):
+		pass
+
+
+
+	@abstractmethod
+	def update_goals_current_kvi(self, kvi_updates):
+		pass
+
+
+
 	@abstractmethod
 	def get_last_progress_entry_associated_with_goal_id(self, goal_id):
 		pass
@@ -161,6 +253,24 @@ class HabitTrackerFacadeInterface(ABC):
 
 
 
+	@abstractmethod
+	def create_progress_batch(self, progresses, chunk_size=1000):
+		pass
+
+
+
+	@abstractmethod
+	def get_latest_periods(self, goal_ids):
+		pass
+
+
+
+	@abstractmethod
+	def get_progress_history_page(self, goal_id=None, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		pass
+
+
+
 	"""REMINDER RELATED METHODS"""
 	@abstractmethod
 	def get_pending_goals(self):
@@ -193,4 +303,47 @@ class HabitTrackerFacadeInterface(ABC):
 
 	@abstractmethod
 	def average_streaks(self):
-		pass
\ No newline at end of file
+		pass
+
+
+
+	@abstractmethod
+	def get_streak_statistics(self, user_id=None, periodicity_type=None, active_only=False, percentiles=(0.5, 0.9, 0.99)):
+		pass
+
+
+
+	@abstractmethod
+	def get_all_habit_streaks(self, today=None):
+		pass
+
+
+
+	@abstractmethod
+	def compute_historical_streaks(self, habit_ids=None, today=None):
+		pass
+
+
+
+	@abstractmethod
+	def record_completions(self, completions):
+		pass
+
+
+
+	@abstractmethod
+	def rebuild_analytics(self, chunk_size=500):
+		pass
+
+
+
+	"""DIAGNOSTICS RELATED METHODS"""
+	@abstractmethod
+	def get_repository_metrics(self):
+		pass
+
+
+
+	@abstractmethod
+	def dump_repository_metrics(self, directory):
+		pass
@@ -1,3 +1,5 @@
+from contextlib import nullcontext
+
 from apps.core.facades.habit_tracker_facade import HabitTrackerFacadeInterface
 from apps.core.orchestrators.habit_orchestrator import HabitOrchestrator
 from apps.users.services.user_service import UserService
@@ -6,11 +8,16 @@ from apps.goals.services.goal_service import GoalService
 from apps.progresses.services.progress_service import ProgressesService
 from apps.analytics.services.analytics_service import AnalyticsService
 from apps.reminders.services.reminder_service import ReminderService
+from apps.database.database_manager import MariadbConnection
+from apps.database.pagination import DEFAULT_PAGE_SIZE
+from apps.database.instrumentation import RepositoryMetrics
+from apps.utils.tracing import traced
 
 
 class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 	"""Concrete implementation of the HabitTrackerFacade abstract class"""
-	def __init__(self, user_service: UserService, habit_service: HabitService, goal_service: GoalService, progress_service: ProgressesService, reminder_service: ReminderService, analytics_service: AnalyticsService):
+	def __init__(self, user_service: UserService, habit_service: HabitService, goal_service: GoalService, progress_service: ProgressesService, reminder_service: ReminderService, analytics_service: AnalyticsService, database: MariadbConnection = None):
+		self._database = database
 		self._user_service = user_service
 		self._habit_service = habit_service
 		self._goal_service = goal_service
@@ -20,6 +27,21 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 		self._habit_orchestrator = HabitOrchestrator(self)
 
 
+	"""TRANSACTION RELATED METHODS"""
+	def unit_of_work(self):
+		"""
+		Opens a unit of work. Every repository call made within it runs in one
+		transaction, which is committed once at the end or rolled back on error.
+
+		Returns:
+			contextmanager: The unit of work scope, a no-op if the facade was built without a database.
+		"""
+		if self._database is None:
+			return nullcontext()
+		return self._database.unit_of_work()
+
+
+
 	"""USER RELATED METHODS"""
 	def create_user(self, user_name: str, user_age: int, user_gender: str, user_role: str) ->dict:
 		"""
@@ -63,6 +85,33 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	def iter_all_user_data(self):
+		"""
+		Streams all user data, without loading every user at once.
+
+		Returns:
+			iterator: User records (tuples).
+		"""
+		return self._user_service.iter_all_user_data()
+
+
+
+	def get_users_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of users, ordered by user ID.
+
+		Args:
+			page_size (int, optional): Users per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._user_service.get_users_page(page_size=page_size, after=after, before=before)
+
+
+
 	def validate_user_by_id(self, user_id: int) ->int:
 		"""
 		Validates that a user with the given ID exists.
@@ -92,6 +141,17 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	def iter_user_and_related_habits(self):
+		"""
+		Streams users along with any habits associated to them.
+
+		Returns:
+			iterator: Tuples of user and habit data.
+		"""
+		return self._user_service.iter_user_and_related_habits()
+
+
+
 	def create_a_habit_with_validation(self, habit_name, habit_action, habit_periodicity_type, habit_user_id, habit_streak=None, habit_periodicity_value=None):
 		"""
 		Creates a habit after validating the user ID.
@@ -141,6 +201,33 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	def iter_all_habits(self):
+		"""
+		Streams all habits in the system, without loading every habit at once.
+
+		Returns:
+			iterator: Habit records.
+		"""
+		return self._habit_service.iter_all_habits()
+
+
+
+	def get_habits_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of habits, ordered by habit ID.
+
+		Args:
+			page_size (int, optional): Habits per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._habit_service.get_habits_page(page_size=page_size, after=after, before=before)
+
+
+
 	def delete_a_habit_by_id(self, habit_id, goal_id):
 		"""
 		Deletes a habit by ID, potentially requiring goal reference.
@@ -173,6 +260,7 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	@traced('facade')
 	def complete_a_habit(self, habit_id, goal_id):
 		"""
 		Marks a habit as complete, incrementing streaks and progress as needed.
@@ -188,6 +276,52 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	@traced('facade')
+	def complete_habits_batch(self, habit_goal_pairs):
+		"""
+		Marks many habits as complete in one transaction.
+
+		Args:
+			habit_goal_pairs (list of tuple): (habit_id, goal_id) pairs to complete.
+
+		Returns:
+			list of dict: A per item report, see HabitOrchestrator.complete_habits_batch.
+		"""
+		return self._habit_orchestrator.complete_habits_batch(habit_goal_pairs=habit_goal_pairs)
+
+
+
+	def import_progress_history(self, records, checkpoint=None, chunk_size=1000, on_progress=None):
+		"""
+		Imports a stream of progress records, e.g. the history of another habit tracker.
+
+		Args:
+			records (iterable of tuple): (offset, record) pairs, see read_progress_records.
+			checkpoint (ImportCheckpoint, optional): Saved after every committed chunk.
+			chunk_size (int, optional): Records per transaction. Defaults to 1000.
+			on_progress (callable, optional): Called with the running report after every chunk.
+
+		Returns:
+			dict: The import report, see HabitOrchestrator.import_progress_history.
+		"""
+		return self._habit_orchestrator.import_progress_history(records=records, checkpoint=checkpoint, chunk_size=chunk_size, on_progress=on_progress)
+
+
+
+	def update_habit_streaks(self, streak_updates):
+		"""
+		Updates the streak count of many habits at once.
+
+		Args:
+			streak_updates (list of tuple): (habit_id, habit_streak) pairs.
+
+		Returns:
+			int: Number of rows updated.
+		"""
+		return self._habit_service.update_habit_streaks(streak_updates)
+
+
+
 	def get_habit_strategy(self, habit_id):
 		"""
 		Retrieves the periodicity strategy (type) of a habit.
@@ -318,6 +452,33 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	def iter_goals_and_related_habits(self):
+		"""
+		Streams goals along with their associated habit data.
+
+		Returns:
+			iterator: Tuples of goal and habit data.
+		"""
+		return self._goal_service.iter_goals_and_related_habits()
+
+
+
+	def get_goals_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of goals with their habit, ordered by goal ID.
+
+		Args:
+			page_size (int, optional): Goals per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._goal_service.get_goals_page(page_size=page_size, after=after, before=before)
+
+
+
 	def update_goal_current_kvi_value(self, goal_id, current_kvi_value):
 		"""
 		Updates the current KVI value of a goal.
@@ -415,6 +576,59 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 	
 
 
+	def query_tickable_goals(self):
+		"""
+		Retrieves the goals that can be ticked now.
+
+		Returns:
+			list: A list of goal records with their tick window, never ticked goals included.
+		"""
+		return self._goal_service.query_tickable_goals()
+
+
+
+	def get_goal_entities_by_ids(self, goal_ids):
+		"""
+		Retrieves the goal entities of many goals at once.
+
+		Args:
+			goal_ids (list of int): IDs of the goals.
+
+		Returns:
+			dict: Goal entities keyed by goal ID, missing goals are left out.
+		"""
+		return self._goal_service.get_goal_entities_by_ids(goal_ids)
+
+
+
+	def get_goals_of_user_habits(self, user_habit_pairs):
+		"""
+		Retrieves the goals of many habits, named by their user and habit names, at once.
+
+		Args:
+			user_habit_pairs (iterable of tuple): (user_name, habit_name) pairs.
+
+		Returns:
+			dict: (user_name, habit_name) -> list of goal dicts, oldest goal first.
+		"""
+		return self._goal_service.get_goals_of_user_habits(user_habit_pairs)
+
+
+
+	def update_goals_current_kvi(self, kvi_updates):
+		"""
+		Updates the current KVI value of many goals at once.
+
+		Args:
+			kvi_updates (list of tuple): (goal_id, current_kvi_value) pairs.
+
+		Returns:
+			int: Number of rows affected.
+		"""
+		return self._goal_service.update_goals_current_kvi(kvi_updates)
+
+
+
 	def get_last_progress_entry_associated_with_goal_id(self, goal_id):
 		"""
 		Gets the most recent progress entry for a specific goal.
@@ -487,6 +701,52 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 
 
 
+	def create_progress_batch(self, progresses, chunk_size=1000):
+		"""
+		Creates many progress entries at once, in chunks with one commit each.
+
+		Args:
+			progresses (iterable of dict): The progress entries to create.
+			chunk_size (int, optional): Entries per INSERT and commit. Defaults to 1000.
+
+		Returns:
+			list of int: The ids of the created progress entries, in input order.
+		"""
+		return self._progress_service.create_progress_batch(progresses, chunk_size=chunk_size)
+
+
+
+	def get_latest_periods(self, goal_ids):
+		"""
+		Retrieves the period index, streak and KVI of the latest progress entry of many goals at once.
+
+		Args:
+			goal_ids (iterable of int): IDs of the goals.
+
+		Returns:
+			dict: goal_id -> dict with period_index, current_streak and current_kvi_value.
+		"""
+		return self._progress_service.get_latest_periods(goal_ids)
+
+
+
+	def get_progress_history_page(self, goal_id=None, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of the progress history, newest entries first.
+
+		Args:
+			goal_id (int, optional): Only the history of this goal. Defaults to every goal.
+			page_size (int, optional): Entries per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next (older) page.
+			before (tuple, optional): previous_cursor of the current page, for the previous (newer) page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._progress_service.get_progress_history_page(goal_id=goal_id, page_size=page_size, after=after, before=before)
+
+
+
 	"""REMINDER RELATED METHODS"""
 	def get_pending_goals(self):
 		"""
@@ -541,7 +801,7 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 			habit_id (int): The habit ID to evaluate.
 
 		Returns:
-			list of tuples: The longest streak value for the specified habit from progresses table.
+			list of tuples: The (habit_id, streak_length, times_completed, last_completed_at) analytics row of the habit.
 		"""
 		return self._analytics_service.longest_streak_for_habit(habit_id)
 
@@ -554,3 +814,103 @@ class HabitTrackerFacadeImpl(HabitTrackerFacadeInterface):
 			float: The average amount of streaks across all habits.
 		"""
 		return self._analytics_service.average_streaks()
+
+
+
+	def get_streak_statistics(self, user_id=None, periodicity_type=None, active_only=False, percentiles=(0.5, 0.9, 0.99)):
+		"""
+		Summarises the current streaks of the selected habits in the database.
+
+		Args:
+			user_id (int, optional): Only include the habits of this user.
+			periodicity_type (str, optional): Only include 'daily' or 'weekly' habits.
+			active_only (bool, optional): Only include habits with a streak above zero.
+			percentiles (tuple of float, optional): Fractions between 0 and 1.
+
+		Returns:
+			dict: count, sum, mean, min, max and percentiles of the streaks.
+		"""
+		return self._analytics_service.get_streak_statistics(user_id=user_id, periodicity_type=periodicity_type, active_only=active_only, percentiles=percentiles)
+
+
+
+	def get_all_habit_streaks(self, today=None):
+		"""
+		Retrieves the longest-ever and the current streak of every habit with one statement.
+
+		Args:
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
+
+		Returns:
+			dict: habit_id -> {'longest_streak', 'current_streak'}.
+		"""
+		return self._analytics_service.get_all_habit_streaks(today=today)
+
+
+
+	def compute_historical_streaks(self, habit_ids=None, today=None):
+		"""
+		Recomputes current streak, longest streak and every streak run of habits from their progress log.
+
+		Args:
+			habit_ids (list of int, optional): The habits to compute. Defaults to every habit with progress.
+			today (date, optional): The day to evaluate current streaks at. Defaults to today.
+
+		Returns:
+			dict: habit_id -> {'current_streak', 'longest_streak', 'runs'}.
+		"""
+		return self._analytics_service.compute_historical_streaks(habit_ids=habit_ids, today=today)
+
+
+
+	def record_completions(self, completions):
+		"""
+		Records habit completions in the analytics rows of their habits.
+
+		Args:
+			completions (list of tuple): (habit_id, streak, completed_at) triples.
+
+		Returns:
+			int: The number of completions recorded.
+		"""
+		return self._analytics_service.record_completions(completions)
+
+
+
+	def rebuild_analytics(self, chunk_size=500):
+		"""
+		Rebuilds every analytics row from the progresses table, in chunks.
+
+		Args:
+			chunk_size (int, optional): Habits rebuilt per transaction. Defaults to 500.
+
+		Returns:
+			int: The number of habits processed.
+		"""
+		return self._analytics_service.rebuild_analytics(chunk_size=chunk_size)
+
+
+
+	"""DIAGNOSTICS RELATED METHODS"""
+	def get_repository_metrics(self):
+		"""
+		Retrieves the call statistics of every repository method and SQL statement since start up.
+
+		Returns:
+			dict: See RepositoryMetrics.snapshot.
+		"""
+		return RepositoryMetrics().snapshot()
+
+
+
+	def dump_repository_metrics(self, directory):
+		"""
+		Writes the repository statistics as JSON and in the Prometheus text format.
+
+		Args:
+			directory (str): The directory to write repository_metrics.json and repository_metrics.prom to.
+
+		Returns:
+			tuple: The paths of the JSON and the Prometheus file.
+		"""
+		return RepositoryMetrics().write_dumps(directory)
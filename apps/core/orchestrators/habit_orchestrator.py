@@ -1,11 +1,17 @@
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 
 from apps.core.facades.habit_tracker_facade import HabitTrackerFacadeInterface
 from apps.goals.domain.goal_subject import GoalSubject
 from apps.goals.domain.goal_factory import build_goal_subject
+from apps.progresses.repositories.progress_repository import ProgressPeriodAlreadyTickedError, period_index_of
+from apps.utils.tracing import traced
 
 import click
 
+#resolved goals and goal states kept between chunks of an import, both are dropped and read again once exceeded
+MAX_IMPORT_CACHE_ENTRIES = 100000
+
 class HabitOrchestrator:
 	"""Handles multi-step workflows if facade deems that necessary."""
 	def __init__(self, habit_tracker_facade: HabitTrackerFacadeInterface):
@@ -32,6 +38,7 @@ class HabitOrchestrator:
 
 
 
+	@traced('orchestrator')
 	def complete_a_habit(self, habit_id, goal_id):
 		"""
 		Marks a habit as complete, updating streaks and progress.
@@ -39,6 +46,10 @@ class HabitOrchestrator:
 		Validates that both habit and goal exist, then retrieves
 		the habit’s periodicity type to determine how much to
 		increment Key Value Indicators (KVI) and the streak.
+		All reads and writes run in one unit of work, so the
+		streak, goal, progress and analytics updates are committed
+		together or not at all. The progress entry is unique per
+		goal and period, so of two racing ticks only one commits.
 
 		Args:
 			habit_id (int): The habit’s ID.
@@ -50,94 +61,274 @@ class HabitOrchestrator:
 			actual return can be None or a custom result depending
 			on the implementation.
 		"""
-		validated_habit_id = self._habit_facade.validate_a_habit(habit_id=int(habit_id))
+		try:
+			with self._habit_facade.unit_of_work():
+				validated_habit_id = self._habit_facade.validate_a_habit(habit_id=int(habit_id))
 
-		validated_goal_id = self._habit_facade.validate_a_goal(goal_id=int(goal_id))
+				validated_goal_id = self._habit_facade.validate_a_goal(goal_id=int(goal_id))
 
-		habit_periodicity_type = self._habit_facade.get_habit_strategy(validated_habit_id)[0]
+				habit_periodicity_type = self._habit_facade.get_habit_strategy(validated_habit_id)[0]
 		
-		goal_subject = build_goal_subject(
-			habit_id=validated_habit_id,
-			goal_id=validated_goal_id,
-			habit_periodicity_type = habit_periodicity_type,
-			goal_service=self._habit_facade._goal_service,
-			progress_service=self._habit_facade._progress_service
-		)
+				goal_subject = build_goal_subject(
+					habit_id=validated_habit_id,
+					goal_id=validated_goal_id,
+					habit_periodicity_type = habit_periodicity_type,
+					goal_service=self._habit_facade._goal_service,
+					progress_service=self._habit_facade._progress_service
+				)
 		
-		kvi_increment_amount = 1.0 if habit_periodicity_type == 'daily' else 7.0
-		new_streak_amount = goal_subject._goal_data['streak'] + 1
-		goal_subject._goal_data['streak'] = new_streak_amount
-		last_progress = self._habit_facade.get_last_progress_entry(goal_id=goal_subject._goal_data['goal_id'])
-		goal_subject._goal_data['last_occurence'] = last_progress[3] if last_progress else None
-
-		if goal_subject.is_too_early() == True:
-			now = datetime.now()
-			difference = now - goal_subject._goal_data['last_occurence']
-			if kvi_increment_amount == 1.0:
-				waiting_time = timedelta(hours=24) - difference
-			else:
-				waiting_time = timedelta(hours=168) - difference
-			click.echo(click.style(f"\nIt is too early to tick this habit. You need to wait {waiting_time} hours before you can tick it again.", fg="red", bold=True))
-			return
+				kvi_increment_amount = 1.0 if habit_periodicity_type == 'daily' else 7.0
+				new_streak_amount = goal_subject._goal_data['streak'] + 1
+				goal_subject._goal_data['streak'] = new_streak_amount
+
+				if goal_subject.is_too_early() == True:
+					waiting_time = goal_subject._goal_data['next_due_at'] - datetime.now()
+					click.echo(click.style(f"\nIt is too early to tick this habit. You need to wait {waiting_time} hours before you can tick it again.", fg="red", bold=True))
+					return
 		
-		elif goal_subject.is_expired() == True:
-			self._habit_facade.update_habit_streak(habit_id=validated_habit_id, updated_streak_value=0)
-			goal_subject.reset_progress()
+				elif goal_subject.is_expired() == True:
+					self._habit_facade.update_habit_streak(habit_id=validated_habit_id, updated_streak_value=0)
+					goal_subject.reset_progress()
+					completed_streak = 0
+
+				else:
+					self._habit_facade.update_habit_streak(habit_id=validated_habit_id, updated_streak_value=new_streak_amount)
+					goal_subject.increment_kvi(increment=kvi_increment_amount)
+					completed_streak = new_streak_amount
 
-		else:
-			self._habit_facade.update_habit_streak(habit_id=validated_habit_id, updated_streak_value=new_streak_amount)
-			goal_subject.increment_kvi(increment=kvi_increment_amount)
+				self._habit_facade.record_completions([(validated_habit_id, completed_streak, None)])
+		except ProgressPeriodAlreadyTickedError:
+			#a concurrent tick of the same goal won the race for this period, the whole unit of work was rolled back
+			click.echo(click.style("\nThis habit has already been ticked in the current period.", fg="red", bold=True))
 
 
 
-	def fetch_ready_to_tick_goals_of_habits(self):
+	@traced('orchestrator')
+	def complete_habits_batch(self, habit_goal_pairs):
 		"""
-		Identifies which goals are ready to be incremented (ticked).
+		Marks many habits as complete in one go, for bulk imports.
+
+		Applies the same rules as complete_a_habit to every
+		(habit_id, goal_id) pair, but validates all pairs with one
+		IN (...) query and writes all streak updates, goal
+		KVI updates, progress entries and analytics as batched
+		statements in one unit of work. Notifications are not printed per item.
 
-		Pulls all goals, checks their last progress occurrence date,
-		and decides if they are tickable based on daily or weekly
-		intervals.
+		Args:
+			habit_goal_pairs (list of tuple): (habit_id, goal_id) pairs to complete.
 
 		Returns:
-			list: A list of goals (or combined habit-goal structures)
-			that are eligible for increment based on their schedule.
+			list of dict: One report per pair, in input order, with habit_id, goal_id
+			and a status of 'ticked', 'reset', 'too_early' or 'not_found'. Ticked and
+			reset items also carry the new streak and current_kvi.
 		"""
-		all_goals = self._habit_facade._goal_service.query_all_goals()
+		pairs = [(int(habit_id), int(goal_id)) for habit_id, goal_id in habit_goal_pairs]
+		now = datetime.now()
 
-		all_goals_with_date = {}
-		for goal in all_goals:
-			all_goals_with_date[goal["goal_id"]] = goal
-			last_entry = self._habit_facade.get_last_progress_entry_associated_with_goal_id(goal_id=int(goal['goal_id']))
-			if len(last_entry) != 0:
-				all_goals_with_date[goal["goal_id"]]["occurence_date"] = last_entry["occurence_date"]
-			else:
-				all_goals_with_date[goal["goal_id"]]["occurence_date"] = None
+		with self._habit_facade.unit_of_work():
+			goal_ids = list(dict.fromkeys(goal_id for _, goal_id in pairs))
+			goal_entities = self._habit_facade.get_goal_entities_by_ids(goal_ids)
+
+			report = []
+			streak_updates = []
+			kvi_updates = []
+			progresses = []
+			completions = []
+			completed_goal_ids = set()
+
+			for habit_id, goal_id in pairs:
+				goal_data = goal_entities.get(goal_id)
+				if goal_data is None or goal_data['habit_id'] != habit_id:
+					report.append({'habit_id': habit_id, 'goal_id': goal_id, 'status': 'not_found'})
+					continue
+
+				goal_subject = GoalSubject(goal_service=self._habit_facade._goal_service, progress_service=self._habit_facade._progress_service, goal_data=goal_data)
+
+				if goal_id in completed_goal_ids or goal_subject.is_too_early():
+					report.append({'habit_id': habit_id, 'goal_id': goal_id, 'status': 'too_early'})
+					continue
+
+				if goal_subject.is_expired():
+					status = 'reset'
+					new_streak = 0
+					new_kvi_value = 0.0
+				else:
+					status = 'ticked'
+					new_streak = goal_data['streak'] + 1
+					new_kvi_value = float(goal_data['current_kvi']) + (1.0 if goal_data['habit_periodicity_type'] == 'daily' else 7.0)
+
+				completed_goal_ids.add(goal_id)
+				streak_updates.append((habit_id, new_streak))
+				kvi_updates.append((goal_id, new_kvi_value))
+				progresses.append({
+					'goal_id': goal_id,
+					'current_kvi_value': new_kvi_value,
+					'distance_from_target_kvi_value': goal_data['target_kvi'] - new_kvi_value,
+					'current_streak': new_streak,
+					'goal_name': goal_data['goal_name'],
+					'habit_name': goal_data['habit_name'],
+					'progress_description': "batch completion",
+					'occurence_date': now
+				})
+				completions.append((habit_id, new_streak, now))
+				report.append({'habit_id': habit_id, 'goal_id': goal_id, 'status': status, 'streak': new_streak, 'current_kvi': new_kvi_value})
+
+			self._habit_facade.update_habit_streaks(streak_updates)
+			self._habit_facade.update_goals_current_kvi(kvi_updates)
+			self._habit_facade.create_progress_batch(progresses)
+			self._habit_facade.record_completions(completions)
+
+		return report
+
+
+
+	@traced('orchestrator')
+	def import_progress_history(self, records, checkpoint=None, chunk_size=1000, on_progress=None):
+		"""
+		Imports a stream of progress records, e.g. the history of another habit tracker,
+		with memory bounded by the chunk size and the amount of goals, not the amount of records.
 
-		now = datetime.now()
-		tickable_goals_and_habits = []
+		Records are taken chunk_size at a time. The goals of a chunk are resolved with one
+		query for the (user, habit) pairs that were not seen before, and the latest period of
+		goals seen for the first time with another one. Streaks are recomputed on the fly:
+		a record in the period after the goal's previous one continues its streak, any other
+		record starts a new streak. Records of a period that already has an entry are skipped,
+		so the records of a goal are expected in chronological order.
 
-		for k, v in all_goals_with_date.items():
-			last_tick = v['occurence_date']
-			target_kvi = v['target_kvi_value']
+		Every chunk is written in one unit of work: the progress entries as a bulk insert with
+		one due window update per goal, the habit streaks, goal KVIs and analytics as batched updates. The checkpoint is saved
+		after the chunk committed, so an interrupted import resumes after the last committed record.
 
-			if last_tick is None:
-				tickable_goals_and_habits.append(v)
-				continue 
+		Args:
+			records (iterable of tuple): (offset, record) pairs, see read_progress_records.
+				A record of None is a malformed line and is counted as such.
+			checkpoint (ImportCheckpoint, optional): Saved after every committed chunk. Its totals
+				are continued, when the import resumes from it.
+			chunk_size (int, optional): Records per transaction. Defaults to 1000.
+			on_progress (callable, optional): Called with the running report after every chunk.
 
-			time_since_last_tick = now - last_tick
-			
-			if target_kvi == 1:
-				if (timedelta(days=1) <= time_since_last_tick < timedelta(days=2)):
-					tickable_goals_and_habits.append(v)
-				else:
-					pass
-			
-			elif target_kvi == 7:
-				if timedelta(days=7) <= time_since_last_tick < timedelta(days=14):
-					tickable_goals_and_habits.append(v)
-				else:
-					pass
+		Returns:
+			dict: Amount of records read, imported, malformed, unresolved (unknown user, habit or goal)
+			and duplicates (period already ticked), the committed offset, the seconds taken and
+			the records per second of this run.
+		"""
+		if not isinstance(chunk_size, int) or chunk_size < 1:
+			raise ValueError("chunk_size must be a positive integer.")
+
+		saved = checkpoint.load() if checkpoint else None
+		report = dict((saved or {}).get('totals') or {'read': 0, 'imported': 0, 'malformed': 0, 'unresolved': 0, 'duplicates': 0, 'offset': 0})
+		read_before = report['read']
+		started_at = time.perf_counter()
+		resolved_goals = {}
+		goal_states = {}
+
+		def import_chunk(chunk, offset):
+			if len(resolved_goals) > MAX_IMPORT_CACHE_ENTRIES:
+				resolved_goals.clear()
+			if len(goal_states) > MAX_IMPORT_CACHE_ENTRIES:
+				goal_states.clear()
+
+			unseen_pairs = list(dict.fromkeys((record['user'], record['habit']) for record in chunk if record and (record['user'], record['habit'], record['goal']) not in resolved_goals))
+			goals_of_pairs = self._habit_facade.get_goals_of_user_habits(unseen_pairs) if unseen_pairs else {}
+			for record in chunk:
+				if record and (record['user'], record['habit'], record['goal']) not in resolved_goals:
+					goals = goals_of_pairs.get((record['user'], record['habit']), [])
+					if record['goal'] is not None:
+						goals = [goal for goal in goals if goal['goal_name'] == record['goal']]
+					resolved_goals[(record['user'], record['habit'], record['goal'])] = goals[0] if goals else None
+
+			unseen_goal_ids = list(dict.fromkeys(
+				goal['goal_id'] for goal in (resolved_goals[(record['user'], record['habit'], record['goal'])] for record in chunk if record)
+				if goal and goal['goal_id'] not in goal_states
+			))
+			if unseen_goal_ids:
+				latest_periods = self._habit_facade.get_latest_periods(unseen_goal_ids)
+				for goal_id in unseen_goal_ids:
+					latest = latest_periods.get(goal_id)
+					goal_states[goal_id] = {'period_index': latest['period_index'], 'streak': latest['current_streak'], 'kvi': latest['current_kvi_value']} if latest else None
+
+			progresses = []
+			streak_updates = {}
+			kvi_updates = {}
+			completions = []
+			for record in chunk:
+				report['read'] += 1
+				if record is None:
+					report['malformed'] += 1
+					continue
+				goal = resolved_goals[(record['user'], record['habit'], record['goal'])]
+				if goal is None:
+					report['unresolved'] += 1
+					continue
+
+				state = goal_states[goal['goal_id']]
+				period_index = period_index_of(record['timestamp'], goal['habit_periodicity_type'])
+				if state and period_index <= state['period_index']:
+					report['duplicates'] += 1
+					continue
+
+				continues_streak = state is not None and period_index == state['period_index'] + 1
+				streak = state['streak'] + 1 if continues_streak else 1
+				increment = 7.0 if goal['habit_periodicity_type'] == 'weekly' else 1.0
+				kvi = record['kvi'] if record['kvi'] is not None else (float(state['kvi']) if continues_streak else 0.0) + increment
+				goal_states[goal['goal_id']] = {'period_index': period_index, 'streak': streak, 'kvi': kvi}
+
+				progresses.append({
+					'goal_id': goal['goal_id'],
+					'current_kvi_value': kvi,
+					'distance_from_target_kvi_value': max(0.0, float(goal['target_kvi']) - kvi),
+					'current_streak': streak,
+					'goal_name': goal['goal_name'],
+					'habit_name': record['habit'],
+					'progress_description': "imported",
+					'occurence_date': record['timestamp']
+				})
+				streak_updates[goal['habit_id']] = streak
+				kvi_updates[goal['goal_id']] = kvi
+				completions.append((goal['habit_id'], streak, record['timestamp']))
+
+			if progresses:
+				with self._habit_facade.unit_of_work():
+					self._habit_facade.create_progress_batch(progresses, chunk_size=len(progresses))
+					self._habit_facade.update_habit_streaks(list(streak_updates.items()))
+					self._habit_facade.update_goals_current_kvi(list(kvi_updates.items()))
+					self._habit_facade.record_completions(completions)
+			report['imported'] += len(progresses)
+			report['offset'] = offset
+
+			if checkpoint:
+				checkpoint.save(offset, report)
+			if on_progress:
+				on_progress(dict(report))
+
+		chunk = []
+		offset = report['offset']
+		for offset, record in records:
+			chunk.append(record)
+			if len(chunk) == chunk_size:
+				import_chunk(chunk, offset)
+				chunk = []
+		if chunk:
+			import_chunk(chunk, offset)
+
+		seconds = time.perf_counter() - started_at
+		return {**report, 'seconds': seconds, 'records_per_second': (report['read'] - read_before) / seconds if seconds > 0 else 0.0}
+
+
+
+	def fetch_ready_to_tick_goals_of_habits(self):
+		"""
+		Identifies which goals are ready to be incremented (ticked).
 
+		Goals keep their tick window in next_due_at/expires_at, so
+		the tickable goals, never ticked ones included, come from a
+		single range query instead of a check per goal.
+
+		Returns:
+			list: A list of goals (or combined habit-goal structures)
+			that are eligible for increment based on their schedule.
+		"""
+		tickable_goals_and_habits = self._habit_facade.query_tickable_goals()
 		return tickable_goals_and_habits
 
 
@@ -156,10 +347,11 @@ class HabitOrchestrator:
 		Returns:
 			Any: Result of the delete operation.
 		"""
-		validated_habit_id = self._habit_facade.validate_a_habit(habit_id)
-		goal_id = self._habit_facade.query_goal_of_a_habit(habit_id=validated_habit_id)
+		with self._habit_facade.unit_of_work():
+			validated_habit_id = self._habit_facade.validate_a_habit(habit_id)
+			goal_id = self._habit_facade.query_goal_of_a_habit(habit_id=validated_habit_id)
 
-		deleted = self._habit_facade.delete_habit_physical_preserving_progress(habit_id=validated_habit_id, goal_id=int(goal_id[0]))
-		return deleted
+			deleted = self._habit_facade.delete_habit_physical_preserving_progress(habit_id=validated_habit_id, goal_id=int(goal_id[0]))
+			return deleted
 
 
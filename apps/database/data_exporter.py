@@ -0,0 +1,206 @@
+import csv
+import datetime
+import decimal
+import gzip
+import json
+import os
+
+from apps.database.database_manager import stream_rows
+
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+FETCH_BATCH = 5000
+
+#per table: the SELECT without filters, the column filtered by the date range and the primary key the rows are ordered by
+EXPORT_TABLES = {
+	'habits': {
+		'query': """
+			SELECT h.habit_id, u.user_name, h.habit_name, h.habit_action, h.habit_periodicity_type,
+				h.habit_streak, h.created_at
+			FROM habits h
+			JOIN app_users u ON h.habit_user_id = u.user_id
+		""",
+		'date_column': "h.created_at",
+		'order_by': "h.habit_id",
+	},
+	'goals': {
+		'query': """
+			SELECT g.goal_id, u.user_name, h.habit_id, h.habit_name, g.goal_name, g.target_kvi_value,
+				g.current_kvi_value, g.goal_description, g.created_at, g.deleted_at, g.next_due_at, g.expires_at
+			FROM goals g
+			JOIN habits h ON g.habit_id_id = h.habit_id
+			JOIN app_users u ON h.habit_user_id = u.user_id
+		""",
+		'date_column': "g.created_at",
+		'order_by': "g.goal_id",
+	},
+	#progresses outlive their deleted goals, their user and habit are only known through the names kept on the row
+	'progresses': {
+		'query': """
+			SELECT p.progress_id, u.user_name, p.habit_name, p.goal_id_id AS goal_id, p.goal_name, p.period_index,
+				p.current_streak, p.current_kvi_value, p.distance_from_goal_kvi_value, p.progress_description, p.occurence_date
+			FROM progresses p
+			LEFT JOIN goals g ON p.goal_id_id = g.goal_id
+			LEFT JOIN habits h ON g.habit_id_id = h.habit_id
+			LEFT JOIN app_users u ON h.habit_user_id = u.user_id
+		""",
+		'date_column': "p.occurence_date",
+		'order_by': "p.progress_id",
+	},
+	'analytics': {
+		'query': """
+			SELECT a.analytics_id, u.user_name, h.habit_id, h.habit_name, h.habit_periodicity_type,
+				a.times_completed, a.streak_length, a.last_completed_at
+			FROM analytics a
+			JOIN habits h ON a.habit_id_id = h.habit_id
+			JOIN app_users u ON h.habit_user_id = u.user_id
+		""",
+		'date_column': "a.last_completed_at",
+		'order_by': "a.analytics_id",
+	},
+}
+
+
+
+def build_export_query(table, since=None, until=None, users=None):
+	"""
+	Builds the SELECT of one exported table with its filters.
+
+	Args:
+		table (str): A key of EXPORT_TABLES.
+		since (date, optional): Only rows dated on or after this day.
+		until (date, optional): Only rows dated on or before this day.
+		users (list of str, optional): Only rows of these user names.
+
+	Returns:
+		tuple: The query and its parameters.
+	"""
+	if table not in EXPORT_TABLES:
+		raise ValueError(f"Unknown export table '{table}', expected one of: {', '.join(EXPORT_TABLES)}.")
+	if since is not None and until is not None and since > until:
+		raise ValueError("since must not be after until.")
+
+	definition = EXPORT_TABLES[table]
+	conditions = []
+	params = []
+	if since is not None:
+		conditions.append(f"{definition['date_column']} >= %s")
+		params.append(datetime.datetime.combine(since, datetime.time.min))
+	if until is not None:
+		#exclusive upper bound, so the whole last day is included whatever the column's precision
+		conditions.append(f"{definition['date_column']} < %s")
+		params.append(datetime.datetime.combine(until + datetime.timedelta(days=1), datetime.time.min))
+	if users:
+		conditions.append(f"u.user_name IN ({', '.join(['%s'] * len(users))})")
+		params.extend(users)
+
+	query = " ".join(definition['query'].split())
+	if conditions:
+		query += " WHERE " + " AND ".join(conditions)
+	query += f" ORDER BY {definition['order_by']};"
+	return query, tuple(params)
+
+
+
+def export_value(value):
+	"""Converts a column value to its JSON representation: dates as ISO 8601, decimals as floats."""
+	if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+		return value.isoformat()
+	if isinstance(value, decimal.Decimal):
+		return float(value)
+	if isinstance(value, (bytes, bytearray)):
+		return value.decode("utf-8", errors="replace")
+	return value
+
+
+
+def export_table(database, table, path, file_format=None, compress=None, since=None, until=None, users=None, batch_size=FETCH_BATCH):
+	"""
+	Exports one table to a JSONL or CSV file, optionally gzip compressed.
+
+	The file is written under a temporary name and renamed once complete, so a nightly job
+	never leaves a truncated export behind under the final name.
+
+	Args:
+		database (ConnectionManager): The connection manager to read through.
+		table (str): A key of EXPORT_TABLES.
+		path (str): The target file.
+		file_format (str, optional): 'jsonl' or 'csv'. Defaults to the file extension.
+		compress (bool, optional): Gzip the file. Defaults to True for paths ending in .gz.
+		since (date, optional): Only rows dated on or after this day.
+		until (date, optional): Only rows dated on or before this day.
+		users (list of str, optional): Only rows of these user names.
+		batch_size (int, optional): Rows fetched per round trip. Defaults to FETCH_BATCH.
+
+	Returns:
+		int: The number of exported rows.
+	"""
+	compress = path.endswith(".gz") if compress is None else compress
+	file_format = file_format or ('csv' if path.removesuffix(".gz").endswith(".csv") else 'jsonl')
+	if file_format not in EXPORT_FORMATS:
+		raise ValueError(f"file_format must be one of: {', '.join(EXPORT_FORMATS)}.")
+	if not isinstance(batch_size, int) or batch_size < 1:
+		raise ValueError("batch_size must be a positive integer.")
+
+	query, params = build_export_query(table, since=since, until=until, users=users)
+	temporary_path = f"{path}.tmp"
+	opener = gzip.open if compress else open
+	rows_written = 0
+	try:
+		with opener(temporary_path, "wt", encoding="utf-8", newline="") as export_file:
+			rows = stream_rows(database, query, params, batch_size=batch_size, with_columns=True)
+			columns = next(rows)
+			writer = csv.writer(export_file) if file_format == 'csv' else None
+			if writer:
+				writer.writerow(columns)
+			for row in rows:
+				values = [export_value(value) for value in row]
+				if writer:
+					writer.writerow(values)
+				else:
+					export_file.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False) + "\n")
+				rows_written += 1
+		os.replace(temporary_path, path)
+	except BaseException:
+		if os.path.exists(temporary_path):
+			os.remove(temporary_path)
+		raise
+	return rows_written
+
+
+
+def export_data(database, directory, tables=None, file_format='jsonl', compress=False, since=None, until=None, users=None, batch_size=FETCH_BATCH, on_progress=None):
+	"""
+	Exports several tables into a directory, one file per table named after it,
+	e.g. progresses.jsonl.gz.
+
+	Args:
+		database (ConnectionManager): The connection manager to read through.
+		directory (str): The target directory, created if missing.
+		tables (list of str, optional): Keys of EXPORT_TABLES. Defaults to every table.
+		file_format (str, optional): 'jsonl' or 'csv'. Defaults to 'jsonl'.
+		compress (bool, optional): Gzip the files. Defaults to False.
+		since (date, optional): Only rows dated on or after this day.
+		until (date, optional): Only rows dated on or before this day.
+		users (list of str, optional): Only rows of these user names.
+		batch_size (int, optional): Rows fetched per round trip. Defaults to FETCH_BATCH.
+		on_progress (callable, optional): Called with the table, its file and row count after every table.
+
+	Returns:
+		dict: table -> (path, exported rows).
+	"""
+	tables = list(tables or EXPORT_TABLES)
+	for table in tables:
+		build_export_query(table, since=since, until=until, users=users)
+	if file_format not in EXPORT_FORMATS:
+		raise ValueError(f"file_format must be one of: {', '.join(EXPORT_FORMATS)}.")
+
+	os.makedirs(directory, exist_ok=True)
+	exported = {}
+	for table in tables:
+		path = os.path.join(directory, f"{table}.{file_format}{'.gz' if compress else ''}")
+		rows = export_table(database, table, path, file_format=file_format, compress=compress, since=since, until=until, users=users, batch_size=batch_size)
+		exported[table] = (path, rows)
+		if on_progress:
+			on_progress(table, path, rows)
+	return exported
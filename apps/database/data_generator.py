@@ -0,0 +1,351 @@
+import datetime
+import hashlib
+import multiprocessing
+import random
+import re
+
+from apps.database.database_manager import ConnectionManager, MariadbConnection
+from apps.progresses.repositories.progress_repository import period_index_of
+
+
+LABEL_PATTERN = re.compile(r"^[A-Za-z0-9]{1,12}$")
+ID_LOOKUP_BATCH = 1000
+
+#(name, action, periodicity type), names are kept short since habit names are limited to 40 characters
+HABIT_CATALOG = (
+	("reading", "read 20 pages", "daily"),
+	("meditation", "meditate 10 mins", "daily"),
+	("journaling", "write a journal entry", "daily"),
+	("stretching", "stretch 15 mins", "daily"),
+	("language", "practice a language 15 mins", "daily"),
+	("walking", "walk 8000 steps", "daily"),
+	("long run", "run 10 kms", "weekly"),
+	("blogging", "write 2 pages for your blog", "weekly"),
+	("meal prep", "cook the meals of the week", "weekly"),
+	("call family", "call a family member", "weekly"),
+)
+GENDERS = ("Male", "Female", "Other")
+
+
+
+def simulate_habit(rng, periodicity_type, started_at, ended_at):
+	"""
+	Simulates the ticks of one habit between two dates.
+
+	Every habit gets its own adherence from a beta distribution, so most habits are kept up fairly
+	well and some are barely kept. A period after a tick is more likely to be ticked than one after
+	a miss, which gives the long streaks and gaps of real data. Daily habits are ticked less on
+	weekends, and every habit is ticked around its own time of day.
+
+	Args:
+		rng (random.Random): Source of randomness.
+		periodicity_type (str): 'daily' or 'weekly'.
+		started_at (datetime): Start of the first period.
+		ended_at (datetime): No ticks are simulated at or after this moment.
+
+	Returns:
+		list of tuple: (occurence_date, period_index, streak) per tick, oldest first.
+	"""
+	period = datetime.timedelta(days=7 if periodicity_type == 'weekly' else 1)
+	adherence = rng.betavariate(2.5, 1.5)
+	keep_probability = min(0.98, adherence + 0.15)
+	resume_probability = adherence * 0.6
+	hour_of_day = rng.choice((7.5, 12.5, 20.0))
+
+	ticks = []
+	streak = 0
+	previous_index = None
+	ticked_last_period = False
+	period_start = started_at
+	if periodicity_type == 'weekly':
+		#weekly periods run from Monday to Sunday, like the period index
+		period_start += datetime.timedelta(days=(7 - started_at.weekday()) % 7)
+	while period_start < ended_at:
+		probability = keep_probability if ticked_last_period else resume_probability
+		if periodicity_type == 'daily' and period_start.weekday() >= 5:
+			probability *= 0.8
+
+		ticked_last_period = rng.random() < probability
+		if ticked_last_period:
+			minutes = int(min(max(rng.gauss(hour_of_day, 1.5), 0.0), 23.9) * 60)
+			occurence_date = period_start + datetime.timedelta(days=rng.randrange(period.days), minutes=minutes)
+			if occurence_date >= ended_at:
+				break
+			period_index = period_index_of(occurence_date, periodicity_type)
+			streak = streak + 1 if previous_index == period_index - 1 else 1
+			previous_index = period_index
+			ticks.append((occurence_date, period_index, streak))
+		period_start += period
+	return ticks
+
+
+
+def generate_users(rng, label, first_user, amount_of_users, habits_per_user, days, now):
+	"""
+	Generates users with their habits and tick histories, without touching the database.
+
+	Users sign up during the first 80% of the history and create their habits over their first
+	weeks, about a third of the habits are abandoned at some point.
+
+	Args:
+		rng (random.Random): Source of randomness.
+		label (str): Label of the dataset, part of every user and habit name.
+		first_user (int): Number of the first user, user numbers are unique within a dataset.
+		amount_of_users (int): Amount of users to generate.
+		habits_per_user (int): Average amount of habits per user.
+		days (int): Days of history, ending yesterday.
+		now (datetime): The moment the history ends.
+
+	Returns:
+		list of dict: Users with user_name, user_age, user_gender, created_at and their habits.
+	"""
+	today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+	first_day = today - datetime.timedelta(days=days)
+
+	users = []
+	for user_number in range(first_user, first_user + amount_of_users):
+		signed_up_at = first_day + datetime.timedelta(days=rng.randrange(max(1, int(days * 0.8))))
+		habits = []
+		for habit_number in range(rng.randint(1, max(1, 2 * habits_per_user - 1))):
+			habit_name, habit_action, periodicity_type = rng.choice(HABIT_CATALOG)
+			started_at = min(signed_up_at + datetime.timedelta(days=rng.randrange(21)), today - datetime.timedelta(days=1))
+			ended_at = today
+			if rng.random() < 0.3:
+				ended_at = started_at + (today - started_at) * rng.random()
+			habits.append({
+				'habit_name': f"{habit_name} {label}-{user_number}-{habit_number}",
+				'habit_action': habit_action,
+				'periodicity_type': periodicity_type,
+				'created_at': started_at,
+				'ticks': simulate_habit(rng, periodicity_type, started_at, ended_at),
+			})
+		users.append({
+			'user_name': f"{label}_user{user_number}",
+			'user_age': rng.randint(16, 80),
+			'user_gender': rng.choice(GENDERS),
+			'created_at': signed_up_at,
+			'habits': habits,
+		})
+	return users
+
+
+
+def _executemany_in_batches(database: ConnectionManager, query, rows, batch_size):
+	with database._connection.cursor() as cursor:
+		for start in range(0, len(rows), batch_size):
+			cursor.executemany(query, rows[start:start + batch_size])
+			database.commit()
+
+
+
+def _lookup_ids(database: ConnectionManager, query, keys):
+	ids = {}
+	with database._connection.cursor() as cursor:
+		for start in range(0, len(keys), ID_LOOKUP_BATCH):
+			batch = keys[start:start + ID_LOOKUP_BATCH]
+			cursor.execute(query.format(placeholders=", ".join(["%s"] * len(batch))), tuple(batch))
+			ids.update({key: row_id for row_id, key in cursor.fetchall()})
+	return ids
+
+
+
+def write_users(database: ConnectionManager, users, batch_size=5000):
+	"""
+	Writes generated users with their habits, goals, progresses and analytics in executemany batches.
+
+	Goals get the tick window of their last tick, as update_due_windows would have set it, and
+	analytics rows are computed from the ticks, as rebuild_analytics would have computed them.
+
+	Args:
+		database (ConnectionManager): The connection manager to write through.
+		users (list of dict): Users returned by generate_users.
+		batch_size (int): Rows per executemany batch.
+
+	Returns:
+		dict: The amount of users, habits, goals and progresses written.
+	"""
+	_executemany_in_batches(
+		database,
+		"INSERT INTO app_users(user_name, user_age, user_gender, user_role_id, created_at) VALUES (%s, %s, %s, 'user', %s);",
+		[(user['user_name'], user['user_age'], user['user_gender'], user['created_at']) for user in users],
+		batch_size
+	)
+	user_ids = _lookup_ids(database, "SELECT user_id, user_name FROM app_users WHERE user_name IN ({placeholders});", [user['user_name'] for user in users])
+
+	habits = [(user_ids[user['user_name']], habit) for user in users for habit in user['habits']]
+	_executemany_in_batches(
+		database,
+		"INSERT INTO habits(habit_name, habit_action, habit_streak, habit_periodicity_type, habit_periodicity_value, habit_user_id, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s);",
+		[
+			(habit['habit_name'], habit['habit_action'], habit['ticks'][-1][2] if habit['ticks'] else 0, habit['periodicity_type'], 7 if habit['periodicity_type'] == 'weekly' else 1, user_id, habit['created_at'])
+			for user_id, habit in habits
+		],
+		batch_size
+	)
+	habit_ids = _lookup_ids(database, "SELECT habit_id, habit_name FROM habits WHERE habit_name IN ({placeholders});", [habit['habit_name'] for _, habit in habits])
+
+	goal_rows = []
+	analytics_rows = []
+	for _, habit in habits:
+		period = datetime.timedelta(days=7 if habit['periodicity_type'] == 'weekly' else 1)
+		last_tick = habit['ticks'][-1] if habit['ticks'] else None
+		goal_rows.append((
+			f"Goal for {habit['habit_name']}",
+			habit_ids[habit['habit_name']],
+			float(period.days),
+			float(period.days * last_tick[2]) if last_tick else 0.0,
+			f"This is a {habit['periodicity_type']} goal.",
+			habit['created_at'],
+			last_tick[0] + period if last_tick else None,
+			last_tick[0] + 2 * period if last_tick else None,
+		))
+		if last_tick:
+			analytics_rows.append((habit_ids[habit['habit_name']], len(habit['ticks']), max(tick[2] for tick in habit['ticks']), last_tick[0].date(), habit['created_at']))
+	_executemany_in_batches(
+		database,
+		"INSERT INTO goals(goal_name, habit_id_id, target_kvi_value, current_kvi_value, goal_description, created_at, next_due_at, expires_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s);",
+		goal_rows,
+		batch_size
+	)
+	goal_ids = _lookup_ids(database, "SELECT goal_id, habit_id_id FROM goals WHERE habit_id_id IN ({placeholders});", list(habit_ids.values()))
+
+	#progresses are the bulk of the data, so they are built and flushed one batch at a time
+	progress_query = "INSERT INTO progresses(current_kvi_value, goal_id_id, distance_from_goal_kvi_value, current_streak, goal_name, habit_name, progress_description, occurence_date, period_index) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);"
+	progress_rows = []
+	amount_of_progresses = 0
+	for _, habit in habits:
+		target_kvi_value = 7.0 if habit['periodicity_type'] == 'weekly' else 1.0
+		goal_id = goal_ids[habit_ids[habit['habit_name']]]
+		for occurence_date, period_index, streak in habit['ticks']:
+			kvi_value = target_kvi_value * streak
+			progress_rows.append((kvi_value, goal_id, max(0.0, target_kvi_value - kvi_value), streak, f"Goal for {habit['habit_name']}", habit['habit_name'], "Generated progress", occurence_date, period_index))
+			if len(progress_rows) >= batch_size:
+				_executemany_in_batches(database, progress_query, progress_rows, batch_size)
+				amount_of_progresses += len(progress_rows)
+				progress_rows = []
+	_executemany_in_batches(database, progress_query, progress_rows, batch_size)
+	amount_of_progresses += len(progress_rows)
+
+	_executemany_in_batches(
+		database,
+		"INSERT INTO analytics(habit_id_id, times_completed, streak_length, last_completed_at, created_at) VALUES (%s, %s, %s, %s, %s);",
+		analytics_rows,
+		batch_size
+	)
+
+	return {'users': len(users), 'habits': len(habits), 'goals': len(goal_rows), 'progresses': amount_of_progresses}
+
+
+
+def generate_chunk(task, database: ConnectionManager = None):
+	"""
+	Generates and writes one chunk of users. Runs in a worker process when the generation is
+	parallelized, every worker then opens its own connection.
+
+	Every chunk has its own random generator, seeded from the dataset's seed and the chunk's
+	number, so the generated data does not depend on the amount of workers.
+
+	Args:
+		task (dict): label, chunk, first_user, amount_of_users, habits_per_user, days, now, random_seed and batch_size.
+		database (ConnectionManager, optional): The connection manager to write through. Defaults to MariadbConnection().
+
+	Returns:
+		dict: The amount of users, habits, goals and progresses written.
+	"""
+	database = database or MariadbConnection()
+	rng = random.Random(f"{task['random_seed']}:{task['chunk']}")
+	users = generate_users(rng, task['label'], task['first_user'], task['amount_of_users'], task['habits_per_user'], task['days'], task['now'])
+	return write_users(database, users, batch_size=task['batch_size'])
+
+
+
+def default_label(random_seed):
+	"""
+	Derives the label of a dataset from its seed: 'gen' and 9 hex digits of the seed's hash, so
+	long or negative seeds still give a valid label and seeds sharing their first digits do not collide.
+	"""
+	return "gen" + hashlib.sha1(str(random_seed).encode("utf-8")).hexdigest()[:9]
+
+
+
+def generate_dataset(database: ConnectionManager, users, habits_per_user=4, days=30, random_seed=None, label=None, workers=1, chunk_size=500, batch_size=5000, now=None, on_progress=None):
+	"""
+	Generates a synthetic dataset of users, habits, goals, progresses and analytics.
+
+	The users are generated in chunks of chunk_size, either one after another on the given
+	connection or in parallel by a pool of worker processes with their own connections.
+	The same random_seed, scale and now give the same data, whatever the amount of workers.
+
+	Args:
+		database (ConnectionManager): The connection manager to write through, used when workers is 1.
+		users (int): Amount of users.
+		habits_per_user (int, optional): Average amount of habits per user. Defaults to 4.
+		days (int, optional): Days of history, ending yesterday. Defaults to 30.
+		random_seed (int, optional): Seed of the generated data. Defaults to a random seed.
+		label (str, optional): Up to 12 letters and digits, part of every user and habit name. Defaults to default_label of the seed.
+		workers (int, optional): Worker processes. Defaults to 1, no worker processes.
+		chunk_size (int, optional): Users per chunk. Defaults to 500.
+		batch_size (int, optional): Rows per executemany batch. Defaults to 5000.
+		now (datetime, optional): The moment the history ends. Defaults to now.
+		on_progress (callable, optional): Called with the running totals after every chunk.
+
+	Returns:
+		dict: The label, the seed and the amount of users, habits, goals and progresses written.
+
+	Raises:
+		ValueError: If a count is not positive or the label is not valid.
+	"""
+	if users < 1 or habits_per_user < 1 or days < 1 or workers < 1 or chunk_size < 1 or batch_size < 1:
+		raise ValueError("users, habits_per_user, days, workers, chunk_size and batch_size must be positive.")
+
+	random_seed = random_seed if random_seed is not None else random.getrandbits(32)
+	label = label or default_label(random_seed)
+	if not LABEL_PATTERN.match(label):
+		raise ValueError("label must be 1 to 12 letters or digits.")
+
+	now = now or datetime.datetime.now()
+	tasks = [
+		{'label': label, 'chunk': chunk, 'first_user': first_user, 'amount_of_users': min(chunk_size, users - first_user), 'habits_per_user': habits_per_user, 'days': days, 'now': now, 'random_seed': random_seed, 'batch_size': batch_size}
+		for chunk, first_user in enumerate(range(0, users, chunk_size))
+	]
+
+	with database._connection.cursor() as cursor:
+		cursor.execute("INSERT IGNORE INTO app_users_role(user_role) VALUES ('user');")
+	database.commit()
+
+	totals = {'label': label, 'random_seed': random_seed, 'users': 0, 'habits': 0, 'goals': 0, 'progresses': 0}
+	def add(written):
+		for key, amount in written.items():
+			totals[key] += amount
+		if on_progress:
+			on_progress(dict(totals))
+
+	if workers == 1:
+		for task in tasks:
+			add(generate_chunk(task, database=database))
+		return totals
+
+	#spawned workers start without the parent's connections, forked ones would share its sockets
+	with multiprocessing.get_context("spawn").Pool(processes=workers) as pool:
+		for written in pool.imap_unordered(generate_chunk, tasks):
+			add(written)
+	return totals
+
+
+
+def drop_dataset(database: ConnectionManager, label):
+	"""
+	Removes a generated dataset, analytics and progresses included.
+
+	Args:
+		database (ConnectionManager): The connection manager to write through.
+		label (str): The label the dataset was generated with.
+	"""
+	pattern = f"{label}\\_user%"
+	with database._connection.cursor() as cursor:
+		cursor.execute("DELETE p FROM progresses p JOIN goals g ON p.goal_id_id = g.goal_id JOIN habits h ON g.habit_id_id = h.habit_id JOIN app_users u ON h.habit_user_id = u.user_id WHERE u.user_name LIKE %s;", (pattern,))
+		cursor.execute("DELETE a FROM analytics a JOIN habits h ON a.habit_id_id = h.habit_id JOIN app_users u ON h.habit_user_id = u.user_id WHERE u.user_name LIKE %s;", (pattern,))
+		cursor.execute("DELETE g FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id JOIN app_users u ON h.habit_user_id = u.user_id WHERE u.user_name LIKE %s;", (pattern,))
+		cursor.execute("DELETE h FROM habits h JOIN app_users u ON h.habit_user_id = u.user_id WHERE u.user_name LIKE %s;", (pattern,))
+		cursor.execute("DELETE FROM app_users WHERE user_name LIKE %s;", (pattern,))
+	database.commit()
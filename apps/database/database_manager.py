@@ -1,28 +1,436 @@
 import psycopg2
 import MySQLdb
 import mysql.connector as mysql
+import threading
+import time
+from contextlib import contextmanager
 
 from apps.utils.singleton_meta import SingletonMeta
 from apps.utils.env_manager import EnvManager
+from apps.database.identity_map import IdentityMap, NullIdentityMap
+from apps.database.instrumentation import InstrumentedConnection
+from apps.database.slow_query_log import SlowQueryLog
 
-class MariadbConnection(metaclass=SingletonMeta):
-	"""Singleton class for managing database connections."""
-	def __init__(self):
 
-		config = EnvManager()
+#rows fetched per round trip by stream_rows
+STREAM_BATCH = 1000
+
+
+
+class ConnectionPoolError(Exception):
+	def __init__(self, message="An unexpected error occurred in the connection pool."):
+		super().__init__(message)
+
+
+
+class ConnectionPoolExhaustedError(ConnectionPoolError):
+	"""Raised when no pooled connection becomes available before the checkout timeout."""
+	def __init__(self, pool_size, timeout):
+		message = f"All {pool_size} pooled connections are in use, none was checked in within {timeout} seconds."
+		super().__init__(message)
+
+
+
+class UnitOfWorkError(Exception):
+	"""Raised when a unit of work ends normally after one of its statements asked for a rollback."""
+	def __init__(self, message="The unit of work was rolled back because one of its statements failed."):
+		super().__init__(message)
+
+
+
+class ConnectionPool:
+	"""
+	A thread-safe, fixed size pool of database connections.
+
+	Connections are opened lazily, up to pool_size, and reused after they are
+	checked back in. When every connection is in use, checkout blocks until one
+	is checked in or the timeout runs out.
+	"""
+	def __init__(self, connection_factory, pool_size=5, checkout_timeout=30.0):
+		if not isinstance(pool_size, int) or pool_size < 1:
+			raise ValueError("pool_size must be a positive integer.")
+
+		self._connection_factory = connection_factory
+		self._pool_size = pool_size
+		self._checkout_timeout = checkout_timeout
+		self._idle_connections = []
+		self._opened = 0
+		self._in_use = 0
+		self._condition = threading.Condition()
+		self._stats = {
+			'checkouts': 0,
+			'checkins': 0,
+			'waits': 0,
+			'wait_seconds': 0.0,
+			'timeouts': 0,
+			'reconnects': 0,
+			'peak_in_use': 0,
+		}
+
+
+
+	def checkout(self, timeout=None):
+		"""
+		Takes a connection out of the pool, opening a new one if the pool is not full yet.
+
+		Args:
+			timeout (float, optional): Seconds to wait for a free connection. Defaults to the pool's checkout timeout.
+
+		Returns:
+			connection: An open database connection reserved for the caller.
+
+		Raises:
+			ConnectionPoolExhaustedError: If no connection is checked in before the timeout.
+		"""
+		timeout = self._checkout_timeout if timeout is None else timeout
+		started_at = time.monotonic()
+		deadline = started_at + timeout
+		waited = False
+
+		with self._condition:
+			while not self._idle_connections and self._opened >= self._pool_size:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					self._stats['timeouts'] += 1
+					raise ConnectionPoolExhaustedError(self._pool_size, timeout)
+				waited = True
+				self._condition.wait(remaining)
+
+			connection = self._idle_connections.pop() if self._idle_connections else None
+			if connection is None:
+				self._opened += 1
+			self._in_use += 1
+			self._stats['checkouts'] += 1
+			self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+			if waited:
+				self._stats['waits'] += 1
+				self._stats['wait_seconds'] += time.monotonic() - started_at
+
+		try:
+			if connection is None:
+				return self._connection_factory()
+			return self._revive(connection)
+		except Exception:
+			with self._condition:
+				self._opened -= 1
+				self._in_use -= 1
+				self._condition.notify()
+			raise
+
+
+
+	def checkin(self, connection):
+		"""
+		Returns a connection to the pool. Any transaction left open is rolled back,
+		so the next unit of work never inherits uncommitted state or a stale snapshot.
+
+		Args:
+			connection: A connection previously returned by checkout.
+		"""
+		try:
+			connection.rollback()
+			broken = False
+		except Exception:
+			broken = True
+
+		with self._condition:
+			self._in_use -= 1
+			self._stats['checkins'] += 1
+			if broken:
+				self._opened -= 1
+			else:
+				self._idle_connections.append(connection)
+			self._condition.notify()
+
+
+
+	def _revive(self, connection):
+		"""Pings an idle connection and reconnects it if the server dropped it meanwhile."""
+		if connection.is_connected():
+			return connection
+		connection.reconnect(attempts=1, delay=0)
+		with self._condition:
+			self._stats['reconnects'] += 1
+		return connection
+
+
+
+	def stats(self):
+		"""
+		Returns a snapshot of the pool statistics.
+
+		Returns:
+			dict: Pool size, opened/in use/idle connection counts and checkout counters.
+		"""
+		with self._condition:
+			return {
+				'pool_size': self._pool_size,
+				'opened': self._opened,
+				'in_use': self._in_use,
+				'idle': len(self._idle_connections),
+				**self._stats,
+			}
+
+
+
+	def close(self):
+		"""Closes every idle connection. Connections that are checked out are closed on checkin by their owner."""
+		with self._condition:
+			idle_connections, self._idle_connections = self._idle_connections, []
+			self._opened -= len(idle_connections)
+
+		for connection in idle_connections:
+			try:
+				connection.close()
+			except Exception:
+				pass
+
+
+
+class ConnectionManager:
+	"""
+	Hands out pooled connections to repositories.
+
+	Every thread works on its own connection: `_connection` returns the connection
+	bound to the calling thread and checks one out on first use. Wrapping a unit of
+	work in `connection()` checks the connection back in when the work is done, which
+	is what lets several workers share one process.
+	"""
+	def __init__(self, connection_config: dict, pool_size=5, checkout_timeout=30.0, slow_query_log=None):
+		self._connection_config = dict(connection_config)
+		self._slow_query_log = slow_query_log
+		self._pool = ConnectionPool(connection_factory=self._connect, pool_size=pool_size, checkout_timeout=checkout_timeout)
+		self._local = threading.local()
+
+
+
+	def _connect(self):
+		return InstrumentedConnection(mysql.connect(**self._connection_config), slow_query_log=self._slow_query_log)
+
 
-		self._connection = mysql.connect(
-			host=config.get_config("HOST"),
-			user=config.get_config("USER"),
-			password=config.get_config("PASSWORD"),
-			database=config.get_config("NAME"),
-			port=config.get_config("PORT"),
-			charset="utf8mb4",
-			collation="utf8mb4_unicode_ci"
-		)
 
-		cursor = self._connection.cursor()
+	@property
+	def _connection(self):
+		"""The connection bound to the calling thread, checked out from the pool on first use."""
+		connection = getattr(self._local, 'connection', None)
+		if connection is None:
+			connection = self._pool.checkout()
+			self._local.connection = connection
+		return connection
 
 
 
+	@contextmanager
+	def connection(self):
+		"""
+		Binds one pooled connection to the calling thread for the duration of a unit of work.
+		Nested scopes, or a thread that already holds a connection, reuse the bound connection.
 
+		Yields:
+			connection: The connection used by every repository call within the scope.
+		"""
+		bound_connection = getattr(self._local, 'connection', None)
+		if bound_connection is not None:
+			yield bound_connection
+			return
+
+		connection = self._pool.checkout()
+		self._local.connection = connection
+		try:
+			yield connection
+		finally:
+			self._local.connection = None
+			self._pool.checkin(connection)
+
+
+
+	@contextmanager
+	def unit_of_work(self):
+		"""
+		Runs every repository call within the scope in a single transaction on one pooled connection.
+		The transaction is committed once when the outermost scope ends, or rolled back if it raises.
+		Nested scopes join the outer transaction. The scope has its own identity map, so repositories
+		read each row at most once per unit of work.
+
+		Yields:
+			connection: The connection the transaction runs on.
+
+		Raises:
+			UnitOfWorkError: If a statement within the scope rolled back but the scope swallowed the error.
+		"""
+		with self.connection() as connection:
+			depth = getattr(self._local, 'unit_of_work_depth', 0)
+			if depth == 0:
+				self._local.rollback_only = False
+				self._local.identity_map = IdentityMap()
+			self._local.unit_of_work_depth = depth + 1
+			try:
+				yield connection
+			except BaseException:
+				self._local.unit_of_work_depth = depth
+				if depth == 0:
+					self._local.identity_map = None
+					connection.rollback()
+				raise
+			self._local.unit_of_work_depth = depth
+
+			if depth == 0:
+				self._local.identity_map = None
+				if self._local.rollback_only:
+					connection.rollback()
+					raise UnitOfWorkError()
+				connection.commit()
+
+
+
+	def in_unit_of_work(self):
+		"""Returns True if the calling thread is inside a unit of work."""
+		return getattr(self._local, 'unit_of_work_depth', 0) > 0
+
+
+
+	def identity_map(self):
+		"""
+		Returns the identity map of the calling thread's unit of work.
+
+		Returns:
+			IdentityMap: The unit of work's map, or a NullIdentityMap outside a unit of work.
+		"""
+		identity_map = getattr(self._local, 'identity_map', None)
+		return identity_map if identity_map is not None else NullIdentityMap()
+
+
+
+	def commit(self):
+		"""
+		Commits the calling thread's transaction. Within a unit of work the commit is
+		deferred to the end of the outermost scope, so the whole scope commits once.
+		"""
+		if not self.in_unit_of_work():
+			self._connection.commit()
+
+
+
+	def rollback(self):
+		"""
+		Rolls back the calling thread's transaction. Within a unit of work the whole
+		scope is marked to roll back when it ends, so no partial work gets committed.
+		"""
+		if self.in_unit_of_work():
+			self._local.rollback_only = True
+		else:
+			self._connection.rollback()
+
+
+
+	def release(self):
+		"""Checks the connection bound to the calling thread back into the pool, if there is one."""
+		connection = getattr(self._local, 'connection', None)
+		if connection is not None:
+			self._local.connection = None
+			self._pool.checkin(connection)
+
+
+
+	def pool_stats(self):
+		"""
+		Returns the statistics of the underlying connection pool.
+
+		Returns:
+			dict: See ConnectionPool.stats.
+		"""
+		return self._pool.stats()
+
+
+
+	def close(self):
+		"""Releases the calling thread's connection and closes all idle pooled connections."""
+		self.release()
+		self._pool.close()
+
+
+
+def identity_map_of(database):
+	"""
+	Returns the identity map repositories should read through for a database.
+
+	Args:
+		database: The repository's database, a ConnectionManager or a stand-in for one.
+
+	Returns:
+		IdentityMap: The current unit of work's map, a NullIdentityMap for anything else.
+	"""
+	if isinstance(database, ConnectionManager):
+		return database.identity_map()
+	return NullIdentityMap()
+
+
+
+def stream_rows(database, query, params=(), batch_size=STREAM_BATCH, with_columns=False):
+	"""
+	Streams the rows of a query with an unbuffered cursor.
+
+	The driver then reads the result set from the server as it is consumed, batch_size rows
+	at a time, instead of loading it into memory first, so memory stays constant whatever
+	the size of the result. The connection can not run another statement until every row
+	was read: consume the rows before querying again, or close the iterator, which drains
+	what is left of the result.
+
+	Args:
+		database: The connection manager to read through, a ConnectionManager or a stand-in for one.
+		query (str): The SELECT to stream.
+		params (tuple, optional): Its parameters.
+		batch_size (int, optional): Rows fetched per call. Defaults to STREAM_BATCH.
+		with_columns (bool, optional): Yield the column names before the rows. Defaults to False.
+
+	Yields:
+		tuple: The column names first if asked for, then every row.
+	"""
+	if not isinstance(batch_size, int) or batch_size < 1:
+		raise ValueError("batch_size must be a positive integer.")
+
+	with database.connection() as connection:
+		with connection.cursor(buffered=False) as cursor:
+			cursor.execute(query, params)
+			if with_columns:
+				yield tuple(column[0] for column in cursor.description)
+			try:
+				while True:
+					rows = cursor.fetchmany(batch_size)
+					if not rows:
+						break
+					yield from rows
+			except GeneratorExit:
+				#the consumer stopped early, an unread result would fail the next statement on this connection
+				while cursor.fetchmany(batch_size):
+					pass
+				raise
+
+
+
+class MariadbConnection(ConnectionManager, metaclass=SingletonMeta):
+	"""Singleton, pooled connection manager for the configured MariaDB database."""
+	def __init__(self):
+
+		config = EnvManager()
+
+		super().__init__(
+			connection_config={
+				'host': config.get_config("HOST"),
+				'user': config.get_config("USER"),
+				'password': config.get_config("PASSWORD"),
+				'database': config.get_config("NAME"),
+				'port': config.get_config("PORT"),
+				'charset': "utf8mb4",
+				'collation': "utf8mb4_unicode_ci",
+			},
+			pool_size=config.get_config("POOL_SIZE"),
+			checkout_timeout=config.get_config("POOL_TIMEOUT"),
+			slow_query_log=SlowQueryLog(
+				path=config.get_config("SLOW_QUERY_LOG"),
+				threshold_seconds=config.get_config("SLOW_QUERY_MS") / 1000.0,
+				max_bytes=config.get_config("SLOW_QUERY_LOG_MAX_BYTES"),
+				backup_count=config.get_config("SLOW_QUERY_LOG_BACKUPS"),
+				explain=config.get_config("SLOW_QUERY_EXPLAIN"),
+			) if config.get_config("SLOW_QUERY_LOG") else None,
+		)
@@ -0,0 +1,103 @@
+class IdentityMap:
+	"""
+	The rows read or written within one unit of work, keyed by table and primary key.
+
+	Each entry holds the columns that are known for a row, so a row loaded by one query
+	can answer a later query that needs a subset of its columns. Repositories merge what
+	they read or write and discard columns the database computes, which keeps an entry
+	identical to the row as the transaction sees it. A present entry also proves the row
+	exists, so validations of the same id are answered without a query.
+	"""
+	def __init__(self):
+		self._rows = {}
+		self._stats = {'hits': 0, 'misses': 0}
+
+
+
+	def get(self, table, key, columns=()):
+		"""
+		Returns the known columns of a row, if every requested column is known.
+
+		Args:
+			table (str): The table of the row.
+			key (int): The row's primary key.
+			columns (iterable of str, optional): Columns the caller needs. Defaults to none, only the row's existence.
+
+		Returns:
+			dict or None: The known columns of the row, None on a miss.
+		"""
+		row = self._rows.get((table, key))
+		if row is None or any(column not in row for column in columns):
+			self._stats['misses'] += 1
+			return None
+		self._stats['hits'] += 1
+		return row
+
+
+
+	def merge(self, table, key, columns):
+		"""
+		Adds a row, or updates the known columns of a row that is already mapped.
+
+		Args:
+			table (str): The table of the row.
+			key (int): The row's primary key.
+			columns (dict): Column name -> value.
+		"""
+		self._rows.setdefault((table, key), {}).update(columns)
+
+
+
+	def discard(self, table, key, columns=None):
+		"""
+		Forgets columns of a row, or the whole row when no columns are given.
+
+		Args:
+			table (str): The table of the row.
+			key (int): The row's primary key.
+			columns (iterable of str, optional): The columns to forget.
+		"""
+		if columns is None:
+			self._rows.pop((table, key), None)
+			return
+
+		row = self._rows.get((table, key))
+		if row is not None:
+			for column in columns:
+				row.pop(column, None)
+
+
+
+	def discard_where(self, table, column, value):
+		"""Forgets every mapped row of a table whose column holds the given value, e.g. the goals of a deleted habit."""
+		for mapped_table, key in [mapped for mapped, row in self._rows.items() if mapped[0] == table and row.get(column) == value]:
+			del self._rows[(mapped_table, key)]
+
+
+
+	def clear(self):
+		"""Forgets every row."""
+		self._rows.clear()
+
+
+
+	def stats(self):
+		"""
+		Returns the lookup counters.
+
+		Returns:
+			dict: Amount of hits, misses and mapped rows.
+		"""
+		return {**self._stats, 'rows': len(self._rows)}
+
+
+
+class NullIdentityMap(IdentityMap):
+	"""Stands in outside a unit of work: nothing is kept, so every lookup is a miss and reads go to the database."""
+	def get(self, table, key, columns=()):
+		return None
+
+
+
+	def merge(self, table, key, columns):
+		pass
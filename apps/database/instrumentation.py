@@ -0,0 +1,452 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+
+from apps.utils.scoped_calls import call_within
+from apps.utils.singleton_meta import SingletonMeta
+from apps.utils.tracing import Tracer
+
+
+#upper bounds in seconds, the Prometheus client defaults
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+
+def fingerprint_sql(query):
+	"""
+	Reduces a statement to its shape, so executions with different values group together.
+	Quoted strings, numbers and placeholders become ?, lists of them (?+) and whitespace collapses.
+
+	Args:
+		query (str): The SQL text.
+
+	Returns:
+		tuple: The normalised text and a 12 character hash of it.
+	"""
+	normalized = re.sub(r"'(?:[^'\\]|\\.)*'", "?", query)
+	normalized = normalized.replace("%s", "?")
+	normalized = re.sub(r"\b\d+(?:\.\d+)?\b", "?", normalized)
+	normalized = " ".join(normalized.split())
+	normalized = re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", "(?+)", normalized)
+	return normalized, hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+
+class LatencyHistogram:
+	"""A cumulative latency histogram over LATENCY_BUCKETS, plus count, sum and maximum."""
+	def __init__(self):
+		self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+		self.count = 0
+		self.sum = 0.0
+		self.max = 0.0
+
+
+
+	def observe(self, seconds):
+		for index, upper_bound in enumerate(LATENCY_BUCKETS):
+			if seconds <= upper_bound:
+				self.bucket_counts[index] += 1
+		self.count += 1
+		self.sum += seconds
+		self.max = max(self.max, seconds)
+
+
+
+	def to_dict(self):
+		return {
+			'count': self.count,
+			'sum_seconds': self.sum,
+			'max_seconds': self.max,
+			'mean_seconds': self.sum / self.count if self.count else 0.0,
+			'buckets': {str(upper_bound): bucket_count for upper_bound, bucket_count in zip(LATENCY_BUCKETS, self.bucket_counts)},
+		}
+
+
+
+class RepositoryMetrics(metaclass=SingletonMeta):
+	"""
+	Process wide call statistics of the repository layer.
+
+	Every repository method wrapped by its error decorator is recorded with its call and error
+	count, latency histogram and the rows its statements returned or changed. Statements run on
+	instrumented cursors are recorded by their fingerprint, and attributed to the innermost
+	repository method that was running on the same thread.
+	"""
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._local = threading.local()
+		self._methods = {}
+		self._statements = {}
+		self._started_at = time.time()
+
+
+
+	def _active_calls(self):
+		calls = getattr(self._local, 'calls', None)
+		if calls is None:
+			calls = self._local.calls = []
+		return calls
+
+
+
+	def current_method(self):
+		"""Returns the name of the innermost repository method running on the calling thread, or None."""
+		calls = self._active_calls()
+		return calls[-1]['method'] if calls else None
+
+
+
+	def call(self, method_name, f, *args, **kwargs):
+		"""
+		Runs a repository method and records its latency, rows and outcome.
+
+		A method returning a generator, e.g. a streaming listing, is recorded once the generator
+		is exhausted, closed or raises. Its latency is the time spent in the method and in the
+		generator's steps, statements run while stepping are attributed to the method.
+
+		Args:
+			method_name (str): The qualified method name, e.g. 'GoalRepository.validate_a_goal'.
+			f (callable): The method.
+
+		Returns:
+			Any: Whatever the method returns. Exceptions are recorded and re-raised.
+		"""
+		active_call = {'method': method_name, 'rows': 0, 'seconds': 0.0}
+		try:
+			result = self._run(active_call, f, *args, **kwargs)
+		except BaseException:
+			self._record_call(active_call, failed=True)
+			raise
+		if inspect.isgenerator(result):
+			return self._iterate(active_call, result)
+		self._record_call(active_call, failed=False)
+		return result
+
+
+
+	def _run(self, active_call, f, *args, **kwargs):
+		calls = self._active_calls()
+		calls.append(active_call)
+		started_at = time.perf_counter()
+		try:
+			return f(*args, **kwargs)
+		finally:
+			active_call['seconds'] += time.perf_counter() - started_at
+			calls.pop()
+
+
+
+	def _iterate(self, active_call, rows):
+		#the method only counts as running while a step is taken, not while the caller holds a row
+		failed = False
+		end = object()
+		try:
+			while True:
+				row = self._run(active_call, next, rows, end)
+				if row is end:
+					return
+				yield row
+		except GeneratorExit:
+			self._run(active_call, rows.close)
+			raise
+		except BaseException:
+			failed = True
+			raise
+		finally:
+			self._record_call(active_call, failed=failed)
+
+
+
+	def _record_call(self, active_call, failed):
+		with self._lock:
+			method = self._methods.get(active_call['method'])
+			if method is None:
+				method = self._methods[active_call['method']] = {'calls': 0, 'errors': 0, 'rows': 0, 'latency': LatencyHistogram()}
+			method['calls'] += 1
+			method['errors'] += failed
+			method['rows'] += active_call['rows']
+			method['latency'].observe(active_call['seconds'])
+
+
+
+	def record_statement(self, query, seconds, rows):
+		"""
+		Records one execution of a statement.
+
+		Args:
+			query (str): The SQL text.
+			seconds (float): Execution time.
+			rows (int): Rows changed by the statement, fetched rows are added with record_rows.
+
+		Returns:
+			str: The statement's fingerprint hash.
+		"""
+		normalized, fingerprint = fingerprint_sql(query)
+		method_name = self.current_method()
+		with self._lock:
+			statement = self._statements.get(fingerprint)
+			if statement is None:
+				statement = self._statements[fingerprint] = {'sql': normalized, 'executions': 0, 'rows': 0, 'latency': LatencyHistogram(), 'methods': set()}
+			statement['executions'] += 1
+			statement['rows'] += rows
+			statement['latency'].observe(seconds)
+			if method_name is not None:
+				statement['methods'].add(method_name)
+		self.record_rows(None, rows)
+		return fingerprint
+
+
+
+	def record_rows(self, fingerprint, rows):
+		"""Adds fetched or changed rows to the running repository method and, if given, to a statement."""
+		calls = self._active_calls()
+		if calls:
+			calls[-1]['rows'] += rows
+		if fingerprint is not None:
+			with self._lock:
+				statement = self._statements.get(fingerprint)
+				if statement is not None:
+					statement['rows'] += rows
+
+
+
+	def snapshot(self):
+		"""
+		Returns a copy of all statistics.
+
+		Returns:
+			dict: 'since' (epoch seconds), 'methods' (name -> calls, errors, rows, latency) and
+				  'statements' (fingerprint -> sql, executions, rows, latency, methods).
+		"""
+		with self._lock:
+			return {
+				'since': self._started_at,
+				'methods': {
+					name: {'calls': method['calls'], 'errors': method['errors'], 'rows': method['rows'], 'latency': method['latency'].to_dict()}
+					for name, method in self._methods.items()
+				},
+				'statements': {
+					fingerprint: {'sql': statement['sql'], 'executions': statement['executions'], 'rows': statement['rows'], 'latency': statement['latency'].to_dict(), 'methods': sorted(statement['methods'])}
+					for fingerprint, statement in self._statements.items()
+				},
+			}
+
+
+
+	def reset(self):
+		"""Forgets all statistics."""
+		with self._lock:
+			self._methods = {}
+			self._statements = {}
+			self._started_at = time.time()
+
+
+
+	def to_prometheus(self):
+		"""
+		Renders the statistics in the Prometheus text exposition format.
+
+		Returns:
+			str: Counters per method and statement, and per method latency histograms.
+		"""
+		snapshot = self.snapshot()
+		lines = []
+
+		def family(name, metric_type, description):
+			lines.append(f"# HELP {name} {description}")
+			lines.append(f"# TYPE {name} {metric_type}")
+
+		family("habit_tracker_repository_calls_total", "counter", "Repository method calls.")
+		for name, method in snapshot['methods'].items():
+			lines.append(f'habit_tracker_repository_calls_total{{method="{name}"}} {method["calls"]}')
+		family("habit_tracker_repository_errors_total", "counter", "Repository method calls that raised.")
+		for name, method in snapshot['methods'].items():
+			lines.append(f'habit_tracker_repository_errors_total{{method="{name}"}} {method["errors"]}')
+		family("habit_tracker_repository_rows_total", "counter", "Rows fetched or changed by repository methods.")
+		for name, method in snapshot['methods'].items():
+			lines.append(f'habit_tracker_repository_rows_total{{method="{name}"}} {method["rows"]}')
+
+		family("habit_tracker_repository_call_seconds", "histogram", "Repository method latency.")
+		for name, method in snapshot['methods'].items():
+			latency = method['latency']
+			for upper_bound, bucket_count in latency['buckets'].items():
+				lines.append(f'habit_tracker_repository_call_seconds_bucket{{method="{name}",le="{upper_bound}"}} {bucket_count}')
+			lines.append(f'habit_tracker_repository_call_seconds_bucket{{method="{name}",le="+Inf"}} {latency["count"]}')
+			lines.append(f'habit_tracker_repository_call_seconds_sum{{method="{name}"}} {latency["sum_seconds"]}')
+			lines.append(f'habit_tracker_repository_call_seconds_count{{method="{name}"}} {latency["count"]}')
+
+		family("habit_tracker_sql_executions_total", "counter", "Executions per statement fingerprint.")
+		for fingerprint, statement in snapshot['statements'].items():
+			lines.append(f'habit_tracker_sql_executions_total{{fingerprint="{fingerprint}"}} {statement["executions"]}')
+		family("habit_tracker_sql_seconds_total", "counter", "Execution time per statement fingerprint.")
+		for fingerprint, statement in snapshot['statements'].items():
+			lines.append(f'habit_tracker_sql_seconds_total{{fingerprint="{fingerprint}"}} {statement["latency"]["sum_seconds"]}')
+		return "\n".join(lines) + "\n"
+
+
+
+	def write_dumps(self, directory):
+		"""
+		Writes the statistics to repository_metrics.json and repository_metrics.prom in a directory.
+		Both files are replaced atomically, so a Prometheus textfile collector never reads half a file.
+
+		Args:
+			directory (str): The target directory, created if missing.
+
+		Returns:
+			tuple: The paths of the JSON and the Prometheus file.
+		"""
+		os.makedirs(directory, exist_ok=True)
+		json_path = os.path.join(directory, "repository_metrics.json")
+		prometheus_path = os.path.join(directory, "repository_metrics.prom")
+		for path, content in ((json_path, json.dumps(self.snapshot(), indent=2)), (prometheus_path, self.to_prometheus())):
+			temporary_path = f"{path}.tmp"
+			with open(temporary_path, "w", encoding="utf-8") as dump:
+				dump.write(content)
+			os.replace(temporary_path, path)
+		return json_path, prometheus_path
+
+
+
+def instrument_repository_call(f):
+	"""
+	Wraps a repository method so RepositoryMetrics records each call, and the Tracer a span
+	while tracing is on. Applied by the repositories' error decorators, which every database
+	method already goes through. Both cover the iteration of a returned generator.
+	"""
+	method_name = f.__qualname__
+	def instrumented_call(*args, **kwargs):
+		return call_within(Tracer().span(method_name, 'repository'), RepositoryMetrics().call, method_name, f, *args, **kwargs)
+	instrumented_call.__name__ = f.__name__
+	instrumented_call.__qualname__ = f.__qualname__
+	return instrumented_call
+
+
+
+class InstrumentedCursor:
+	"""
+	A cursor proxy recording the fingerprint, latency and rows of every statement it runs.
+	With a slow query log, statements above its threshold are logged when the cursor is closed,
+	as their EXPLAIN can only run once the connection has no unread result left.
+	"""
+	def __init__(self, cursor, connection=None, slow_query_log=None):
+		self._cursor = cursor
+		self._connection = connection
+		self._slow_query_log = slow_query_log
+		self._slow_statements = []
+		self._fingerprint = None
+
+
+
+	def _measure(self, run, query, params, many=False):
+		tracer = Tracer()
+		started_at = time.perf_counter()
+		try:
+			if tracer.enabled:
+				with tracer.span(" ".join(query.split())[:80], 'db'):
+					return run()
+			return run()
+		finally:
+			elapsed = time.perf_counter() - started_at
+			#statements without a result set report their affected rows, fetched rows are counted on fetch
+			changed_rows = max(self._cursor.rowcount, 0) if self._cursor.description is None else 0
+			self._fingerprint = RepositoryMetrics().record_statement(query, elapsed, changed_rows)
+			if self._slow_query_log is not None and self._slow_query_log.is_slow(elapsed):
+				self._slow_statements.append(self._slow_query_log.capture(query, params, elapsed, many=many))
+
+
+
+	def _log_slow_statements(self):
+		slow_statements, self._slow_statements = self._slow_statements, []
+		for entry in slow_statements:
+			self._slow_query_log.explain(self._connection, entry)
+			self._slow_query_log.write(entry)
+
+
+
+	def execute(self, operation, params=(), *args, **kwargs):
+		return self._measure(lambda: self._cursor.execute(operation, params, *args, **kwargs), operation, params)
+
+
+
+	def executemany(self, operation, seq_params, *args, **kwargs):
+		return self._measure(lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs), operation, seq_params, many=True)
+
+
+
+	def _count(self, rows):
+		if self._fingerprint is not None:
+			RepositoryMetrics().record_rows(self._fingerprint, len(rows))
+		return rows
+
+
+
+	def fetchone(self):
+		row = self._cursor.fetchone()
+		if row is not None and self._fingerprint is not None:
+			RepositoryMetrics().record_rows(self._fingerprint, 1)
+		return row
+
+
+
+	def fetchall(self):
+		return self._count(self._cursor.fetchall())
+
+
+
+	def fetchmany(self, *args, **kwargs):
+		return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+
+
+	def __iter__(self):
+		return iter(self.fetchone, None)
+
+
+
+	def __enter__(self):
+		self._cursor.__enter__()
+		return self
+
+
+
+	def __exit__(self, *exc_info):
+		try:
+			return self._cursor.__exit__(*exc_info)
+		finally:
+			self._log_slow_statements()
+
+
+
+	def close(self):
+		try:
+			return self._cursor.close()
+		finally:
+			self._log_slow_statements()
+
+
+
+	def __getattr__(self, name):
+		return getattr(self._cursor, name)
+
+
+
+class InstrumentedConnection:
+	"""A connection proxy whose cursors are InstrumentedCursors. Everything else is passed through."""
+	def __init__(self, connection, slow_query_log=None):
+		self._connection = connection
+		self._slow_query_log = slow_query_log
+
+
+
+	def cursor(self, *args, **kwargs):
+		return InstrumentedCursor(self._connection.cursor(*args, **kwargs), connection=self._connection, slow_query_log=self._slow_query_log)
+
+
+
+	def __getattr__(self, name):
+		return getattr(self._connection, name)
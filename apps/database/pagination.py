@@ -0,0 +1,114 @@
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+
+
+
+def keyset_condition(key_columns, operator):
+	"""
+	Builds the condition selecting the rows whose key comes after a cursor in one direction.
+
+	Two column keys are written as `a >= x AND (a > x OR b > y)` instead of the row comparison
+	`(a, b) > (x, y)`, so MariaDB reads them as a range on the leading index column.
+
+	Args:
+		key_columns (tuple of str): One or two key columns, the last one unique.
+		operator (str): '>' or '<'.
+
+	Returns:
+		tuple: The condition and, per cursor value, how often it is passed as a parameter.
+	"""
+	if len(key_columns) == 1:
+		return f"{key_columns[0]} {operator} %s", (1,)
+	leading_column, unique_column = key_columns
+	return f"{leading_column} {operator}= %s AND ({leading_column} {operator} %s OR {unique_column} {operator} %s)", (2, 1)
+
+
+
+def keyset_query(select, key_columns, page_size=DEFAULT_PAGE_SIZE, after=None, before=None, descending=False, conditions=(), params=()):
+	"""
+	Builds the query of one page of a keyset (cursor based) pagination.
+
+	Instead of skipping OFFSET rows, a page starts right after the key of the last row shown,
+	which the database finds with an index seek, so a page costs the same however deep it is.
+	One row more than the page size is read, to know whether another page follows.
+
+	Args:
+		select (str): The SELECT ... FROM ... of the listing, without WHERE, ORDER BY or LIMIT.
+		key_columns (tuple of str): The columns the listing is ordered by, the last one unique.
+		page_size (int, optional): Rows per page. Defaults to DEFAULT_PAGE_SIZE.
+		after (tuple, optional): Key of the last row of the previous page, to read the next page.
+		before (tuple, optional): Key of the first row of the current page, to read the page before it.
+		descending (bool, optional): List the rows from the highest key down. Defaults to False.
+		conditions (tuple of str, optional): Filters of the listing, joined with AND.
+		params (tuple, optional): Parameters of the filters.
+
+	Returns:
+		tuple: The query and its parameters.
+
+	Raises:
+		ValueError: If the page size is out of range, both cursors are given or a cursor does not match the key.
+	"""
+	if not isinstance(page_size, int) or not 1 <= page_size <= MAX_PAGE_SIZE:
+		raise ValueError(f"page_size must be an integer between 1 and {MAX_PAGE_SIZE}.")
+	if after is not None and before is not None:
+		raise ValueError("Only one of after and before can be given.")
+	if len(key_columns) not in (1, 2):
+		raise ValueError("A keyset needs one or two key columns.")
+
+	conditions = list(conditions)
+	params = list(params)
+	cursor = after if after is not None else before
+	#reading backwards walks the index the other way and the page is reversed afterwards
+	backwards = before is not None
+	reading_descending = descending != backwards
+	if cursor is not None:
+		if len(cursor) != len(key_columns):
+			raise ValueError(f"The cursor must hold {len(key_columns)} value(s): {', '.join(key_columns)}.")
+		condition, repeats = keyset_condition(key_columns, '<' if reading_descending else '>')
+		conditions.append(condition)
+		for value, repeat in zip(cursor, repeats):
+			params.extend([value] * repeat)
+
+	direction = "DESC" if reading_descending else "ASC"
+	query = select
+	if conditions:
+		query += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+	query += " ORDER BY " + ", ".join(f"{column} {direction}" for column in key_columns)
+	query += f" LIMIT {page_size + 1};"
+	return query, tuple(params)
+
+
+
+def keyset_page(rows, key_positions, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+	"""
+	Turns the rows read with a keyset_query into a page with the cursors of its neighbours.
+
+	Args:
+		rows (list of tuple): The rows returned by the query, up to page_size + 1.
+		key_positions (tuple of int): Positions of the key columns within a row.
+		page_size (int, optional): Rows per page, as passed to keyset_query.
+		after (tuple, optional): The after cursor passed to keyset_query.
+		before (tuple, optional): The before cursor passed to keyset_query.
+
+	Returns:
+		dict: 'rows' of the page in listing order, 'next_cursor' and 'previous_cursor',
+		the keys to pass as after and before for the neighbouring pages, None where there is none.
+	"""
+	has_more = len(rows) > page_size
+	rows = list(rows[:page_size])
+
+	def key_of(row):
+		return tuple(row[position] for position in key_positions)
+
+	if before is not None:
+		rows.reverse()
+		return {
+			'rows': rows,
+			'next_cursor': key_of(rows[-1]) if rows else None,
+			'previous_cursor': key_of(rows[0]) if rows and has_more else None,
+		}
+	return {
+		'rows': rows,
+		'next_cursor': key_of(rows[-1]) if rows and has_more else None,
+		'previous_cursor': key_of(rows[0]) if rows and after is not None else None,
+	}
@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import re
+import time
+from logging.handlers import RotatingFileHandler
+
+from apps.database.instrumentation import RepositoryMetrics, fingerprint_sql
+
+
+#statements MariaDB can EXPLAIN, EXPLAIN never runs them
+EXPLAINABLE_STATEMENT = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE|INSERT\s.*\bSELECT\b|REPLACE\s.*\bSELECT\b)", re.IGNORECASE | re.DOTALL)
+MAX_PARAMS_LENGTH = 500
+MAX_LOGGED_PARAM_SETS = 3
+
+
+
+class SlowQueryLog:
+	"""
+	Opt-in recorder of statements slower than a threshold, written as JSON lines to a rotating file.
+
+	Every entry holds the statement, its fingerprint, duration, parameters, the repository method
+	that ran it and the EXPLAIN output of the statement. EXPLAIN needs the connection to be free,
+	so it is run once the slow statement's cursor is done, see InstrumentedCursor.
+	"""
+	def __init__(self, path, threshold_seconds=0.2, max_bytes=5 * 1024 * 1024, backup_count=3, explain=True):
+		if threshold_seconds < 0:
+			raise ValueError("threshold_seconds must not be negative.")
+
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+
+		self._path = path
+		self._threshold_seconds = threshold_seconds
+		self._explain = explain
+		self._logger = logging.getLogger(f"habit_tracker.slow_queries.{path}")
+		self._logger.setLevel(logging.INFO)
+		self._logger.propagate = False
+		if not self._logger.handlers:
+			handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+			handler.setFormatter(logging.Formatter("%(message)s"))
+			self._logger.addHandler(handler)
+
+
+
+	@property
+	def path(self):
+		return self._path
+
+
+
+	def is_slow(self, seconds):
+		"""Returns True if a statement that ran this long should be logged."""
+		return seconds >= self._threshold_seconds
+
+
+
+	def capture(self, query, params, seconds, many=False):
+		"""
+		Builds the entry of a slow statement, while the calling repository method is still known.
+
+		Args:
+			query (str): The SQL text.
+			params (tuple or list): The parameters, a list of parameter sets for executemany.
+			seconds (float): How long the statement ran.
+			many (bool, optional): True if the statement ran through executemany.
+
+		Returns:
+			dict: The entry, to be completed by explain() and written by write().
+		"""
+		normalized, fingerprint = fingerprint_sql(query)
+		if many:
+			param_sets = list(params or [])
+			logged_params = {'count': len(param_sets), 'first': [self._shorten(param_set) for param_set in param_sets[:MAX_LOGGED_PARAM_SETS]]}
+			explain_params = param_sets[0] if param_sets else None
+		else:
+			logged_params = self._shorten(params)
+			explain_params = params
+
+		return {
+			'logged_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+			'duration_ms': round(seconds * 1000, 3),
+			'method': RepositoryMetrics().current_method(),
+			'fingerprint': fingerprint,
+			'sql': " ".join(query.split()),
+			'normalized_sql': normalized,
+			'params': logged_params,
+			'_explain_params': explain_params,
+		}
+
+
+
+	def explain(self, connection, entry):
+		"""
+		Adds the EXPLAIN output of the entry's statement, run with the same parameters on a fresh cursor.
+		Statements MariaDB can not explain are left without a plan, failures are recorded instead of raised.
+
+		Args:
+			connection: The raw connection the statement ran on.
+			entry (dict): An entry built by capture().
+		"""
+		explain_params = entry.pop('_explain_params', None)
+		if not self._explain or not EXPLAINABLE_STATEMENT.match(entry['sql']):
+			return
+
+		try:
+			with connection.cursor() as cursor:
+				cursor.execute(f"EXPLAIN {entry['sql']}", explain_params or ())
+				columns = [column[0] for column in cursor.description or ()]
+				entry['explain'] = [dict(zip(columns, [self._jsonable(value) for value in row])) for row in cursor.fetchall()]
+		except Exception as error:
+			entry['explain_error'] = str(error)
+
+
+
+	def write(self, entry):
+		"""Appends an entry to the log file as one JSON line."""
+		entry.pop('_explain_params', None)
+		self._logger.info(json.dumps(entry, default=str))
+
+
+
+	def _shorten(self, params):
+		text = repr(params)
+		return text if len(text) <= MAX_PARAMS_LENGTH else text[:MAX_PARAMS_LENGTH] + "..."
+
+
+
+	def _jsonable(self, value):
+		if isinstance(value, (bytes, bytearray)):
+			return value.decode("utf-8", errors="replace")
+		return value
@@ -0,0 +1,121 @@
+import re
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from apps.database.database_manager import ConnectionManager
+from apps.habits.repositories.habit_repository import HabitRepository
+from apps.goals.repositories.goal_repository import GoalRepository
+from apps.progresses.repositories.progress_repository import ProgressesRepository
+from apps.analytics.repositories.analytics_repository import AnalyticsRepository
+from apps.habits.services.habit_service import HabitService
+from apps.goals.services.goal_service import GoalService
+from apps.progresses.services.progress_service import ProgressesService
+from apps.analytics.services.analytics_service import AnalyticsService
+from apps.core.facades.habit_tracker_facade_impl import HabitTrackerFacadeImpl
+
+
+class ScriptedCursor:
+	"""A cursor that records every statement and answers SELECTs from the rows of its connection's script."""
+	def __init__(self, connection):
+		self._connection = connection
+		self._rows = []
+		self.rowcount = 0
+		self.lastrowid = None
+		self.description = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		return False
+
+	def execute(self, query, params=()):
+		statement = " ".join(query.split())
+		self._connection.statements.append(statement)
+		self._rows = next((rows for pattern, rows in self._connection.script if re.search(pattern, statement)), [])
+		self.description = (('column',),) if statement.startswith("SELECT") else None
+		self.rowcount = 1
+		self.lastrowid = 99
+
+	def executemany(self, query, seq_params):
+		self.execute(query)
+		self.rowcount = len(seq_params)
+
+	def fetchone(self):
+		return self._rows[0] if self._rows else None
+
+	def fetchall(self):
+		return list(self._rows)
+
+
+
+class ScriptedConnection:
+	def __init__(self, script):
+		self.script = script
+		self.statements = []
+
+	def cursor(self):
+		return ScriptedCursor(self)
+
+	def commit(self):
+		pass
+
+	def rollback(self):
+		pass
+
+	def is_connected(self):
+		return True
+
+
+
+@pytest.fixture
+def tickable_goal_script():
+	"""
+	Fixture returning the rows of a daily habit 1 with goal 10, last ticked 30 hours ago, so it can be ticked now.
+
+	Returns:
+		list of tuple: (statement pattern, rows) pairs, first match wins.
+	"""
+	now = datetime.now()
+	return [
+		(r"^SELECT habit_id FROM habits", [(1,)]),
+		(r"^SELECT goal_id FROM goals WHERE goal_id", [(10,)]),
+		(r"^SELECT habit_periodicity_type FROM habits", [('daily',)]),
+		(r"^SELECT habit_streak FROM habits", [(3,)]),
+		(r"^SELECT g\.goal_id, g\.goal_name, g\.habit_id_id, h\.habit_name", [(10, "read", 1, "reading", 1.0, 3.0, 3, now - timedelta(hours=6), now + timedelta(hours=18))]),
+		(r"^SELECT @new_kvi_value", [(4.0,)]),
+	]
+
+
+
+@pytest.fixture
+def habit_tracker_facade(tickable_goal_script):
+	"""
+	Fixture wiring the real repositories, services and facade to a ConnectionManager whose
+	pooled connection runs the tickable goal script.
+
+	Returns:
+		tuple: The facade and the scripted connection.
+	"""
+	connection = ScriptedConnection(tickable_goal_script)
+	database = ConnectionManager(connection_config={}, pool_size=1)
+	database._pool._connection_factory = lambda: connection
+
+	habit_repository = HabitRepository(database=database, user_repository=MagicMock())
+	goal_repository = GoalRepository(database=database, habit_repository=habit_repository)
+	habit_service = HabitService(repository=habit_repository)
+	goal_service = GoalService(repository=goal_repository, habit_service=habit_service)
+	progress_service = ProgressesService(repository=ProgressesRepository(database=database, goal_repository=goal_repository), goal_service=goal_service)
+	analytics_service = AnalyticsService(repository=AnalyticsRepository(database=database, habit_repository=habit_repository), habit_service=habit_service, progress_service=progress_service)
+
+	facade = HabitTrackerFacadeImpl(
+		user_service=MagicMock(),
+		habit_service=habit_service,
+		goal_service=goal_service,
+		progress_service=progress_service,
+		reminder_service=MagicMock(),
+		analytics_service=analytics_service,
+		database=database
+	)
+	return facade, connection
@@ -0,0 +1,180 @@
+import pytest
+import threading
+from unittest.mock import MagicMock
+
+from apps.database.database_manager import ConnectionPool, ConnectionManager, ConnectionPoolExhaustedError
+
+
+@pytest.fixture
+def connection_factory():
+	"""
+	Fixture returning a factory that hands out a fresh MagicMock connection per call.
+
+	Returns:
+		MagicMock: The mocked connection factory.
+	"""
+	return MagicMock(side_effect=lambda: MagicMock())
+
+
+
+@pytest.fixture
+def connection_pool(connection_factory):
+	"""
+	Fixture instantiating a ConnectionPool of two connections with a short timeout.
+
+	Returns:
+		ConnectionPool: Pool using the mocked connection factory.
+	"""
+	return ConnectionPool(connection_factory=connection_factory, pool_size=2, checkout_timeout=0.05)
+
+
+
+def test_checkout_opens_connections_lazily(connection_pool, connection_factory):
+	"""
+	Test that connections are only opened when they are checked out.
+
+	Given:
+		- An empty pool of size 2.
+	When:
+		- One connection is checked out.
+	Then:
+		- The factory is called once and the stats show one connection in use.
+	"""
+	assert connection_factory.call_count == 0
+
+	connection_pool.checkout()
+
+	assert connection_factory.call_count == 1
+	stats = connection_pool.stats()
+	assert stats['opened'] == 1
+	assert stats['in_use'] == 1
+	assert stats['idle'] == 0
+
+
+
+def test_checkin_reuses_connection(connection_pool, connection_factory):
+	"""
+	Test that a checked in connection is rolled back and handed out again.
+
+	Given:
+		- A connection that was checked out and checked back in.
+	When:
+		- Another connection is checked out.
+	Then:
+		- The same connection is returned and no new one is opened.
+	"""
+	connection = connection_pool.checkout()
+	connection_pool.checkin(connection)
+	connection.is_connected.return_value = True
+
+	reused = connection_pool.checkout()
+
+	assert reused is connection
+	connection.rollback.assert_called_once()
+	assert connection_factory.call_count == 1
+	assert connection_pool.stats()['checkins'] == 1
+
+
+
+def test_checkout_reconnects_dropped_connection(connection_pool):
+	"""
+	Test that an idle connection dropped by the server is reconnected on checkout.
+	"""
+	connection = connection_pool.checkout()
+	connection_pool.checkin(connection)
+	connection.is_connected.return_value = False
+
+	connection_pool.checkout()
+
+	connection.reconnect.assert_called_once()
+	assert connection_pool.stats()['reconnects'] == 1
+
+
+
+def test_checkout_raises_when_exhausted(connection_pool):
+	"""
+	Test that checkout times out when every connection is in use.
+
+	Given:
+		- Both connections of the pool are checked out.
+	When:
+		- A third checkout is attempted.
+	Then:
+		- ConnectionPoolExhaustedError is raised and counted as a timeout.
+	"""
+	connection_pool.checkout()
+	connection_pool.checkout()
+
+	with pytest.raises(ConnectionPoolExhaustedError):
+		connection_pool.checkout()
+	assert connection_pool.stats()['timeouts'] == 1
+
+
+
+def test_broken_connection_is_discarded_on_checkin(connection_pool, connection_factory):
+	"""
+	Test that a connection failing its rollback on checkin is not reused.
+	"""
+	connection = connection_pool.checkout()
+	connection.rollback.side_effect = Exception("server has gone away")
+
+	connection_pool.checkin(connection)
+
+	assert connection_pool.stats()['opened'] == 0
+	assert connection_pool.checkout() is not connection
+	assert connection_factory.call_count == 2
+
+
+
+def test_concurrent_checkouts_never_exceed_pool_size(connection_factory):
+	"""
+	Test that many threads sharing a pool never hold more connections than its size.
+	"""
+	pool = ConnectionPool(connection_factory=connection_factory, pool_size=3, checkout_timeout=5.0)
+	errors = []
+
+	def worker():
+		try:
+			for _ in range(50):
+				connection = pool.checkout()
+				connection.is_connected.return_value = True
+				pool.checkin(connection)
+		except Exception as error:
+			errors.append(error)
+
+	threads = [threading.Thread(target=worker) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	stats = pool.stats()
+	assert errors == []
+	assert stats['peak_in_use'] <= 3
+	assert stats['opened'] <= 3
+	assert stats['checkouts'] == stats['checkins'] == 400
+
+
+
+def test_connection_manager_binds_one_connection_per_thread(connection_factory):
+	"""
+	Test that each thread gets its own connection and a scope checks it back in.
+	"""
+	manager = ConnectionManager(connection_config={}, pool_size=2, checkout_timeout=0.05)
+	manager._pool._connection_factory = connection_factory
+	seen = {}
+
+	with manager.connection() as connection:
+		assert manager._connection is connection
+
+		def other_thread():
+			seen['connection'] = manager._connection
+			manager.release()
+
+		thread = threading.Thread(target=other_thread)
+		thread.start()
+		thread.join()
+
+	assert seen['connection'] is not connection
+	assert manager.pool_stats()['in_use'] == 0
+	assert manager.pool_stats()['idle'] == 2
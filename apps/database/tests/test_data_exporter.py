@@ -0,0 +1,129 @@
+import csv
+import datetime
+import gzip
+import json
+import pytest
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from apps.database.data_exporter import build_export_query, export_table, export_data
+
+
+
+def fake_database(columns, rows):
+	"""
+	Builds a stand-in for a ConnectionManager whose cursor returns the given rows through fetchmany.
+
+	Returns:
+		tuple: The database, its connection and its cursor mock.
+	"""
+	pending_rows = list(rows)
+	cursor = MagicMock()
+	cursor.__enter__.return_value = cursor
+	cursor.description = [(column,) for column in columns]
+
+	def fetchmany(size):
+		batch = pending_rows[:size]
+		del pending_rows[:size]
+		return batch
+
+	cursor.fetchmany.side_effect = fetchmany
+	connection = MagicMock()
+	connection.cursor.return_value = cursor
+	database = MagicMock()
+
+	@contextmanager
+	def scoped_connection():
+		yield connection
+
+	database.connection = scoped_connection
+	return database, connection, cursor
+
+
+
+def test_build_export_query_filters():
+	"""
+	Test the date range and user filters of an export query.
+
+	Given:
+		- A range from March 1 to March 2 and two users.
+	When:
+		- build_export_query is called for progresses.
+	Then:
+		- The upper bound is the start of March 3 and the users are parameters, not part of the SQL.
+	"""
+	query, params = build_export_query('progresses', since=datetime.date(2025, 3, 1), until=datetime.date(2025, 3, 2), users=["alice", "bob"])
+
+	assert "p.occurence_date >= %s AND p.occurence_date < %s AND u.user_name IN (%s, %s)" in query
+	assert query.endswith("ORDER BY p.progress_id;")
+	assert params == (datetime.datetime(2025, 3, 1), datetime.datetime(2025, 3, 3), "alice", "bob")
+	assert "WHERE" not in build_export_query('habits')[0]
+
+
+
+def test_build_export_query_rejects_invalid_arguments():
+	"""
+	Test unknown tables and inverted date ranges are refused.
+	"""
+	with pytest.raises(ValueError):
+		build_export_query('app_users')
+	with pytest.raises(ValueError):
+		build_export_query('goals', since=datetime.date(2025, 3, 2), until=datetime.date(2025, 3, 1))
+
+
+
+def test_export_table_streams_gzipped_jsonl(tmp_path):
+	"""
+	Test exporting a table to a gzipped JSONL file.
+
+	Given:
+		- A cursor returning five rows with a datetime and a decimal.
+	When:
+		- export_table is called with a batch size of 2.
+	Then:
+		- The rows are read with an unbuffered cursor, two per fetchmany call.
+		- Every row is a JSON object with ISO dates and floats.
+	"""
+	rows = [(number, "alice", Decimal("1.5"), datetime.datetime(2025, 3, 1, 8, number)) for number in range(5)]
+	database, connection, cursor = fake_database(("progress_id", "user_name", "current_kvi_value", "occurence_date"), rows)
+	path = str(tmp_path / "progresses.jsonl.gz")
+
+	exported = export_table(database, 'progresses', path, batch_size=2)
+
+	assert exported == 5
+	connection.cursor.assert_called_once_with(buffered=False)
+	assert cursor.fetchmany.call_count == 4
+	with gzip.open(path, "rt", encoding="utf-8") as export_file:
+		records = [json.loads(line) for line in export_file]
+	assert records[4] == {'progress_id': 4, 'user_name': "alice", 'current_kvi_value': 1.5, 'occurence_date': "2025-03-01T08:04:00"}
+	assert not (tmp_path / "progresses.jsonl.gz.tmp").exists()
+
+
+
+def test_export_data_writes_csv_per_table(tmp_path):
+	"""
+	Test exporting several tables to CSV files with a header.
+	"""
+	database, _, _ = fake_database(("habit_id", "habit_name"), [(1, "reading")])
+
+	exported = export_data(database, str(tmp_path), tables=['habits'], file_format='csv')
+
+	assert exported == {'habits': (str(tmp_path / "habits.csv"), 1)}
+	with open(tmp_path / "habits.csv", encoding="utf-8", newline="") as export_file:
+		assert list(csv.reader(export_file)) == [["habit_id", "habit_name"], ["1", "reading"]]
+
+
+
+def test_export_table_removes_partial_file_on_error(tmp_path):
+	"""
+	Test a failing export leaves neither the file nor its temporary file behind.
+	"""
+	database, _, cursor = fake_database(("habit_id",), [])
+	cursor.fetchmany.side_effect = RuntimeError("connection lost")
+	path = tmp_path / "habits.jsonl"
+
+	with pytest.raises(RuntimeError):
+		export_table(database, 'habits', str(path))
+
+	assert list(tmp_path.iterdir()) == []
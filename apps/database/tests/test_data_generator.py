@@ -0,0 +1,76 @@
+import random
+import pytest
+from datetime import datetime
+
+from apps.database.data_generator import LABEL_PATTERN, default_label, generate_users, generate_dataset
+
+
+NOW = datetime(2025, 3, 12, 15, 30)
+
+
+
+def test_generated_users_are_reproducible_from_a_seed():
+	"""
+	Test that two generators seeded alike produce the same users, habits and ticks, and a different seed does not.
+	"""
+	first = generate_users(random.Random("7:0"), "gen7", 0, 20, 4, 90, NOW)
+	second = generate_users(random.Random("7:0"), "gen7", 0, 20, 4, 90, NOW)
+	other = generate_users(random.Random("8:0"), "gen7", 0, 20, 4, 90, NOW)
+
+	assert first == second
+	assert first != other
+	assert [user['user_name'] for user in first] == [f"gen7_user{number}" for number in range(20)]
+
+
+
+def test_generated_histories_respect_the_period_rules():
+	"""
+	Test the ticks of generated habits.
+
+	Given:
+		- 200 generated users with 90 days of history.
+	When:
+		- Their habits' ticks are inspected.
+	Then:
+		- Every tick lies in the past, after the habit was created, one per period at most.
+		- A streak grows by one on consecutive periods and starts again at 1 after a gap.
+		- Habit names are unique and fit the 40 characters of the habits table.
+	"""
+	users = generate_users(random.Random(1), "gen1", 0, 200, 4, 90, NOW)
+	habits = [habit for user in users for habit in user['habits']]
+
+	assert len({habit['habit_name'] for habit in habits}) == len(habits)
+	assert max(len(habit['habit_name']) for habit in habits) <= 40
+	assert sum(len(habit['ticks']) for habit in habits) > 0
+
+	for habit in habits:
+		previous_index = None
+		previous_streak = 0
+		for occurence_date, period_index, streak in habit['ticks']:
+			assert habit['created_at'] <= occurence_date < NOW.replace(hour=0, minute=0)
+			assert previous_index is None or period_index > previous_index
+			assert streak == (1 if previous_index is None or period_index != previous_index + 1 else previous_streak + 1)
+			previous_index, previous_streak = period_index, streak
+
+
+
+def test_generate_dataset_rejects_invalid_labels():
+	"""
+	Test that a label which could break the LIKE patterns or the 40 character habit names is rejected before anything is written.
+	"""
+	with pytest.raises(ValueError):
+		generate_dataset(database=None, users=10, label="no_underscores")
+	with pytest.raises(ValueError):
+		generate_dataset(database=None, users=0)
+
+
+
+def test_default_labels_of_long_and_negative_seeds_are_valid_and_distinct():
+	"""
+	Test that seeds sharing their first digits or being negative still get distinct, valid default labels.
+	"""
+	labels = [default_label(seed) for seed in (1234567890, 1234567891, -5, 5)]
+
+	assert all(LABEL_PATTERN.match(label) for label in labels)
+	assert len(set(labels)) == len(labels)
+	assert default_label(1234567890) == labels[0]
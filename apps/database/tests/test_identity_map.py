@@ -0,0 +1,66 @@
+from collections import Counter
+
+from apps.database.identity_map import IdentityMap
+
+
+def test_tick_reads_every_row_once(habit_tracker_facade):
+	"""
+	Test the statements of one tick: every entity is read at most once, repeated lookups are served by the identity map.
+
+	Given:
+		- A daily goal that can be ticked, behind the real repositories, services and facade.
+	When:
+		- complete_a_habit ticks it.
+	Then:
+		- Habit 1 and goal 10 are validated once each, although the orchestrator, update_habit_streak and the
+		  progress service all validate them, and the habit's streak is not read again before it is updated.
+		- The tick takes 10 statements: 4 reads, the streak, KVI, progress, window and analytics writes.
+	"""
+	facade, connection = habit_tracker_facade
+
+	facade.complete_a_habit(habit_id=1, goal_id=10)
+
+	selects = Counter(statement for statement in connection.statements if statement.startswith("SELECT"))
+	assert selects["SELECT habit_id FROM habits WHERE habit_id = %s"] == 1
+	assert selects["SELECT goal_id FROM goals WHERE goal_id = %s;"] == 1
+	assert not any(statement.startswith("SELECT habit_streak FROM habits") for statement in selects)
+	assert all(count == 1 for count in selects.values())
+	assert len(connection.statements) == 10
+
+
+
+def test_identity_map_ends_with_the_unit_of_work(habit_tracker_facade):
+	"""
+	Test that the identity map lives only as long as its unit of work, so a later unit of work reads fresh rows.
+	"""
+	facade, connection = habit_tracker_facade
+	goal_repository = facade._goal_service._repository
+
+	with facade.unit_of_work():
+		goal_repository.validate_a_goal(goal_id=10)
+		goal_repository.validate_a_goal(goal_id=10)
+	with facade.unit_of_work():
+		goal_repository.validate_a_goal(goal_id=10)
+	goal_repository.validate_a_goal(goal_id=10)
+
+	assert connection.statements.count("SELECT goal_id FROM goals WHERE goal_id = %s;") == 3
+
+
+
+def test_identity_map_answers_subsets_of_known_columns():
+	"""
+	Test that a mapped row answers lookups for columns it knows, misses for others, and forgets discarded columns.
+	"""
+	identity_map = IdentityMap()
+	identity_map.merge('goals', 10, {'goal_id': 10, 'current_kvi_value': 3.0, 'next_due_at': None})
+
+	assert identity_map.get('goals', 10) is not None
+	assert identity_map.get('goals', 10, ('current_kvi_value',))['current_kvi_value'] == 3.0
+	assert identity_map.get('goals', 10, ('goal_name',)) is None
+
+	identity_map.merge('goals', 10, {'current_kvi_value': 4.0})
+	identity_map.discard('goals', 10, ('next_due_at',))
+
+	assert identity_map.get('goals', 10, ('current_kvi_value',))['current_kvi_value'] == 4.0
+	assert identity_map.get('goals', 10, ('next_due_at',)) is None
+	assert identity_map.stats() == {'hits': 3, 'misses': 2, 'rows': 1}
@@ -0,0 +1,124 @@
+import sqlite3
+import pytest
+
+from apps.database.pagination import keyset_query, keyset_page
+
+
+
+@pytest.fixture
+def history():
+	"""
+	Fixture returning an in-memory SQLite table of 53 entries, several sharing a date.
+
+	Returns:
+		sqlite3.Connection: The connection holding the entries table.
+	"""
+	connection = sqlite3.connect(":memory:")
+	connection.execute("CREATE TABLE entries (entry_id INTEGER PRIMARY KEY, entry_date TEXT, owner INTEGER)")
+	connection.executemany(
+		"INSERT INTO entries (entry_id, entry_date, owner) VALUES (?, ?, ?)",
+		[(entry_id, f"2025-03-{entry_id // 4 + 1:02d}", entry_id % 2) for entry_id in range(1, 54)]
+	)
+	yield connection
+	connection.close()
+
+
+
+def read_page(connection, page_size, after=None, before=None, conditions=(), params=()):
+	query, query_params = keyset_query("SELECT entry_id, entry_date FROM entries", ("entry_date", "entry_id"), page_size=page_size, after=after, before=before, descending=True, conditions=conditions, params=params)
+	rows = connection.execute(query.replace("%s", "?"), query_params).fetchall()
+	return keyset_page(rows, (1, 0), page_size=page_size, after=after, before=before)
+
+
+
+def test_keyset_query_after_a_single_column_key():
+	"""
+	Test the query of the page after a cursor on a single key column.
+	"""
+	query, params = keyset_query("SELECT habit_id FROM habits", ("habit_id",), page_size=10, after=(42,))
+
+	assert query == "SELECT habit_id FROM habits WHERE (habit_id > %s) ORDER BY habit_id ASC LIMIT 11;"
+	assert params == (42,)
+
+
+
+def test_keyset_query_before_reads_backwards():
+	"""
+	Test the query of the page before a cursor on a two column key, listed newest first.
+
+	Given:
+		- A descending listing and a before cursor.
+	When:
+		- keyset_query is called.
+	Then:
+		- The rows above the cursor are read in ascending order, as a range on the leading column.
+	"""
+	query, params = keyset_query("SELECT * FROM progresses", ("occurence_date", "progress_id"), after=None, before=("2025-03-01", 7), descending=True, conditions=("goal_id_id = %s",), params=(3,))
+
+	assert "WHERE (goal_id_id = %s) AND (occurence_date >= %s AND (occurence_date > %s OR progress_id > %s))" in query
+	assert query.endswith("ORDER BY occurence_date ASC, progress_id ASC LIMIT 21;")
+	assert params == (3, "2025-03-01", "2025-03-01", 7)
+
+
+
+def test_keyset_query_rejects_invalid_arguments():
+	"""
+	Test that page sizes out of range, two cursors at once and cursors of the wrong length are refused.
+	"""
+	with pytest.raises(ValueError):
+		keyset_query("SELECT habit_id FROM habits", ("habit_id",), page_size=0)
+	with pytest.raises(ValueError):
+		keyset_query("SELECT habit_id FROM habits", ("habit_id",), after=(1,), before=(9,))
+	with pytest.raises(ValueError):
+		keyset_query("SELECT habit_id FROM habits", ("habit_id",), after=(1, 2))
+
+
+
+def test_paging_forward_and_back_visits_every_row_once(history):
+	"""
+	Test walking a listing with ties on the leading key column forward to its end and back to its start.
+
+	Given:
+		- 53 entries, four per date, listed newest first in pages of 10.
+	When:
+		- The next page is read until there is none, then the previous page until there is none.
+	Then:
+		- Both walks visit every entry once, in the listing order, in 6 pages.
+		- The first page has no previous cursor and the last page no next cursor.
+	"""
+	expected = [row[0] for row in history.execute("SELECT entry_id FROM entries ORDER BY entry_date DESC, entry_id DESC")]
+
+	pages = [read_page(history, 10)]
+	while pages[-1]['next_cursor'] is not None:
+		pages.append(read_page(history, 10, after=pages[-1]['next_cursor']))
+	forward = [row[0] for page in pages for row in page['rows']]
+
+	pages_back = [pages[-1]]
+	while pages_back[-1]['previous_cursor'] is not None:
+		pages_back.append(read_page(history, 10, before=pages_back[-1]['previous_cursor']))
+	backward = [row[0] for page in reversed(pages_back) for row in page['rows']]
+
+	assert forward == expected
+	assert backward == expected
+	assert len(pages) == len(pages_back) == 6
+	assert pages[0]['previous_cursor'] is None and pages_back[-1]['previous_cursor'] is None
+	assert pages[-1]['next_cursor'] is None and len(pages[-1]['rows']) == 3
+
+
+
+def test_paging_with_a_filter(history):
+	"""
+	Test that the filter of a listing is kept on every page.
+	"""
+	first_page = read_page(history, 5, conditions=("owner = %s",), params=(1,))
+	second_page = read_page(history, 5, after=first_page['next_cursor'], conditions=("owner = %s",), params=(1,))
+
+	assert [row[0] for row in first_page['rows'] + second_page['rows']] == [53, 51, 49, 47, 45, 43, 41, 39, 37, 35]
+
+
+
+def test_keyset_page_of_an_empty_listing():
+	"""
+	Test that an empty listing has neither a next nor a previous page.
+	"""
+	assert keyset_page([], (0,), page_size=10) == {'rows': [], 'next_cursor': None, 'previous_cursor': None}
@@ -0,0 +1,99 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from apps.database.instrumentation import RepositoryMetrics, InstrumentedConnection, fingerprint_sql
+from apps.goals.repositories.goal_repository import GoalRepository, GoalNotFoundError
+
+
+@pytest.fixture
+def metrics():
+	"""
+	Fixture returning the process wide RepositoryMetrics, emptied before and after the test.
+
+	Returns:
+		RepositoryMetrics: The metrics singleton.
+	"""
+	repository_metrics = RepositoryMetrics()
+	repository_metrics.reset()
+	yield repository_metrics
+	repository_metrics.reset()
+
+
+
+@pytest.fixture
+def goal_repository():
+	"""
+	Fixture instantiating GoalRepository on an instrumented MagicMock connection, whose cursor
+	finds goal 10 and no other goal.
+
+	Returns:
+		GoalRepository: Repository running on the instrumented mock.
+	"""
+	raw_cursor = MagicMock()
+	raw_cursor.__enter__.return_value = raw_cursor
+	raw_cursor.__exit__.return_value = False
+	raw_cursor.description = (('goal_id',),)
+	raw_cursor.execute.side_effect = lambda query, params=(): setattr(raw_cursor, 'row', (10,) if params == (10,) else None)
+	raw_cursor.fetchone.side_effect = lambda: raw_cursor.row
+
+	database = MagicMock()
+	database._connection = InstrumentedConnection(MagicMock(cursor=MagicMock(return_value=raw_cursor)))
+	return GoalRepository(database=database, habit_repository=MagicMock())
+
+
+
+def test_fingerprint_groups_statements_by_shape():
+	"""
+	Test that statements differing only in literals, placeholders, IN list length or whitespace share a fingerprint.
+	"""
+	first, first_hash = fingerprint_sql("SELECT goal_id FROM goals WHERE goal_id IN (%s, %s) AND goal_name = 'run'")
+	second, second_hash = fingerprint_sql("SELECT goal_id\n\tFROM goals WHERE goal_id IN (1, 2, 3) AND goal_name = 'read 5 pages'")
+
+	assert first == "SELECT goal_id FROM goals WHERE goal_id IN (?+) AND goal_name = ?"
+	assert (second, second_hash) == (first, first_hash)
+
+
+
+def test_repository_calls_are_recorded_at_the_error_decorator(metrics, goal_repository):
+	"""
+	Test that a decorated repository method is counted with its errors, latency, rows and statements.
+
+	Given:
+		- An instrumented connection that finds goal 10 only.
+	When:
+		- validate_a_goal is called for goal 10 twice and for goal 11 once.
+	Then:
+		- The method has 3 calls, 1 error, 2 rows, a latency histogram over 3 observations,
+		  and its one statement shape has 3 executions attributed to it.
+	"""
+	goal_repository.validate_a_goal(10)
+	goal_repository.validate_a_goal(10)
+	with pytest.raises(GoalNotFoundError):
+		goal_repository.validate_a_goal(11)
+
+	snapshot = metrics.snapshot()
+	method = snapshot['methods']['GoalRepository.validate_a_goal']
+	assert (method['calls'], method['errors'], method['rows']) == (3, 1, 2)
+	assert method['latency']['count'] == 3
+	[statement] = snapshot['statements'].values()
+	assert statement['sql'] == "SELECT goal_id FROM goals WHERE goal_id = ?;"
+	assert (statement['executions'], statement['rows'], statement['methods']) == (3, 2, ['GoalRepository.validate_a_goal'])
+
+
+
+def test_dumps_are_json_and_prometheus_text(metrics, goal_repository, tmp_path):
+	"""
+	Test that the dumps hold the snapshot as JSON and valid Prometheus counters and histograms.
+	"""
+	goal_repository.validate_a_goal(10)
+
+	json_path, prometheus_path = metrics.write_dumps(str(tmp_path / "metrics"))
+
+	with open(json_path) as dump:
+		assert json.load(dump)['methods']['GoalRepository.validate_a_goal']['calls'] == 1
+	with open(prometheus_path) as dump:
+		exposition = dump.read().splitlines()
+	assert 'habit_tracker_repository_calls_total{method="GoalRepository.validate_a_goal"} 1' in exposition
+	assert 'habit_tracker_repository_call_seconds_bucket{method="GoalRepository.validate_a_goal",le="+Inf"} 1' in exposition
+	assert '# TYPE habit_tracker_repository_call_seconds histogram' in exposition
@@ -0,0 +1,241 @@
+import ast
+import re
+import pytest
+from pathlib import Path
+from datetime import datetime
+from unittest.mock import MagicMock
+from django.db.utils import ConnectionHandler
+
+from apps.users.models import AppUsersRoles, AppUsers
+from apps.habits.models import Habits
+from apps.kvi_types.models import KviTypes
+from apps.goals.models import Goals
+from apps.progresses.models import Progresses
+from apps.analytics.models import Analytics
+from apps.habits.repositories.habit_repository import HabitRepository
+from apps.progresses.repositories.progress_repository import ProgressesRepository
+
+
+APPS_DIR = Path(__file__).resolve().parent.parent.parent
+GUARDED_TABLES = {"habits", "progresses"}
+
+#methods whose whole point is to list every row, a full scan is expected there
+FULL_LISTINGS = {
+	"HabitRepository.get_all_habits",
+	"HabitRepository.iter_all_habits",
+	"UserRepository.query_user_and_related_habits",
+	"UserRepository.iter_user_and_related_habits",
+	"AnalyticsRepository.query_all_habit_streaks",
+}
+
+#SELECTs completed with the page condition, order and limit by keyset_query, their pages are explained by test_keyset_pages_seek_instead_of_scanning
+KEYSET_PAGES = {
+	"HabitRepository.get_habits_page",
+	"ProgressesRepository.get_progress_history_page",
+}
+
+#statements using MariaDB-only syntax the SQLite stand-in can not plan
+MARIADB_ONLY = {
+	"GoalRepository.increment_current_kvi": "assigns and reads a MariaDB session variable; it updates by primary key.",
+}
+
+SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE|WITH|INSERT\s+INTO\s+\w+\s*(\([^)]*\))?\s*SELECT)\b", re.IGNORECASE)
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|SET\b|JOIN\b|INNER\b|LEFT\b|GROUP\b|ORDER\b|LIMIT\b)(\w+))?", re.IGNORECASE)
+
+
+
+def collect_repository_statements():
+	"""
+	Collects every constant SQL string that reads or filters rows in the repository modules.
+	Statements assembled at runtime are left out.
+
+	Returns:
+		list of tuple: (qualified method name, sql) pairs.
+	"""
+	statements = []
+	for module_path in sorted(APPS_DIR.glob("*/repositories/*.py")):
+		tree = ast.parse(module_path.read_text())
+		for class_node in [node for node in tree.body if isinstance(node, ast.ClassDef)]:
+			for method in [node for node in class_node.body if isinstance(node, ast.FunctionDef)]:
+				dynamic = set()
+				for node in ast.walk(method):
+					#fragments that are concatenated or formatted into the final statement can not be explained on their own
+					if isinstance(node, ast.BinOp):
+						dynamic.update((id(node.left), id(node.right)))
+					elif isinstance(node, ast.Attribute) and node.attr == "format":
+						dynamic.add(id(node.value))
+					elif isinstance(node, ast.JoinedStr):
+						dynamic.update(id(value) for value in node.values)
+				for node in ast.walk(method):
+					if id(node) in dynamic:
+						continue
+					sql = None
+					if isinstance(node, ast.Constant) and isinstance(node.value, str):
+						sql = node.value
+					elif isinstance(node, ast.JoinedStr) and all(isinstance(value, ast.Constant) for value in node.values):
+						sql = "".join(value.value for value in node.values)
+					if sql and SQL_START.match(sql):
+						statements.append((f"{class_node.name}.{method.name}", sql))
+	return statements
+
+
+
+def to_sqlite(sql):
+	"""Rewrites the few MariaDB spellings the stand-in does not understand."""
+	sql = re.sub(r"\s+SEPARATOR\s+'[^']*'", "", sql)
+	sql = re.sub(r"\bIF\(", "IIF(", sql)
+	return re.sub(r",\s*INTERVAL\s+(.+?)\s+DAY\)", r", \1)", sql)
+
+
+
+def full_table_scans(sql, plan_rows):
+	"""
+	Returns the guarded tables that the plan reads with a full table scan.
+
+	Args:
+		sql (str): The explained statement, used to resolve table aliases.
+		plan_rows (list): Rows of EXPLAIN QUERY PLAN.
+
+	Returns:
+		set: Names of guarded tables that are scanned without an index.
+	"""
+	aliases = {}
+	for table, alias in TABLE_REFERENCE.findall(sql):
+		aliases[table.lower()] = table.lower()
+		if alias:
+			aliases[alias.lower()] = table.lower()
+
+	scanned = set()
+	for row in plan_rows:
+		detail = row[-1]
+		match = re.match(r"SCAN (\w+)", detail)
+		if match and "INDEX" not in detail:
+			table = aliases.get(match.group(1).lower(), match.group(1).lower())
+			if table in GUARDED_TABLES:
+				scanned.add(table)
+	return scanned
+
+
+
+@pytest.fixture(scope="module")
+def explain_cursor(django_db_blocker):
+	"""
+	Fixture building an in-memory SQLite stand-in with the schema, indexes included, of the models.
+
+	Yields:
+		CursorWrapper: A cursor on the stand-in database.
+	"""
+	handler = ConnectionHandler({"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}})
+	connection = handler["default"]
+
+	with django_db_blocker.unblock():
+		with connection.schema_editor() as editor:
+			for model in (AppUsersRoles, AppUsers, Habits, KviTypes, Goals, Progresses, Analytics):
+				editor.create_model(model)
+		connection.connection.create_function("NOW", 0, lambda: datetime.now().isoformat(" "))
+		connection.connection.create_function("CONCAT", -1, lambda *parts: "".join(str(part) for part in parts))
+		connection.connection.create_function("DATE_ADD", 2, lambda date, days: date)
+		connection.connection.create_function("DATE_SUB", 2, lambda date, days: date)
+		connection.connection.create_function("DATEDIFF", 2, lambda date, other_date: 0)
+
+		with connection.cursor() as cursor:
+			yield cursor
+	connection.close()
+
+
+
+def test_repository_statements_are_collected():
+	"""
+	Test that the collector finds the repository SQL, so the plan test can not pass vacuously.
+	"""
+	methods = {method for method, _ in collect_repository_statements()}
+
+	assert "ProgressesRepository.get_last_progress_entry" in methods
+	assert "AnalyticsRepository.calculate_longest_streak" in methods
+	assert "AnalyticsRepository.get_currently_tracked_habits" in methods
+
+
+
+@pytest.mark.parametrize(
+	"method, sql",
+	collect_repository_statements(),
+	ids=[f"{method}-{position}" for position, (method, _) in enumerate(collect_repository_statements())]
+)
+def test_repository_statement_does_not_scan_guarded_tables(explain_cursor, method, sql):
+	"""
+	Test that no repository statement reads habits or progresses with a full table scan.
+
+	Given:
+		- The SQLite stand-in schema with every index declared on the models.
+	When:
+		- EXPLAIN QUERY PLAN is run for a repository SQL string.
+	Then:
+		- habits and progresses are only read through an index, unless the method lists every row on purpose.
+	"""
+	if method in MARIADB_ONLY:
+		pytest.skip(MARIADB_ONLY[method])
+	if method in KEYSET_PAGES:
+		pytest.skip("only a fragment, the complete page queries are explained separately.")
+
+	explain_cursor.execute("EXPLAIN QUERY PLAN " + to_sqlite(sql), [None] * sql.count("%s"))
+	scanned = full_table_scans(sql, explain_cursor.fetchall())
+
+	if method in FULL_LISTINGS:
+		return
+	assert not scanned, f"{method} does a full table scan of {scanned}: {sql}"
+
+
+
+def test_tickable_goals_are_a_range_query_on_the_due_window_index(explain_cursor):
+	"""
+	Test that listing the tickable goals reads the (next_due_at, expires_at) index instead of every goal.
+	"""
+	sql = dict(collect_repository_statements())["GoalRepository.query_tickable_goals"]
+
+	explain_cursor.execute("EXPLAIN QUERY PLAN " + to_sqlite(sql), [None] * sql.count("%s"))
+	plan = [row[-1] for row in explain_cursor.fetchall()]
+
+	assert any("goal_due_window_idx" in detail for detail in plan)
+	assert not any(detail.startswith("SCAN g") and "INDEX" not in detail for detail in plan)
+
+
+
+def executed_page_query(repository_class, method_name, **kwargs):
+	"""Runs a paging repository method on a mocked connection and returns the SQL it executed."""
+	cursor = MagicMock()
+	cursor.__enter__.return_value = cursor
+	cursor.fetchall.return_value = []
+	database = MagicMock()
+	database._connection.cursor.return_value = cursor
+	getattr(repository_class(database, MagicMock()), method_name)(**kwargs)
+	return cursor.execute.call_args.args[0]
+
+
+
+@pytest.mark.parametrize("repository_class, method_name, kwargs", [
+	(HabitRepository, "get_habits_page", {'after': (5000,)}),
+	(HabitRepository, "get_habits_page", {'before': (5000,)}),
+	(ProgressesRepository, "get_progress_history_page", {'after': (datetime(2025, 3, 1), 5000)}),
+	(ProgressesRepository, "get_progress_history_page", {'before': (datetime(2025, 3, 1), 5000)}),
+	(ProgressesRepository, "get_progress_history_page", {'goal_id': 7, 'after': (datetime(2025, 3, 1), 5000)}),
+])
+def test_keyset_pages_seek_instead_of_scanning(explain_cursor, repository_class, method_name, kwargs):
+	"""
+	Test that a page deep into a listing starts with an index seek on its key, not a scan from the first row.
+
+	Given:
+		- The SQL of a page after or before a cursor, of every progress or of one goal.
+	When:
+		- Its plan is explained on the SQLite stand-in.
+	Then:
+		- The guarded table is searched through an index and no sort of the whole table is needed.
+	"""
+	sql = executed_page_query(repository_class, method_name, **kwargs)
+
+	explain_cursor.execute("EXPLAIN QUERY PLAN " + to_sqlite(sql), [None] * sql.count("%s"))
+	plan_rows = explain_cursor.fetchall()
+
+	assert not full_table_scans(sql, plan_rows), f"{method_name} scans: {sql}"
+	assert not any("TEMP B-TREE" in row[-1] for row in plan_rows), f"{method_name} sorts the whole listing: {sql}"
+
+
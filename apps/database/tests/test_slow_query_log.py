@@ -0,0 +1,131 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from apps.database.instrumentation import InstrumentedConnection
+from apps.database.slow_query_log import SlowQueryLog
+from apps.goals.repositories.goal_repository import GoalRepository
+
+
+def mock_cursor(rows=(), description=None):
+	cursor = MagicMock()
+	cursor.__enter__.return_value = cursor
+	cursor.__exit__.return_value = False
+	cursor.description = description
+	cursor.rowcount = len(rows)
+	cursor.fetchone.return_value = rows[0] if rows else None
+	cursor.fetchall.return_value = list(rows)
+	return cursor
+
+
+
+def read_entries(path):
+	with open(path, encoding="utf-8") as log:
+		return [json.loads(line) for line in log]
+
+
+
+@pytest.fixture
+def explain_cursor():
+	"""
+	Fixture returning the cursor EXPLAIN statements run on, answering with one plan row.
+
+	Returns:
+		MagicMock: The mocked cursor.
+	"""
+	return mock_cursor(rows=[(1, 'SIMPLE', 'goals', 'const', 'PRIMARY', 1)], description=(('id',), ('select_type',), ('table',), ('type',), ('key',), ('rows',)))
+
+
+
+def repository_with_slow_query_log(slow_query_log, statement_cursor, explain_cursor):
+	"""Builds a GoalRepository on an instrumented mock connection, which hands out the statement cursor first and the EXPLAIN cursor second."""
+	raw_connection = MagicMock()
+	raw_connection.cursor.side_effect = [statement_cursor, explain_cursor]
+	database = MagicMock()
+	database._connection = InstrumentedConnection(raw_connection, slow_query_log=slow_query_log)
+	return GoalRepository(database=database, habit_repository=MagicMock())
+
+
+
+def test_slow_select_is_logged_with_method_params_and_explain(tmp_path, explain_cursor):
+	"""
+	Test that a statement above the threshold is written with everything needed to act on it.
+
+	Given:
+		- A slow query log with a threshold of 0 ms, so every statement is slow.
+	When:
+		- GoalRepository.validate_a_goal runs its SELECT.
+	Then:
+		- One JSON line holds the SQL, fingerprint, parameters, calling method and the EXPLAIN rows,
+		  and EXPLAIN ran with the statement's parameters after the statement's cursor was closed.
+	"""
+	path = tmp_path / "logs" / "slow_queries.log"
+	statement_cursor = mock_cursor(rows=[(10,)], description=(('goal_id',),))
+	repository = repository_with_slow_query_log(SlowQueryLog(path=str(path), threshold_seconds=0.0), statement_cursor, explain_cursor)
+
+	repository.validate_a_goal(10)
+
+	[entry] = read_entries(path)
+	assert entry['sql'] == "SELECT goal_id FROM goals WHERE goal_id = %s;"
+	assert entry['method'] == "GoalRepository.validate_a_goal"
+	assert entry['params'] == "(10,)"
+	assert entry['explain'] == [{'id': 1, 'select_type': 'SIMPLE', 'table': 'goals', 'type': 'const', 'key': 'PRIMARY', 'rows': 1}]
+	explain_cursor.execute.assert_called_once_with("EXPLAIN SELECT goal_id FROM goals WHERE goal_id = %s;", (10,))
+	statement_cursor.__exit__.assert_called_once()
+
+
+
+def test_fast_statements_are_not_logged(tmp_path, explain_cursor):
+	"""
+	Test that statements below the threshold leave the log empty and run no EXPLAIN.
+	"""
+	path = tmp_path / "slow_queries.log"
+	repository = repository_with_slow_query_log(SlowQueryLog(path=str(path), threshold_seconds=60.0), mock_cursor(rows=[(10,)], description=(('goal_id',),)), explain_cursor)
+
+	repository.validate_a_goal(10)
+
+	assert read_entries(path) == []
+	explain_cursor.execute.assert_not_called()
+
+
+
+def test_slow_batch_write_logs_parameter_sets(tmp_path, explain_cursor):
+	"""
+	Test that a slow executemany logs its amount of parameter sets and the first few, and is
+	explained with the first set.
+
+	Given:
+		- A threshold of 0 ms.
+	When:
+		- update_goals_current_kvi writes 5 goals with one UPDATE ... executemany.
+	Then:
+		- The entry counts 5 parameter sets, lists the first 3 and has an EXPLAIN of the UPDATE
+		  with the first parameter set.
+	"""
+	path = tmp_path / "slow_queries.log"
+	repository = repository_with_slow_query_log(SlowQueryLog(path=str(path), threshold_seconds=0.0), mock_cursor(), explain_cursor)
+
+	repository.update_goals_current_kvi([(goal_id, 1.0) for goal_id in range(1, 6)])
+
+	[entry] = read_entries(path)
+	assert entry['params']['count'] == 5
+	assert entry['params']['first'] == ["(1.0, 1)", "(1.0, 2)", "(1.0, 3)"]
+	explain_cursor.execute.assert_called_once_with("EXPLAIN UPDATE goals SET current_kvi_value = %s WHERE goal_id = %s", (1.0, 1))
+
+
+
+def test_insert_values_is_logged_without_explain(tmp_path, explain_cursor):
+	"""
+	Test that a statement MariaDB can not explain, a plain INSERT ... VALUES, is logged without a plan.
+	"""
+	path = tmp_path / "slow_queries.log"
+	slow_query_log = SlowQueryLog(path=str(path), threshold_seconds=0.0)
+	raw_connection = MagicMock()
+	raw_connection.cursor.side_effect = [mock_cursor(), explain_cursor]
+
+	with InstrumentedConnection(raw_connection, slow_query_log=slow_query_log).cursor() as cursor:
+		cursor.execute("INSERT INTO analytics(habit_id_id) VALUES (%s);", (3,))
+
+	[entry] = read_entries(path)
+	assert 'explain' not in entry and entry['method'] is None
+	explain_cursor.execute.assert_not_called()
@@ -0,0 +1,212 @@
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+from apps.database.database_manager import stream_rows
+from apps.database.instrumentation import InstrumentedConnection, RepositoryMetrics
+from apps.habits.repositories.habit_repository import HabitRepository
+from apps.habits.services.habit_service import HabitService
+from apps.utils.tracing import Tracer
+
+
+
+@pytest.fixture
+def streaming_database():
+	"""
+	Fixture returning a stand-in ConnectionManager whose unbuffered cursor holds 2500 habit rows.
+
+	Returns:
+		tuple: The database, its connection and its cursor mock.
+	"""
+	pending_rows = [(habit_id, f"habit_{habit_id}", "action", 1) for habit_id in range(2500)]
+	cursor = MagicMock()
+	cursor.__enter__.return_value = cursor
+	cursor.description = [("habit_id",), ("habit_name",), ("habit_action",), ("habit_user_id",)]
+
+	def fetchmany(size):
+		batch = pending_rows[:size]
+		del pending_rows[:size]
+		return batch
+
+	cursor.fetchmany.side_effect = fetchmany
+	connection = MagicMock()
+	connection.cursor.return_value = cursor
+	database = MagicMock()
+
+	@contextmanager
+	def scoped_connection():
+		yield connection
+
+	database.connection = scoped_connection
+	return database, connection, cursor
+
+
+
+@pytest.fixture
+def metrics():
+	"""
+	Fixture returning the process wide RepositoryMetrics, emptied before and after the test.
+
+	Returns:
+		RepositoryMetrics: The metrics singleton.
+	"""
+	repository_metrics = RepositoryMetrics()
+	repository_metrics.reset()
+	yield repository_metrics
+	repository_metrics.reset()
+
+
+
+@pytest.fixture
+def tracer():
+	"""
+	Fixture returning the Tracer, emptied and enabled for the test and disabled afterwards.
+
+	Returns:
+		Tracer: The tracer singleton.
+	"""
+	tracer = Tracer()
+	tracer.reset()
+	tracer.enable()
+	yield tracer
+	tracer.disable()
+	tracer.reset()
+
+
+
+def instrument(database, connection):
+	"""Makes the stand-in ConnectionManager hand out its connection with instrumented cursors."""
+	@contextmanager
+	def scoped_connection():
+		yield InstrumentedConnection(connection)
+
+	database.connection = scoped_connection
+
+
+
+def test_stream_rows_fetches_in_batches(streaming_database):
+	"""
+	Test that stream_rows reads an unbuffered result in fetchmany batches, only as far as it is consumed.
+
+	Given:
+		- A result of 2500 rows.
+	When:
+		- The first 10 rows are taken, then the rest.
+	Then:
+		- Taking 10 rows fetched one batch, all rows took three batches and an empty fetch.
+	"""
+	database, connection, cursor = streaming_database
+
+	rows = stream_rows(database, "SELECT habit_id FROM habits;", batch_size=1000)
+	first_rows = [next(rows) for _ in range(10)]
+
+	assert cursor.fetchmany.call_count == 1
+	assert len(first_rows) + len(list(rows)) == 2500
+	assert cursor.fetchmany.call_count == 4
+	connection.cursor.assert_called_once_with(buffered=False)
+
+
+
+def test_stream_rows_drains_the_result_when_closed_early(streaming_database):
+	"""
+	Test that closing the iterator early reads the rest of the result, so the connection can run the next statement.
+	"""
+	database, _, cursor = streaming_database
+
+	rows = stream_rows(database, "SELECT habit_id FROM habits;", batch_size=1000)
+	next(rows)
+	rows.close()
+
+	assert cursor.fetchmany(1000) == []
+
+
+
+def test_stream_rows_yields_columns_first(streaming_database):
+	"""
+	Test that with_columns yields the column names before the rows.
+	"""
+	database, _, _ = streaming_database
+
+	rows = stream_rows(database, "SELECT * FROM habits;", with_columns=True)
+
+	assert next(rows) == ("habit_id", "habit_name", "habit_action", "habit_user_id")
+	assert next(rows) == (0, "habit_0", "action", 1)
+
+
+
+def test_iter_all_habits_streams_without_fetchall(streaming_database):
+	"""
+	Test that the habit listing iterator never loads the whole result with fetchall.
+	"""
+	database, _, cursor = streaming_database
+	repository = HabitRepository(database=database, user_repository=MagicMock())
+
+	habits = repository.iter_all_habits(batch_size=500)
+
+	assert sum(1 for _ in habits) == 2500
+	assert cursor.fetchmany.call_count == 6
+	cursor.fetchall.assert_not_called()
+
+
+
+def test_streamed_listing_is_measured_over_its_iteration(streaming_database, metrics, tracer):
+	"""
+	Test that metrics and spans of a streaming listing cover the query, which only runs once the rows are iterated.
+
+	Given:
+		- Instrumented cursors holding 2500 habit rows, and tracing on.
+	When:
+		- The habit service's iter_all_habits is called, then iterated to its end.
+	Then:
+		- Nothing is recorded before the iteration ends.
+		- The repository method is then recorded once with its 2500 rows, and its SELECT attributed to it.
+		- The service and repository spans contain the span of the SELECT.
+	"""
+	database, connection, _ = streaming_database
+	instrument(database, connection)
+	service = HabitService(repository=HabitRepository(database=database, user_repository=MagicMock()))
+
+	habits = service.iter_all_habits()
+	assert metrics.snapshot()['methods'] == {}
+	assert sum(1 for _ in habits) == 2500
+
+	snapshot = metrics.snapshot()
+	method = snapshot['methods']['HabitRepository.iter_all_habits']
+	assert (method['calls'], method['errors'], method['rows']) == (1, 0, 2500)
+	[statement] = snapshot['statements'].values()
+	assert statement['methods'] == ['HabitRepository.iter_all_habits']
+
+	events = {event['cat']: event for event in tracer.events()}
+	for category in ('service', 'repository'):
+		outer, inner = events[category], events['db']
+		assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+
+
+def test_error_while_streaming_goes_through_the_error_decorator(streaming_database, metrics):
+	"""
+	Test that an error raised while a listing is iterated rolls back and is counted, while an early close is not an error.
+
+	Given:
+		- A cursor that fails on its second fetchmany.
+	When:
+		- One listing is iterated into the failure, another closed after its first row.
+	Then:
+		- The failing listing rolls the transaction back and is recorded as an error.
+		- The closed listing is recorded without an error and without a rollback.
+	"""
+	database, _, cursor = streaming_database
+	repository = HabitRepository(database=database, user_repository=MagicMock())
+
+	habits = repository.iter_all_habits(batch_size=1000)
+	next(habits)
+	habits.close()
+	database.rollback.assert_not_called()
+
+	cursor.fetchmany.side_effect = [[(1, "habit_1", "action", 1)], RuntimeError("connection lost")]
+	with pytest.raises(RuntimeError):
+		list(repository.iter_all_habits(batch_size=1000))
+
+	database.rollback.assert_called_once()
+	method = metrics.snapshot()['methods']['HabitRepository.iter_all_habits']
+	assert (method['calls'], method['errors']) == (2, 1)
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock
+
+from apps.database.database_manager import ConnectionManager, UnitOfWorkError
+
+
+@pytest.fixture
+def connection_manager():
+	"""
+	Fixture instantiating a ConnectionManager whose pool hands out MagicMock connections.
+
+	Returns:
+		ConnectionManager: Manager using a mocked connection factory.
+	"""
+	manager = ConnectionManager(connection_config={}, pool_size=2, checkout_timeout=0.05)
+	manager._pool._connection_factory = MagicMock(side_effect=lambda: MagicMock())
+	return manager
+
+
+
+def test_commit_outside_unit_of_work_is_immediate(connection_manager):
+	"""
+	Test that a repository commit outside a unit of work commits right away.
+	"""
+	connection_manager.commit()
+
+	connection_manager._connection.commit.assert_called_once()
+
+
+
+def test_unit_of_work_commits_once(connection_manager):
+	"""
+	Test that repository commits within a unit of work are deferred to a single commit.
+
+	Given:
+		- A unit of work in which three repository calls commit.
+	When:
+		- The unit of work ends.
+	Then:
+		- The connection is committed exactly once, and checked back into the pool.
+	"""
+	with connection_manager.unit_of_work() as connection:
+		for _ in range(3):
+			connection_manager.commit()
+		connection.commit.assert_not_called()
+
+	connection.commit.assert_called_once()
+	assert connection_manager.pool_stats()['in_use'] == 0
+
+
+
+def test_unit_of_work_rolls_back_on_error(connection_manager):
+	"""
+	Test that an exception within a unit of work rolls the whole transaction back.
+	"""
+	with pytest.raises(ValueError):
+		with connection_manager.unit_of_work() as connection:
+			connection_manager.commit()
+			raise ValueError("tick failed halfway")
+
+	connection.commit.assert_not_called()
+	connection.rollback.assert_called()
+
+
+
+def test_nested_unit_of_work_joins_outer_transaction(connection_manager):
+	"""
+	Test that a nested unit of work reuses the outer connection and does not commit on its own.
+	"""
+	with connection_manager.unit_of_work() as outer_connection:
+		with connection_manager.unit_of_work() as inner_connection:
+			connection_manager.commit()
+		assert inner_connection is outer_connection
+		outer_connection.commit.assert_not_called()
+
+	outer_connection.commit.assert_called_once()
+
+
+
+def test_swallowed_rollback_fails_the_unit_of_work(connection_manager):
+	"""
+	Test that a unit of work is not committed after a statement within it asked for a rollback.
+
+	Given:
+		- A repository call that rolls back and whose error is swallowed by the caller.
+	When:
+		- The unit of work ends normally.
+	Then:
+		- The transaction is rolled back instead of committed and UnitOfWorkError is raised.
+	"""
+	with pytest.raises(UnitOfWorkError):
+		with connection_manager.unit_of_work() as connection:
+			connection_manager.rollback()
+
+	connection.commit.assert_not_called()
+	connection.rollback.assert_called()
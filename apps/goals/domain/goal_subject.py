@@ -1,7 +1,8 @@
 from apps.goals.repositories.goal_repository import GoalRepository
 from apps.goals.services.goal_service import GoalService
 from apps.progresses.services.progress_service import ProgressesService
-from datetime import datetime, timedelta
+from apps.utils.tracing import Tracer, traced
+from datetime import datetime
 
 class GoalSubject:
 	def __init__(self, goal_service: GoalService, progress_service: ProgressesService, goal_data: dict):
@@ -24,36 +25,27 @@ class GoalSubject:
 
 
 	def notify(self):
+		tracer = Tracer()
 		for observer in self._observers:
-			observer.update(progress_data=self._goal_data)
+			with tracer.span(f"{type(observer).__name__}.update", 'observer'):
+				observer.update(progress_data=self._goal_data)
 
 	def is_too_early(self):
-		periodicity = 1.0 if self._goal_data['target_kvi'] == 1.0 else 7.0
-		last_progress = self._goal_data.get('last_occurence')
-		if last_progress is None:
+		next_due_at = self._goal_data.get('next_due_at')
+		if next_due_at is None:
 			return False
-		
-		now = datetime.now()
-		time_delta_difference = timedelta(hours=24) if periodicity == 1.0 else timedelta(weeks=1)
-		time_difference = now - last_progress
-		absolute_time_difference = abs(time_difference.total_seconds())
-		
-		return (absolute_time_difference < time_delta_difference.total_seconds())
+
+		return datetime.now() < next_due_at
 
 	def is_expired(self):
-		periodicity = 1.0 if self._goal_data['target_kvi'] == 1.0 else 7.0
-		last_progress = self._goal_data.get('last_occurence')
-		if last_progress is None:
+		expires_at = self._goal_data.get('expires_at')
+		if expires_at is None:
 			return False
-		
-		now = datetime.now()
-		time_delta_difference = timedelta(hours=48) if periodicity == 1.0 else timedelta(weeks=2)
-		time_difference = now - last_progress
-		absolute_time_difference = abs(time_difference.total_seconds())
-		
-		return (absolute_time_difference > time_delta_difference.total_seconds())
+
+		return datetime.now() > expires_at
 
 
+	@traced('domain')
 	def reset_progress(self):
 		self._goal_data['streak'] = 0
 		self._goal_data['current_kvi'] = 0.0
@@ -62,20 +54,13 @@ class GoalSubject:
 
 
 
+	@traced('domain')
 	def increment_kvi(self, increment):
-		last_progress = self._progress_service.get_last_progress_entry(goal_id=self._goal_data['goal_id'])
-		self._goal_data['last_occurence'] = last_progress[3] if last_progress else None
-
 		target_kvi_value = self._goal_data['target_kvi']
-		new_kvi_value = float(self._goal_data['current_kvi']) + increment
+		new_kvi_value = self._goal_service.increment_current_kvi(goal_id=self._goal_data['goal_id'], increment=increment)
 
-		self._goal_service.update_a_goal(goal_id=self._goal_data['goal_id'], current_kvi_value=new_kvi_value)
 		self._goal_data['current_kvi'] = new_kvi_value
 		self._goal_data[self._goal_data['target_kvi']] = target_kvi_value - new_kvi_value
 
-
-		last_progress = self._progress_service.get_last_progress_entry(goal_id=self._goal_data['goal_id'])
-		self._goal_data['last_occurence'] = last_progress[3] if last_progress else None
-
 		self.notify()
 		print(f"Habit ticked successfully!")
\ No newline at end of file
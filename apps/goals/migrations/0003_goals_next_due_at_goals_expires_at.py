@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import DateTimeField, ExpressionWrapper, Max, OuterRef, Subquery
+
+
+def backfill_due_window(apps, schema_editor):
+    """Derives next_due_at and expires_at of every ticked goal from its latest progress entry."""
+    Goals = apps.get_model('goals', 'Goals')
+    Progresses = apps.get_model('progresses', 'Progresses')
+
+    last_occurence = Subquery(
+        Progresses.objects.filter(goal_id=OuterRef('goal_id'))
+        .order_by()
+        .values('goal_id')
+        .annotate(last_occurence=Max('occurence_date'))
+        .values('last_occurence')
+    )
+
+    daily_goals = Goals.objects.filter(target_kvi_value=1.0)
+    weekly_goals = Goals.objects.exclude(target_kvi_value=1.0)
+    for goals, period in ((daily_goals, timedelta(days=1)), (weekly_goals, timedelta(weeks=1))):
+        goals.update(
+            next_due_at=ExpressionWrapper(last_occurence + period, output_field=DateTimeField()),
+            expires_at=ExpressionWrapper(last_occurence + 2 * period, output_field=DateTimeField()),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0002_remove_goals_kvi_type_id_alter_goals_created_at_and_more'),
+        ('habits', '0003_habit_streak_idx_habit_periodicity_type_idx'),
+        ('progresses', '0008_progresses_progress_goal_streak_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goals',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goals',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='goals',
+            index=models.Index(fields=['next_due_at', 'expires_at'], name='goal_due_window_idx'),
+        ),
+        migrations.RunPython(backfill_due_window, migrations.RunPython.noop),
+    ]
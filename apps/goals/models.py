@@ -20,12 +20,17 @@ class Goals(models.Model):
 	goal_description = models.CharField(max_length=80, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 	deleted_at = models.DateTimeField(blank=True, null=True)
+	next_due_at = models.DateTimeField(blank=True, null=True)
+	expires_at = models.DateTimeField(blank=True, null=True)
 
 	class Meta:
 		db_table = "goals"
 		constraints = [
 			models.UniqueConstraint(fields=['goal_name', 'habit_id'], name="unique_goal_for_habit_id")
 		]
+		indexes = [
+			models.Index(fields=['next_due_at', 'expires_at'], name="goal_due_window_idx")
+		]
 	
 	def save(self, *args, **kwargs):
 		if not self.goal_name.strip():
@@ -1,5 +1,9 @@
+from contextlib import contextmanager
 from apps.users.models import AppUsers
-from apps.database.database_manager import MariadbConnection
+from apps.database.database_manager import MariadbConnection, STREAM_BATCH, identity_map_of, stream_rows
+from apps.database.instrumentation import instrument_repository_call
+from apps.utils.scoped_calls import call_within
+from apps.database.pagination import DEFAULT_PAGE_SIZE, keyset_page, keyset_query
 from apps.users.repositories.user_repository import UserRepository, UserNotFoundError
 from apps.users.services.user_service import UserService
 from apps.habits.repositories.habit_repository import HabitRepository, HabitNotFoundError
@@ -7,6 +11,10 @@ from apps.kvi_types.repositories.kvi_type_repository import KviTypeRepository, K
 
 from mysql.connector.errors import IntegrityError
 
+
+GOAL_ENTITY_GOAL_COLUMNS = ('goal_name', 'habit_id_id', 'target_kvi_value', 'current_kvi_value', 'next_due_at', 'expires_at')
+GOAL_ENTITY_HABIT_COLUMNS = ('habit_name', 'habit_streak')
+
 class GoalNotFoundError(Exception):
 	"""Custom exception raised when a user is not found."""
 	pass
@@ -36,17 +44,21 @@ class GoalAlreadyExistError(GoalRepositoryError):
 
 def handle_goal_repository_errors(f):
 	"""Decorator to clean up and handle errors in goal repository methods."""
-	def exception_wrapper(self, *args, **kwargs):
+	f = instrument_repository_call(f)
+	@contextmanager
+	def handling_errors(self, args, kwargs):
 		try:
-			return f(self, *args, **kwargs)
+			yield
 		except IntegrityError as ierror:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise GoalAlreadyExistError(goal_name=args[0], goal_user_id=args[-1]) from ierror
 		except GoalRepositoryError as herror:
 			raise herror
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise error
+	def exception_wrapper(self, *args, **kwargs):
+		return call_within(handling_errors(self, args, kwargs), f, self, *args, **kwargs)
 	return exception_wrapper
 
 
@@ -72,6 +84,10 @@ class GoalRepository:
 		Raises:
 			GoalNotFoundError: If the goal is not found.
 		"""
+		identity_map = identity_map_of(self._db)
+		if identity_map.get('goals', goal_id) is not None:
+			return goal_id
+
 		with self._db._connection.cursor() as cursor:
 			query = "SELECT goal_id FROM goals WHERE goal_id = %s;"
 			cursor.execute(query, (goal_id,))
@@ -79,6 +95,7 @@ class GoalRepository:
 
 			if not current_value:
 				raise GoalNotFoundError(goal_id)
+			identity_map.merge('goals', current_value[0], {'goal_id': current_value[0]})
 			return current_value[0]
 
 
@@ -104,7 +121,7 @@ class GoalRepository:
 		with self._db._connection.cursor() as cursor:
 			query = "INSERT INTO goals(goal_name, habit_id_id, target_kvi_value, current_kvi_value, goal_description, created_at) VALUES (%s, %s, %s, %s, %s,  NOW());"
 			cursor.execute(query, (goal_name, habit_id, target_kvi_value, current_kvi_value, goal_description, ))
-			self._db._connection.commit()
+			self._db.commit()
 			return {
 				'goal_id': cursor.lastrowid,
 				'goal_name': goal_name,
@@ -132,7 +149,7 @@ class GoalRepository:
 			GoalNotFoundError: If the goal is not found in the database.
 		"""
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT goal_id FROM goals WHERE (goal_name = %s AND habit_id = %s)"
+			query = "SELECT goal_id FROM goals WHERE (goal_name = %s AND habit_id_id = %s)"
 			cursor.execute(query, (goal_name, habit_id))
 			result = cursor.fetchone()
 			if result:
@@ -153,30 +170,126 @@ class GoalRepository:
 			habit_id (int): The habit’s ID linked to the goal.
 
 		Returns:
-			dict: Goal information including name, KVI values, and streak.
+			dict: Goal information including name, KVI values, streak and the
+			next_due_at/expires_at tick window (None if the goal was never ticked).
 
 		Raises:
 			GoalNotFoundError: If the goal does not exist.
 		"""
+		identity_map = identity_map_of(self._db)
+		goal = identity_map.get('goals', goal_id, GOAL_ENTITY_GOAL_COLUMNS)
+		habit = identity_map.get('habits', habit_id, GOAL_ENTITY_HABIT_COLUMNS)
+		if goal is not None and habit is not None and goal['habit_id_id'] == habit_id:
+			return self._goal_entity(goal_id, goal, habit)
+
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT g.goal_id, g.goal_name, g.habit_id_id, h.habit_name, g.target_kvi_value, g.current_kvi_value, h.habit_streak FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id WHERE g.goal_id = %s AND g.habit_id_id = %s;"
+			query = "SELECT g.goal_id, g.goal_name, g.habit_id_id, h.habit_name, g.target_kvi_value, g.current_kvi_value, h.habit_streak, g.next_due_at, g.expires_at FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id WHERE g.goal_id = %s AND g.habit_id_id = %s;"
 			cursor.execute(query, (goal_id, habit_id))
 			result = cursor.fetchone()
 			if result:
-				return {
-					'goal_id': result[0],
-					'goal_name': result[1],
-					'habit_id': result[2],
-					'habit_name': result[3],
-					'target_kvi': result[4],
-					'current_kvi': result[5],
-					'streak': result[6]
-				}
+				goal = {'goal_id': result[0], 'goal_name': result[1], 'habit_id_id': result[2], 'target_kvi_value': result[4], 'current_kvi_value': result[5], 'next_due_at': result[7], 'expires_at': result[8]}
+				habit = {'habit_id': result[2], 'habit_name': result[3], 'habit_streak': result[6]}
+				identity_map.merge('goals', result[0], goal)
+				identity_map.merge('habits', result[2], habit)
+				return self._goal_entity(result[0], goal, habit)
 			else:
 				raise GoalNotFoundError(goal_id)
 
 
 
+	def _goal_entity(self, goal_id, goal, habit):
+		"""Builds the goal entity returned by get_goal_entity_by_id from the goal's and its habit's columns."""
+		return {
+			'goal_id': goal_id,
+			'goal_name': goal['goal_name'],
+			'habit_id': goal['habit_id_id'],
+			'habit_name': habit['habit_name'],
+			'target_kvi': goal['target_kvi_value'],
+			'current_kvi': goal['current_kvi_value'],
+			'streak': habit['habit_streak'],
+			'next_due_at': goal['next_due_at'],
+			'expires_at': goal['expires_at']
+		}
+
+
+
+	@handle_goal_repository_errors
+	def get_goal_entities_by_ids(self, goal_ids):
+		"""
+		Fetches the goal entities of many goals in a single query.
+
+		Args:
+			goal_ids (list of int): IDs of the goals to fetch.
+
+		Returns:
+			dict: Goal information keyed by goal ID, the same fields as get_goal_entity_by_id
+			plus the habit's periodicity type. Goals that do not exist are left out.
+		"""
+		if not goal_ids:
+			return {}
+
+		placeholders = ", ".join(["%s"] * len(goal_ids))
+		with self._db._connection.cursor() as cursor:
+			query = f"SELECT g.goal_id, g.goal_name, g.habit_id_id, h.habit_name, g.target_kvi_value, g.current_kvi_value, h.habit_streak, g.next_due_at, g.expires_at, h.habit_periodicity_type FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id WHERE g.goal_id IN ({placeholders});"
+			cursor.execute(query, tuple(goal_ids))
+			result = cursor.fetchall()
+
+			identity_map = identity_map_of(self._db)
+			for row in result:
+				identity_map.merge('goals', row[0], {'goal_id': row[0], 'goal_name': row[1], 'habit_id_id': row[2], 'target_kvi_value': row[4], 'current_kvi_value': row[5], 'next_due_at': row[7], 'expires_at': row[8]})
+				identity_map.merge('habits', row[2], {'habit_id': row[2], 'habit_name': row[3], 'habit_streak': row[6], 'habit_periodicity_type': row[9]})
+
+			return {
+				row[0]: {
+					'goal_id': row[0],
+					'goal_name': row[1],
+					'habit_id': row[2],
+					'habit_name': row[3],
+					'target_kvi': row[4],
+					'current_kvi': row[5],
+					'streak': row[6],
+					'next_due_at': row[7],
+					'expires_at': row[8],
+					'habit_periodicity_type': row[9]
+				}
+				for row in result
+			}
+
+
+
+	@handle_goal_repository_errors
+	def get_goals_of_user_habits(self, user_habit_pairs):
+		"""
+		Fetches the goals of many habits, named by their user and habit names, in a single query.
+
+		Args:
+			user_habit_pairs (list of tuple): (user_name, habit_name) pairs.
+
+		Returns:
+			dict: (user_name, habit_name) -> list of goal dicts with goal_id, goal_name, habit_id,
+			habit_periodicity_type and target_kvi, oldest goal first. Pairs without goals are left out.
+		"""
+		if not user_habit_pairs:
+			return {}
+
+		placeholders = ", ".join(["(%s, %s)"] * len(user_habit_pairs))
+		with self._db._connection.cursor() as cursor:
+			query = f"SELECT u.user_name, h.habit_name, g.goal_id, g.goal_name, h.habit_id, h.habit_periodicity_type, g.target_kvi_value FROM app_users u JOIN habits h ON h.habit_user_id = u.user_id JOIN goals g ON g.habit_id_id = h.habit_id WHERE (u.user_name, h.habit_name) IN ({placeholders}) ORDER BY g.goal_id;"
+			cursor.execute(query, tuple(value for pair in user_habit_pairs for value in pair))
+
+			goals = {}
+			for user_name, habit_name, goal_id, goal_name, habit_id, habit_periodicity_type, target_kvi_value in cursor.fetchall():
+				goals.setdefault((user_name, habit_name), []).append({
+					'goal_id': goal_id,
+					'goal_name': goal_name,
+					'habit_id': habit_id,
+					'habit_periodicity_type': habit_periodicity_type,
+					'target_kvi': target_kvi_value
+				})
+			return goals
+
+
+
 	def get_goal_entity_by_goal_id(self, goal_id):
 		"""
 		Fetches a goal entity matching the provided goal and habit IDs.
@@ -190,16 +303,31 @@ class GoalRepository:
 		Raises:
 			GoalNotFoundError: If the goal does not exist.
 		"""
+		identity_map = identity_map_of(self._db)
+		goal = identity_map.get('goals', goal_id, ('goal_name', 'target_kvi_value', 'current_kvi_value', 'next_due_at', 'expires_at'))
+		if goal is not None:
+			return {
+				'goal_id': goal_id,
+				'goal_name': goal['goal_name'],
+				'target_kvi': goal['target_kvi_value'],
+				'current_kvi': goal['current_kvi_value'],
+				'next_due_at': goal['next_due_at'],
+				'expires_at': goal['expires_at'],
+			}
+
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT goal_id, goal_name, target_kvi_value, current_kvi_value FROM goals WHERE goal_id = %s;"
+			query = "SELECT goal_id, goal_name, target_kvi_value, current_kvi_value, next_due_at, expires_at FROM goals WHERE goal_id = %s;"
 			cursor.execute(query, (goal_id,))
 			result = cursor.fetchone()
 			if result:
+				identity_map.merge('goals', result[0], {'goal_id': result[0], 'goal_name': result[1], 'target_kvi_value': result[2], 'current_kvi_value': result[3], 'next_due_at': result[4], 'expires_at': result[5]})
 				return {
 					'goal_id': result[0],
 					'goal_name': result[1],
 					'target_kvi': result[2],
 					'current_kvi': result[3],
+					'next_due_at': result[4],
+					'expires_at': result[5],
 				}
 			else:
 				raise GoalNotFoundError(goal_id)
@@ -219,11 +347,17 @@ class GoalRepository:
 		Raises:
 			GoalNotFoundError: If the goal doesn’t exist.
 		"""
+		identity_map = identity_map_of(self._db)
+		goal = identity_map.get('goals', goal_id, ('current_kvi_value',))
+		if goal is not None:
+			return goal['current_kvi_value']
+
 		with self._db._connection.cursor() as cursor:
 			query = "SELECT current_kvi_value FROM goals WHERE goal_id = %s"
 			cursor.execute(query, (goal_id,))
 			result = cursor.fetchone()
 			if result:
+				identity_map.merge('goals', goal_id, {'goal_id': goal_id, 'current_kvi_value': result[0]})
 				return result[0]
 			else:
 				raise GoalNotFoundError(goal_id)
@@ -271,11 +405,13 @@ class GoalRepository:
 		query = "UPDATE goals SET " + set_commands + " WHERE goal_id = %s;"
 		with self._db._connection.cursor() as cursor:
 			cursor.execute(query, updated_values)
-			self._db._connection.commit()
+			self._db.commit()
 
 			if cursor.rowcount == 0:
 				raise GoalNotFoundError(f"Goal with goal_id {goal_id} is not found.")
 
+			updated_columns = {'goal_name': goal_name, 'target_kvi_value': target_kvi_value, 'current_kvi_value': current_kvi_value}
+			identity_map_of(self._db).merge('goals', goal_id, {column: value for column, value in updated_columns.items() if value is not None})
 			return cursor.rowcount
 
 
@@ -296,15 +432,120 @@ class GoalRepository:
 		with self._db._connection.cursor() as cursor:
 			query = f"DELETE FROM goals WHERE goal_id = %s"
 			cursor.execute(query, (goal_id,))
-			self._db._connection.commit()
+			self._db.commit()
 			
 			if cursor.rowcount == 0:
 				raise GoalNotFoundError(f"Goal of with id {goal_id} is not found.")
+			identity_map_of(self._db).discard('goals', goal_id)
 			return cursor.rowcount
 
 
 
 
+	@handle_goal_repository_errors
+	def update_goals_current_kvi(self, kvi_updates):
+		"""
+		Updates the current KVI value of many goals with one batched statement.
+
+		Args:
+			kvi_updates (list of tuple): (goal_id, current_kvi_value) pairs.
+
+		Returns:
+			int: Number of rows affected.
+		"""
+		if not kvi_updates:
+			return 0
+
+		with self._db._connection.cursor() as cursor:
+			query = "UPDATE goals SET current_kvi_value = %s WHERE goal_id = %s"
+			cursor.executemany(query, [(current_kvi_value, goal_id) for goal_id, current_kvi_value in kvi_updates])
+			self._db.commit()
+
+			identity_map = identity_map_of(self._db)
+			for goal_id, current_kvi_value in kvi_updates:
+				if identity_map.get('goals', goal_id) is not None:
+					identity_map.merge('goals', goal_id, {'current_kvi_value': current_kvi_value})
+			return cursor.rowcount
+
+
+
+	@handle_goal_repository_errors
+	def increment_current_kvi(self, goal_id, increment):
+		"""
+		Adds to the current KVI value of a goal in the database, instead of writing back
+		a value computed in Python, so concurrent increments can not overwrite each other.
+		The new value is captured in a session variable by the UPDATE itself, while the
+		row is locked, so reading it back needs no second look at the goals table.
+
+		Args:
+			goal_id (int): ID of the goal to update.
+			increment (float): Amount added to the current KVI value.
+
+		Returns:
+			float: The current KVI value after the increment.
+
+		Raises:
+			GoalNotFoundError: If the goal does not exist.
+		"""
+		with self._db._connection.cursor() as cursor:
+			query = "UPDATE goals SET current_kvi_value = (@new_kvi_value := current_kvi_value + %s) WHERE goal_id = %s;"
+			cursor.execute(query, (increment, goal_id))
+			if cursor.rowcount == 0:
+				raise GoalNotFoundError(f"Goal with goal_id {goal_id} is not found.")
+
+			cursor.execute("SELECT @new_kvi_value;")
+			new_kvi_value = cursor.fetchone()[0]
+			self._db.commit()
+			identity_map_of(self._db).merge('goals', goal_id, {'goal_id': goal_id, 'current_kvi_value': float(new_kvi_value)})
+			return float(new_kvi_value)
+
+
+
+	@handle_goal_repository_errors
+	def update_due_windows(self, ticks):
+		"""
+		Moves the tick window of goals forward after they were ticked. A daily goal
+		(target KVI of 1) is due again one day after the tick and expires after two,
+		other goals after one and two weeks. The window never moves backwards, so
+		backdated progress entries do not shorten it.
+
+		The ticks are collapsed to the latest one per goal and sent as a single
+		UPDATE joined against them, so a batch costs one round trip.
+
+		Args:
+			ticks (iterable of tuple): (goal_id, occurence_date) pairs, occurence_date
+				may be None for a tick that happened now.
+
+		Returns:
+			int: Number of goals whose window moved.
+		"""
+		latest_ticks = {}
+		for goal_id, occurence_date in ticks:
+			#None is a tick of now, later than any occurence_date given
+			if goal_id not in latest_ticks or (latest_ticks[goal_id] is not None and (occurence_date is None or occurence_date > latest_ticks[goal_id])):
+				latest_ticks[goal_id] = occurence_date
+		if not latest_ticks:
+			return 0
+
+		ticked_goals = " UNION ALL ".join(["SELECT %s AS goal_id, CAST(%s AS DATETIME) AS occurence_date"] * len(latest_ticks))
+		with self._db._connection.cursor() as cursor:
+			query = (
+				f"UPDATE goals g JOIN ({ticked_goals}) t ON g.goal_id = t.goal_id SET "
+				"g.next_due_at = DATE_ADD(COALESCE(t.occurence_date, NOW()), INTERVAL IF(g.target_kvi_value = 1, 1, 7) DAY), "
+				"g.expires_at = DATE_ADD(COALESCE(t.occurence_date, NOW()), INTERVAL IF(g.target_kvi_value = 1, 2, 14) DAY) "
+				"WHERE g.next_due_at IS NULL OR g.next_due_at < DATE_ADD(COALESCE(t.occurence_date, NOW()), INTERVAL IF(g.target_kvi_value = 1, 1, 7) DAY);"
+			)
+			cursor.execute(query, tuple(value for tick in latest_ticks.items() for value in tick))
+			self._db.commit()
+
+			#the window is computed by the database, mapped goals forget it and read it again if needed
+			identity_map = identity_map_of(self._db)
+			for goal_id in latest_ticks:
+				identity_map.discard('goals', goal_id, ('next_due_at', 'expires_at'))
+			return cursor.rowcount
+
+
+
 	@handle_goal_repository_errors
 	def query_goals_and_related_habits(self):
 		"""
@@ -326,6 +567,45 @@ class GoalRepository:
 
 
 
+	@handle_goal_repository_errors
+	def iter_goals_and_related_habits(self, batch_size=STREAM_BATCH):
+		"""
+		Streams all goals with their associated habit data, batch_size rows per round trip.
+		Consume or close the iterator before the next query.
+
+		Args:
+			batch_size (int, optional): Rows fetched per round trip. Defaults to STREAM_BATCH.
+
+		Returns:
+			iterator: Tuples of (goal_name, goal_id, habit_id, habit_name).
+		"""
+		query = "SELECT goal_name, goal_id, habit_id_id, habit_name from goals INNER JOIN habits ON goals.habit_id_id = habits.habit_id;"
+		return stream_rows(self._db, query, batch_size=batch_size)
+
+
+
+	@handle_goal_repository_errors
+	def get_goals_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of goals with their habit ordered by goal_id, with keyset pagination,
+		so every page is an index seek however deep it lies.
+
+		Args:
+			page_size (int, optional): Goals per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): (goal_id,) of the last goal shown, for the next page.
+			before (tuple, optional): (goal_id,) of the first goal shown, for the previous page.
+
+		Returns:
+			dict: 'rows' of (goal_name, goal_id, habit_id, habit_name) tuples,
+			'next_cursor' and 'previous_cursor', see keyset_page.
+		"""
+		query, params = keyset_query("SELECT goals.goal_name, goals.goal_id, goals.habit_id_id, habits.habit_name FROM goals INNER JOIN habits ON goals.habit_id_id = habits.habit_id", ("goals.goal_id",), page_size=page_size, after=after, before=before)
+		with self._db._connection.cursor() as cursor:
+			cursor.execute(query, params)
+			return keyset_page(cursor.fetchall(), (1,), page_size=page_size, after=after, before=before)
+
+
+
 	@handle_goal_repository_errors
 	def query_goals_of_a_habit(self, habit_id):
 		"""
@@ -338,7 +618,7 @@ class GoalRepository:
 			list: A list of goals (and habit details) for the given habit.
 		"""
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT goal_name, goal_id, habit_id_id, habit_name, habit_periodicity_value from goals INNER JOIN habits ON %s = goals.habit_id_id;"
+			query = "SELECT goal_name, goal_id, habit_id_id, habit_name, habit_periodicity_value from goals INNER JOIN habits ON habits.habit_id = goals.habit_id_id WHERE goals.habit_id_id = %s;"
 			cursor.execute(query, (habit_id, ))
 
 			result = cursor.fetchall()
@@ -393,6 +673,30 @@ class GoalRepository:
 
 
 
+	@handle_goal_repository_errors
+	def query_tickable_goals(self, now):
+		"""
+		Retrieves the goals that can be ticked at the given moment: goals that were never
+		ticked and goals whose tick window is open. This is a range query on the
+		(next_due_at, expires_at) index, so it does not read every goal or any progress.
+
+		Args:
+			now (datetime): The moment to check the tick windows against.
+
+		Returns:
+			list of dict: Each item containing goal_id, habit_id, target_kvi_value,
+			current_kvi_value, goal_name, occurence_date (None if never ticked),
+			next_due_at and expires_at, or an empty list.
+		"""
+		with self._db._connection.cursor() as cursor:
+			query = "SELECT g.goal_id, g.habit_id_id, g.target_kvi_value, g.current_kvi_value, g.goal_name, DATE_SUB(g.next_due_at, INTERVAL IF(g.target_kvi_value = 1, 1, 7) DAY), g.next_due_at, g.expires_at FROM goals g WHERE g.next_due_at IS NULL OR (g.next_due_at <= %s AND g.expires_at >= %s);"
+			cursor.execute(query, (now, now))
+			result = cursor.fetchall()
+
+			return [{"goal_id": row[0], "habit_id": row[1], "target_kvi_value": row[2], "current_kvi_value": row[3], "goal_name": row[4], "occurence_date": row[5], "next_due_at": row[6], "expires_at": row[7]} for row in result]
+
+
+
 	@handle_goal_repository_errors
 	def get_last_progress_entry_associated_with_goal_id(self, goal_id):
 		"""
@@ -1,15 +1,22 @@
+from contextlib import contextmanager
 from apps.goals.repositories.goal_repository import GoalNotFoundError, GoalRepository, GoalAlreadyExistError, GoalRepositoryError
+from apps.database.pagination import DEFAULT_PAGE_SIZE
 from apps.habits.services.habit_service import HabitNotFoundError, HabitService
 from apps.kvi_types.services.kvi_type_service import KviTypesNotFoundError, KviTypeService
+from apps.utils.scoped_calls import call_within
+from apps.utils.tracing import traced
 from mysql.connector.errors import IntegrityError
+from datetime import datetime
 import logging
 
 
 def handle_log_service_exceptions(f):
 	"""Decorator to clean up and handle errors in goal services methods."""
-	def exception_wrapper(*args, **kwargs):
+	f = traced('service')(f)
+	@contextmanager
+	def handling_errors():
 		try:
-			return f(*args, **kwargs)
+			yield
 		except (GoalAlreadyExistError, GoalRepositoryError, GoalNotFoundError) as specific_error:
 			logging.error(f"Service error in {f.__name__}: {specific_error}")
 			raise specific_error
@@ -22,6 +29,8 @@ def handle_log_service_exceptions(f):
 		except Exception as error:
 			logging.error(f"Unexpected error in {f.__name__}: {error}")
 			raise error
+	def exception_wrapper(*args, **kwargs):
+		return call_within(handling_errors(), f, *args, **kwargs)
 	return exception_wrapper
 
 
@@ -127,6 +136,38 @@ class GoalService:
 
 
 
+	@handle_log_service_exceptions
+	def get_goal_entities_by_ids(self, goal_ids):
+		"""
+		Retrieves the goal entities of many goals at once.
+
+		Args:
+			goal_ids (list of int): IDs of the goals.
+
+		Returns:
+			dict: Goal entities keyed by goal ID, missing goals are left out.
+		"""
+		goal_entities = self._repository.get_goal_entities_by_ids(goal_ids=list(goal_ids))
+		return goal_entities
+
+
+
+	@handle_log_service_exceptions
+	def get_goals_of_user_habits(self, user_habit_pairs):
+		"""
+		Retrieves the goals of many habits, named by their user and habit names, at once.
+
+		Args:
+			user_habit_pairs (iterable of tuple): (user_name, habit_name) pairs.
+
+		Returns:
+			dict: (user_name, habit_name) -> list of goal dicts, oldest goal first.
+		"""
+		goals = self._repository.get_goals_of_user_habits(user_habit_pairs=list(user_habit_pairs))
+		return goals
+
+
+
 	def get_goal_entity_by_goal_id(self, goal_id):
 		"""
 		Retrieves comprehensive goal data (including streak and names) purely by goal id.
@@ -201,7 +242,36 @@ class GoalService:
 		return inner_joined_goals_and_related_habits
 
 
-	
+
+	@handle_log_service_exceptions
+	def iter_goals_and_related_habits(self):
+		"""
+		Streams goals joined with related habit data instead of loading them at once.
+
+		Returns:
+			iterator: Tuples containing goal and habit information.
+		"""
+		return self._repository.iter_goals_and_related_habits()
+
+
+
+	@handle_log_service_exceptions
+	def get_goals_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of goals with their habit, ordered by goal ID.
+
+		Args:
+			page_size (int, optional): Goals per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._repository.get_goals_page(page_size=page_size, after=after, before=before)
+
+
+
 	@handle_log_service_exceptions
 	def update_a_goal(self, goal_id, goal_name=None, target_kvi_value=None, current_kvi_value=None):
 		"""
@@ -225,6 +295,69 @@ class GoalService:
 
 
 
+	@handle_log_service_exceptions
+	def update_goals_current_kvi(self, kvi_updates):
+		"""
+		Updates the current KVI value of many goals at once.
+
+		Args:
+			kvi_updates (list of tuple): (goal_id, current_kvi_value) pairs.
+
+		Returns:
+			int: Number of rows affected.
+
+		Raises:
+			ValueError: If a KVI value is negative.
+		"""
+		for goal_id, current_kvi_value in kvi_updates:
+			if current_kvi_value < 0:
+				raise ValueError(f"Invalid current KVI value for goal {goal_id}. It must be a non-negative number.")
+
+		updated_rows = self._repository.update_goals_current_kvi(kvi_updates=kvi_updates)
+		return updated_rows
+
+
+
+	@handle_log_service_exceptions
+	def increment_current_kvi(self, goal_id, increment):
+		"""
+		Atomically increments the current KVI value of a goal.
+
+		Args:
+			goal_id (int): ID of the goal to update.
+			increment (float): Positive amount to add.
+
+		Returns:
+			float: The new current KVI value.
+
+		Raises:
+			ValueError: If the increment is not a positive number.
+			GoalNotFoundError: If no matching goal is found.
+		"""
+		if not isinstance(increment, (int, float)) or increment <= 0:
+			raise ValueError("Invalid KVI increment. It must be a positive number.")
+
+		new_kvi_value = self._repository.increment_current_kvi(goal_id=goal_id, increment=increment)
+		return new_kvi_value
+
+
+
+	@handle_log_service_exceptions
+	def update_due_windows(self, ticks):
+		"""
+		Moves the next_due_at/expires_at window of ticked goals forward.
+
+		Args:
+			ticks (list of tuple): (goal_id, occurence_date) pairs, occurence_date None meaning now.
+
+		Returns:
+			int: Number of goals whose window moved.
+		"""
+		updated_rows = self._repository.update_due_windows(ticks=ticks)
+		return updated_rows
+
+
+
 	@handle_log_service_exceptions
 	def query_goals_of_a_habit(self, habit_id):
 		"""
@@ -270,6 +403,22 @@ class GoalService:
 
 
 
+	@handle_log_service_exceptions
+	def query_tickable_goals(self, now=None):
+		"""
+		Retrieves the goals that can be ticked now, never ticked goals included.
+
+		Args:
+			now (datetime, optional): The moment to check against. Defaults to the current time.
+
+		Returns:
+			list of dict: Each item representing goal data with its tick window.
+		"""
+		tickable_goals = self._repository.query_tickable_goals(now=now or datetime.now())
+		return tickable_goals
+
+
+
 	@handle_log_service_exceptions
 	def get_last_progress_entry_associated_with_goal_id(self, goal_id):
 		"""
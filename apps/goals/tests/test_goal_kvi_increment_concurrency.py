@@ -0,0 +1,79 @@
+import pytest
+import threading
+from django.db import connection
+
+from apps.database.database_manager import ConnectionManager
+from apps.goals.models import Goals
+from apps.goals.repositories.goal_repository import GoalRepository
+
+
+THREADS = 8
+INCREMENTS_PER_THREAD = 25
+
+pytestmark = [
+	pytest.mark.django_db(transaction=True),
+	pytest.mark.skipif(connection.vendor != "mysql", reason="The stress test needs the MariaDB server, the atomic increment uses MariaDB session variables."),
+]
+
+
+
+@pytest.fixture
+def pooled_database():
+	"""
+	Fixture building a connection pool on the test database, one connection per worker thread.
+
+	Yields:
+		ConnectionManager: The pooled connection manager.
+	"""
+	settings = connection.settings_dict
+	manager = ConnectionManager(
+		connection_config={
+			'host': settings['HOST'],
+			'user': settings['USER'],
+			'password': settings['PASSWORD'],
+			'database': settings['NAME'],
+			'port': settings['PORT'],
+		},
+		pool_size=THREADS,
+	)
+	yield manager
+	manager.close()
+
+
+
+def test_concurrent_increments_are_not_lost(setup_habit, pooled_database):
+	"""
+	Test that concurrent KVI increments on the same goal never overwrite each other.
+
+	Given:
+		- One goal and THREADS workers, each on its own pooled connection.
+	When:
+		- Every worker increments the goal INCREMENTS_PER_THREAD times, each in its own unit of work.
+	Then:
+		- The final value counts every increment and every increment saw a distinct new value.
+	"""
+	goal = Goals.objects.create(goal_name="stress goal", habit_id=setup_habit, target_kvi_value=7.0, current_kvi_value=0.0)
+	goal_repository = GoalRepository(database=pooled_database, habit_repository=None)
+	start = threading.Barrier(THREADS)
+	observed_values = []
+	errors = []
+
+	def worker():
+		try:
+			start.wait()
+			for _ in range(INCREMENTS_PER_THREAD):
+				with pooled_database.unit_of_work():
+					observed_values.append(goal_repository.increment_current_kvi(goal_id=goal.goal_id, increment=1.0))
+		except Exception as error:
+			errors.append(error)
+
+	workers = [threading.Thread(target=worker) for _ in range(THREADS)]
+	for thread in workers:
+		thread.start()
+	for thread in workers:
+		thread.join()
+
+	assert not errors
+	goal.refresh_from_db()
+	assert goal.current_kvi_value == THREADS * INCREMENTS_PER_THREAD
+	assert sorted(observed_values) == [float(value) for value in range(1, THREADS * INCREMENTS_PER_THREAD + 1)]
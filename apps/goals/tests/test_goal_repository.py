@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from apps.goals.repositories.goal_repository import GoalRepository
+
+
+@pytest.fixture
+def mock_cursor():
+	"""
+	Fixture returning a MagicMock cursor usable as a context manager.
+
+	Returns:
+		MagicMock: The mocked cursor.
+	"""
+	cursor = MagicMock()
+	cursor.__enter__.return_value = cursor
+	return cursor
+
+
+
+@pytest.fixture
+def goal_repository(mock_cursor):
+	"""
+	Fixture instantiating GoalRepository on a mocked database connection.
+
+	Returns:
+		GoalRepository: Repository whose connection hands out mock_cursor.
+	"""
+	database = MagicMock()
+	database._connection.cursor.return_value = mock_cursor
+	return GoalRepository(database=database, habit_repository=MagicMock())
+
+
+
+def test_increment_current_kvi_updates_in_sql_and_returns_new_value(goal_repository, mock_cursor):
+	"""
+	Test that the increment is applied by the UPDATE itself and the new value is read back from the session.
+
+	Given:
+		- The UPDATE matches the goal and the session variable holds the new value.
+	When:
+		- increment_current_kvi is called.
+	Then:
+		- The increment is passed as a parameter of a relative UPDATE and the new value is returned.
+	"""
+	mock_cursor.rowcount = 1
+	mock_cursor.fetchone.return_value = (8.0,)
+
+	new_kvi_value = goal_repository.increment_current_kvi(goal_id=3, increment=1.0)
+
+	update_query, update_params = mock_cursor.execute.call_args_list[0].args
+	assert "current_kvi_value + %s" in update_query
+	assert update_params == (1.0, 3)
+	assert new_kvi_value == 8.0
+
+
+
+def test_update_due_windows_sends_the_latest_tick_per_goal_in_one_statement(goal_repository, mock_cursor):
+	"""
+	Test that a batch of ticks moves the windows with one UPDATE, joined against the latest tick of every goal.
+
+	Given:
+		- Three ticks of goal 3, one of them a tick of now, and two of goal 4.
+	When:
+		- update_due_windows is called.
+	Then:
+		- A single statement is executed, with one (goal_id, occurence_date) row per goal.
+		- The tick of now wins for goal 3 and the later date for goal 4.
+	"""
+	mock_cursor.rowcount = 2
+
+	updated_rows = goal_repository.update_due_windows(ticks=[
+		(3, datetime(2025, 3, 3)),
+		(4, datetime(2025, 3, 5)),
+		(3, None),
+		(4, datetime(2025, 3, 4)),
+		(3, datetime(2025, 3, 9)),
+	])
+
+	assert mock_cursor.execute.call_count == 1
+	mock_cursor.executemany.assert_not_called()
+	query, params = mock_cursor.execute.call_args.args
+	assert query.count("UNION ALL") == 1
+	assert params == (3, None, 4, datetime(2025, 3, 5))
+	assert updated_rows == 2
+
+
+
+def test_update_due_windows_without_ticks(goal_repository, mock_cursor):
+	"""
+	Test that no statement is sent when there is nothing to move.
+	"""
+	assert goal_repository.update_due_windows(ticks=iter([])) == 0
+	mock_cursor.execute.assert_not_called()
@@ -144,4 +144,25 @@ def test_create_goal_calls_validate_and_repository(create_mock_goal_service):
 	create_mock_goal_service.create_a_goal("G1", 7, 2.0, 0.5, "desc")
 
 	create_mock_goal_service._habit_service.validate_a_habit.assert_called_once_with(7)
-	create_mock_goal_service._repository.create_a_goal.assert_called_once_with("G1", 7, 2.0, 0.5, "desc")
\ No newline at end of file
+	create_mock_goal_service._repository.create_a_goal.assert_called_once_with("G1", 7, 2.0, 0.5, "desc")
+
+
+def test_increment_current_kvi_delegates_to_atomic_repository_update(create_mock_goal_service):
+	"""
+	Test that increment_current_kvi hands the increment to the repository instead of writing an absolute value.
+
+	Given:
+		- The repository increments the goal to 5.0.
+	When:
+		- increment_current_kvi is called, once with a valid and once with a negative increment.
+	Then:
+		- The new value is returned, update_goal_field is never used and the negative increment is rejected.
+	"""
+	create_mock_goal_service._repository.increment_current_kvi.return_value = 5.0
+
+	assert create_mock_goal_service.increment_current_kvi(goal_id=1, increment=1.0) == 5.0
+	create_mock_goal_service._repository.increment_current_kvi.assert_called_once_with(goal_id=1, increment=1.0)
+	create_mock_goal_service._repository.update_goal_field.assert_not_called()
+
+	with pytest.raises(ValueError):
+		create_mock_goal_service.increment_current_kvi(goal_id=1, increment=-1.0)
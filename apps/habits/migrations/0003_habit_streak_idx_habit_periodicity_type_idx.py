@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0002_alter_habits_habit_name_habits_unique_habit_per_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habits',
+            index=models.Index(fields=['habit_streak'], name='habit_streak_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habits',
+            index=models.Index(fields=['habit_periodicity_type'], name='habit_periodicity_type_idx'),
+        ),
+    ]
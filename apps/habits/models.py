@@ -30,6 +30,10 @@ class Habits(models.Model):
 		constraints = [
 			UniqueConstraint(fields=["habit_name", "habit_user"], name="unique_habit_per_user")
 		]
+		indexes = [
+			models.Index(fields=["habit_streak"], name="habit_streak_idx"),
+			models.Index(fields=["habit_periodicity_type"], name="habit_periodicity_type_idx")
+		]
 
 	def save(self, *args, **kwargs):
 		if not self.habit_name.strip():
@@ -1,5 +1,9 @@
+from contextlib import contextmanager
 from apps.users.models import AppUsers
-from apps.database.database_manager import MariadbConnection
+from apps.database.database_manager import MariadbConnection, STREAM_BATCH, identity_map_of, stream_rows
+from apps.database.instrumentation import instrument_repository_call
+from apps.utils.scoped_calls import call_within
+from apps.database.pagination import DEFAULT_PAGE_SIZE, keyset_page, keyset_query
 from apps.users.repositories.user_repository import UserRepository, UserNotFoundError
 from apps.users.services.user_service import UserService
 from mysql.connector.errors import IntegrityError
@@ -36,19 +40,23 @@ class HabitPeriodicityTypeError(HabitRepositoryError):
 
 def handle_habit_repository_errors(f):
 	"""Decorator to clean up and handle errors in habit repository methods."""
-	def exception_wrapper(self, *args, **kwargs):
+	f = instrument_repository_call(f)
+	@contextmanager
+	def handling_errors(self, args, kwargs):
 		try:
-			return f(self, *args, **kwargs)
+			yield
 		except IntegrityError as ierror:
-			self._db._connection.rollback()
+			self._db.rollback()
 			name = kwargs.get("habit_name", args[0] if args else "<unknown>")
 			user_id = kwargs.get("habit_user_id", args[-1] if args else "<unknown>")
 			raise HabitAlreadyExistError(name, user_id) from ierror
 		except HabitRepositoryError as herror:
 			raise herror
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise error
+	def exception_wrapper(self, *args, **kwargs):
+		return call_within(handling_errors(self, args, kwargs), f, self, *args, **kwargs)
 	return exception_wrapper
 
 
@@ -74,6 +82,10 @@ class HabitRepository:
 		Raises:
 			HabitNotFoundError: If the habit is not found.
 		"""
+		identity_map = identity_map_of(self._db)
+		if identity_map.get('habits', habit_id) is not None:
+			return habit_id
+
 		with self._db._connection.cursor() as cursor:
 			query = "SELECT habit_id FROM habits WHERE habit_id = %s"  
 			cursor.execute(query, (habit_id,))
@@ -81,6 +93,7 @@ class HabitRepository:
 			 
 			if not result:
 				raise HabitNotFoundError(habit_id)
+			identity_map.merge('habits', result[0], {'habit_id': result[0]})
 			return result[0]
 
 
@@ -122,7 +135,7 @@ class HabitRepository:
 
 			query = "INSERT INTO habits(habit_name, habit_action, habit_streak, habit_periodicity_type, habit_periodicity_value, habit_user_id, created_at) VALUES (%s, %s, %s, %s, %s, %s, NOW());"
 			cursor.execute(query, (habit_name, habit_action, habit_streak, habit_periodicity_type, habit_periodicity_value, habit_user_id))
-			self._db._connection.commit()
+			self._db.commit()
 			return {
 				'habit_id': cursor.lastrowid,
 				'habit_action': habit_action,
@@ -159,26 +172,59 @@ class HabitRepository:
 			raise ValueError(f"Invalid habit field to update.")
 		
 	
-		with self._db._connection.cursor() as cursor:
-			check_query = "SELECT {} FROM habits WHERE habit_id = %s".format(habit_field_name)
-			cursor.execute(check_query, (habit_id,))
-			current_value = cursor.fetchone()
-
-			if not current_value:
-				raise HabitNotFoundError(f"Habit of with id of: {habit_id} is not found.")
-			if current_value[0] == habit_field_value:
-				return 0
+		identity_map = identity_map_of(self._db)
+		habit = identity_map.get('habits', habit_id, (habit_field_name,))
+		if habit is not None:
+			current_value = (habit[habit_field_name],)
+		else:
+			with self._db._connection.cursor() as cursor:
+				check_query = "SELECT {} FROM habits WHERE habit_id = %s".format(habit_field_name)
+				cursor.execute(check_query, (habit_id,))
+				current_value = cursor.fetchone()
+
+		if not current_value:
+			raise HabitNotFoundError(f"Habit of with id of: {habit_id} is not found.")
+		if current_value[0] == habit_field_value:
+			return 0
 		
 
 		with self._db._connection.cursor() as cursor:
 			query = "UPDATE habits SET {} = %s WHERE habit_id = %s".format(habit_field_name)
 			cursor.execute(query, (habit_field_value, habit_id,))
-			self._db._connection.commit()
+			self._db.commit()
+			identity_map.merge('habits', habit_id, {'habit_id': habit_id, habit_field_name: habit_field_value})
 			return cursor.rowcount
 
 
 
 
+	@handle_habit_repository_errors
+	def update_habit_streaks(self, streak_updates):
+		"""
+		Updates the streak of many habits with one batched statement.
+
+		Args:
+			streak_updates (list of tuple): (habit_id, habit_streak) pairs.
+
+		Returns:
+			int: Number of rows affected.
+		"""
+		if not streak_updates:
+			return 0
+
+		with self._db._connection.cursor() as cursor:
+			query = "UPDATE habits SET habit_streak = %s WHERE habit_id = %s"
+			cursor.executemany(query, [(habit_streak, habit_id) for habit_id, habit_streak in streak_updates])
+			self._db.commit()
+
+			identity_map = identity_map_of(self._db)
+			for habit_id, habit_streak in streak_updates:
+				if identity_map.get('habits', habit_id) is not None:
+					identity_map.merge('habits', habit_id, {'habit_streak': habit_streak})
+			return cursor.rowcount
+
+
+
 	@handle_habit_repository_errors
 	def get_periodicity_type(self, habit_id):
 		"""
@@ -193,12 +239,18 @@ class HabitRepository:
 		Raises:
 			HabitPeriodicityTypeError: If the periodicity type is not found.
 		"""
+		identity_map = identity_map_of(self._db)
+		habit = identity_map.get('habits', habit_id, ('habit_periodicity_type',))
+		if habit is not None:
+			return (habit['habit_periodicity_type'],)
+
 		with self._db._connection.cursor() as cursor:
 			query =  "SELECT habit_periodicity_type FROM habits WHERE habit_id = %s"
 			cursor.execute(query, (habit_id,))
 
 			habit_periodicity_type = cursor.fetchone()
 			if habit_periodicity_type:
+				identity_map.merge('habits', habit_id, {'habit_id': habit_id, 'habit_periodicity_type': habit_periodicity_type[0]})
 				return habit_periodicity_type
 			else:
 				raise HabitPeriodicityTypeError(habit_id=habit_id)
@@ -247,8 +299,7 @@ class HabitRepository:
 		Raises:
 			HabitNotFoundError: If the habit does not exist.
 		"""
-		self._db._connection.autocommit = False
-		try:
+		with self._db.unit_of_work():
 			with self._db._connection.cursor() as cursor:
 				prorgresses_query = "DELETE FROM progresses WHERE goal_id_id = %s"
 				cursor.execute(prorgresses_query, (goal_id,))
@@ -262,11 +313,11 @@ class HabitRepository:
 				if cursor.rowcount == 0:
 					raise HabitNotFoundError(habit_id)
 
-				self._db._connection.commit()
-				return cursor.rowcount
+				identity_map = identity_map_of(self._db)
+				identity_map.discard('habits', habit_id)
+				identity_map.discard_where('goals', 'habit_id_id', habit_id)
 
-		finally:
-			self._db._connection.autocommit = True
+				return cursor.rowcount
 
 
 
@@ -284,9 +335,8 @@ class HabitRepository:
 		Raises:
 			HabitNotFoundError: If the habit does not exist.
 		"""
-		with self._db._connection.cursor() as cursor:
-			self._db._connection.autocommit = False
-			try:
+		with self._db.unit_of_work():
+			with self._db._connection.cursor() as cursor:
 				set_null_query = f"UPDATE progresses SET goal_id_id = NULL WHERE goal_id_id = %s;"
 				cursor.execute(set_null_query, (goal_id, ))
 
@@ -299,14 +349,11 @@ class HabitRepository:
 				if cursor.rowcount == 0:
 					raise HabitNotFoundError(habit_id)
 
-				self._db._connection.commit()
-				return cursor.rowcount
+				identity_map = identity_map_of(self._db)
+				identity_map.discard('habits', habit_id)
+				identity_map.discard_where('goals', 'habit_id_id', habit_id)
 
-			except Exception as err:
-				self._db._connection.rollback()
-				raise err
-			finally:
-				self._db._connection.autocommit = True
+				return cursor.rowcount
 
 
 
@@ -331,6 +378,45 @@ class HabitRepository:
 
 
 
+	@handle_habit_repository_errors
+	def iter_all_habits(self, batch_size=STREAM_BATCH):
+		"""
+		Streams all habit records, batch_size rows per round trip, so listing any amount of
+		habits needs constant memory. Consume or close the iterator before the next query.
+
+		Args:
+			batch_size (int, optional): Rows fetched per round trip. Defaults to STREAM_BATCH.
+
+		Returns:
+			iterator: Tuples of (habit_id, habit_name, habit_action, habit_user_id).
+		"""
+		query = "SELECT habit_id, habit_name, habit_action, habit_user_id FROM habits;"
+		return stream_rows(self._db, query, batch_size=batch_size)
+
+
+
+	@handle_habit_repository_errors
+	def get_habits_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of habits ordered by habit_id, with keyset pagination,
+		so every page is an index seek however deep it lies.
+
+		Args:
+			page_size (int, optional): Habits per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): (habit_id,) of the last habit shown, for the next page.
+			before (tuple, optional): (habit_id,) of the first habit shown, for the previous page.
+
+		Returns:
+			dict: 'rows' of (habit_id, habit_name, habit_action, habit_user_id) tuples,
+			'next_cursor' and 'previous_cursor', see keyset_page.
+		"""
+		query, params = keyset_query("SELECT habit_id, habit_name, habit_action, habit_user_id FROM habits", ("habit_id",), page_size=page_size, after=after, before=before)
+		with self._db._connection.cursor() as cursor:
+			cursor.execute(query, params)
+			return keyset_page(cursor.fetchall(), (0,), page_size=page_size, after=after, before=before)
+
+
+
 	@handle_habit_repository_errors
 	def get_current_streak(self, habit_id):
 		"""
@@ -345,6 +431,11 @@ class HabitRepository:
 		Raises:
 			HabitNotFoundError: If the habit is not found.
 		"""
+		identity_map = identity_map_of(self._db)
+		habit = identity_map.get('habits', habit_id, ('habit_streak',))
+		if habit is not None:
+			return (habit['habit_streak'],)
+
 		with self._db._connection.cursor() as cursor:
 			query = "SELECT habit_streak FROM habits WHERE habit_id = %s;"
 			cursor.execute(query, (habit_id,))
@@ -353,6 +444,7 @@ class HabitRepository:
 			if not streak:
 				raise HabitNotFoundError(habit_id)
 
+			identity_map.merge('habits', habit_id, {'habit_id': habit_id, 'habit_streak': streak[0][0]})
 			return streak[0]
 
 
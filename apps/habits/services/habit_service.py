@@ -1,17 +1,25 @@
+from contextlib import contextmanager
 from apps.habits.repositories.habit_repository import HabitRepository, HabitNotFoundError, HabitRepositoryError, HabitAlreadyExistError
+from apps.database.pagination import DEFAULT_PAGE_SIZE
 from mysql.connector.errors import IntegrityError
 from apps.users.repositories.user_repository import UserNotFoundError
+from apps.utils.scoped_calls import call_within
+from apps.utils.tracing import traced
 import logging
 
 
 
 def handle_log_service_exceptions(f):
-	def exception_wrapper(*args, **kwargs):
+	f = traced('service')(f)
+	@contextmanager
+	def handling_errors():
 		try:
-			return f(*args, **kwargs)
+			yield
 		except Exception as error:
 			logging.error(f"Service error in {f.__name__}: {error}")
 			raise error
+	def exception_wrapper(*args, **kwargs):
+		return call_within(handling_errors(), f, *args, **kwargs)
 	return exception_wrapper
 
 
@@ -143,6 +151,29 @@ class HabitService:
 
 
 
+	@handle_log_service_exceptions
+	def update_habit_streaks(self, streak_updates):
+		"""
+		Updates the streak count of many habits at once. A streak of 0 resets the habit.
+
+		Args:
+			streak_updates (list of tuple): (habit_id, habit_streak) pairs.
+
+		Returns:
+			int: Number of rows updated.
+
+		Raises:
+			ValueError: If a streak is not a non-negative integer.
+		"""
+		for habit_id, habit_streak in streak_updates:
+			if not isinstance(habit_streak, int) or habit_streak < 0:
+				raise ValueError(f"Invalid streak value for habit {habit_id}. It must be a non-negative integer.")
+
+		updated_habit_rows = self._repository.update_habit_streaks(streak_updates=streak_updates)
+		return updated_habit_rows
+
+
+
 	@handle_log_service_exceptions
 	def update_habit_periodicity_type(self, user_name, habit_name, updated_type_value):
 		"""
@@ -345,6 +376,35 @@ class HabitService:
 
 
 
+	@handle_log_service_exceptions
+	def iter_all_habits(self):
+		"""
+		Streams all habits from the database instead of loading them at once.
+
+		Returns:
+			iterator: Tuples describing each habit.
+		"""
+		return self._repository.iter_all_habits()
+
+
+
+	@handle_log_service_exceptions
+	def get_habits_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of habits, ordered by habit ID.
+
+		Args:
+			page_size (int, optional): Habits per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._repository.get_habits_page(page_size=page_size, after=after, before=before)
+
+
+
 	@handle_log_service_exceptions
 	def get_goal_of_habit(self, habit_id):
 		"""
@@ -0,0 +1,136 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from apps.core.orchestrators.habit_orchestrator import HabitOrchestrator
+from apps.progresses.repositories.progress_repository import ProgressPeriodAlreadyTickedError
+
+
+def goal_entity(goal_id, habit_id, periodicity_type="daily", streak=3, current_kvi=3.0, last_occurence=None):
+	target_kvi = 1.0 if periodicity_type == "daily" else 7.0
+	period = timedelta(days=1) if periodicity_type == "daily" else timedelta(weeks=1)
+	return {
+		'goal_id': goal_id,
+		'goal_name': f"goal {goal_id}",
+		'habit_id': habit_id,
+		'habit_name': f"habit {habit_id}",
+		'target_kvi': target_kvi,
+		'current_kvi': current_kvi,
+		'streak': streak,
+		'next_due_at': last_occurence + period if last_occurence else None,
+		'expires_at': last_occurence + 2 * period if last_occurence else None,
+		'habit_periodicity_type': periodicity_type,
+	}
+
+
+
+@pytest.fixture
+def mock_facade():
+	"""
+	Fixture returning a facade mock with four goals: one tickable, one ticked an hour ago,
+	one expired and one that was never ticked.
+
+	Returns:
+		MagicMock: The mocked facade.
+	"""
+	now = datetime.now()
+	facade = MagicMock()
+	facade.get_goal_entities_by_ids.return_value = {
+		10: goal_entity(10, 1, last_occurence=now - timedelta(hours=30)),
+		20: goal_entity(20, 2, last_occurence=now - timedelta(hours=1)),
+		30: goal_entity(30, 3, periodicity_type="weekly", current_kvi=14.0, last_occurence=now - timedelta(weeks=3)),
+		40: goal_entity(40, 4, streak=0, current_kvi=0.0),
+	}
+	return facade
+
+
+
+@pytest.fixture
+def habit_orchestrator(mock_facade):
+	return HabitOrchestrator(habit_tracker_facade=mock_facade)
+
+
+
+def test_complete_habits_batch_reports_every_item(habit_orchestrator):
+	"""
+	Test that every pair gets a report entry, in input order, with the status its rules dictate.
+
+	Given:
+		- A tickable, a too early, an expired, a never ticked and an unknown goal, plus a goal paired with the wrong habit.
+	When:
+		- complete_habits_batch is called.
+	Then:
+		- Each item is reported as ticked, too_early, reset or not_found.
+	"""
+	report = habit_orchestrator.complete_habits_batch([(1, 10), (2, 20), (3, 30), (4, 40), (5, 50), (2, 10)])
+
+	assert [item['status'] for item in report] == ['ticked', 'too_early', 'reset', 'ticked', 'not_found', 'not_found']
+	assert report[0]['streak'] == 4
+	assert report[0]['current_kvi'] == 4.0
+	assert report[2]['streak'] == 0
+	assert report[3]['streak'] == 1
+
+
+
+def test_complete_habits_batch_writes_in_one_unit_of_work(habit_orchestrator, mock_facade):
+	"""
+	Test that the batch reads with one IN query and writes each table with one batched call.
+
+	Given:
+		- Four pairs of which three can be completed.
+	When:
+		- complete_habits_batch is called.
+	Then:
+		- One unit of work is opened, the reads are batched and each write, analytics included, is a single batched call.
+	"""
+	habit_orchestrator.complete_habits_batch([(1, 10), (2, 20), (3, 30), (4, 40)])
+
+	mock_facade.unit_of_work.assert_called_once()
+	mock_facade.get_goal_entities_by_ids.assert_called_once_with([10, 20, 30, 40])
+	mock_facade.update_habit_streaks.assert_called_once_with([(1, 4), (3, 0), (4, 1)])
+	mock_facade.update_goals_current_kvi.assert_called_once_with([(10, 4.0), (30, 0.0), (40, 1.0)])
+
+	progresses = mock_facade.create_progress_batch.call_args.args[0]
+	assert [progress['goal_id'] for progress in progresses] == [10, 30, 40]
+	assert [progress['current_streak'] for progress in progresses] == [4, 0, 1]
+	completions = mock_facade.record_completions.call_args.args[0]
+	assert [(habit_id, streak) for habit_id, streak, _ in completions] == [(1, 4), (3, 0), (4, 1)]
+	mock_facade.complete_a_habit.assert_not_called()
+
+
+
+def test_complete_habits_batch_ticks_a_goal_once(habit_orchestrator, mock_facade):
+	"""
+	Test that a goal listed twice in one batch is only ticked once.
+	"""
+	report = habit_orchestrator.complete_habits_batch([(1, 10), (1, 10)])
+
+	assert [item['status'] for item in report] == ['ticked', 'too_early']
+	mock_facade.update_habit_streaks.assert_called_once_with([(1, 4)])
+
+
+
+def test_complete_a_habit_reports_a_second_tick_in_the_same_period(habit_orchestrator, mock_facade, capsys):
+	"""
+	Test that a tick losing the race for its period is reported instead of raised.
+
+	Given:
+		- A tickable daily goal whose progress entry is rejected with ProgressPeriodAlreadyTickedError,
+		  as when a concurrent tick already wrote this period's entry.
+	When:
+		- complete_a_habit is called.
+	Then:
+		- The user is told the habit was already ticked, nothing is raised and no analytics are recorded.
+	"""
+	mock_facade.validate_a_habit.return_value = 1
+	mock_facade.validate_a_goal.return_value = 10
+	mock_facade.get_habit_strategy.return_value = ('daily',)
+	mock_facade._goal_service.get_goal_entity_by_id.return_value = goal_entity(10, 1, last_occurence=datetime.now() - timedelta(hours=30))
+	mock_facade._goal_service.increment_current_kvi.return_value = 4.0
+	mock_facade._progress_service.create_progress.side_effect = ProgressPeriodAlreadyTickedError(goal_id=10)
+	mock_facade.unit_of_work.return_value.__exit__.return_value = False
+
+	habit_orchestrator.complete_a_habit(habit_id=1, goal_id=10)
+
+	assert "already been ticked in the current period" in capsys.readouterr().out
+	mock_facade.record_completions.assert_not_called()
@@ -299,3 +299,24 @@ def test_get_goal_of_habit_invalid_id(habit_service):
 	"""
 	with pytest.raises(ValueError):
 		habit_service.get_goal_of_habit(-1)
+
+
+
+def test_update_habit_streaks_allows_reset_and_rejects_negative(habit_service, mock_habit_repository):
+	"""
+	Test that update_habit_streaks passes resets (0) through but rejects negative streaks.
+
+	Given:
+		- A batch with a reset and a regular streak, and a batch with a negative streak.
+	When:
+		- habit_service.update_habit_streaks is called with each.
+	Then:
+		- The first batch reaches the repository, the second raises ValueError.
+	"""
+	mock_habit_repository.update_habit_streaks.return_value = 2
+
+	assert habit_service.update_habit_streaks([(1, 0), (2, 5)]) == 2
+	mock_habit_repository.update_habit_streaks.assert_called_once_with(streak_updates=[(1, 0), (2, 5)])
+
+	with pytest.raises(ValueError):
+		habit_service.update_habit_streaks([(1, -1)])
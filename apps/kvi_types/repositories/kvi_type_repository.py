@@ -30,7 +30,7 @@ class KviTypeRepository:
 					raise KviTypesNotFoundError(f"Kvi type with id of: {kvi_type_id} is not found.")
 				return current_value[0]
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise
 
 
@@ -48,7 +48,7 @@ class KviTypeRepository:
 			with self._db._connection.cursor() as cursor:
 				query = "INSERT INTO kvi_types(kvi_type_name, kvi_description, kvi_multiplier, kvi_type_user_id) VALUES (%s, %s, %s, %s);"
 				cursor.execute(query, (kvi_type_name, kvi_description, kvi_multiplier, user_id))
-				self._db._connection.commit()
+				self._db.commit()
 				return {
 					'kvi_type_id': cursor.lastrowid,
 					'kvi_type_name': kvi_type_name,
@@ -58,11 +58,11 @@ class KviTypeRepository:
 				}
 		except IntegrityError as ierror:
 			if "Duplicate entry" in str(ierror):
-				self._db._connection.rollback()
+				self._db.rollback()
 				raise IntegrityError(f"Duplicate kvi_type with {kvi_type_name}.")
 			raise
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise
 
 
@@ -78,7 +78,7 @@ class KviTypeRepository:
 				else:
 					raise KviTypesNotFoundError(f"Kvi type with name: {kvi_type_name} and kvi type user id: {kvi_type_user_id} is not found.")
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise
 
 
@@ -87,7 +87,7 @@ class KviTypeRepository:
 			with self._db._connection.cursor() as cursor:
 				query = "UPDATE kvi_types SET kvi_multiplier = %s WHERE kvi_type_id = %s"
 				cursor.execute(query, (kvi_multiplier, kvi_type_id))
-				self._db._connection.commit()
+				self._db.commit()
 				
 				if cursor.rowcount == 0:
 					raise KviTypesNotFoundError(f"KVI type with ID {kvi_type_id} not found.")
@@ -95,11 +95,11 @@ class KviTypeRepository:
 				return cursor.rowcount
 			
 		except KviTypesNotFoundError as not_found_error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise 
 
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise
 
 
@@ -108,13 +108,13 @@ class KviTypeRepository:
 			with self._db._connection.cursor() as cursor:
 				query = "DELETE FROM kvi_types WHERE kvi_type_id = %s"
 				cursor.execute(query, (kvi_type_id, ))
-				self._db._connection.commit()
+				self._db.commit()
 
 				if cursor.rowcount == 0:
 					raise KviTypesNotFoundError(f"Kvi type with id {kvi_type_id} is not found.")
 				return cursor.rowcount
 		
 		except Exception as error:
-				self._db._connection.rollback()
+				self._db.rollback()
 				raise
 
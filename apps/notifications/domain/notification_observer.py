@@ -31,7 +31,7 @@ class NotificationObserver:
 		}
 
 		progress_dto = ProgressHistoryDTO(
-				progress_data['last_occurence'], 
+				progress_data.get('last_occurence'), 
 				progress_data['target_kvi'] - progress_data['current_kvi'],
 				progress_data['streak'],
 			)
@@ -0,0 +1,181 @@
+import csv
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+
+#an ISO 8601 date with separators, compact forms like 20250303 are too easily mistaken for epoch seconds
+ISO_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+
+class ProgressRecordError(ValueError):
+	"""Raised when a line of an import file is not a valid progress record."""
+	def __init__(self, line_number, reason):
+		super().__init__(f"Line {line_number}: {reason}")
+
+
+
+def parse_progress_record(fields, line_number):
+	"""
+	Validates the fields of one imported progress record.
+
+	The timestamp is either an ISO 8601 string starting with a YYYY-MM-DD date, or epoch seconds
+	given as a JSON number. Digits in a string, e.g. a CSV value, are not taken as epoch seconds.
+
+	Args:
+		fields (dict): user, habit and timestamp, optionally goal and kvi.
+		line_number (int): The record's line in the file, for error messages.
+
+	Returns:
+		dict: user, habit, goal (or None for the habit's first goal), timestamp as a naive local datetime and kvi (float or None).
+
+	Raises:
+		ProgressRecordError: If a required field is missing or a value can not be parsed.
+	"""
+	for field in ('user', 'habit', 'timestamp'):
+		if fields.get(field) in (None, ""):
+			raise ProgressRecordError(line_number, f"'{field}' is missing.")
+
+	timestamp = fields['timestamp']
+	try:
+		if isinstance(timestamp, bool):
+			raise ValueError("a boolean is not a timestamp")
+		if isinstance(timestamp, (int, float)):
+			timestamp = datetime.fromtimestamp(timestamp)
+		else:
+			if not ISO_DATE_PATTERN.match(str(timestamp)):
+				raise ValueError("not an ISO 8601 date with separators")
+			timestamp = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+			if timestamp.tzinfo is not None:
+				timestamp = timestamp.astimezone().replace(tzinfo=None)
+	except (ValueError, OverflowError, OSError) as error:
+		raise ProgressRecordError(line_number, f"invalid timestamp {fields['timestamp']!r}.") from error
+
+	kvi = fields.get('kvi')
+	if kvi in (None, ""):
+		kvi = None
+	else:
+		try:
+			kvi = float(kvi)
+		except (TypeError, ValueError) as error:
+			raise ProgressRecordError(line_number, f"invalid kvi {fields['kvi']!r}.") from error
+
+	return {
+		'user': str(fields['user']),
+		'habit': str(fields['habit']),
+		'goal': str(fields['goal']) if fields.get('goal') not in (None, "") else None,
+		'timestamp': timestamp,
+		'kvi': kvi,
+	}
+
+
+
+def read_progress_records(path, start_offset=0, file_format=None):
+	"""
+	Reads an import file of progress records lazily, one line at a time, so files of any size
+	are read with constant memory.
+
+	JSONL files hold one object per line with the keys user, habit, goal, timestamp and kvi.
+	CSV files have a header line with the same column names, goal and kvi may be left empty.
+	CSV values are text, so their timestamps have to be ISO 8601, epoch seconds only work in JSONL.
+	CSV values can not contain line breaks.
+
+	Args:
+		path (str): The import file.
+		start_offset (int, optional): Byte offset to continue from, as yielded earlier. Defaults to 0.
+		file_format (str, optional): 'jsonl' or 'csv'. Defaults to the file extension.
+
+	Yields:
+		tuple: (offset after the record, record dict) pairs, record is None for a line that is
+		not a valid record. Malformed lines are logged and skipped by the importer.
+	"""
+	file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+	if file_format not in ('jsonl', 'csv'):
+		raise ValueError("file_format must be 'jsonl' or 'csv'.")
+
+	with open(path, "rb") as source:
+		header = None
+		if file_format == 'csv':
+			header = [column.strip() for column in next(csv.reader([source.readline().decode("utf-8-sig")]), [])]
+			missing_columns = [column for column in ('user', 'habit', 'timestamp') if column not in header]
+			if missing_columns:
+				raise ValueError(f"The CSV header lacks the columns: {', '.join(missing_columns)}.")
+
+		if start_offset:
+			source.seek(start_offset)
+
+		#line numbers are only known when reading from the start
+		line_number = 1 if header is None else 2
+		for line in iter(source.readline, b""):
+			offset = source.tell()
+			text = line.decode("utf-8", errors="replace").strip()
+			if not text:
+				line_number += 1
+				continue
+			try:
+				if header is None:
+					fields = json.loads(text)
+					if not isinstance(fields, dict):
+						raise ProgressRecordError(line_number, "not a JSON object.")
+				else:
+					fields = dict(zip(header, next(csv.reader([text]))))
+				record = parse_progress_record(fields, line_number)
+			except (ProgressRecordError, json.JSONDecodeError) as error:
+				logging.warning(f"Skipping malformed progress record at byte {offset - len(line)}: {error}")
+				record = None
+			yield offset, record
+			line_number += 1
+
+
+
+class ImportCheckpoint:
+	"""
+	Remembers how far an import got: the byte offset after the last committed chunk and the
+	running totals. Saved atomically after every committed chunk, so an interrupted import
+	continues where it stopped without importing a record twice.
+	"""
+	def __init__(self, path):
+		self._path = path
+
+
+
+	@property
+	def path(self):
+		return self._path
+
+
+
+	def load(self):
+		"""
+		Returns:
+			dict or None: The saved offset and totals, None if there is no checkpoint.
+		"""
+		if not os.path.exists(self._path):
+			return None
+		with open(self._path, encoding="utf-8") as checkpoint:
+			return json.load(checkpoint)
+
+
+
+	def save(self, offset, totals):
+		"""
+		Saves the offset after the last committed record together with the running totals.
+
+		Args:
+			offset (int): Byte offset to continue from.
+			totals (dict): The import report so far.
+		"""
+		temporary_path = f"{self._path}.tmp"
+		with open(temporary_path, "w", encoding="utf-8") as checkpoint:
+			json.dump({'offset': offset, 'totals': totals, 'saved_at': datetime.now().isoformat(timespec='seconds')}, checkpoint)
+		os.replace(temporary_path, self._path)
+
+
+
+	def clear(self):
+		"""Removes the checkpoint, e.g. once the import is complete."""
+		if os.path.exists(self._path):
+			os.remove(self._path)
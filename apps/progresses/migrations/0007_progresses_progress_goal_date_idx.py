@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progresses', '0006_progresses_goal_name_progresses_habit_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progresses',
+            index=models.Index(fields=['goal_id', 'occurence_date'], name='progress_goal_date_idx'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progresses', '0007_progresses_progress_goal_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progresses',
+            index=models.Index(fields=['goal_id', 'current_streak'], name='progress_goal_streak_idx'),
+        ),
+    ]
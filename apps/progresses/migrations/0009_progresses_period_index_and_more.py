@@ -0,0 +1,56 @@
+from datetime import date
+
+from django.db import migrations, models
+
+
+EPOCH = date(1970, 1, 1)
+
+
+def backfill_period_index(apps, schema_editor):
+    """
+    Sets the period index of every existing progress entry: days since 1970-01-01 for daily habits,
+    Monday to Sunday weeks since then for weekly ones. When a goal was ticked several times in one
+    period, only its first entry gets the index, so the unique constraint can be added.
+    """
+    Progresses = apps.get_model('progresses', 'Progresses')
+
+    entries = (
+        Progresses.objects.filter(goal_id__isnull=False)
+        .order_by('goal_id', 'occurence_date', 'progress_id')
+        .values_list('progress_id', 'goal_id', 'occurence_date', 'goal_id__habit_id__habit_periodicity_type')
+    )
+
+    seen = set()
+    updates = []
+    for progress_id, goal_id, occurence_date, periodicity_type in entries.iterator(chunk_size=2000):
+        days = (occurence_date.date() - EPOCH).days
+        period_index = (days + 3) // 7 if periodicity_type == 'weekly' else days
+        if (goal_id, period_index) in seen:
+            continue
+        seen.add((goal_id, period_index))
+        updates.append(Progresses(progress_id=progress_id, period_index=period_index))
+        if len(updates) >= 2000:
+            Progresses.objects.bulk_update(updates, ['period_index'])
+            updates = []
+    Progresses.objects.bulk_update(updates, ['period_index'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progresses', '0008_progresses_progress_goal_streak_idx'),
+        ('habits', '0003_habit_streak_idx_habit_periodicity_type_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progresses',
+            name='period_index',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_period_index, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='progresses',
+            constraint=models.UniqueConstraint(fields=('goal_id', 'period_index'), name='unique_progress_per_period'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progresses', '0009_progresses_period_index_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progresses',
+            index=models.Index(fields=['occurence_date', 'progress_id'], name='progress_date_id_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import UniqueConstraint
 from apps.goals.models import Goals
 from django.core.validators import MinValueValidator
 from math import isinf, isnan
@@ -26,9 +27,18 @@ class Progresses(models.Model):
 	occurence_date = models.DateTimeField(auto_now_add=True)
 	goal_name = models.CharField(max_length=60, blank=True, null=True, default=None)
 	habit_name = models.CharField(max_length=60, blank=True, null=True, default=None)
+	period_index = models.IntegerField(blank=True, null=True)
 
 	class Meta:
 		db_table = "progresses"
+		constraints = [
+			UniqueConstraint(fields=["goal_id", "period_index"], name="unique_progress_per_period")
+		]
+		indexes = [
+			models.Index(fields=["goal_id", "occurence_date"], name="progress_goal_date_idx"),
+			models.Index(fields=["goal_id", "current_streak"], name="progress_goal_streak_idx"),
+			models.Index(fields=["occurence_date", "progress_id"], name="progress_date_id_idx")
+		]
 	
 	def save(self, *args, **kwargs):
 		if isinf(self.goal_id.current_kvi_value) or isnan(self.goal_id.current_kvi_value):
@@ -1,9 +1,19 @@
+import re
+from datetime import date, datetime
+
 from apps.habits.repositories.habit_repository import HabitRepository
 from apps.goals.repositories.goal_repository import GoalRepository
 
 from apps.database.database_manager import MariadbConnection
+from apps.database.instrumentation import instrument_repository_call
+from apps.database.pagination import DEFAULT_PAGE_SIZE, keyset_page, keyset_query
 from mysql.connector.errors import IntegrityError
 
+
+EPOCH = date(1970, 1, 1)
+#the unique (goal_id_id, period_index) entry MariaDB reports, e.g. Duplicate entry '10-20150' for key 'unique_progress_per_period'
+DUPLICATE_PERIOD_PATTERN = re.compile(r"Duplicate entry '(\d+)-(-?\d+)'")
+
 class ProgressesRepositoryError(Exception):
 	def __init__(self, message="An unexpected error occurred in progress repository."):
 		super().__init__(message)
@@ -18,22 +28,51 @@ class ProgressNotFoundError(ProgressesRepositoryError):
 
 class ProgressAlreadyExistError(ProgressesRepositoryError):
 	"""Raised when creating progress fails due to a already existing entry."""
-	def __init__(self, progress_name, progress_id):
-		message = f"Goal '{progress_name}' already exists for user with id: {progress_id}"
+	def __init__(self, progress_name=None, progress_id=None, message=None):
+		message = message or f"Goal '{progress_name}' already exists for user with id: {progress_id}"
 		super().__init__(message)
 
+
+class ProgressPeriodAlreadyTickedError(ProgressAlreadyExistError):
+	"""Raised when a goal already has a progress entry in the period (day or week) of a new one."""
+	def __init__(self, goal_id=None):
+		self.goal_id = goal_id
+		if goal_id is None:
+			message = "A goal has already been ticked in this period."
+		else:
+			message = f"Goal with id: {goal_id} has already been ticked in this period."
+		super().__init__(message=message)
+
+
+
+def period_index_of(occurence_date, periodicity_type):
+	"""
+	Returns the period index of a progress entry, as create_progress computes it in SQL: days since
+	1970-01-01 for a daily habit, Monday to Sunday weeks since then for a weekly one.
+	"""
+	days = (occurence_date.date() - EPOCH).days
+	return (days + 3) // 7 if periodicity_type == 'weekly' else days
+
+
+
 def handle_goal_repository_errors(f):
 	"""Decorator to clean up and handle errors in progress repository methods."""
+	f = instrument_repository_call(f)
 	def exception_wrapper(self, *args, **kwargs):
 		try:
 			return f(self, *args, **kwargs)
 		except IntegrityError as ierror:
-			self._db._connection.rollback()
-			raise ProgressAlreadyExistError(progress_name=args[0], progress_id=args[-1]) from ierror
+			self._db.rollback()
+			if "unique_progress_per_period" in str(ierror):
+				#batch inserts pass no goal_id, the duplicate entry names the goal
+				duplicate_entry = DUPLICATE_PERIOD_PATTERN.search(str(ierror))
+				goal_id = kwargs.get('goal_id', int(duplicate_entry.group(1)) if duplicate_entry else None)
+				raise ProgressPeriodAlreadyTickedError(goal_id=goal_id) from ierror
+			raise ProgressAlreadyExistError(progress_name=kwargs.get('goal_name', args[0] if args else None), progress_id=kwargs.get('goal_id', args[-1] if args else None)) from ierror
 		except ProgressesRepositoryError as herror:
 			raise herror
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise error
 	return exception_wrapper
 
@@ -56,11 +95,16 @@ class ProgressesRepository:
 		"""
 		Inserts a new progress entry into the database.
 
+		The entry gets the period index of its occurence date: days since 1970-01-01 for a daily
+		habit, Monday to Sunday weeks since then for a weekly one. The unique (goal_id_id, period_index)
+		constraint lets the database reject a second tick in the same period, also when two ticks race.
+		Without an explicit streak, the streak continues the entry of the previous period, if there is one.
+
 		Args:
 			goal_id (int): The unique identifier of the goal associated with this progress.
 			current_kvi_value (float): Current Key Value Indicator for this progress iteration.
 			distance_from_target_kvi_value (float): The difference between the target KVI and the current KVI.
-			current_streak (int): The current streak value.
+			current_streak (int or None): The current streak value, None to derive it from the previous period.
 			goal_name (str): The name of the goal.
 			habit_name (str): The name of the habit.
 			progress_description (str, optional): Additional description of the progress. Defaults to None.
@@ -70,37 +114,131 @@ class ProgressesRepository:
 			dict: A dictionary containing the newly created progress entry fields.
 
 		Raises:
-			ProgressAlreadyExistError: If there is a constraint violation indicating the progress already exists.
+			ProgressPeriodAlreadyTickedError: If the goal already has a progress entry in this period.
+			ProgressNotFoundError: If the goal does not exist.
+			ProgressAlreadyExistError: If there is another constraint violation.
 			ProgressesRepositoryError: If other repository-level errors occur.
 			Exception: For any other unexpected errors.
 		"""
 		with self._db._connection.cursor() as cursor:
-			if occurence_date == None: 
-				query = "INSERT INTO progresses(current_kvi_value, goal_id_id, distance_from_goal_kvi_value, current_streak, goal_name, habit_name, occurence_date) VALUES (%s, %s, %s, %s, %s, %s, NOW());"
-				cursor.execute(query, (current_kvi_value, goal_id, distance_from_target_kvi_value, current_streak, goal_name, habit_name))
-				self._db._connection.commit()
-				return {
-					'progress_id': cursor.lastrowid,
-					'goal_id': goal_id,
-					'current_kvi_value': current_kvi_value,
-					'distance_from_target_kvi_value': distance_from_target_kvi_value,
-					'current_streak': current_streak,
-					'goal_name': goal_name,
-					'habit_name': habit_name
-				}
-			else:
-				query = "INSERT INTO progresses(current_kvi_value, goal_id_id, distance_from_goal_kvi_value, current_streak, goal_name, habit_name, occurence_date) VALUES (%s, %s, %s, %s, %s, %s, %s);"
-				cursor.execute(query, (current_kvi_value, goal_id, distance_from_target_kvi_value, current_streak, goal_name, habit_name, occurence_date))
-				self._db._connection.commit()
-				return {
-					'progress_id': cursor.lastrowid,
-					'goal_id': goal_id,
-					'current_kvi_value': current_kvi_value,
-					'distance_from_target_kvi_value': distance_from_target_kvi_value,
-					'current_streak': current_streak,
-					'goal_name': goal_name,
-					'habit_name': habit_name
-				}
+			query = """
+				INSERT INTO progresses(current_kvi_value, goal_id_id, distance_from_goal_kvi_value, current_streak, goal_name, habit_name, progress_description, occurence_date, period_index)
+				SELECT %s, ticked.goal_id, %s,
+					COALESCE(%s, (SELECT previous.current_streak + 1 FROM progresses previous WHERE previous.goal_id_id = ticked.goal_id AND previous.period_index = ticked.period_index - 1), 1),
+					%s, %s, %s, ticked.occurence_date, ticked.period_index
+				FROM (
+					SELECT g.goal_id, dated.occurence_date, IF(h.habit_periodicity_type = 'weekly', FLOOR((DATEDIFF(dated.occurence_date, '1970-01-01') + 3) / 7), DATEDIFF(dated.occurence_date, '1970-01-01')) AS period_index
+					FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id
+					JOIN (SELECT COALESCE(%s, NOW()) AS occurence_date) AS dated
+					WHERE g.goal_id = %s
+				) AS ticked;
+			"""
+			cursor.execute(query, (current_kvi_value, distance_from_target_kvi_value, current_streak, goal_name, habit_name, progress_description, occurence_date, goal_id))
+
+			if cursor.rowcount == 0:
+				raise ProgressNotFoundError(goal_id)
+			progress_id = cursor.lastrowid
+
+			if current_streak is None:
+				cursor.execute("SELECT current_streak FROM progresses WHERE progress_id = %s;", (progress_id,))
+				current_streak = cursor.fetchone()[0]
+			self._db.commit()
+			return {
+				'progress_id': progress_id,
+				'goal_id': goal_id,
+				'current_kvi_value': current_kvi_value,
+				'distance_from_target_kvi_value': distance_from_target_kvi_value,
+				'current_streak': current_streak,
+				'goal_name': goal_name,
+				'habit_name': habit_name
+			}
+
+
+
+	@handle_goal_repository_errors
+	def create_progress_batch(self, progresses, chunk_size=1000):
+		"""
+		Inserts progress entries in chunks, each chunk as one multi-row executemany INSERT and one commit.
+
+		The iterable is consumed lazily, so only one chunk is held in memory. Per chunk, the periodicity
+		of the goals is read once to compute the period indexes, the generated ids are read back
+		through the unique (goal_id_id, period_index) key and the tick windows of the chunk's goals
+		are moved forward, in the same transaction as the INSERT. Chunks committed before a failing
+		chunk stay committed with their windows, unless the call runs inside a unit of work.
+
+		Args:
+			progresses (iterable of dict): Progress entries, each with goal_id, current_kvi_value,
+				distance_from_target_kvi_value, current_streak, goal_name, habit_name and optionally
+				progress_description and occurence_date (defaults to now).
+			chunk_size (int, optional): Entries per INSERT and commit. Defaults to 1000.
+
+		Returns:
+			list of int: The progress ids of the entries, in input order.
+
+		Raises:
+			ValueError: If chunk_size is not a positive integer.
+			ProgressNotFoundError: If a goal of a chunk does not exist, the chunk is not inserted.
+			ProgressPeriodAlreadyTickedError: If a goal already has a progress entry in the period of its new entry.
+			ProgressAlreadyExistError: If there is another constraint violation.
+		"""
+		if not isinstance(chunk_size, int) or chunk_size < 1:
+			raise ValueError("chunk_size must be a positive integer.")
+
+		progress_ids = []
+		chunk = []
+		for progress in progresses:
+			chunk.append(progress)
+			if len(chunk) == chunk_size:
+				progress_ids += self._insert_progress_chunk(chunk)
+				chunk = []
+		if chunk:
+			progress_ids += self._insert_progress_chunk(chunk)
+		return progress_ids
+
+
+
+	def _insert_progress_chunk(self, chunk):
+		now = datetime.now()
+		goal_ids = list(dict.fromkeys(progress['goal_id'] for progress in chunk))
+		placeholders = ", ".join(["%s"] * len(goal_ids))
+
+		with self._db.unit_of_work():
+			with self._db._connection.cursor() as cursor:
+				cursor.execute(f"SELECT g.goal_id, h.habit_periodicity_type FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id WHERE g.goal_id IN ({placeholders});", tuple(goal_ids))
+				periodicity_types = dict(cursor.fetchall())
+				missing_goal_ids = [goal_id for goal_id in goal_ids if goal_id not in periodicity_types]
+				if missing_goal_ids:
+					raise ProgressNotFoundError(missing_goal_ids[0])
+
+				rows = []
+				keys = []
+				for progress in chunk:
+					occurence_date = progress.get('occurence_date') or now
+					period_index = period_index_of(occurence_date, periodicity_types[progress['goal_id']])
+					keys.append((progress['goal_id'], period_index))
+					rows.append((
+						progress['current_kvi_value'],
+						progress['goal_id'],
+						progress['distance_from_target_kvi_value'],
+						progress['current_streak'],
+						progress['goal_name'],
+						progress['habit_name'],
+						progress.get('progress_description'),
+						occurence_date,
+						period_index
+					))
+
+				#a plain VALUES list lets the driver send the whole chunk as one multi-row INSERT
+				query = "INSERT INTO progresses(current_kvi_value, goal_id_id, distance_from_goal_kvi_value, current_streak, goal_name, habit_name, progress_description, occurence_date, period_index) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);"
+				cursor.executemany(query, rows)
+
+				key_placeholders = ", ".join(["(%s, %s)"] * len(keys))
+				cursor.execute(f"SELECT goal_id_id, period_index, progress_id FROM progresses WHERE (goal_id_id, period_index) IN ({key_placeholders});", tuple(value for key in keys for value in key))
+				progress_ids = {(goal_id, period_index): progress_id for goal_id, period_index, progress_id in cursor.fetchall()}
+
+			#the windows commit with the entries, a chunk never lands without them
+			self._goal_repository.update_due_windows(ticks=[(progress['goal_id'], progress.get('occurence_date')) for progress in chunk])
+			return [progress_ids.get(key) for key in keys]
 
 
 
@@ -134,29 +272,102 @@ class ProgressesRepository:
 	def get_last_progress_entry(self, goal_id):
 		"""
 		Retrieves the most recent progress entry for a given goal based on occurence_date.
+		Reads a single row through the (goal_id_id, occurence_date) index, so the cost does
+		not depend on the length of the goal's history.
 
 		Args:
 			goal_id (int): The unique identifier of the goal.
 
 		Returns:
-			tuple or None: The last progress record if found, otherwise None.
+			dict or None: The progress_id, occurence_date, current_streak and current_kvi_value
+			of the last progress record if found, otherwise None.
 
 		Raises:
 			ProgressesRepositoryError: For repository-level progress errors.
 			Exception: For any other unexpected errors.
 		"""
 		with self._db._connection.cursor() as cursor:
-			query = "SELECT * FROM progresses WHERE goal_id_id = %s ORDER BY occurence_date;"
+			query = "SELECT progress_id, occurence_date, current_streak, current_kvi_value FROM progresses WHERE goal_id_id = %s ORDER BY occurence_date DESC, progress_id DESC LIMIT 1;"
 			cursor.execute(query, (goal_id,))
-			result = cursor.fetchall()
+			result = cursor.fetchone()
 
 			if result:
-				return result[-1]
+				return {
+					'progress_id': result[0],
+					'occurence_date': result[1],
+					'current_streak': result[2],
+					'current_kvi_value': result[3]
+				}
 			else:
 				return None
 
 
 
+	@handle_goal_repository_errors
+	def get_latest_periods(self, goal_ids):
+		"""
+		Retrieves the progress entry of the latest period of many goals in one query, through the
+		unique (goal_id_id, period_index) index.
+
+		Args:
+			goal_ids (list of int): IDs of the goals.
+
+		Returns:
+			dict: goal_id -> dict with period_index, current_streak and current_kvi_value.
+			Goals without progress entries are left out.
+
+		Raises:
+			ProgressesRepositoryError: For repository-level progress errors.
+			Exception: For any other unexpected errors.
+		"""
+		if not goal_ids:
+			return {}
+
+		placeholders = ", ".join(["%s"] * len(goal_ids))
+		with self._db._connection.cursor() as cursor:
+			query = f"""
+				SELECT p.goal_id_id, p.period_index, p.current_streak, p.current_kvi_value
+				FROM progresses p
+				JOIN (SELECT goal_id_id, MAX(period_index) AS period_index FROM progresses WHERE goal_id_id IN ({placeholders}) GROUP BY goal_id_id) latest
+					ON p.goal_id_id = latest.goal_id_id AND p.period_index = latest.period_index;
+			"""
+			cursor.execute(query, tuple(goal_ids))
+			return {row[0]: {'period_index': row[1], 'current_streak': row[2], 'current_kvi_value': row[3]} for row in cursor.fetchall()}
+
+
+
+	@handle_goal_repository_errors
+	def get_progress_history_page(self, goal_id=None, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of the progress history, newest first, with keyset pagination on
+		(occurence_date, progress_id), so every page is an index seek however deep it lies.
+
+		Args:
+			goal_id (int, optional): Only the history of this goal. Defaults to every goal.
+			page_size (int, optional): Entries per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): (occurence_date, progress_id) of the last entry shown, for the next (older) page.
+			before (tuple, optional): (occurence_date, progress_id) of the first entry shown, for the previous (newer) page.
+
+		Returns:
+			dict: 'rows' of (progress_id, goal_id, goal_name, habit_name, current_streak, current_kvi_value,
+			distance_from_goal_kvi_value, occurence_date) tuples, 'next_cursor' and 'previous_cursor', see keyset_page.
+		"""
+		query, params = keyset_query(
+			"SELECT progress_id, goal_id_id, goal_name, habit_name, current_streak, current_kvi_value, distance_from_goal_kvi_value, occurence_date FROM progresses",
+			("occurence_date", "progress_id"),
+			page_size=page_size,
+			after=after,
+			before=before,
+			descending=True,
+			conditions=("goal_id_id = %s",) if goal_id is not None else (),
+			params=(goal_id,) if goal_id is not None else ()
+		)
+		with self._db._connection.cursor() as cursor:
+			cursor.execute(query, params)
+			return keyset_page(cursor.fetchall(), (7, 0), page_size=page_size, after=after, before=before)
+
+
+
 	@handle_goal_repository_errors
 	def get_progress(self, progress_id):
 		"""
@@ -203,7 +414,7 @@ class ProgressesRepository:
 		with self._db._connection.cursor() as cursor:
 			query = "DELETE FROM progresses WHERE progress_id = %s;"
 			cursor.execute(query, (progress_id,))
-			self._db._connection.commit()
+			self._db.commit()
 
 			if cursor.rowcount == 0:
 				raise ProgressNotFoundError(progress_id)
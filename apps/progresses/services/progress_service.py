@@ -1,11 +1,14 @@
 from apps.progresses.repositories.progress_repository import ProgressesRepository, ProgressAlreadyExistError, ProgressesRepositoryError, ProgressNotFoundError
+from apps.database.pagination import DEFAULT_PAGE_SIZE
 from apps.goals.services.goal_service import GoalService, GoalNotFoundError
+from apps.utils.tracing import traced
 import logging
 import datetime
 
 
 def handle_progresses_service_exceptions(f):
 	"""Decorator to clean up and handle errors in progress services methods."""
+	f = traced('service')(f)
 	def exception_wrapper(*args, **kwargs):
 		try:
 			return f(*args, **kwargs)
@@ -37,8 +40,10 @@ class ProgressesService:
 	@handle_progresses_service_exceptions
 	def create_progress(self, goal_id, current_kvi_value, distance_from_target_kvi_value,  goal_name, habit_name, current_streak=None, progress_description=None, occurence_date=None):
 		"""
-		Creates a new progress entry for a given goal, updating or resetting 
-		the streak based on the last progress date.
+		Creates a new progress entry for a given goal. Without an explicit streak,
+		the streak continues the goal's entry of the previous period or restarts at 1.
+		A second entry in the same period is rejected by the database, so a tick
+		needs no read of the last progress entry first.
 
 		Args:
 			goal_id (int): The unique identifier of the goal associated with the progress.
@@ -54,6 +59,7 @@ class ProgressesService:
 			dict: A dictionary containing the newly created progress entry data.
 
 		Raises:
+			ProgressPeriodAlreadyTickedError: If the goal has already been ticked in this period.
 			ProgressAlreadyExistError: If a duplicate or invalid progress entry creation is attempted.
 			ProgressNotFoundError: If the goal validation fails (no associated goal).
 			GoalNotFoundError: If the specified goal_id is invalid.
@@ -61,28 +67,77 @@ class ProgressesService:
 			Exception: For any other unexpected errors.
 		"""
 		validated_goal_id = self._goal_service.validate_goal_id(goal_id)
-		goal_entity = self._goal_service.get_goal_entity_by_goal_id(validated_goal_id)
-		target_kvi = goal_entity['target_kvi']
-		last_progress_entry = self._repository.get_last_progress_entry(goal_id=validated_goal_id)
-		
-		if not last_progress_entry and current_streak == None:
-			new_streak = 1
-		elif current_streak is not None:
-			new_streak = current_streak
-		else:
-			last_date = last_progress_entry[3]
-			last_streak = last_progress_entry[6]
-			
-			threshold = datetime.timedelta(hours=48) if target_kvi == 1.0 else datetime.timedelta(weeks=2)
-			if (occurence_date - last_date) < threshold:
-				new_streak = last_streak + 1
-			else:
-				new_streak = 1
-		progress_entity = self._repository.create_progress(goal_id=validated_goal_id, current_kvi_value=current_kvi_value, distance_from_target_kvi_value=distance_from_target_kvi_value, current_streak=new_streak, goal_name=goal_name, habit_name=habit_name, progress_description=progress_description, occurence_date=occurence_date)
+		progress_entity = self._repository.create_progress(goal_id=validated_goal_id, current_kvi_value=current_kvi_value, distance_from_target_kvi_value=distance_from_target_kvi_value, current_streak=current_streak, goal_name=goal_name, habit_name=habit_name, progress_description=progress_description, occurence_date=occurence_date)
+		self._goal_service.update_due_windows(ticks=[(validated_goal_id, occurence_date)])
 		return progress_entity
 
 
 
+	@handle_progresses_service_exceptions
+	def create_progress_batch(self, progresses, chunk_size=1000):
+		"""
+		Creates many progress entries at once, streamed to the repository in chunks of
+		chunk_size with one commit per chunk. Unlike create_progress, the streak of each
+		entry is taken as given, the caller is expected to have computed it. The tick
+		windows of the goals are moved forward chunk by chunk, with the entries.
+
+		Args:
+			progresses (iterable of dict): Progress entries, see ProgressesRepository.create_progress_batch.
+				A generator is consumed lazily.
+			chunk_size (int, optional): Entries per INSERT and commit. Defaults to 1000.
+
+		Returns:
+			list of int: The ids of the created progress entries, in input order.
+
+		Raises:
+			ValueError: If chunk_size is not a positive integer.
+			ProgressNotFoundError: If a goal of an entry does not exist.
+			ProgressPeriodAlreadyTickedError: If a goal has already been ticked in the period of its entry.
+			ProgressAlreadyExistError: If a duplicate progress entry creation is attempted.
+		"""
+		progress_ids = self._repository.create_progress_batch(progresses=progresses, chunk_size=chunk_size)
+		return progress_ids
+
+
+
+	@handle_progresses_service_exceptions
+	def get_latest_periods(self, goal_ids):
+		"""
+		Retrieves the period index, streak and KVI of the latest progress entry of many goals at once.
+
+		Args:
+			goal_ids (iterable of int): IDs of the goals.
+
+		Returns:
+			dict: goal_id -> dict with period_index, current_streak and current_kvi_value.
+			Goals without progress entries are left out.
+		"""
+		latest_periods = self._repository.get_latest_periods(goal_ids=list(goal_ids))
+		return latest_periods
+
+
+
+	@handle_progresses_service_exceptions
+	def get_progress_history_page(self, goal_id=None, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of the progress history, newest entries first.
+
+		Args:
+			goal_id (int, optional): Only the history of this goal. Defaults to every goal.
+			page_size (int, optional): Entries per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next (older) page.
+			before (tuple, optional): previous_cursor of the current page, for the previous (newer) page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		#the goal is validated once, on the first page, not on every page turned
+		if goal_id is not None and after is None and before is None:
+			goal_id = self._goal_service.validate_goal_id(goal_id)
+		return self._repository.get_progress_history_page(goal_id=goal_id, page_size=page_size, after=after, before=before)
+
+
+
 	@handle_progresses_service_exceptions
 	def get_progress_id(self, goal_id):
 		"""
@@ -132,7 +187,8 @@ class ProgressesService:
 			goal_id (int): The unique identifier of the goal.
 
 		Returns:
-			tuple or None: The last progress record if found, otherwise None.
+			dict or None: The last progress record (progress_id, occurence_date,
+			current_streak, current_kvi_value) if found, otherwise None.
 
 		Raises:
 			ProgressNotFoundError: If no progress is found for the given goal.
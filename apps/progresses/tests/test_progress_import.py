@@ -0,0 +1,256 @@
+import json
+import pytest
+from contextlib import nullcontext
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from apps.core.orchestrators.habit_orchestrator import HabitOrchestrator
+from apps.progresses.domain.progress_records import ImportCheckpoint, read_progress_records, parse_progress_record, ProgressRecordError
+from apps.goals.repositories.goal_repository import GoalRepository
+from apps.progresses.repositories.progress_repository import ProgressesRepository, period_index_of
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+	"""
+	Fixture writing a JSONL import file with three records and one malformed line.
+
+	Returns:
+		str: Path of the file.
+	"""
+	path = tmp_path / "history.jsonl"
+	lines = [
+		json.dumps({'user': "alice", 'habit': "run", 'timestamp': "2024-01-01T08:00:00"}),
+		"{not json",
+		json.dumps({'user': "alice", 'habit': "run", 'goal': "5k", 'timestamp': "2024-01-02T08:00:00", 'kvi': 2}),
+		json.dumps({'user': "bob", 'habit': "read", 'timestamp': 1704182400}),
+	]
+	path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+	return str(path)
+
+
+
+@pytest.fixture
+def mock_facade():
+	"""
+	Fixture returning a MagicMock facade knowing one daily goal of alice's habit 'run'.
+
+	Returns:
+		MagicMock: A mock facade.
+	"""
+	facade = MagicMock()
+	facade.unit_of_work.side_effect = lambda: nullcontext()
+	facade.get_goals_of_user_habits.side_effect = lambda pairs: {
+		pair: [{'goal_id': 7, 'goal_name': "5k", 'habit_id': 3, 'habit_periodicity_type': "daily", 'target_kvi': 10}]
+		for pair in pairs if pair == ("alice", "run")
+	}
+	facade.get_latest_periods.return_value = {}
+	return facade
+
+
+
+def record(day, kvi=None, user="alice", habit="run", goal=None):
+	return {'user': user, 'habit': habit, 'goal': goal, 'timestamp': datetime(2024, 1, day, 8), 'kvi': kvi}
+
+
+
+def test_read_progress_records_jsonl(jsonl_file):
+	"""
+	Test reading a JSONL file.
+
+	Given:
+		- Three valid records and one malformed line.
+	When:
+		- read_progress_records is iterated.
+	Then:
+		- Four entries are yielded, the malformed one as None.
+		- The offsets increase and the last one is the file size.
+	"""
+	entries = list(read_progress_records(jsonl_file))
+
+	assert [entry[1] is None for entry in entries] == [False, True, False, False]
+	assert entries[2][1]['goal'] == "5k" and entries[2][1]['kvi'] == 2.0
+	assert entries[3][1]['timestamp'] == datetime.fromtimestamp(1704182400)
+	offsets = [entry[0] for entry in entries]
+	assert offsets == sorted(offsets)
+	with open(jsonl_file, "rb") as source:
+		assert offsets[-1] == len(source.read())
+
+
+
+def test_read_progress_records_resumes_from_offset(jsonl_file):
+	"""
+	Test continuing to read after an offset yielded earlier.
+
+	Given:
+		- The offset yielded after the second line.
+	When:
+		- read_progress_records is called with that start_offset.
+	Then:
+		- Only the records after it are yielded.
+	"""
+	offset = list(read_progress_records(jsonl_file))[1][0]
+
+	resumed = [entry[1]['user'] for entry in read_progress_records(jsonl_file, start_offset=offset)]
+
+	assert resumed == ["alice", "bob"]
+
+
+
+def test_read_progress_records_csv(tmp_path):
+	"""
+	Test reading a CSV file with a header and empty optional columns.
+
+	Given:
+		- A CSV file with the columns user, habit, goal, timestamp and kvi.
+	When:
+		- read_progress_records is iterated, also after the first record's offset.
+	Then:
+		- Empty goal and kvi are None and resuming skips the header.
+	"""
+	path = tmp_path / "history.csv"
+	path.write_text("user,habit,goal,timestamp,kvi\nalice,run,,2024-01-01T08:00:00+00:00,\nbob,read,books,2024-01-02,3.5\n", encoding="utf-8")
+
+	entries = list(read_progress_records(str(path)))
+	resumed = list(read_progress_records(str(path), start_offset=entries[0][0]))
+
+	assert entries[0][1]['goal'] is None and entries[0][1]['kvi'] is None
+	assert entries[0][1]['timestamp'].tzinfo is None
+	assert entries[1][1]['kvi'] == 3.5
+	assert [entry[1]['user'] for entry in resumed] == ["bob"]
+
+
+
+def test_read_progress_records_csv_requires_columns(tmp_path):
+	"""
+	Test a CSV file without a timestamp column is refused.
+	"""
+	path = tmp_path / "history.csv"
+	path.write_text("user,habit\nalice,run\n", encoding="utf-8")
+
+	with pytest.raises(ValueError, match="timestamp"):
+		list(read_progress_records(str(path)))
+
+
+
+def test_parse_progress_record_rejects_invalid_values():
+	"""
+	Test missing fields and unparsable values raise ProgressRecordError.
+	"""
+	with pytest.raises(ProgressRecordError, match="habit"):
+		parse_progress_record({'user': "alice", 'timestamp': "2024-01-01"}, 1)
+	with pytest.raises(ProgressRecordError, match="timestamp"):
+		parse_progress_record({'user': "alice", 'habit': "run", 'timestamp': "yesterday"}, 2)
+	for timestamp in ("20250303", "1704182400", True):
+		with pytest.raises(ProgressRecordError, match="timestamp"):
+			parse_progress_record({'user': "alice", 'habit': "run", 'timestamp': timestamp}, 2)
+	with pytest.raises(ProgressRecordError, match="kvi"):
+		parse_progress_record({'user': "alice", 'habit': "run", 'timestamp': "2024-01-01", 'kvi': "lots"}, 3)
+
+
+
+def test_import_checkpoint_round_trip(tmp_path):
+	"""
+	Test saving, loading and clearing a checkpoint.
+	"""
+	checkpoint = ImportCheckpoint(str(tmp_path / "history.jsonl.checkpoint"))
+	assert checkpoint.load() is None
+
+	checkpoint.save(42, {'read': 3})
+
+	assert checkpoint.load()['offset'] == 42 and checkpoint.load()['totals'] == {'read': 3}
+	checkpoint.clear()
+	assert checkpoint.load() is None
+
+
+
+def test_import_progress_history_recomputes_streaks(mock_facade):
+	"""
+	Test importing records of consecutive and non consecutive days.
+
+	Given:
+		- Records of alice's daily habit on January 1, 2, 4 and a second one on January 4.
+		- A record of a user without goals and a malformed line.
+	When:
+		- import_progress_history is called with a chunk size of 3.
+	Then:
+		- The streaks are 1, 2 and 1 again after the gap, the second January 4 record is a duplicate.
+		- The goals are resolved once, not per chunk, and the checkpoint is saved per chunk.
+		- The last habit streak and goal kvi are written per chunk.
+	"""
+	records = [(10, record(1)), (20, record(2)), (30, None), (40, record(4)), (50, record(4)), (60, record(1, user="carol"))]
+	checkpoint = MagicMock()
+	checkpoint.load.return_value = None
+
+	report = HabitOrchestrator(mock_facade).import_progress_history(records, checkpoint=checkpoint, chunk_size=3)
+
+	inserted = [progress for call in mock_facade.create_progress_batch.call_args_list for progress in call.args[0]]
+	assert [progress['current_streak'] for progress in inserted] == [1, 2, 1]
+	assert [progress['current_kvi_value'] for progress in inserted] == [1.0, 2.0, 1.0]
+	assert inserted[1]['distance_from_target_kvi_value'] == 8.0
+	assert (report['read'], report['imported'], report['malformed'], report['unresolved'], report['duplicates']) == (6, 3, 1, 1, 1)
+	assert report['offset'] == 60
+	assert mock_facade.get_goals_of_user_habits.call_count == 2
+	mock_facade.get_latest_periods.assert_called_once_with([7])
+	assert [call.args[0] for call in checkpoint.save.call_args_list] == [30, 60]
+	mock_facade.update_habit_streaks.assert_called_with([(3, 1)])
+	mock_facade.update_goals_current_kvi.assert_called_with([(7, 1.0)])
+
+
+
+def test_import_progress_history_moves_each_window_once_per_chunk(mock_facade):
+	"""
+	Test that a chunk moves the due window of each of its goals with one statement, not one per record.
+
+	Given:
+		- Five consecutive records of alice's goal, written by the progress and goal repositories.
+	When:
+		- import_progress_history is called with one chunk for all of them.
+	Then:
+		- The windows are moved by a single UPDATE, with the goal's latest record only.
+	"""
+	database = MagicMock()
+	cursor = database._connection.cursor.return_value.__enter__.return_value
+	cursor.fetchall.side_effect = [[(7, 'daily')], []]
+	repository = ProgressesRepository(database=database, goal_repository=GoalRepository(database=database, habit_repository=MagicMock()))
+	mock_facade.create_progress_batch.side_effect = repository.create_progress_batch
+
+	HabitOrchestrator(mock_facade).import_progress_history([(day, record(day)) for day in range(1, 6)], chunk_size=5)
+
+	updates = [call.args for call in cursor.execute.call_args_list if call.args[0].startswith("UPDATE goals")]
+	assert len(updates) == 1
+	assert updates[0][1] == (7, datetime(2024, 1, 5, 8))
+	assert not [call for call in cursor.executemany.call_args_list if call.args[0].startswith("UPDATE")]
+
+
+
+def test_import_progress_history_continues_existing_streak(mock_facade):
+	"""
+	Test the first imported record continues the goal's latest stored period.
+
+	Given:
+		- The goal's latest progress is on January 1 with a streak of 4 and a kvi of 4.
+	When:
+		- Records of January 1 and January 2 are imported, the second with an explicit kvi.
+	Then:
+		- January 1 is a duplicate and January 2 continues the streak with 5 and keeps its kvi.
+	"""
+	mock_facade.get_latest_periods.return_value = {7: {'period_index': period_index_of(datetime(2024, 1, 1), "daily"), 'current_streak': 4, 'current_kvi_value': 4}}
+
+	report = HabitOrchestrator(mock_facade).import_progress_history([(1, record(1)), (2, record(2, kvi=9))])
+
+	progress = mock_facade.create_progress_batch.call_args.args[0][0]
+	assert (progress['current_streak'], progress['current_kvi_value']) == (5, 9.0)
+	assert report['duplicates'] == 1 and report['imported'] == 1
+
+
+
+def test_import_progress_history_resumes_totals(mock_facade):
+	"""
+	Test resuming from a checkpoint continues its totals.
+	"""
+	checkpoint = MagicMock()
+	checkpoint.load.return_value = {'offset': 5, 'totals': {'read': 10, 'imported': 8, 'malformed': 2, 'unresolved': 0, 'duplicates': 0, 'offset': 5}}
+
+	report = HabitOrchestrator(mock_facade).import_progress_history([(9, record(3))], checkpoint=checkpoint)
+
+	assert (report['read'], report['imported'], report['offset']) == (11, 9, 9)
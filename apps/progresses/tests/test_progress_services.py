@@ -1,8 +1,10 @@
 import pytest
+import datetime
 from unittest.mock import MagicMock, patch
 
 from apps.progresses.services.progress_service import ProgressesService
-from apps.progresses.repositories.progress_repository import ProgressNotFoundError, ProgressAlreadyExistError
+from apps.progresses.repositories.progress_repository import ProgressesRepository, ProgressNotFoundError, ProgressAlreadyExistError, ProgressPeriodAlreadyTickedError, period_index_of
+from mysql.connector.errors import IntegrityError
 from apps.goals.services.goal_service import GoalNotFoundError
 
 @pytest.fixture
@@ -51,8 +53,6 @@ def test_create_progress_success(progresses_service, mock_progress_repo, mock_go
 
 	Given:
 		- goal_service.validate_goal_id returns valid goal_id.
-		- goal_service.get_goal_entity_by_goal_id returns a target_kvi != 1.
-		- repository.get_last_progress_entry returns None.
 	When:
 		- create_progress is called without current_streak or occurence_date.
 	Then:
@@ -84,7 +84,6 @@ def test_create_progress_with_explicit_streak(progresses_service, mock_progress_
 	Test creating progress with an explicit current_streak overrides logic.
 
 	Given:
-		- repository.get_last_progress_entry returns a previous entry.
 		- current_streak parameter is provided.
 	When:
 		- create_progress is called with current_streak=5.
@@ -92,8 +91,6 @@ def test_create_progress_with_explicit_streak(progresses_service, mock_progress_
 		- repository.create_progress is called with current_streak == 5.
 	"""
 	mock_goal_service.validate_goal_id.return_value = 10
-	mock_goal_service.get_goal_entity_by_goal_id.return_value = {'target_kvi': 1.0}
-	mock_progress_repo.get_last_progress_entry.return_value = ('id', 10, 1.0, None, None, None, 2)
 	expected = {'progress_id': 2, 'goal_id': 10, 'current_streak': 5}
 	mock_progress_repo.create_progress.return_value = expected
 
@@ -214,3 +211,150 @@ def test_delete_progress_not_found(progresses_service, mock_progress_repo):
 	mock_progress_repo.delete_progress.side_effect = ProgressNotFoundError("No progress with ID=98")
 	with pytest.raises(ProgressNotFoundError):
 		progresses_service.delete_progress(goal_id=98)
+
+
+
+def test_create_progress_leaves_streak_to_the_database_and_moves_window(progresses_service, mock_progress_repo, mock_goal_service):
+	"""
+	Test that a tick without an explicit streak is written without reading the last entry first, and moves the goal's window.
+
+	Given:
+		- A valid goal.
+	When:
+		- create_progress is called for 2025-03-02 18:00 without current_streak.
+	Then:
+		- The repository derives the streak (current_streak=None is passed through), the last entry is not read
+		  and the goal's window is updated for the tick.
+	"""
+	mock_goal_service.validate_goal_id.return_value = 10
+	occurence_date = datetime.datetime(2025, 3, 2, 18)
+
+	progresses_service.create_progress(goal_id=10, current_kvi_value=1.0, distance_from_target_kvi_value=0.0, goal_name="g", habit_name="h", occurence_date=occurence_date)
+
+	assert mock_progress_repo.create_progress.call_args.kwargs['current_streak'] is None
+	mock_progress_repo.get_last_progress_entry.assert_not_called()
+	mock_goal_service.update_due_windows.assert_called_with(ticks=[(10, occurence_date)])
+
+
+
+def test_create_progress_twice_in_one_period_is_rejected(progresses_service, mock_progress_repo, mock_goal_service):
+	"""
+	Test that the period conflict reported by the repository reaches the caller and the window is not moved.
+
+	Given:
+		- repository.create_progress raises ProgressPeriodAlreadyTickedError.
+	When:
+		- create_progress is called.
+	Then:
+		- ProgressPeriodAlreadyTickedError is raised, which still is a ProgressAlreadyExistError.
+		- update_due_windows is not called.
+	"""
+	mock_goal_service.validate_goal_id.return_value = 10
+	mock_progress_repo.create_progress.side_effect = ProgressPeriodAlreadyTickedError(goal_id=10)
+
+	with pytest.raises(ProgressAlreadyExistError, match="already been ticked in this period"):
+		progresses_service.create_progress(goal_id=10, current_kvi_value=1.0, distance_from_target_kvi_value=0.0, goal_name="g", habit_name="h")
+	mock_goal_service.update_due_windows.assert_not_called()
+
+
+
+def test_repository_maps_unique_period_violation(mock_goal_service):
+	"""
+	Test that the repository turns a violation of the one tick per period constraint into ProgressPeriodAlreadyTickedError.
+
+	Given:
+		- A cursor whose INSERT raises the IntegrityError MariaDB reports for unique_progress_per_period.
+	When:
+		- ProgressesRepository.create_progress is called.
+	Then:
+		- ProgressPeriodAlreadyTickedError is raised and the transaction is rolled back.
+	"""
+	database = MagicMock()
+	cursor = database._connection.cursor.return_value.__enter__.return_value
+	cursor.execute.side_effect = IntegrityError(msg="Duplicate entry '10-20150' for key 'unique_progress_per_period'")
+	repository = ProgressesRepository(database=database, goal_repository=MagicMock())
+
+	with pytest.raises(ProgressPeriodAlreadyTickedError):
+		repository.create_progress(goal_id=10, current_kvi_value=1.0, distance_from_target_kvi_value=0.0, current_streak=None, goal_name="g", habit_name="h")
+	database.rollback.assert_called_once()
+
+
+
+def test_repository_names_the_goal_of_a_batch_period_violation():
+	"""
+	Test that a period violation in a batch insert, which passes no goal_id, names the goal of the duplicate entry.
+
+	Given:
+		- A cursor whose batch INSERT raises the unique_progress_per_period violation of goal 11.
+	When:
+		- ProgressesRepository.create_progress_batch is called.
+	Then:
+		- ProgressPeriodAlreadyTickedError names goal 11 and nothing is committed.
+		- Without a known goal the message names none, instead of 'None'.
+	"""
+	database = MagicMock()
+	cursor = database._connection.cursor.return_value.__enter__.return_value
+	cursor.fetchall.return_value = [(11, 'daily')]
+	cursor.executemany.side_effect = IntegrityError(msg="Duplicate entry '11-20151' for key 'unique_progress_per_period'")
+	repository = ProgressesRepository(database=database, goal_repository=MagicMock())
+	entry = {'goal_id': 11, 'current_kvi_value': 1.0, 'distance_from_target_kvi_value': 0.0, 'current_streak': 1, 'goal_name': "g", 'habit_name': "h"}
+
+	with pytest.raises(ProgressPeriodAlreadyTickedError, match="Goal with id: 11 ") as error:
+		repository.create_progress_batch(progresses=[entry])
+	assert error.value.goal_id == 11
+	database.commit.assert_not_called()
+	assert str(ProgressPeriodAlreadyTickedError()) == "A goal has already been ticked in this period."
+
+
+
+def test_repository_streams_progress_batch_in_chunks():
+	"""
+	Test that create_progress_batch writes a lazily produced batch in chunks and returns the ids in input order.
+
+	Given:
+		- A generator of 5 daily progress entries for goals 10 and 11, and a chunk size of 2.
+		- A cursor answering the periodicity lookup and the id read-back of every chunk.
+	When:
+		- ProgressesRepository.create_progress_batch is called.
+	Then:
+		- 3 executemany INSERTs with 2, 2 and 1 rows are sent, each chunk in its own transaction.
+		- The tick windows of every chunk's goals are moved within that transaction.
+		- The ids read back through (goal_id, period_index) are returned in input order.
+	"""
+	start = datetime.datetime(2025, 3, 3, 9, 0)
+	entries = [{'goal_id': 10 + day % 2, 'current_kvi_value': 1.0, 'distance_from_target_kvi_value': 0.0, 'current_streak': 1, 'goal_name': "g", 'habit_name': "h", 'occurence_date': start + datetime.timedelta(days=day)} for day in range(5)]
+	ids = {(entry['goal_id'], period_index_of(entry['occurence_date'], 'daily')): 100 + number for number, entry in enumerate(entries)}
+
+	database = MagicMock()
+	cursor = database._connection.cursor.return_value.__enter__.return_value
+	chunks = [entries[0:2], entries[2:4], entries[4:5]]
+	cursor.fetchall.side_effect = [
+		rows
+		for chunk in chunks
+		for rows in ([(goal_id, 'daily') for goal_id in {entry['goal_id'] for entry in chunk}], [(*key, progress_id) for key, progress_id in ids.items() if key[0] in {entry['goal_id'] for entry in chunk}])
+	]
+	goal_repository = MagicMock()
+	repository = ProgressesRepository(database=database, goal_repository=goal_repository)
+
+	progress_ids = repository.create_progress_batch(progresses=(entry for entry in entries), chunk_size=2)
+
+	assert [len(call.args[1]) for call in cursor.executemany.call_args_list] == [2, 2, 1]
+	assert database.unit_of_work.call_count == 3
+	assert [call.kwargs['ticks'] for call in goal_repository.update_due_windows.call_args_list] == [[(entry['goal_id'], entry['occurence_date']) for entry in chunk] for chunk in chunks]
+	assert progress_ids == [100, 101, 102, 103, 104]
+
+
+
+def test_create_progress_batch_streams_entries_to_the_repository(progresses_service, mock_progress_repo, mock_goal_service):
+	"""
+	Test that the service passes a streamed batch through to the repository, which moves the tick windows chunk by chunk.
+	"""
+	occurence_date = datetime.datetime(2025, 3, 3, 9, 0)
+	entries = ({'goal_id': goal_id, 'occurence_date': occurence_date} for goal_id in (10, 11, 12))
+	mock_progress_repo.create_progress_batch.side_effect = lambda progresses, chunk_size: [progress['goal_id'] * 10 for progress in progresses]
+
+	progress_ids = progresses_service.create_progress_batch(entries, chunk_size=500)
+
+	assert progress_ids == [100, 110, 120]
+	assert mock_progress_repo.create_progress_batch.call_args.kwargs['chunk_size'] == 500
+	mock_goal_service.update_due_windows.assert_not_called()
@@ -1,9 +1,10 @@
-from datetime import datetime, timedelta
 from apps.goals.services.goal_service import GoalService
+from apps.utils.tracing import traced
 from mysql.connector.errors import IntegrityError
 import logging
 
 def handle_reminder_service_exceptions(f):
+	f = traced('service')(f)
 	def wrapper(*args, **kwargs):
 		try:
 			return f(*args, **kwargs)
@@ -23,77 +24,24 @@ class ReminderService:
 	
 
 
-	@handle_reminder_service_exceptions
-	def calculate_tickability(self, last_occurence_datetime, current_time, time_delta_difference):
-		"""
-		Determines whether a habit/goal is currently 'tickable', if 
-		it is within the valid window to record progress.
-
-		Args:
-			last_occurence_datetime (datetime): The datetime of the last occurrence or progress.
-			current_time (datetime): The current system time.
-			time_delta_difference (timedelta): The standard interval (daily or weekly) for completion.
-
-		Returns:
-			bool: True if it is currently acceptable to record progress, False otherwise.
-		"""
-		time_between_last_occurrence_and_now = current_time - last_occurence_datetime
-		absolute_time_difference = abs(time_between_last_occurrence_and_now.total_seconds())
-		is_too_early = (absolute_time_difference < time_delta_difference.total_seconds())
-		is_too_late = (absolute_time_difference > time_delta_difference.total_seconds() * 2)
- 
-		return not (is_too_early or is_too_late)
-		
-
-
-	@handle_reminder_service_exceptions
-	def is_tickable(self, daily_or_weekly, last_occurence):
-		"""
-		Determines if the given goal (daily or weekly) can be ticked now 
-		based on the last recorded occurrence.
-
-		Args:
-			daily_or_weekly (int): An integer signifying daily (1) or weekly (7).
-			last_occurence (dict): A dictionary containing the last occurrence info 
-				for the goal, including 'occurence_date'.
-
-		Returns:
-			bool: True if the goal can be ticked, otherwise False.
-		"""
-		if len(last_occurence) == 0:
-			return True
-		
-		current_time = datetime.now()
-		last_occurence_datetime = last_occurence['occurence_date']
-		td = timedelta(hours=24) if daily_or_weekly == 1 else timedelta(weeks=1)
-		return self.calculate_tickability(last_occurence_datetime, current_time, td)
-
-
-
 	@handle_reminder_service_exceptions
 	def get_pending_goals(self):
 		"""
-		Retrieves all goals from the GoalService, checks whether each goal 
-		is 'tickable', and prints reminders for those that are pending.
+		Retrieves the goals whose tick window is open, never ticked goals
+		included, with a single range query on their precomputed
+		next_due_at/expires_at window, and prints reminders for them.
 
 		Raises:
 			Exception: For any unexpected errors during the reminder process.
 		"""
-		all_goals = self._goal_service.query_all_goals()
+		tickable_goals = self._goal_service.query_tickable_goals()
 		goals_which_need_reminders = []
-		for goal in all_goals:
-			last_occurence = self._goal_service.get_last_progress_entry_associated_with_goal_id(goal['goal_id'])
-			daily_or_weekly = 1 if goal	['target_kvi_value'] == 1.0 else 7
-			is_tickable = self.is_tickable(daily_or_weekly, last_occurence)
-
-			if is_tickable == False:
-				continue
-
+		for goal in tickable_goals:
 			goals_which_need_reminders.append({
 				'goal_id': goal['goal_id'],
 				'goal_name': goal['goal_name'],
 				'habit_id': goal['habit_id'],
-				'print_message': is_tickable
+				'print_message': True
 				})
 		self.print_reminders(goals_which_need_reminders)
 
@@ -1,5 +1,4 @@
 import pytest
-from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 from apps.reminders.services.reminder_service import ReminderService
@@ -31,95 +30,35 @@ def reminder_service(mock_goal_service):
  
 
 
-def test_calculate_tickability_too_early(reminder_service):
-	"""
-	Test that when the elapsed time is less than the delta, the method returns False.
-	"""
-	now = datetime(2025, 3, 15, 12, 0, 0)   
-	last_occurrence = now - timedelta(hours=1)
-	td_24_hours = timedelta(hours=24)
-
-	result = reminder_service.calculate_tickability(
-		last_occurence_datetime=last_occurrence,
-		current_time=now,
-		time_delta_difference=td_24_hours
-	)
-	assert result is False
-  
-
-	
-def test_calculate_tickability_within_window(reminder_service):
-	"""
-	Test that when elapsed time is between delta and 2*delta, returns True.
-	"""
-	now = datetime(2025, 3, 15, 12, 0, 0)
-	last_occurrence = now - timedelta(hours=25) 
-	td_24_hours = timedelta(hours=24)
-	result = reminder_service.calculate_tickability(
-		last_occurence_datetime=last_occurrence,
-		current_time=now,
-		time_delta_difference=td_24_hours
-	)
-	assert result is True
-
-
-
-def test_calculate_tickability_too_late(reminder_service):
-	"""
-	Test that when elapsed time exceeds 2*delta, returns False.
-	"""
-	now = datetime(2025, 3, 15, 12, 0, 0)
-	last_occurrence = now - timedelta(hours=50)
-	td_24_hours = timedelta(hours=24)
-
-	result = reminder_service.calculate_tickability(
-		last_occurence_datetime=last_occurrence,
-		current_time=now,
-		time_delta_difference=td_24_hours
-	)
-	assert result is False
-
-
-
-def test_is_tickable_no_history(reminder_service):
+@patch("builtins.print")
+def test_get_pending_goals_some_goals(mock_print, reminder_service, mock_goal_service):
 	"""
-	If last_occurrence dict is empty, is_tickable should return True immediately.
+	Test that get_pending_goals prints a header and each goal needing a reminder.
 	"""
-	assert reminder_service.is_tickable(daily_or_weekly=1, last_occurence={}) is True
-
+	mock_goal_service.query_tickable_goals.return_value = [
+		{"goal_id": 1, "goal_name": "pushups", "habit_id": 80, "target_kvi_value": 1.0, "occurence_date": None, "next_due_at": None, "expires_at": None},
+		{"goal_id": 2, "goal_name": "reading", "habit_id": 11, "target_kvi_value": 1.0, "occurence_date": None, "next_due_at": None, "expires_at": None},
+	]
 
+	reminder_service.get_pending_goals()
 
-def test_is_tickable_with_history(reminder_service):
-	"""
-	Test that is_tickable returns True when history is present and within the valid window.
-	"""
-	now = datetime(2025, 3, 15, 12, 0, 0)
-	last_occ = {
-		'occurence_date': now - timedelta(hours=30)
-	}
+	mock_print.assert_any_call("\033[91mGOALS THAT NEED TO BE TICKED\033[0m")
+	assert mock_print.call_count >= 3 
+	mock_goal_service.get_last_progress_entry_associated_with_goal_id.assert_not_called()
 
-	with patch("apps.reminders.services.reminder_service.datetime") as mock_datetime:
-		mock_datetime.now.return_value = now
-		result = reminder_service.is_tickable(daily_or_weekly=1, last_occurence=last_occ)
-		assert result is True
 
 
 @patch("builtins.print")
-def test_get_pending_goals_some_goals(mock_print, reminder_service, mock_goal_service):
+def test_get_pending_goals_uses_the_tick_window_range_query(mock_print, reminder_service, mock_goal_service):
 	"""
-	Test that get_pending_goals prints a header and each goal needing a reminder.
+	Test that pending goals come from the tick window range query, without scanning every goal.
 	"""
-	mock_goal_service.query_all_goals.return_value = [
-		{"goal_id": 1, "goal_name": "pushups", "habit_id": 80, "target_kvi_value": 1.0},
-		{"goal_id": 2, "goal_name": "reading", "habit_id": 11, "target_kvi_value": 1.0},
-	]
-
-	mock_goal_service.get_last_progress_entry_associated_with_goal_id.return_value = {}
+	mock_goal_service.query_tickable_goals.return_value = []
 
 	reminder_service.get_pending_goals()
 
-	mock_print.assert_any_call("\033[91mGOALS THAT NEED TO BE TICKED\033[0m")
-	assert mock_print.call_count >= 3 
+	mock_goal_service.query_tickable_goals.assert_called_once_with()
+	mock_print.assert_called_once_with("\033[92mNo pending goals to complete!\033[0m")
 
 
 
@@ -128,7 +67,7 @@ def test_get_pending_goals_no_goals(mock_print, reminder_service, mock_goal_serv
 	"""
 	Test that get_pending_goals prints 'No pending goals' when there are none.
 	"""
-	mock_goal_service.query_all_goals.return_value = []
+	mock_goal_service.query_tickable_goals.return_value = []
 
 	reminder_service.get_pending_goals()
 	mock_print.assert_called_once_with("\033[92mNo pending goals to complete!\033[0m")
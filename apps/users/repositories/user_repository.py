@@ -1,4 +1,8 @@
-from apps.database.database_manager import MariadbConnection
+from contextlib import contextmanager
+from apps.database.database_manager import MariadbConnection, STREAM_BATCH, stream_rows
+from apps.database.instrumentation import instrument_repository_call
+from apps.utils.scoped_calls import call_within
+from apps.database.pagination import DEFAULT_PAGE_SIZE, keyset_page, keyset_query
 from mysql.connector.errors import IntegrityError
 
 
@@ -35,18 +39,22 @@ class AlreadyExistError(UserRepositoryError):
 
 def handle_user_repository_errors(f):
 	'''A decorator to make exceptions in database errors cleaner.'''
-	def exception_wrapper(self, *args, **kwargs):
+	f = instrument_repository_call(f)
+	@contextmanager
+	def handling_errors(self, args, kwargs):
 		try:
-			return f(self, *args, **kwargs)
+			yield
 		except IntegrityError as ierror:
-			self._db._connection.rollback()
+			self._db.rollback()
 			user_identifier = args[0] if args else "unknown"
 			raise AlreadyExistError(user_identifier) from ierror
 		except UserRepositoryError as urerror:
 			raise urerror
 		except Exception as error:
-			self._db._connection.rollback()
+			self._db.rollback()
 			raise error
+	def exception_wrapper(self, *args, **kwargs):
+		return call_within(handling_errors(self, args, kwargs), f, self, *args, **kwargs)
 
 	return exception_wrapper		
 		
@@ -134,7 +142,7 @@ class UserRepository:
 				return role[0]
 			query = "INSERT INTO app_users_role(user_role) VALUES (%s);"
 			cursor.execute(query, (user_role,))
-			self._db._connection.commit()
+			self._db.commit()
 			return user_role 
 
 
@@ -161,7 +169,7 @@ class UserRepository:
 			user_role_id = self.create_a_role(user_role)
 			query = "INSERT INTO app_users(user_name, user_age, user_gender, user_role_id, created_at) VALUES (%s, %s, %s, %s, NOW());"
 			cursor.execute(query, (user_name, user_age, user_gender, user_role_id))
-			self._db._connection.commit()
+			self._db.commit()
 			return {
 				'user_id': cursor.lastrowid,
 				'user_name': user_name,
@@ -184,8 +192,7 @@ class UserRepository:
 		Raises:
 			UserNotFoundError: If the user doesn't exist.
 		"""
-		try:
-			self._db._connection.autocommit = False
+		with self._db.unit_of_work():
 			with self._db._connection.cursor() as cursor:
 				query_habit = "DELETE FROM habits WHERE habit_user_id = %s";
 				cursor.execute(query_habit, (user_id,))
@@ -195,10 +202,7 @@ class UserRepository:
 
 				if cursor.rowcount == 0:
 					raise UserNotFoundError(user_id)
-				self._db._connection.commit()
 				return cursor.rowcount
-		finally:
-			self._db._connection.autocommit = True
 
 
 
@@ -249,7 +253,7 @@ class UserRepository:
 		
 		with self._db._connection.cursor() as cursor:
 			cursor.execute(query, updated_vals)
-			self._db._connection.commit()
+			self._db.commit()
 			
 			if cursor.rowcount == 0:
 				raise UserNotFoundError(user_name)
@@ -303,6 +307,45 @@ class UserRepository:
 				return []
 
 
+
+	@handle_user_repository_errors
+	def iter_all_user_data(self, batch_size=STREAM_BATCH):
+		"""
+		Streams all users, batch_size rows per round trip, so listing any amount of
+		users needs constant memory. Consume or close the iterator before the next query.
+
+		Args:
+			batch_size (int, optional): Rows fetched per round trip. Defaults to STREAM_BATCH.
+
+		Returns:
+			iterator: Tuples of (user_id, user_name).
+		"""
+		query = "SELECT user_id, user_name FROM app_users;"
+		return stream_rows(self._db, query, batch_size=batch_size)
+
+
+
+	@handle_user_repository_errors
+	def get_users_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of users ordered by user_id, with keyset pagination,
+		so every page is an index seek however deep it lies.
+
+		Args:
+			page_size (int, optional): Users per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): (user_id,) of the last user shown, for the next page.
+			before (tuple, optional): (user_id,) of the first user shown, for the previous page.
+
+		Returns:
+			dict: 'rows' of (user_id, user_name) tuples, 'next_cursor' and 'previous_cursor', see keyset_page.
+		"""
+		query, params = keyset_query("SELECT user_id, user_name FROM app_users", ("user_id",), page_size=page_size, after=after, before=before)
+		with self._db._connection.cursor() as cursor:
+			cursor.execute(query, params)
+			return keyset_page(cursor.fetchall(), (0,), page_size=page_size, after=after, before=before)
+
+
+
 	@handle_user_repository_errors
 	def query_user_and_related_habits(self):
 		"""
@@ -322,5 +365,20 @@ class UserRepository:
 				return result
 			else:
 				return []
-			
 
+
+
+	@handle_user_repository_errors
+	def iter_user_and_related_habits(self, batch_size=STREAM_BATCH):
+		"""
+		Streams the users joined with their habits, batch_size rows per round trip.
+		Consume or close the iterator before the next query.
+
+		Args:
+			batch_size (int, optional): Rows fetched per round trip. Defaults to STREAM_BATCH.
+
+		Returns:
+			iterator: Tuples of (user_name, user_id, habit_id, habit_name, habit_action).
+		"""
+		query = "SELECT app_users.user_name, app_users.user_id, habits.habit_id, habits.habit_name, habits.habit_action FROM habits INNER JOIN app_users ON habits.habit_user_id=app_users.user_id;"
+		return stream_rows(self._db, query, batch_size=batch_size)
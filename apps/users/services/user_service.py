@@ -1,11 +1,17 @@
+from contextlib import contextmanager
 from apps.users.repositories.user_repository import UserRepository, UserRepositoryError, UserNotFoundError, RoleCreationError, AlreadyExistError
+from apps.database.pagination import DEFAULT_PAGE_SIZE
+from apps.utils.scoped_calls import call_within
+from apps.utils.tracing import traced
 import logging
 
 def handle_log_service_exceptions(f):
 	'''A decorator to log exceptions in the service layer.'''
-	def exception_wrapper(self, *args, **kwargs):
+	f = traced('service')(f)
+	@contextmanager
+	def handling_errors():
 		try:
-			return f(self, *args, **kwargs)
+			yield
 		except ValueError as verror:
 			logging.error(f"Service error in user_service from function {f.__name__}: {verror}")
 			raise verror
@@ -15,6 +21,8 @@ def handle_log_service_exceptions(f):
 		except Exception as error:
 			logging.error(f"Service error in user_service from function {f.__name__}: {error}")
 			raise error
+	def exception_wrapper(self, *args, **kwargs):
+		return call_within(handling_errors(), f, self, *args, **kwargs)
 	return exception_wrapper
 
 
@@ -215,6 +223,35 @@ class UserService:
 
 
 
+	@handle_log_service_exceptions
+	def iter_all_user_data(self):
+		"""
+		Streams all users (user_id, user_name) instead of loading them at once.
+
+		Returns:
+			iterator: User records (tuples).
+		"""
+		return self._repository.iter_all_user_data()
+
+
+
+	@handle_log_service_exceptions
+	def get_users_page(self, page_size=DEFAULT_PAGE_SIZE, after=None, before=None):
+		"""
+		Retrieves one page of users (user_id, user_name), ordered by user ID.
+
+		Args:
+			page_size (int, optional): Users per page. Defaults to DEFAULT_PAGE_SIZE.
+			after (tuple, optional): next_cursor of the current page, for the next page.
+			before (tuple, optional): previous_cursor of the current page, for the previous page.
+
+		Returns:
+			dict: The page's rows, next_cursor and previous_cursor.
+		"""
+		return self._repository.get_users_page(page_size=page_size, after=after, before=before)
+
+
+
 	@handle_log_service_exceptions
 	def query_user_and_related_habits(self) -> list:
 		"""
@@ -225,4 +262,16 @@ class UserService:
 					e.g., (user_name, user_id, habit_id, habit_name, habit_action).
 		"""
 		inner_joined_user_and_related_habits = self._repository.query_user_and_related_habits()
-		return inner_joined_user_and_related_habits
\ No newline at end of file
+		return inner_joined_user_and_related_habits
+
+
+
+	@handle_log_service_exceptions
+	def iter_user_and_related_habits(self):
+		"""
+		Streams all users joined with their habits instead of loading them at once.
+
+		Returns:
+			iterator: Tuples of (user_name, user_id, habit_id, habit_name, habit_action).
+		"""
+		return self._repository.iter_user_and_related_habits()
@@ -23,6 +23,8 @@ class EnvManager(metaclass=SingletonMeta):
 		else:
 			pass
 		environ.Env.read_env(env_file=location)
+		#a relative log path is taken from the project root, wherever the application is started from
+		slow_query_log = env("MARIADB_SLOW_QUERY_LOG", default=None)
 		
 		return {
 			"ENGINE": "django.db.backends.mysql",
@@ -30,7 +32,14 @@ class EnvManager(metaclass=SingletonMeta):
 			"USER": env("MARIADB_USER"), 
 			"PASSWORD": env("MARIADB_PASSWORD"),
 			"HOST": env("MARIADB_HOST", default="127.0.0.1"),
-			"PORT": env("MARIADB_PORT", default="5000")
+			"PORT": env("MARIADB_PORT", default="5000"),
+			"POOL_SIZE": env.int("MARIADB_POOL_SIZE", default=5),
+			"POOL_TIMEOUT": env.float("MARIADB_POOL_TIMEOUT", default=30.0),
+			"SLOW_QUERY_LOG": str(BASE_DIR / slow_query_log) if slow_query_log else None,
+			"SLOW_QUERY_MS": env.float("MARIADB_SLOW_QUERY_MS", default=200.0),
+			"SLOW_QUERY_LOG_MAX_BYTES": env.int("MARIADB_SLOW_QUERY_LOG_MAX_BYTES", default=5 * 1024 * 1024),
+			"SLOW_QUERY_LOG_BACKUPS": env.int("MARIADB_SLOW_QUERY_LOG_BACKUPS", default=3),
+			"SLOW_QUERY_EXPLAIN": env.bool("MARIADB_SLOW_QUERY_EXPLAIN", default=True)
 		}
 
 
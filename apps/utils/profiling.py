@@ -0,0 +1,192 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+
+#path fragments deciding which subsystem a function or allocation site belongs to, first match wins
+SUBSYSTEMS = (
+	('repositories', ('/repositories/', '/apps/database/', '/mysql/connector/')),
+	('domain', ('/domain/', '/services/', '/orchestrators/', '/facades/', '/controllers/')),
+	('cli rendering', ('/cli.py', '/click/')),
+)
+OTHER_SUBSYSTEM = 'other'
+
+
+
+def subsystem_of(filename):
+	"""
+	Returns the subsystem a source file belongs to.
+
+	Args:
+		filename (str): The path of the source file.
+
+	Returns:
+		str: 'repositories', 'domain', 'cli rendering' or 'other'.
+	"""
+	path = filename.replace(os.sep, '/')
+	for subsystem, fragments in SUBSYSTEMS:
+		if any(fragment in path for fragment in fragments):
+			return subsystem
+	return OTHER_SUBSYSTEM
+
+
+
+class SessionProfiler:
+	"""
+	Runs a CLI session, or a single command, under cProfile and/or tracemalloc and writes the
+	reports to a directory once it stops:
+
+		profile.pstats            raw cProfile statistics, for pstats, snakeviz or gprof2dot
+		profile_cumulative.txt    functions sorted by cumulative time
+		profile_tottime.txt       functions sorted by their own time
+		profile_subsystems.txt    own time per subsystem and its most expensive functions
+		memory.snapshot           raw tracemalloc snapshot, to compare runs with Snapshot.compare_to
+		memory_allocations.txt    peak memory, top allocation sites overall and per subsystem
+
+	Usable as a context manager, the reports are also written when the session ends through sys.exit.
+	"""
+	def __init__(self, directory, cpu=False, memory=False, top=30, memory_frames=10):
+		if not cpu and not memory:
+			raise ValueError("Enable cpu and/or memory profiling.")
+
+		self._directory = directory
+		self._cpu = cpu
+		self._memory = memory
+		self._top = top
+		self._memory_frames = memory_frames
+		self._profiler = None
+		self._started_at = None
+
+
+
+	def __enter__(self):
+		self.start()
+		return self
+
+
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+		return False
+
+
+
+	def start(self):
+		"""Starts tracing memory allocations and/or profiling function calls."""
+		os.makedirs(self._directory, exist_ok=True)
+		self._started_at = time.perf_counter()
+		if self._memory:
+			tracemalloc.start(self._memory_frames)
+		if self._cpu:
+			self._profiler = cProfile.Profile()
+			self._profiler.enable()
+
+
+
+	def stop(self):
+		"""
+		Stops profiling and writes the reports.
+
+		Returns:
+			list: The paths of the written reports.
+		"""
+		written = []
+		if self._profiler is not None:
+			self._profiler.disable()
+			written += self._write_cpu_reports(self._profiler)
+			self._profiler = None
+
+		if self._memory and tracemalloc.is_tracing():
+			snapshot = tracemalloc.take_snapshot()
+			current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+			written += self._write_memory_reports(snapshot, current_bytes, peak_bytes)
+
+		return written
+
+
+
+	def _write_cpu_reports(self, profiler):
+		stats_path = os.path.join(self._directory, 'profile.pstats')
+		profiler.dump_stats(stats_path)
+		written = [stats_path]
+
+		for sort_key, file_name in (('cumulative', 'profile_cumulative.txt'), ('tottime', 'profile_tottime.txt')):
+			stream = io.StringIO()
+			pstats.Stats(profiler, stream=stream).sort_stats(sort_key).print_stats(self._top)
+			written.append(self._write(file_name, stream.getvalue()))
+
+		totals = {}
+		functions = {}
+		for (filename, line_number, function_name), (_, calls, own_time, cumulative_time, _) in pstats.Stats(profiler).stats.items():
+			subsystem = subsystem_of(filename)
+			totals[subsystem] = totals.get(subsystem, 0.0) + own_time
+			functions.setdefault(subsystem, []).append((own_time, cumulative_time, calls, f"{filename}:{line_number}({function_name})"))
+
+		lines = [f"Session wall time: {time.perf_counter() - self._started_at:.3f} s", "", "Own time per subsystem:"]
+		for subsystem, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+			lines.append(f"  {subsystem:<15} {seconds:10.4f} s")
+		for subsystem, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+			lines += ["", f"{subsystem}: most expensive functions by own time", f"  {'own s':>10} {'cum s':>10} {'calls':>8}  function"]
+			for own_time, cumulative_time, calls, function in sorted(functions[subsystem], reverse=True)[:self._top]:
+				lines.append(f"  {own_time:10.4f} {cumulative_time:10.4f} {calls:8d}  {function}")
+		written.append(self._write('profile_subsystems.txt', "\n".join(lines) + "\n"))
+		return written
+
+
+
+	def _write_memory_reports(self, snapshot, current_bytes, peak_bytes):
+		snapshot = snapshot.filter_traces((
+			tracemalloc.Filter(False, tracemalloc.__file__),
+			tracemalloc.Filter(False, __file__),
+			tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+			tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+		))
+		snapshot_path = os.path.join(self._directory, 'memory.snapshot')
+		snapshot.dump(snapshot_path)
+
+		#an allocation counts for the subsystem of the innermost frame that belongs to one,
+		#e.g. a string built by the MySQL driver for a repository counts for the repositories
+		totals = {}
+		sites = {}
+		for statistic in snapshot.statistics('traceback'):
+			subsystem, frame = OTHER_SUBSYSTEM, statistic.traceback[-1]
+			for candidate in reversed(statistic.traceback):
+				if subsystem_of(candidate.filename) != OTHER_SUBSYSTEM:
+					subsystem, frame = subsystem_of(candidate.filename), candidate
+					break
+			size, count = totals.get(subsystem, (0, 0))
+			totals[subsystem] = (size + statistic.size, count + statistic.count)
+			site = f"{frame.filename}:{frame.lineno}"
+			size, count = sites.setdefault(subsystem, {}).get(site, (0, 0))
+			sites[subsystem][site] = (size + statistic.size, count + statistic.count)
+
+		lines = [
+			f"Traced memory at exit: {current_bytes / 1024:.1f} KiB, peak: {peak_bytes / 1024:.1f} KiB",
+			"",
+			"Top allocation sites:",
+		]
+		for statistic in snapshot.statistics('lineno')[:self._top]:
+			frame = statistic.traceback[0]
+			lines.append(f"  {statistic.size / 1024:10.1f} KiB {statistic.count:8d} blocks  {frame.filename}:{frame.lineno}")
+
+		lines += ["", "Allocated memory per subsystem:"]
+		for subsystem, (size, count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+			lines.append(f"  {subsystem:<15} {size / 1024:10.1f} KiB {count:8d} blocks")
+		for subsystem, (size, _) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+			lines += ["", f"{subsystem}: top allocation sites"]
+			for site, (size, count) in sorted(sites[subsystem].items(), key=lambda item: item[1][0], reverse=True)[:self._top]:
+				lines.append(f"  {size / 1024:10.1f} KiB {count:8d} blocks  {site}")
+
+		return [snapshot_path, self._write('memory_allocations.txt', "\n".join(lines) + "\n")]
+
+
+
+	def _write(self, file_name, content):
+		path = os.path.join(self._directory, file_name)
+		with open(path, "w", encoding="utf-8") as report:
+			report.write(content)
+		return path
@@ -0,0 +1,33 @@
+import inspect
+from contextlib import ExitStack
+
+
+
+def call_within(scope, f, *args, **kwargs):
+	"""
+	Calls a function within a context manager, e.g. a span or the error handling of a decorator.
+
+	A function returning a generator, like the streaming listings of the repositories, runs its
+	query only once the generator is iterated. The scope is then kept open until the generator
+	is exhausted, closed or raises, so it covers the iteration and not just the call creating it.
+
+	Args:
+		scope (context manager): The context to run the call in.
+		f (callable): The function to call.
+
+	Returns:
+		Any: Whatever f returns, a generator wrapped so it is iterated within the scope.
+	"""
+	with ExitStack() as stack:
+		stack.enter_context(scope)
+		result = f(*args, **kwargs)
+		if inspect.isgenerator(result):
+			return iterate_within(stack.pop_all(), result)
+		return result
+
+
+
+def iterate_within(scope, rows):
+	"""Yields the items of a generator, leaving an already entered scope once the generator is done."""
+	with scope:
+		yield from rows
@@ -1,12 +1,18 @@
+import threading
+
+
 class SingletonMeta(type):
 	'''
-	A Singleton metaclass that ensures a class has only one instance.
+	A thread-safe Singleton metaclass that ensures a class has only one instance.
+	The lock is reentrant, so a singleton may build other singletons in its __init__.
 	'''
 	_instances = {}
+	_lock = threading.RLock()
 
 	def __call__(cls, *args, **kwargs):
 		if cls not in cls._instances:
-			instance = super().__call__(*args, **kwargs)
-			cls._instances[cls] = instance
+			with cls._lock:
+				if cls not in cls._instances:
+					instance = super().__call__(*args, **kwargs)
+					cls._instances[cls] = instance
 		return cls._instances[cls]
-
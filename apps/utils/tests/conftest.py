@@ -0,0 +1,2 @@
+#the scripted connection and the facade built on it are shared with the database tests
+from apps.database.tests.conftest import habit_tracker_facade, tickable_goal_script
@@ -0,0 +1,52 @@
+import pytest
+
+from apps.utils.profiling import SessionProfiler, subsystem_of
+
+
+def test_subsystem_of_source_files():
+	"""
+	Test that source files are attributed to the repositories, domain and CLI rendering subsystems.
+	"""
+	assert subsystem_of("/app/apps/goals/repositories/goal_repository.py") == 'repositories'
+	assert subsystem_of("/venv/site-packages/mysql/connector/cursor.py") == 'repositories'
+	assert subsystem_of("/app/apps/goals/domain/goal_subject.py") == 'domain'
+	assert subsystem_of("/app/apps/core/orchestrators/habit_orchestrator.py") == 'domain'
+	assert subsystem_of("/app/cli.py") == 'cli rendering'
+	assert subsystem_of("/usr/lib/python3.11/json/encoder.py") == 'other'
+
+
+
+def test_profiled_tick_writes_reports_per_subsystem(tmp_path, habit_tracker_facade):
+	"""
+	Test profiling one tick with cProfile and tracemalloc.
+
+	Given:
+		- A tickable goal behind the real facade, services and repositories.
+	When:
+		- The tick runs inside a SessionProfiler with cpu and memory profiling enabled.
+	Then:
+		- The raw statistics, the sorted reports and the per subsystem reports are written,
+		  and the repositories and domain subsystems show up in them.
+	"""
+	facade, _ = habit_tracker_facade
+
+	with SessionProfiler(directory=str(tmp_path), cpu=True, memory=True):
+		facade.complete_a_habit(habit_id=1, goal_id=10)
+
+	written = {path.name for path in tmp_path.iterdir()}
+	assert written == {'profile.pstats', 'profile_cumulative.txt', 'profile_tottime.txt', 'profile_subsystems.txt', 'memory.snapshot', 'memory_allocations.txt'}
+
+	subsystems = (tmp_path / 'profile_subsystems.txt').read_text()
+	assert "repositories: most expensive functions by own time" in subsystems
+	assert "domain: most expensive functions by own time" in subsystems
+	assert "complete_a_habit" in (tmp_path / 'profile_cumulative.txt').read_text()
+	assert "repositories: top allocation sites" in (tmp_path / 'memory_allocations.txt').read_text()
+
+
+
+def test_session_profiler_needs_a_mode(tmp_path):
+	"""
+	Test that a SessionProfiler without cpu or memory profiling is rejected.
+	"""
+	with pytest.raises(ValueError):
+		SessionProfiler(directory=str(tmp_path))
@@ -0,0 +1,102 @@
+import json
+import pytest
+
+from apps.core.controllers.habit_controller import HabitController
+from apps.database.instrumentation import InstrumentedConnection
+from apps.utils.tracing import Tracer
+
+
+@pytest.fixture
+def tracer():
+	"""
+	Fixture returning the Tracer, emptied and enabled for the test and disabled afterwards.
+
+	Returns:
+		Tracer: The tracer singleton.
+	"""
+	tracer = Tracer()
+	tracer.reset()
+	tracer.enable()
+	yield tracer
+	tracer.disable()
+	tracer.reset()
+
+
+
+@pytest.fixture
+def habit_controller(habit_tracker_facade):
+	"""
+	Fixture building a HabitController on the scripted facade, with instrumented cursors so SQL statements are traced.
+
+	Returns:
+		tuple: The controller and the scripted connection.
+	"""
+	facade, connection = habit_tracker_facade
+	facade._database._pool._connection_factory = lambda: InstrumentedConnection(connection)
+	return HabitController(habit_tracker_facade=facade, habit_tracker_orchestrator=facade._habit_orchestrator), connection
+
+
+
+def contains(outer, inner):
+	return outer['tid'] == inner['tid'] and outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+
+
+def test_tick_is_traced_through_every_layer(tracer, habit_controller):
+	"""
+	Test that one tick produces nested spans from the controller down to every SQL statement.
+
+	Given:
+		- Tracing enabled and a tickable goal behind the real facade, services and repositories.
+	When:
+		- The controller completes the habit.
+	Then:
+		- Controller, facade, orchestrator, domain, observer, service, repository and db spans are recorded,
+		  each layer nested in the one above it, with one db span per statement.
+	"""
+	controller, connection = habit_controller
+
+	controller.complete_a_habit(habit_id=1, goal_id=10)
+
+	events = tracer.events()
+	spans = {event['cat']: [span for span in events if span['cat'] == event['cat']] for event in events}
+	assert {'controller', 'facade', 'orchestrator', 'domain', 'observer', 'service', 'repository', 'db'} <= spans.keys()
+	assert len(spans['db']) == len(connection.statements)
+
+	[controller_span] = spans['controller']
+	[orchestrator_span] = spans['orchestrator']
+	assert contains(controller_span, spans['facade'][0]) and contains(spans['facade'][0], orchestrator_span)
+	assert all(contains(orchestrator_span, span) for span in spans['db'])
+	assert any(span['name'] == "ProgressObserver.update" for span in spans['observer'])
+	assert any(span['name'] == "GoalRepository.increment_current_kvi" for span in spans['repository'])
+
+
+
+def test_chrome_trace_export_and_category_totals(tracer, habit_controller, tmp_path):
+	"""
+	Test that the exported file is a Chrome trace whose exclusive category times add up to the outermost span.
+	"""
+	controller, _ = habit_controller
+	controller.complete_a_habit(habit_id=1, goal_id=10)
+
+	path = tracer.export_chrome_trace(str(tmp_path / "traces" / "tick.json"))
+
+	with open(path) as trace_file:
+		trace = json.load(trace_file)
+	assert trace['traceEvents'] and all(event['ph'] == 'X' for event in trace['traceEvents'])
+	totals = trace['otherData']['category_totals_ms']
+	[controller_span] = [event for event in trace['traceEvents'] if event['cat'] == 'controller']
+	assert sum(totals.values()) == pytest.approx(controller_span['dur'] / 1000)
+
+
+
+def test_disabled_tracer_records_nothing(habit_controller):
+	"""
+	Test that with tracing off, the instrumented layers record no spans.
+	"""
+	controller, _ = habit_controller
+	Tracer().reset()
+
+	controller.complete_a_habit(habit_id=1, goal_id=10)
+
+	assert Tracer().events() == []
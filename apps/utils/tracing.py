@@ -0,0 +1,183 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .scoped_calls import call_within
+from .singleton_meta import SingletonMeta
+
+
+
+class Tracer(metaclass=SingletonMeta):
+	"""
+	Collects nested timing spans across the layers of the application, from a CLI option down
+	to single SQL statements, and exports them as a Chrome trace (chrome://tracing, Perfetto).
+
+	Tracing is off until enable() is called. While it is off, span() and traced functions only
+	check a flag, so the instrumentation can stay in place in production code.
+	"""
+	def __init__(self):
+		self._enabled = False
+		self._lock = threading.Lock()
+		self._local = threading.local()
+		self._events = []
+		self._origin = time.perf_counter()
+
+
+
+	@property
+	def enabled(self):
+		return self._enabled
+
+
+
+	def enable(self):
+		"""Starts recording spans. Spans recorded earlier are kept."""
+		self._enabled = True
+
+
+
+	def disable(self):
+		"""Stops recording spans."""
+		self._enabled = False
+
+
+
+	def reset(self):
+		"""Forgets every recorded span."""
+		with self._lock:
+			self._events = []
+			self._origin = time.perf_counter()
+
+
+
+	@contextmanager
+	def span(self, name, category, **args):
+		"""
+		Times the enclosed block as one span, nested in the span that is open on the same thread.
+
+		Args:
+			name (str): The span name, e.g. the qualified name of the traced method.
+			category (str): The layer, e.g. 'cli', 'orchestrator', 'service', 'repository', 'db'.
+			**args: Extra values shown with the span in the trace viewer.
+		"""
+		if not self._enabled:
+			yield
+			return
+
+		depth = getattr(self._local, 'depth', 0)
+		self._local.depth = depth + 1
+		started_at = time.perf_counter()
+		try:
+			yield
+		finally:
+			ended_at = time.perf_counter()
+			self._local.depth = depth
+			event = {
+				'name': name,
+				'cat': category,
+				'ph': 'X',
+				'ts': (started_at - self._origin) * 1e6,
+				'dur': (ended_at - started_at) * 1e6,
+				'pid': os.getpid(),
+				'tid': threading.get_ident(),
+			}
+			if args:
+				event['args'] = {key: str(value) for key, value in args.items()}
+			with self._lock:
+				self._events.append(event)
+
+
+
+	def events(self):
+		"""Returns a copy of the recorded spans as Chrome trace 'complete' events."""
+		with self._lock:
+			return list(self._events)
+
+
+
+	def category_totals(self):
+		"""
+		Sums the exclusive time of the recorded spans per category: a span's duration minus the
+		durations of the spans directly nested in it, so every microsecond is counted once.
+
+		Returns:
+			dict: category -> milliseconds, largest first.
+		"""
+		totals = {}
+		events_by_thread = {}
+		for event in self.events():
+			events_by_thread.setdefault(event['tid'], []).append(event)
+
+		for events in events_by_thread.values():
+			events.sort(key=lambda event: (event['ts'], -event['dur']))
+			open_spans = []
+			for event in events:
+				while open_spans and event['ts'] >= open_spans[-1]['ts'] + open_spans[-1]['dur']:
+					open_spans.pop()
+				totals[event['cat']] = totals.get(event['cat'], 0.0) + event['dur']
+				if open_spans:
+					totals[open_spans[-1]['cat']] -= event['dur']
+				open_spans.append(event)
+
+		return {category: microseconds / 1000 for category, microseconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)}
+
+
+
+	def export_chrome_trace(self, path):
+		"""
+		Writes the recorded spans to a JSON file in the Chrome trace event format.
+
+		Args:
+			path (str): The trace file, its directory is created if missing.
+
+		Returns:
+			str: The path written to.
+		"""
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		with open(path, "w", encoding="utf-8") as trace:
+			json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms', 'otherData': {'category_totals_ms': self.category_totals()}}, trace)
+		return path
+
+
+
+	def wrap_function(self, owner, attribute, category):
+		"""
+		Replaces a function of a module or class with a traced version of itself, for code that
+		can not be decorated, e.g. click.echo to see how long terminal output takes.
+
+		Args:
+			owner (module or class): The owner of the function.
+			attribute (str): The function's name.
+			category (str): The category of its spans.
+		"""
+		function = getattr(owner, attribute)
+		if not getattr(function, '__traced__', False):
+			setattr(owner, attribute, traced(category, name=f"{getattr(owner, '__name__', owner)}.{attribute}")(function))
+
+
+
+def traced(category, name=None):
+	"""
+	Decorator recording every call of the function as a span of the given category.
+	If the function returns a generator, the span lasts until the generator is done.
+
+	Args:
+		category (str): The layer the function belongs to.
+		name (str, optional): The span name. Defaults to the function's qualified name.
+	"""
+	def decorator(f):
+		span_name = name or f.__qualname__
+		@functools.wraps(f)
+		def traced_call(*args, **kwargs):
+			tracer = Tracer()
+			if not tracer.enabled:
+				return f(*args, **kwargs)
+			return call_within(tracer.span(span_name, category), f, *args, **kwargs)
+		traced_call.__traced__ = True
+		return traced_call
+	return decorator
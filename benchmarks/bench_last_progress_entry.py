@@ -0,0 +1,65 @@
+"""
+Measures ProgressesRepository.get_last_progress_entry for goals with growing histories.
+
+With the (goal_id_id, occurence_date) index the latency should stay flat from a
+handful of rows to 100k+ rows per goal.
+
+Usage:
+	python -m benchmarks.bench_last_progress_entry [--sizes 10 1000 10000 100000] [--repeat 200]
+"""
+import argparse
+import datetime
+import random
+
+from benchmarks.common import time_call, create_benchmark_goal, drop_benchmark_user, print_results
+from apps.database.database_manager import MariadbConnection
+from apps.users.repositories.user_repository import UserRepository
+from apps.habits.repositories.habit_repository import HabitRepository
+from apps.goals.repositories.goal_repository import GoalRepository
+from apps.progresses.repositories.progress_repository import ProgressesRepository
+
+
+
+def insert_history(database: MariadbConnection, goal_id, amount_of_rows, batch_size=5000):
+	"""Inserts amount_of_rows daily progress rows, ending today, with executemany batches."""
+	today = datetime.datetime.now().replace(microsecond=0)
+	rows = [
+		(1.0, goal_id, 0.0, day + 1, 'bench_goal', 'bench_habit', today - datetime.timedelta(days=amount_of_rows - day, minutes=random.randint(0, 600)))
+		for day in range(amount_of_rows)
+	]
+	query = "INSERT INTO progresses(current_kvi_value, goal_id_id, distance_from_goal_kvi_value, current_streak, goal_name, habit_name, occurence_date) VALUES (%s, %s, %s, %s, %s, %s, %s);"
+	with database._connection.cursor() as cursor:
+		for start in range(0, len(rows), batch_size):
+			cursor.executemany(query, rows[start:start + batch_size])
+			database._connection.commit()
+
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark get_last_progress_entry against history length.")
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000, 100000])
+	parser.add_argument('--repeat', type=int, default=200)
+	args = parser.parse_args()
+
+	database = MariadbConnection()
+	user_repository = UserRepository(database)
+	habit_repository = HabitRepository(database, user_repository)
+	goal_repository = GoalRepository(database, habit_repository)
+	progress_repository = ProgressesRepository(database, goal_repository)
+
+	results = []
+	for size in args.sizes:
+		created = create_benchmark_goal(database, label=f"last_progress_{size}_{random.random():.6f}")
+		try:
+			insert_history(database, created['goal_id'], size)
+			stats = time_call(lambda: progress_repository.get_last_progress_entry(created['goal_id']), repeat=args.repeat)
+			results.append((f"{size} rows", stats))
+		finally:
+			drop_benchmark_user(database, created['user_id'])
+
+	print_results("get_last_progress_entry latency by history length", results)
+
+
+
+if __name__ == '__main__':
+	main()
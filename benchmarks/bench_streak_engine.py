@@ -0,0 +1,59 @@
+"""
+Measures the vectorized streak engine on synthetic progress logs of growing size.
+
+compute_streaks sorts once and then only does whole-array operations, so millions of
+progress rows should take seconds at most. With --from-database the configured
+database's own history is loaded and computed as well, which includes the transfer.
+
+Usage:
+	python -m benchmarks.bench_streak_engine [--rows 100000 1000000 5000000] [--repeat 3] [--from-database]
+"""
+import argparse
+import datetime
+import numpy as np
+
+from benchmarks.common import time_call, print_results
+from apps.analytics.domain.streak_engine import compute_streaks, to_day_number
+from apps.database.database_manager import MariadbConnection
+from apps.analytics.repositories.analytics_repository import AnalyticsRepository
+
+
+
+def synthetic_history(amount_of_rows, rows_per_habit=500, seed=42):
+	"""Builds an (n, 3) history of habits with one random tick per row over the last three years, a third of them weekly."""
+	generator = np.random.default_rng(seed)
+	habit_ids = generator.integers(1, max(2, amount_of_rows // rows_per_habit), size=amount_of_rows)
+	period_days = np.where(habit_ids % 3 == 0, 7, 1)
+	today = to_day_number(datetime.date.today())
+	day_numbers = today - generator.integers(0, 3 * 365, size=amount_of_rows)
+	return np.column_stack((habit_ids, period_days, day_numbers))
+
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the vectorized streak engine.")
+	parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 5000000])
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--from-database', action='store_true')
+	args = parser.parse_args()
+
+	today = to_day_number(datetime.date.today())
+	results = []
+	for amount_of_rows in args.rows:
+		history = synthetic_history(amount_of_rows)
+		stats = time_call(lambda: compute_streaks(history[:, 0], history[:, 1], history[:, 2], today), repeat=args.repeat, warmup=1)
+		results.append((f"{amount_of_rows} synthetic rows", stats))
+
+	if args.from_database:
+		database = MariadbConnection()
+		analytics_repository = AnalyticsRepository(database=database, habit_repository=None)
+		history = analytics_repository.load_progress_history()
+		results.append((f"{len(history)} rows, load", time_call(analytics_repository.load_progress_history, repeat=args.repeat, warmup=1)))
+		results.append((f"{len(history)} rows, compute", time_call(lambda: compute_streaks(history[:, 0], history[:, 1], history[:, 2], today), repeat=args.repeat, warmup=1)))
+
+	print_results("compute_streaks latency by progress log size", results)
+
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,89 @@
+"""
+Measures AnalyticsRepository.get_streak_statistics against the row-by-row average it replaced.
+
+The statistics are aggregated by MariaDB, so the client side memory and the amount of
+transferred rows stay constant, while fetching every streak into Python grows with
+the amount of habits.
+
+Usage:
+	python -m benchmarks.bench_streak_statistics [--habits 1000000] [--repeat 5]
+"""
+import argparse
+import random
+import tracemalloc
+
+from benchmarks.common import time_call, create_benchmark_goal, drop_benchmark_user, print_results
+from apps.database.database_manager import MariadbConnection
+from apps.analytics.repositories.analytics_repository import AnalyticsRepository
+
+
+
+def insert_habits(database: MariadbConnection, user_id, amount_of_habits, batch_size=10000):
+	"""Inserts amount_of_habits habits with random streaks for the benchmark user, with executemany batches."""
+	token = f"{random.getrandbits(24):06x}"
+	query = "INSERT INTO habits(habit_name, habit_action, habit_streak, habit_periodicity_type, habit_periodicity_value, habit_user_id, created_at) VALUES (%s, 'benchmark', %s, %s, %s, %s, NOW());"
+	with database._connection.cursor() as cursor:
+		for start in range(0, amount_of_habits, batch_size):
+			rows = []
+			for number in range(start, min(start + batch_size, amount_of_habits)):
+				periodicity_type = 'daily' if number % 3 else 'weekly'
+				streak = int(random.expovariate(1 / 20)) if random.random() < 0.8 else 0
+				rows.append((f"bs_{token}_{number}", streak, periodicity_type, 1 if periodicity_type == 'daily' else 7, user_id))
+			cursor.executemany(query, rows)
+			database._connection.commit()
+
+
+
+def average_by_fetching_rows(database: MariadbConnection, user_id):
+	"""The previous approach: fetch every streak and average it in Python."""
+	with database._connection.cursor() as cursor:
+		cursor.execute("SELECT habit_streak FROM habits WHERE habit_user_id = %s;", (user_id,))
+		streaks = cursor.fetchall()
+	return sum(streak[0] for streak in streaks) / len(streaks) if streaks else 0.0
+
+
+
+def peak_memory_kib(function):
+	"""Returns the peak Python allocation, in KiB, of one call of function."""
+	tracemalloc.start()
+	function()
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return peak / 1024.0
+
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark streak statistics aggregated in SQL against fetching every row.")
+	parser.add_argument('--habits', type=int, default=1000000)
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	database = MariadbConnection()
+	analytics_repository = AnalyticsRepository(database=database, habit_repository=None)
+
+	created = create_benchmark_goal(database, label=f"streak_statistics_{random.random():.6f}")
+	user_id = created['user_id']
+	try:
+		insert_habits(database, user_id, args.habits - 1)
+
+		cases = {
+			"fetch rows, average in python": lambda: average_by_fetching_rows(database, user_id),
+			"sql mean only": lambda: analytics_repository.get_streak_statistics(user_id=user_id, percentiles=()),
+			"sql mean and percentiles": lambda: analytics_repository.get_streak_statistics(user_id=user_id),
+			"sql daily, active only": lambda: analytics_repository.get_streak_statistics(user_id=user_id, periodicity_type='daily', active_only=True),
+		}
+
+		results = [(label, time_call(function, repeat=args.repeat, warmup=1)) for label, function in cases.items()]
+		print_results(f"streak statistics over {args.habits} habits", results)
+
+		print(f"\n{'case':<30} {'peak KiB':>10}")
+		for label, function in cases.items():
+			print(f"{label:<30} {peak_memory_kib(function):>10.1f}")
+	finally:
+		drop_benchmark_user(database, user_id)
+
+
+
+if __name__ == '__main__':
+	main()
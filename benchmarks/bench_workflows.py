@@ -0,0 +1,153 @@
+"""
+Measures the hot paths of the application end to end, from the controller down to MariaDB,
+on a seeded dataset of configurable scale, and writes the results as JSON.
+
+Read paths are timed first. complete_a_habit is timed last, once per goal that is due
+today, because a goal can only be ticked once per period. rebuild_analytics rewrites
+every analytics row of the database, not only the seeded ones, so it is only timed
+with --rebuild-analytics, on a database holding nothing but benchmark data.
+
+Usage:
+	python -m benchmarks.bench_workflows [--users 100] [--habits-per-user 5] [--days 180] [--repeat 30]
+		[--output results/HEAD.json] [--baseline results/main.json] [--threshold 0.10] [--rebuild-analytics]
+
+Results of two runs, e.g. of two commits, are compared with:
+	python -m benchmarks.compare results/main.json results/HEAD.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+
+from benchmarks.common import time_call, print_results, write_results, compare_results, print_comparison
+from apps.database.data_generator import generate_dataset, drop_dataset
+from apps.database.database_manager import MariadbConnection
+from main import build_habit_controller
+
+
+
+def quietly(function):
+	"""Wraps a callable so the terminal output of the CLI layers does not flood the benchmark output."""
+	def call():
+		with contextlib.redirect_stdout(io.StringIO()):
+			return function()
+	return call
+
+
+
+def dataset_ids(database, label):
+	"""Returns the habit and goal ids of a generated dataset."""
+	with database._connection.cursor() as cursor:
+		cursor.execute("SELECT h.habit_id, g.goal_id FROM habits h JOIN goals g ON g.habit_id_id = h.habit_id JOIN app_users u ON h.habit_user_id = u.user_id WHERE u.user_name LIKE %s ORDER BY h.habit_id;", (f"{label}\\_user%",))
+		rows = cursor.fetchall()
+	return {'habit_ids': [row[0] for row in rows], 'goal_ids': [row[1] for row in rows]}
+
+
+
+def benchmark_workflows(habit_controller, dataset, repeat, rng, rebuild_analytics=False):
+	"""
+	Times the hot paths on a seeded dataset.
+
+	Args:
+		habit_controller (HabitController): The controller of the full object graph.
+		dataset (dict): The ids returned by dataset_ids.
+		repeat (int): Measured calls per read path.
+		rng (random.Random): Picks the habits passed to single habit calls.
+		rebuild_analytics (bool, optional): Also time rebuild_analytics, which rewrites every analytics row. Defaults to False.
+
+	Returns:
+		list of tuple: (label, stats dict as returned by time_call).
+	"""
+	analytics_service = habit_controller._facade._analytics_service
+	habit_ids = dataset['habit_ids']
+	sample_habit_ids = rng.sample(habit_ids, min(len(habit_ids), 50))
+
+	read_paths = [
+		("fetch_ready_to_tick_goals", habit_controller.fetch_ready_to_tick_goals_of_habits),
+		("get_pending_goals", habit_controller.get_pending_goals),
+		("query_user_and_related_habits", habit_controller.query_user_and_related_habits),
+		("analytics.calculate_longest_streak", analytics_service.calculate_longest_streak),
+		("analytics.get_same_periodicity_type", analytics_service.get_same_periodicity_type_habits),
+		("analytics.get_currently_tracked", analytics_service.get_currently_tracked_habits),
+		("analytics.longest_streak_for_habit", lambda: analytics_service.longest_streak_for_habit(rng.choice(habit_ids))),
+		("analytics.average_streaks", analytics_service.average_streaks),
+		("analytics.get_streak_statistics", analytics_service.get_streak_statistics),
+		("analytics.get_all_habit_streaks", analytics_service.get_all_habit_streaks),
+		("analytics.compute_historical_streaks", lambda: analytics_service.compute_historical_streaks(habit_ids=sample_habit_ids)),
+		("analytics.get_analytics_id", lambda: analytics_service.get_analytics_id(rng.choice(habit_ids))),
+	]
+
+	results = []
+	for label, function in read_paths:
+		results.append((label, time_call(quietly(function), repeat=repeat)))
+		print(f"  {label}", file=sys.stderr)
+
+	#writes, record_completions and the ticks touch the benchmark's own habits only
+	results.append(("analytics.record_completions", time_call(lambda: analytics_service.record_completions([(rng.choice(habit_ids), 1, None)]), repeat=repeat)))
+	if rebuild_analytics:
+		results.append(("analytics.rebuild_analytics", time_call(analytics_service.rebuild_analytics, repeat=3, warmup=0)))
+
+	seeded_goal_ids = set(dataset['goal_ids'])
+	due_goals = [(goal['habit_id'], goal['goal_id']) for goal in habit_controller._facade.query_tickable_goals() if goal['goal_id'] in seeded_goal_ids]
+	if due_goals:
+		rng.shuffle(due_goals)
+		pending_ticks = iter(due_goals)
+		tick = quietly(lambda: habit_controller.complete_a_habit(*next(pending_ticks)))
+		results.append(("complete_a_habit", time_call(tick, repeat=min(repeat, len(due_goals)), warmup=0)))
+	else:
+		print("  no seeded goal is due today, complete_a_habit was skipped", file=sys.stderr)
+
+	return results
+
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the hot paths of the habit tracker on a seeded dataset.")
+	parser.add_argument('--users', type=int, default=100)
+	parser.add_argument('--habits-per-user', type=int, default=5)
+	parser.add_argument('--days', type=int, default=180, help="Days of progress history per habit.")
+	parser.add_argument('--repeat', type=int, default=30)
+	parser.add_argument('--workers', type=int, default=1, help="Worker processes seeding the dataset.")
+	parser.add_argument('--random-seed', type=int, default=42, help="Seeds the dataset and the picked habits, so runs on different commits see the same data.")
+	parser.add_argument('--output', metavar='JSON_FILE', help="Write the results to JSON_FILE.")
+	parser.add_argument('--baseline', metavar='JSON_FILE', help="Compare the results with an earlier run and exit with 1 on a regression.")
+	parser.add_argument('--threshold', type=float, default=0.10, help="Relative slowdown of the median counted as a regression (default 0.10).")
+	parser.add_argument('--keep', action='store_true', help="Keep the seeded dataset instead of dropping it afterwards.")
+	parser.add_argument('--rebuild-analytics', action='store_true', help="Also time rebuild_analytics. It rewrites the analytics of every habit in the database, not only the seeded ones.")
+	args = parser.parse_args()
+
+	rng = random.Random(args.random_seed)
+	label = f"bench{random.getrandbits(24):06x}"
+	habit_controller = build_habit_controller()
+	database = MariadbConnection()
+
+	print(f"Seeding {args.users} users x {args.habits_per_user} habits x {args.days} days (label {label})", file=sys.stderr)
+	try:
+		totals = generate_dataset(database, users=args.users, habits_per_user=args.habits_per_user, days=args.days, random_seed=args.random_seed, label=label, workers=args.workers)
+		results = benchmark_workflows(habit_controller, dataset_ids(database, label), args.repeat, rng, rebuild_analytics=args.rebuild_analytics)
+	finally:
+		if not args.keep:
+			drop_dataset(database, label)
+
+	print_results(f"Hot paths, {totals['habits']} habits with {totals['progresses']} progresses", results)
+
+	scale = {'users': args.users, 'habits_per_user': args.habits_per_user, 'days': args.days, 'progresses': totals['progresses'], 'repeat': args.repeat, 'random_seed': args.random_seed}
+	if args.output:
+		write_results(args.output, results, **scale)
+		print(f"\nWrote {args.output}")
+
+	if args.baseline:
+		current = {'meta': {'revision': "this run", **scale}, 'results': dict(results)}
+		with open(args.baseline, encoding="utf-8") as baseline_file:
+			baseline = json.load(baseline_file)
+		rows = compare_results(baseline, current, threshold=args.threshold)
+		print_comparison(baseline, current, rows)
+		if any(row['status'] == 'regressed' for row in rows):
+			sys.exit(1)
+
+
+
+if __name__ == '__main__':
+	main()
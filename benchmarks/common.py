@@ -0,0 +1,207 @@
+import sys
+import os
+import django
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from apps.database.database_manager import MariadbConnection
+
+
+
+def time_call(function, repeat=50, warmup=3):
+	"""
+	Times a callable and summarises the latencies.
+
+	Args:
+		function (callable): The zero-argument callable to time.
+		repeat (int): Number of measured calls.
+		warmup (int): Number of unmeasured calls made first, to warm caches and connections.
+
+	Returns:
+		dict: min, median, p95 and max latency in milliseconds, plus the amount of calls.
+	"""
+	for _ in range(warmup):
+		function()
+
+	latencies = []
+	for _ in range(repeat):
+		started_at = time.perf_counter()
+		function()
+		latencies.append((time.perf_counter() - started_at) * 1000.0)
+
+	latencies.sort()
+	return {
+		'calls': repeat,
+		'min_ms': latencies[0],
+		'median_ms': statistics.median(latencies),
+		'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+		'max_ms': latencies[-1],
+	}
+
+
+
+def create_benchmark_goal(database: MariadbConnection, label, periodicity_type='daily'):
+	"""
+	Creates a throwaway user, habit and goal to attach benchmark rows to.
+
+	Args:
+		database (MariadbConnection): The connection manager to write through.
+		label (str): A unique label used in the user, habit and goal names.
+		periodicity_type (str): 'daily' or 'weekly'.
+
+	Returns:
+		dict: The user_id, habit_id and goal_id that were created.
+	"""
+	periodicity_value = 1 if periodicity_type == 'daily' else 7
+	with database._connection.cursor() as cursor:
+		cursor.execute("INSERT IGNORE INTO app_users_role(user_role) VALUES ('bot');")
+		cursor.execute("INSERT INTO app_users(user_name, user_age, user_gender, user_role_id, created_at) VALUES (%s, 30, 'none', 'bot', NOW());", (f"bench_user_{label}",))
+		user_id = cursor.lastrowid
+		cursor.execute("INSERT INTO habits(habit_name, habit_action, habit_streak, habit_periodicity_type, habit_periodicity_value, habit_user_id, created_at) VALUES (%s, 'benchmark', 0, %s, %s, %s, NOW());", (f"bench_habit_{label}", periodicity_type, periodicity_value, user_id))
+		habit_id = cursor.lastrowid
+		cursor.execute("INSERT INTO goals(goal_name, habit_id_id, target_kvi_value, current_kvi_value, goal_description, created_at) VALUES (%s, %s, %s, 0.0, 'benchmark', NOW());", (f"bench_goal_{label}", habit_id, float(periodicity_value)))
+		goal_id = cursor.lastrowid
+	database._connection.commit()
+	return {'user_id': user_id, 'habit_id': habit_id, 'goal_id': goal_id}
+
+
+
+def drop_benchmark_user(database: MariadbConnection, user_id):
+	"""
+	Removes a benchmark user together with its habits, goals and progress rows.
+
+	Args:
+		database (MariadbConnection): The connection manager to write through.
+		user_id (int): The ID returned by create_benchmark_goal.
+	"""
+	with database._connection.cursor() as cursor:
+		cursor.execute("DELETE p FROM progresses p JOIN goals g ON p.goal_id_id = g.goal_id JOIN habits h ON g.habit_id_id = h.habit_id WHERE h.habit_user_id = %s;", (user_id,))
+		cursor.execute("DELETE g FROM goals g JOIN habits h ON g.habit_id_id = h.habit_id WHERE h.habit_user_id = %s;", (user_id,))
+		cursor.execute("DELETE FROM habits WHERE habit_user_id = %s;", (user_id,))
+		cursor.execute("DELETE FROM app_users WHERE user_id = %s;", (user_id,))
+	database._connection.commit()
+
+
+
+def print_results(title, rows):
+	"""
+	Prints benchmark results as an aligned table.
+
+	Args:
+		title (str): Heading printed above the table.
+		rows (list of tuple): (label, stats dict as returned by time_call).
+	"""
+	print(f"\n{title}")
+	print(f"{'case':<40} {'median ms':>10} {'p95 ms':>10} {'max ms':>10}")
+	for label, stats in rows:
+		print(f"{label:<40} {stats['median_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['max_ms']:>10.3f}")
+
+
+
+def git_revision():
+	"""Returns the short hash of the checked out commit, with a '+dirty' suffix for uncommitted changes, or None outside git."""
+	try:
+		revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+		dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+	return f"{revision}+dirty" if dirty else revision
+
+
+
+def write_results(path, results, **meta):
+	"""
+	Writes benchmark results to a JSON file, together with the commit they were measured on.
+
+	Args:
+		path (str): The JSON file to write.
+		results (list of tuple): (label, stats dict as returned by time_call).
+		**meta: Extra values describing the run, e.g. the dataset scale.
+
+	Returns:
+		str: The path written to.
+	"""
+	document = {
+		'meta': {
+			'revision': git_revision(),
+			'recorded_at': datetime.datetime.now().isoformat(timespec='seconds'),
+			'python': platform.python_version(),
+			**meta,
+		},
+		'results': {label: stats for label, stats in results},
+	}
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	with open(path, "w", encoding="utf-8") as output:
+		json.dump(document, output, indent=2)
+	return path
+
+
+
+def compare_results(baseline, current, threshold=0.10, min_delta_ms=0.05, metric='median_ms'):
+	"""
+	Compares two result documents written by write_results, case by case.
+
+	A case regressed if its metric grew by more than threshold and by more than min_delta_ms,
+	so sub-millisecond noise does not fail a comparison.
+
+	Args:
+		baseline (dict): The results of the reference commit.
+		current (dict): The results to check.
+		threshold (float): Allowed relative slowdown, 0.10 is 10%.
+		min_delta_ms (float): Slowdowns below this many milliseconds are ignored.
+		metric (str): The statistic to compare, e.g. 'median_ms' or 'p95_ms'.
+
+	Returns:
+		list of dict: One row per case with the baseline and current values, the relative change
+		and a status of 'regressed', 'improved', 'unchanged', 'new' or 'missing'.
+	"""
+	rows = []
+	for label in list(baseline['results']) + [label for label in current['results'] if label not in baseline['results']]:
+		before = baseline['results'].get(label, {}).get(metric)
+		after = current['results'].get(label, {}).get(metric)
+		if before is None or after is None:
+			rows.append({'case': label, 'baseline': before, 'current': after, 'change': None, 'status': 'new' if before is None else 'missing'})
+			continue
+
+		change = (after - before) / before if before else 0.0
+		if change > threshold and after - before > min_delta_ms:
+			status = 'regressed'
+		elif change < -threshold and before - after > min_delta_ms:
+			status = 'improved'
+		else:
+			status = 'unchanged'
+		rows.append({'case': label, 'baseline': before, 'current': after, 'change': change, 'status': status})
+	return rows
+
+
+
+def print_comparison(baseline, current, rows, metric='median_ms'):
+	"""
+	Prints a comparison made by compare_results as an aligned table.
+
+	Args:
+		baseline (dict): The results of the reference commit.
+		current (dict): The results that were checked.
+		rows (list of dict): The rows returned by compare_results.
+		metric (str): The statistic that was compared.
+	"""
+	print(f"\n{metric}: {baseline['meta'].get('revision')} -> {current['meta'].get('revision')}")
+	print(f"{'case':<40} {'baseline':>10} {'current':>10} {'change':>8}  status")
+	for row in rows:
+		baseline_value = f"{row['baseline']:.3f}" if row['baseline'] is not None else "-"
+		current_value = f"{row['current']:.3f}" if row['current'] is not None else "-"
+		change = f"{row['change'] * 100:+.1f}%" if row['change'] is not None else "-"
+		print(f"{row['case']:<40} {baseline_value:>10} {current_value:>10} {change:>8}  {row['status']}")
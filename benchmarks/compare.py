@@ -0,0 +1,43 @@
+"""
+Compares two benchmark result files written with --output, e.g. of the main branch and of a
+feature branch, and exits with 1 if a case got slower than the threshold allows.
+
+Usage:
+	python -m benchmarks.compare BASELINE_JSON CURRENT_JSON [--threshold 0.10] [--metric median_ms]
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.common import compare_results, print_comparison
+
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+	parser.add_argument('baseline', metavar='BASELINE_JSON')
+	parser.add_argument('current', metavar='CURRENT_JSON')
+	parser.add_argument('--threshold', type=float, default=0.10, help="Relative slowdown counted as a regression (default 0.10).")
+	parser.add_argument('--min-delta-ms', type=float, default=0.05, help="Slowdowns below this many milliseconds are ignored (default 0.05).")
+	parser.add_argument('--metric', default='median_ms', choices=['min_ms', 'median_ms', 'p95_ms', 'max_ms'])
+	args = parser.parse_args()
+
+	with open(args.baseline, encoding="utf-8") as baseline_file:
+		baseline = json.load(baseline_file)
+	with open(args.current, encoding="utf-8") as current_file:
+		current = json.load(current_file)
+
+	if baseline['meta'].get('users') != current['meta'].get('users') or baseline['meta'].get('days') != current['meta'].get('days'):
+		print("Warning: the runs used datasets of different scale.", file=sys.stderr)
+
+	rows = compare_results(baseline, current, threshold=args.threshold, min_delta_ms=args.min_delta_ms, metric=args.metric)
+	print_comparison(baseline, current, rows, metric=args.metric)
+	regressions = [row['case'] for row in rows if row['status'] == 'regressed']
+	if regressions:
+		print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+		sys.exit(1)
+
+
+
+if __name__ == '__main__':
+	main()
@@ -12,6 +12,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
 from apps.core.controllers.habit_controller import HabitController
+from apps.database.pagination import DEFAULT_PAGE_SIZE
+from apps.utils.tracing import traced
 
 def signal_handler(sig, frame):
 	click.echo(click.style('\nYou pressed Ctrl+C, doei...', fg='red', bold=True))
@@ -30,19 +32,21 @@ class CLI:
 		Displays a list of user records in a formatted fashion.
 
 		Args:
-			all_users (list): A list of tuples or records, where each contains
-				user information (e.g., (user_id, user_name)).
+			all_users (iterable): Tuples or records, where each contains
+				user information (e.g., (user_id, user_name)). Rows are printed
+				as they arrive, so a streaming iterator is never held in memory.
 
 		Returns:
 			None
 		"""
 		click.echo(click.style("\n---ALL USERS---", fg="cyan", bold=True))
-		if not all_users:
-			click.echo("No users found.")
-			return
-
+		shown_users = 0
 		for user in all_users:
 			click.echo(f" - user_id: {user[0]}, user_name: {user[1]}")
+			shown_users += 1
+
+		if shown_users == 0:
+			click.echo("No users found.")
 
 
 
@@ -51,30 +55,33 @@ class CLI:
 		Displays a list of habit records in a tabular format.
 
 		Args:
-			habits (list): A list of tuples containing habit data. Each tuple
-				is expected in the format (habit_id, habit_name, habit_action, user_id, ...)
+			habits (iterable): Tuples containing habit data. Each tuple
+				is expected in the format (habit_id, habit_name, habit_action, user_id, ...).
+				Rows are printed as they arrive, so a streaming iterator is never held in memory.
 
 		Returns:
 			None
 		"""
 		click.echo(click.style("\n---LIST OF ALL HABITS---", fg="cyan", bold=True))
 
-		if len(habits) == 0:
-			click.echo(click.style("There are currently no habits tracked. Create a first one!", fg="green", bold=True))
-			return
-
 		separator = "-" * 80
-		click.echo("\n" + separator)
-		click.echo(click.style(f"{'Habit ID':<10} {'User ID':<10} {'Habit Name':<20} {'Action':<30}", fg="green", bold=True))
-		click.echo(separator)
-
+		shown_habits = 0
 		for habit in habits:
+			if shown_habits == 0:
+				click.echo("\n" + separator)
+				click.echo(click.style(f"{'Habit ID':<10} {'User ID':<10} {'Habit Name':<20} {'Action':<30}", fg="green", bold=True))
+				click.echo(separator)
+			shown_habits += 1
 			print(
 				click.style(f"{habit[0]:<10}", fg="yellow", bold=True) +
 				click.style(f"{habit[3]:<10}", fg="cyan") +
 				click.style(f"{habit[1]:<20}", fg="white", bold=True) +
 				click.style(f"{habit[2]:<30}", fg="magenta")
 			)
+
+		if shown_habits == 0:
+			click.echo(click.style("There are currently no habits tracked. Create a first one!", fg="green", bold=True))
+			return
 		click.echo(separator)
 
 
@@ -84,22 +91,25 @@ class CLI:
 		Displays goal and habit associations in a structured format.
 
 		Args:
-			goals_and_habits (list): A list of tuples, each containing 
-				goal and habit data (e.g., (goal_name, goal_id, habit_id, habit_name)).
+			goals_and_habits (iterable): Tuples, each containing goal and habit data
+				(e.g., (goal_name, goal_id, habit_id, habit_name)). Rows are printed
+				as they arrive, so a streaming iterator is never held in memory.
 
 		Returns:
 			None
 		"""
 		click.echo(click.style("\n---GOALS AND THEIR ASSOCIATED HABITS---", fg="cyan", bold=True))
-		if not goals_and_habits:
-				click.echo("No goals and associated habits have been found.")
-
+		shown_goals = 0
 		for data in goals_and_habits:
 			click.echo(f"\nGoal Name: {click.style(data[0], fg='green', bold=True)}\n"
 						f"Goal ID: {data[1]}\n"
 						f"Habit Name: {click.style(data[3], fg='yellow', bold=True)}\n"
 						f"Habit ID: {data[2]}"
 			)
+			shown_goals += 1
+
+		if shown_goals == 0:
+			click.echo("No goals and associated habits have been found.")
 
 
 
@@ -143,6 +153,32 @@ class CLI:
 
 
 
+	def display_progress_history(self, progresses):
+		"""
+		Displays progress entries in a tabular format, newest first.
+
+		Args:
+			progresses (list): Tuples of (progress_id, goal_id, goal_name, habit_name, current_streak,
+				current_kvi_value, distance_from_goal_kvi_value, occurence_date).
+
+		Returns:
+			None
+		"""
+		click.echo(click.style("\n---PROGRESS HISTORY---", fg="cyan", bold=True))
+		if not progresses:
+			click.echo("No progress entries found.")
+			return
+
+		separator = "-" * 80
+		click.echo(click.style(f"{'Date':<20} {'Goal ID':<8} {'Habit':<20} {'Goal':<16} {'Streak':<7} {'KVI':<7}", fg="green", bold=True))
+		click.echo(separator)
+		for progress_id, goal_id, goal_name, habit_name, current_streak, current_kvi_value, _, occurence_date in progresses:
+			occurence_date_str = occurence_date.strftime("%Y-%m-%d %H:%M:%S") if occurence_date else "-"
+			click.echo(f"{occurence_date_str:<20} {str(goal_id or '-'):<8} {str(habit_name or '-')[:20]:<20} {str(goal_name or '-')[:16]:<16} {current_streak:<7} {current_kvi_value:<7}")
+		click.echo(separator)
+
+
+
 	def display_tickable_habits(self, goals):
 		"""
 		Displays a list of 'tickable' habits and their associated goals.
@@ -225,6 +261,41 @@ class CLI:
 
 
 
+	def display_repository_metrics(self, metrics, limit=15):
+		"""
+		Displays the repository methods that took the most time in total, with their call
+		count, latency and rows, followed by the most expensive SQL statements.
+
+		Args:
+			metrics (dict): A RepositoryMetrics snapshot with 'methods' and 'statements'.
+			limit (int, optional): Rows shown per table. Defaults to 15.
+
+		Returns:
+			None
+		"""
+		click.echo(click.style("\n---REPOSITORY CALL STATISTICS---", fg="cyan", bold=True))
+		if not metrics['methods']:
+			click.echo("No repository calls recorded yet.")
+			return
+
+		separator = "-" * 100
+		methods = sorted(metrics['methods'].items(), key=lambda item: item[1]['latency']['sum_seconds'], reverse=True)
+		click.echo(separator)
+		click.echo(click.style(f"{'Method':<50}{'Calls':>8}{'Errors':>8}{'Total ms':>11}{'Mean ms':>10}{'Max ms':>9}{'Rows':>8}", fg="yellow", bold=True))
+		for name, method in methods[:limit]:
+			latency = method['latency']
+			click.echo(f"{name:<50}{method['calls']:>8}{method['errors']:>8}{latency['sum_seconds'] * 1000:>11.2f}{latency['mean_seconds'] * 1000:>10.2f}{latency['max_seconds'] * 1000:>9.2f}{method['rows']:>8}")
+
+		statements = sorted(metrics['statements'].items(), key=lambda item: item[1]['latency']['sum_seconds'], reverse=True)
+		if statements:
+			click.echo(separator)
+			click.echo(click.style(f"{'Fingerprint':<14}{'Runs':>8}{'Total ms':>11}  SQL", fg="yellow", bold=True))
+			for fingerprint, statement in statements[:limit]:
+				click.echo(f"{fingerprint:<14}{statement['executions']:>8}{statement['latency']['sum_seconds'] * 1000:>11.2f}  {statement['sql'][:120]}")
+		click.echo(separator)
+
+
+
 	def display_menu(self):
 		"""
 		Prints the main menu of available options in the CLI.
@@ -241,6 +312,8 @@ class CLI:
 		click.echo("9, Get currently tracked habits")
 		click.echo("10, Get longest ever streak for habit")
 		click.echo("11, Calculate the average streak for all habits")
+		click.echo("13, Show repository call statistics")
+		click.echo("14, Browse progress history")
 		click.echo("12, Exit program")
 
 
@@ -286,6 +359,50 @@ class CLI:
 
 
 
+	def browse_pages(self, fetch_page, display, stream_all=None, page_size=DEFAULT_PAGE_SIZE):
+		"""
+		Shows a listing page by page and lets the user move to the next or previous page.
+		Pages are read with keyset pagination, so turning a page costs the same however deep it is.
+
+		Args:
+			fetch_page (callable): Returns a page dict, called with page_size and an after or before cursor.
+			display (callable): Prints the rows of a page.
+			stream_all (callable, optional): Returns an iterator over every row, offered as listing all rows at once.
+			page_size (int, optional): Rows per page. Defaults to DEFAULT_PAGE_SIZE.
+		"""
+		page = fetch_page(page_size=page_size)
+		while True:
+			display(page['rows'])
+
+			choices = {}
+			if page['next_cursor'] is not None:
+				choices['n'] = "[n]ext page"
+			if page['previous_cursor'] is not None:
+				choices['p'] = "[p]revious page"
+			if not choices:
+				return
+			if stream_all is not None:
+				choices['a'] = "[a]ll at once"
+			choices['q'] = "[q]uit"
+
+			try:
+				choice = self.prompt_for_choice(", ".join(choices.values()), list(choices))
+			except click.Abort:
+				click.echo()
+				return
+
+			if choice == 'q':
+				return
+			if choice == 'a':
+				display(stream_all())
+				return
+			if choice == 'n':
+				page = fetch_page(page_size=page_size, after=page['next_cursor'])
+			else:
+				page = fetch_page(page_size=page_size, before=page['previous_cursor'])
+
+
+
 	def option_1_create_user(self):
 		"""
 		CLI flow to create a new user. Prompts the user for information 
@@ -316,8 +433,7 @@ class CLI:
 		click.pause()
 
 		try:
-			all_users = self._controller.query_all_users()
-			self.display_users(all_users)
+			self.browse_pages(self._controller.get_users_page, self.display_users, stream_all=self._controller.iter_all_users)
 		except Exception as error:
 			click.echo(click.style(f"Error while querying all user data: {error}", fg="red", bold=True))
 
@@ -363,8 +479,7 @@ class CLI:
 		click.pause()
 
 		try:
-			all_habits = self._controller.get_all_habits()
-			self.display_habits(all_habits)
+			self.browse_pages(self._controller.get_habits_page, self.display_habits, stream_all=self._controller.iter_all_habits)
 		except Exception as error:
 			click.echo(click.style(f"Error while querying all habits: {error}", fg="red", bold=True))
 
@@ -378,13 +493,13 @@ class CLI:
 		click.pause()
 
 		try:
-			users_and_related_habits = self._controller.query_goals_and_related_habits()
-			self.display_goals_and_habits(users_and_related_habits)
+			self.browse_pages(self._controller.get_goals_page, self.display_goals_and_habits, stream_all=self._controller.iter_goals_and_related_habits)
 		except Exception as error:
 			click.echo(click.style(f"Error while listing goals and habits: {error}", fg="red", bold=True))
 
 
 
+	@traced('cli')
 	def option_6_complete_habit(self):
 		"""
 		CLI flow that allows the user to mark a habit as completed/ticked.
@@ -472,7 +587,7 @@ class CLI:
 			habit_id = self.prompt_for_valid_integer("Select a habit id for its longest ever streak recorded")
 			result = self._controller.longest_streak_for_habit(habit_id)
 			if result:
-				click.echo(click.style(f"Longest streak opf habit {habit_id}: {result[0][6]} days", fg="yellow", bold=True))
+				click.echo(click.style(f"Longest streak opf habit {habit_id}: {result[0][1]} days", fg="yellow", bold=True))
 			else:
 				click.echo(click.style(f"No longest streak for habit {habit_id} yet.", fg="yellow", bold=True))
 
@@ -488,14 +603,57 @@ class CLI:
 		click.echo(click.style("\n[Option 11] Get average streak across all habits.", fg="cyan", bold=True))
 
 		try:
-			result = self._controller.average_streaks()
+			statistics = self._controller.get_streak_statistics(percentiles=(0.5, 0.9))
+			result = statistics['mean'] if statistics['count'] else 0.0
 			click.echo(click.style(f"Average streak across all habits are: {result} times.", fg="yellow", bold=True))
+			if statistics['count']:
+				click.echo(click.style(f"Habits: {statistics['count']}, shortest: {statistics['min']}, longest: {statistics['max']}, median: {statistics['percentiles'][0.5]}, 90th percentile: {statistics['percentiles'][0.9]}.", fg="yellow"))
 
 		except Exception as error:
 			click.echo(click.style(f"Error while querying the average streak: {error}", fg="red", bold=True))
 
 
 
+	def option_13_repository_statistics(self):
+		"""
+		Displays how often and how long every repository method and SQL statement ran since
+		start up, and optionally writes the statistics as JSON and Prometheus text files.
+		"""
+		click.echo(click.style("\n[Option 13] Repository call statistics", fg="cyan", bold=True))
+
+		try:
+			self.display_repository_metrics(self._controller.get_repository_metrics())
+			if click.confirm("Write the statistics to JSON and Prometheus files?", default=False):
+				directory = click.prompt("Directory", default="metrics")
+				json_path, prometheus_path = self._controller.dump_repository_metrics(directory)
+				click.echo(click.style(f"Wrote {json_path} and {prometheus_path}.", fg="green", bold=True))
+
+		except Exception as error:
+			click.echo(click.style(f"Error while reading the repository statistics: {error}", fg="red", bold=True))
+
+
+
+	def option_14_browse_progress_history(self):
+		"""
+		Browses the progress history of one goal or of every goal, newest entries first, page by page.
+		"""
+		click.echo(click.style("\n[Option 14] Browse progress history", fg="cyan", bold=True))
+
+		try:
+			goal_id = click.prompt("Goal ID (leave empty for every goal)", default="", show_default=False).strip()
+			if goal_id and not goal_id.isdigit():
+				raise ValueError("The goal ID must be a number.")
+			goal_id = int(goal_id) if goal_id else None
+
+			def fetch_page(page_size, after=None, before=None):
+				return self._controller.get_progress_history_page(goal_id=goal_id, page_size=page_size, after=after, before=before)
+
+			self.browse_pages(fetch_page, self.display_progress_history)
+		except Exception as error:
+			click.echo(click.style(f"Error while browsing the progress history: {error}", fg="red", bold=True))
+
+
+
 	def option_12_exit_program(self):
 		"""
 		Exciting program with status code 0.
@@ -505,6 +663,34 @@ class CLI:
 	
 
 
+	def run_option(self, choice):
+		"""
+		Routes a menu choice to its option handler, choices without a handler are ignored.
+
+		Args:
+			choice (int): The number of the menu option.
+		"""
+		options = {
+			1: self.option_1_create_user,
+			2: self.option_2_query_all_user_data,
+			3: self.option_3_create_new_habit,
+			4: self.option_4_get_all_habits,
+			5: self.option_5_list_all_goals_with_habits,
+			6: self.option_6_complete_habit,
+			7: self.option_7_longest_streak_in_database,
+			8: self.option_8_same_habit_periodicity,
+			9: self.option_9_get_currently_tracked_habits,
+			10: self.option_10_get_longest_ever_streak_for_habit,
+			11: self.option_11_calculate_average_streak,
+			12: self.option_12_exit_program,
+			13: self.option_13_repository_statistics,
+			14: self.option_14_browse_progress_history,
+		}
+		if choice in options:
+			options[choice]()
+
+
+
 	def run(self):
 		"""
 		The main event loop for the CLI. Registers a signal handler for Ctrl+c,
@@ -517,39 +703,4 @@ class CLI:
 		while True:
 			self.display_menu()
 			choice = click.prompt("\nEnter your choice", type=int)
-
-			if choice == 1:
-				self.option_1_create_user() 
-			
-			if choice == 2:
-				self.option_2_query_all_user_data()
-
-			if choice == 3:
-				self.option_3_create_new_habit()
-
-			if choice == 4:
-				self.option_4_get_all_habits()
-
-			if choice == 5:
-				self.option_5_list_all_goals_with_habits()
-
-			if choice == 6:
-				self.option_6_complete_habit()
-
-			if choice == 7:
-				self.option_7_longest_streak_in_database()
-			
-			if choice == 8:
-				self.option_8_same_habit_periodicity()
-
-			if choice == 9:
-				self.option_9_get_currently_tracked_habits()
-
-			if choice == 10:
-				self.option_10_get_longest_ever_streak_for_habit()
-			
-			if choice == 11:
-				self.option_11_calculate_average_streak()
-
-			if choice == 12:
-				self.option_12_exit_program()
\ No newline at end of file
+			self.run_option(choice)
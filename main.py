@@ -2,9 +2,9 @@ import sys
 import os
 import django
 import click
-import datetime
-import random
 import argparse
+import atexit
+import datetime
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -14,6 +14,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
 from apps.database.database_manager import MariadbConnection
+from apps.database.data_generator import generate_dataset
+from apps.database.data_exporter import EXPORT_TABLES, export_data
 from apps.users.repositories.user_repository import UserRepository
 from apps.users.services.user_service import UserService
 from apps.habits.repositories.habit_repository import HabitRepository
@@ -28,6 +30,8 @@ from apps.core.controllers.habit_controller import HabitController
 from apps.core.orchestrators.habit_orchestrator import HabitOrchestrator
 from apps.analytics.repositories.analytics_repository import AnalyticsRepository
 from apps.analytics.services.analytics_service import AnalyticsService
+from apps.utils.profiling import SessionProfiler
+from apps.utils.tracing import Tracer
 from cli import CLI
 
 
@@ -49,106 +53,283 @@ def signal_handler(sig, frame):
 
 
 
-def seed(habit_controller: HabitController):
+def seed(database, args):
 	"""
-	Seeds the database with a test user, several habits, and associated goals.
-	Also generates progress records for those habits randomly over the last 30 days.
+	Seeds the database with synthetic users, habits, goals, progresses and analytics,
+	written in executemany batches, optionally by several worker processes.
 
 	Args:
-		habit_controller (HabitController): A controller handling user/habit creation and updates.
+		database (MariadbConnection): The connection manager to write through.
+		args (argparse.Namespace): The parsed arguments, `seed` holds the amount of users.
 
-		
 	Returns:
 		None
 	"""
 	click.echo(click.style("\n--- AS REQUESTED, STARTING DATABASE SEEDING PROCESS---", fg="green", bold=True))
 
-	test_user = habit_controller.create_user(f'Testuser{random.random()}', 35, "Male", "user")
-	test_user_id = test_user["user_id"]
-	click.echo(f"Created test user with ID: {test_user_id}")
-
-	habits_to_create = [
-		(f"daily reading{random.random():.4f}", "read 5 pages", "daily"),
-		(f"daily meditation{random.random():.4f}", "meditate 10 mins", "daily"),
-		(f"weekly run{random.random():.4f}", "run 10 kms", "weekly"),
-		(f"weekly blog writing{random.random():.4f}", "write 2 pages for your blog", "weekly"),
-	]
-
-	click.echo("\nCreating sample habits and associated goals.")
-	created_habits = []
-	for habit_name, habit_action, habit_periodicity_type in habits_to_create:
-		habit_periodicity_value = 1.0 if habit_periodicity_type == 'daily' else 7.0
-		new_habit = habit_controller.create_a_habit_with_validation(
-			habit_name=habit_name,
-			habit_action=habit_action,
-			periodicity_type=habit_periodicity_type,
-			user_id=test_user_id
-		)
-		created_habits.append(new_habit)
-		goal_name = f"Goal for {habit_name}"
-		goal_description = f"This is a {habit_periodicity_type} goal."
-		habit_controller.create_a_goal(
-			goal_name=goal_name, 
-			habit_id=new_habit['habit_id'], 
-			target_kvi_value=habit_periodicity_value, 
-			current_kvi_value=0.0, 
-			goal_description=goal_description)
-
-	now = datetime.datetime.now()
-	thirty_days_ago = now - datetime.timedelta(days = 30)
-
-	click.echo("\nGenerating progress entries over the last 30 days.")
-	for habit in created_habits:
-		habit_id = habit["habit_id"]
-
-		current_date = thirty_days_ago
-		goal_id = habit_controller.query_goal_of_a_habit(habit_id=habit_id)
-
-		while current_date <= now:
-			if random.random() < 0.7:
-				if goal_id and current_date.weekday() != 6:
-					habit_controller.create_progress(
-						goal_id=goal_id[0],
-						current_kvi_value=1.0,
-						distance_from_target_kvi_value=0.0,
-						goal_name= f"fake_progress{random.random()}",
-						habit_name= f"name:{random.random()}",
-						progress_description="Auto seeded progress",
-						occurence_date=current_date
-					)
-			current_date += datetime.timedelta(days=1)
-		last_progress_streak = habit_controller.get_last_progress_entry(goal_id=goal_id[0])
-		if last_progress_streak:
-			habit_controller.get_current_streak(habit_id=habit_id)[0]
-			updated_streak = last_progress_streak[6]
-			habit_controller.update_habit_streak(habit_id=habit_id, updated_streak_value=updated_streak)
-	
-	click.echo(click.style("\n---SEEDING COMPLETED. DATABASE HAS BEEN POPULATED WITH DATA FOR 30 DAYS.---", fg="green", bold=True))
+	def report(totals):
+		click.echo(f"Wrote {totals['users']}/{args.seed} users, {totals['habits']} habits and {totals['progresses']} progress entries.")
+
+	totals = generate_dataset(
+		database,
+		users=args.seed,
+		habits_per_user=args.habits_per_user,
+		days=args.days,
+		random_seed=args.random_seed,
+		label=args.label,
+		workers=args.workers,
+		on_progress=report
+	)
+
+	click.echo(click.style(f"\n---SEEDING COMPLETED. DATABASE HAS BEEN POPULATED WITH DATA FOR {args.days} DAYS (label {totals['label']}, random seed {totals['random_seed']}).---", fg="green", bold=True))
+
+
+
+def import_progress(habit_controller, args):
+	"""
+	Imports the progress history file given with --import-progress and reports the throughput.
+
+	Args:
+		habit_controller (HabitController): The controller of the application.
+		args (argparse.Namespace): The parsed command line arguments.
+	"""
+	def report(totals):
+		click.echo(f"\r{totals['read']} records read, {totals['imported']} imported", nl=False)
+
+	totals = habit_controller.import_progress_history(args.import_progress, resume=args.resume, chunk_size=args.import_chunk_size, on_progress=report)
+	click.echo()
+	click.echo(click.style(
+		f"Imported {totals['imported']} of {totals['read']} records in {totals['seconds']:.1f}s ({totals['records_per_second']:.0f} records/s), "
+		f"skipped {totals['malformed']} malformed, {totals['unresolved']} unresolved and {totals['duplicates']} duplicate records.",
+		fg="green", bold=True
+	))
+
+
+
+def export(database, args):
+	"""
+	Streams the tables given with --export-tables to the --export directory.
+
+	Args:
+		database (MariadbConnection): The connection manager to read through.
+		args (argparse.Namespace): The parsed command line arguments.
+	"""
+	def report(table, path, rows):
+		click.echo(f"Exported {rows} {table} rows to {path}.")
+
+	exported = export_data(
+		database,
+		args.export,
+		tables=args.export_tables,
+		file_format=args.export_format,
+		compress=args.gzip,
+		since=args.since,
+		until=args.until,
+		users=args.export_user,
+		on_progress=report
+	)
+	click.echo(click.style(f"Exported {sum(rows for _, rows in exported.values())} rows of {len(exported)} tables.", fg="green", bold=True))
+
+
+
+def start_tracing(trace_path):
+	"""
+	Turns tracing on for the session and writes the trace to a file on exit. Terminal output
+	and prompts are traced as well, so output time and time spent waiting for the user show up
+	as their own categories next to CLI, service, repository and database time.
+
+	Args:
+		trace_path (str): The Chrome trace JSON file to write, loadable in chrome://tracing or Perfetto.
+	"""
+	tracer = Tracer()
+	for attribute in ('echo', 'secho'):
+		tracer.wrap_function(click, attribute, category='output')
+	for attribute in ('prompt', 'confirm', 'pause'):
+		tracer.wrap_function(click, attribute, category='input')
+	tracer.enable()
+
+	def export_trace():
+		tracer.export_chrome_trace(trace_path)
+		totals = ", ".join(f"{category} {milliseconds:.1f} ms" for category, milliseconds in tracer.category_totals().items())
+		print(f"Wrote trace to {trace_path} ({totals}).")
+	atexit.register(export_trace)
 
 
 
 def init_parser():
 	"""
 	Initializes an argument parser for optional CLI arguments, 
-	such as a `--seed` flag to pre-populate the database.
+	such as a `--seed` option to pre-populate the database with
+	synthetic data, sized by `--habits-per-user` and `--days` and
+	written by `--workers` processes, a
+	`--rebuild-analytics` flag to backfill the analytics table,
+	an `--import-progress` option to import progress history,
+	resumable with `--resume`, an `--export` option to stream
+	the tables to JSONL or CSV files, filtered by `--since`,
+	`--until` and `--export-user`,
+	a `--metrics-dir` option to dump the repository statistics, a
+	`--trace` option to record a trace of the session, `--profile`
+	and `--trace-memory` flags to profile the session into
+	`--profile-dir` and a `--command` option to run a single menu
+	option instead of the interactive session.
 
 	Returns:
-		argparse.Namespace: Parsed arguments with a `seed` attribute (boolean).
+		argparse.Namespace: Parsed arguments with a `seed` attribute (users or None),
+		the seeding options,
+		a `rebuild_analytics` attribute (chunk size or None),
+		an `import_progress` attribute (file or None), `resume`
+		and `import_chunk_size` attributes, an `export` attribute
+		(directory or None) with the export options, a
+		`metrics_dir` attribute (directory or None), a `trace`
+		attribute (trace file or None), `profile` and `trace_memory`
+		attributes (booleans), a `profile_dir` attribute (directory)
+		and a `command` attribute (menu option or None).
 	"""
 	parser = argparse.ArgumentParser(description="Habit Tracker CLI")
 	parser.add_argument(
 		'--seed',
+		nargs='?',
+		const=1,
+		type=int,
+		metavar='USERS',
+		help="Seed the database with synthetic data for USERS users (default 1), in case you would need it."
+	)
+	parser.add_argument(
+		'--habits-per-user',
+		type=int,
+		default=4,
+		help="Average amount of habits per seeded user (default 4)."
+	)
+	parser.add_argument(
+		'--days',
+		type=int,
+		default=30,
+		help="Days of progress history to seed, ending yesterday (default 30)."
+	)
+	parser.add_argument(
+		'--workers',
+		type=int,
+		default=1,
+		help="Worker processes writing the seeded data in parallel (default 1)."
+	)
+	parser.add_argument(
+		'--random-seed',
+		type=int,
+		help="Seed of the generated data, the same seed, scale and day give the same data."
+	)
+	parser.add_argument(
+		'--label',
+		help="Up to 12 letters and digits marking the seeded users and habits (default: 'gen' and a hash of the random seed)."
+	)
+	parser.add_argument(
+		'--rebuild-analytics',
+		nargs='?',
+		const=500,
+		type=int,
+		metavar='CHUNK_SIZE',
+		help="Rebuild the analytics of every habit from its progresses, CHUNK_SIZE habits per transaction (default 500), then exit."
+	)
+	parser.add_argument(
+		'--import-progress',
+		metavar='FILE',
+		help="Import progress history from a JSONL or CSV file with the fields user, habit, goal, timestamp and kvi, then exit."
+	)
+	parser.add_argument(
+		'--resume',
 		action='store_true',
-		help="Seed the database with sample data, in case you would need it."
+		help="Continue an interrupted --import-progress after its last committed chunk instead of starting over."
+	)
+	parser.add_argument(
+		'--import-chunk-size',
+		type=int,
+		default=1000,
+		metavar='RECORDS',
+		help="Records imported per transaction by --import-progress (default 1000)."
+	)
+	parser.add_argument(
+		'--export',
+		metavar='DIRECTORY',
+		help="Stream the habits, goals, progresses and analytics to one file per table in DIRECTORY, then exit."
+	)
+	parser.add_argument(
+		'--export-format',
+		choices=['jsonl', 'csv'],
+		default='jsonl',
+		help="File format of --export (default jsonl)."
+	)
+	parser.add_argument(
+		'--export-tables',
+		nargs='+',
+		choices=list(EXPORT_TABLES),
+		metavar='TABLE',
+		help=f"Tables to export, of: {', '.join(EXPORT_TABLES)} (default all)."
+	)
+	parser.add_argument(
+		'--gzip',
+		action='store_true',
+		help="Gzip the exported files."
+	)
+	parser.add_argument(
+		'--since',
+		type=datetime.date.fromisoformat,
+		metavar='YYYY-MM-DD',
+		help="Export only rows dated on or after this day."
+	)
+	parser.add_argument(
+		'--until',
+		type=datetime.date.fromisoformat,
+		metavar='YYYY-MM-DD',
+		help="Export only rows dated on or before this day."
+	)
+	parser.add_argument(
+		'--export-user',
+		action='append',
+		metavar='USER_NAME',
+		help="Export only the rows of this user, can be given several times."
+	)
+	parser.add_argument(
+		'--trace',
+		metavar='TRACE_FILE',
+		help="Record timing spans from CLI options down to SQL statements and write them to TRACE_FILE on exit, in the Chrome trace format."
+	)
+	parser.add_argument(
+		'--metrics-dir',
+		metavar='DIRECTORY',
+		help="Write the repository call statistics as JSON and Prometheus text files to DIRECTORY on exit."
+	)
+	parser.add_argument(
+		'--profile',
+		action='store_true',
+		help="Run under cProfile and write reports sorted by cumulative and own time, also per subsystem, to the profile directory."
+	)
+	parser.add_argument(
+		'--trace-memory',
+		action='store_true',
+		help="Trace memory allocations with tracemalloc and write the peak and top allocation sites per subsystem to the profile directory."
+	)
+	parser.add_argument(
+		'--profile-dir',
+		default='profiles',
+		metavar='DIRECTORY',
+		help="Directory for the --profile and --trace-memory reports (default: profiles)."
+	)
+	parser.add_argument(
+		'--command',
+		type=int,
+		metavar='OPTION',
+		help="Run a single menu option, e.g. 6 to tick a habit, instead of the interactive session, then exit. Prompts read from stdin, so the command can be scripted."
 	)
 	return parser.parse_args()
 
 
 
-def main():
-
-	args = init_parser()
+def build_habit_controller():
+	"""
+	Builds the object graph of the application, from the database connection to the controller.
 
+	Returns:
+		HabitController: The controller the CLI works with.
+	"""
 	database = MariadbConnection()
 	user_repository = UserRepository(database)
 	user_service = UserService(user_repository)
@@ -162,16 +343,69 @@ def main():
 	analytics_repository = AnalyticsRepository(database=database, habit_repository=habit_repository)
 	analytics_service = AnalyticsService(repository=analytics_repository, habit_service=habit_service, progress_service=progress_service)
 	
-	habit_tracker_facade = HabitTrackerFacadeImpl(user_service=user_service, habit_service=habit_service, goal_service=goal_service, progress_service=progress_service, reminder_service=reminder_service, analytics_service=analytics_service)
+	habit_tracker_facade = HabitTrackerFacadeImpl(user_service=user_service, habit_service=habit_service, goal_service=goal_service, progress_service=progress_service, reminder_service=reminder_service, analytics_service=analytics_service, database=database)
 	habit_tracker_orchestrator = HabitOrchestrator(habit_tracker_facade=habit_tracker_facade)
-	habit_controller = HabitController(habit_tracker_facade=habit_tracker_facade, habit_tracker_orchestrator=habit_tracker_orchestrator)
+	return HabitController(habit_tracker_facade=habit_tracker_facade, habit_tracker_orchestrator=habit_tracker_orchestrator)
+
+
+
+def run_session(args):
+	"""
+	Builds the application and runs what the arguments ask for: an analytics rebuild,
+	a progress import, an export, seeding, a single menu option or the interactive session.
+
+	Args:
+		args (argparse.Namespace): The parsed command line arguments.
+	"""
+	habit_controller = build_habit_controller()
 	
+	if args.trace:
+		start_tracing(trace_path=args.trace)
 
-	if args.seed:
-		seed(habit_controller=habit_controller)
+	if args.metrics_dir:
+		#also runs when the CLI exits through sys.exit, e.g. option 12 or Ctrl+C
+		atexit.register(habit_controller.dump_repository_metrics, args.metrics_dir)
+
+	if args.rebuild_analytics is not None:
+		processed_habits = habit_controller.rebuild_analytics(chunk_size=args.rebuild_analytics)
+		click.echo(click.style(f"Rebuilt the analytics of {processed_habits} habits.", fg="green", bold=True))
+		return
+
+	if args.import_progress:
+		import_progress(habit_controller, args)
+		return
+
+	if args.export:
+		export(database=MariadbConnection(), args=args)
+		return
+
+	if args.seed is not None:
+		#MariadbConnection is a singleton, the generator writes through the pool the controller uses
+		seed(database=MariadbConnection(), args=args)
 
 	cli = CLI(controller=habit_controller)
+	if args.command is not None:
+		cli.run_option(args.command)
+		return
 	cli.run()
 
+
+
+def main():
+
+	args = init_parser()
+
+	if not args.profile and not args.trace_memory:
+		run_session(args)
+		return
+
+	#the reports are written on the way out, also when the session ends through sys.exit, e.g. option 12 or Ctrl+C
+	profiler = SessionProfiler(directory=args.profile_dir, cpu=args.profile, memory=args.trace_memory)
+	try:
+		with profiler:
+			run_session(args)
+	finally:
+		click.echo(click.style(f"Wrote profiling reports to {args.profile_dir}.", fg="green", bold=True))
+
 if __name__ == '__main__':
-	main()
\ No newline at end of file
+	main()